@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Add the on-chain evidence id column to the database and fill it in for
+individually anchored evidence from the EvidenceUploaded events mirrored
+by the event indexer. Evidence whose event is missing or ambiguous is left
+empty and cannot be verified until its id is set.
+"""
+
+import sqlite3
+import json
+import os
+
+def add_chain_evidence_id_column():
+    """Add mrvdata.chain_evidence_id and backfill it from chain_events."""
+    db_path = "bluecarbon.db"
+
+    if not os.path.exists(db_path):
+        print(f"❌ Database {db_path} not found!")
+        return False
+
+    print(f"🗃️  Adding on-chain evidence id column to {db_path}...")
+
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("ALTER TABLE mrvdata ADD COLUMN chain_evidence_id INTEGER")
+            print("  SUCCESS: Added column: chain_evidence_id")
+        except sqlite3.OperationalError as e:
+            if "duplicate column name" in str(e).lower():
+                print("  INFO: Column already exists: chain_evidence_id")
+            else:
+                raise
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_mrvdata_chain_evidence_id ON mrvdata (chain_evidence_id)")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='chain_events'")
+        if not cursor.fetchone():
+            print("  INFO: No indexed chain events; start the API with the event indexer and run this again")
+            conn.commit()
+            conn.close()
+            return True
+
+        # (on-chain project id, evidence hash) -> on-chain evidence ids
+        uploaded = {}
+        cursor.execute("SELECT evidence_id, project_id, args FROM chain_events WHERE event = 'EvidenceUploaded'")
+        for chain_evidence_id, chain_project_id, args in cursor.fetchall():
+            evidence_hash = (json.loads(args) if isinstance(args, str) else args or {}).get("evidenceHash", "")
+            uploaded.setdefault((chain_project_id, evidence_hash.lower()), []).append(chain_evidence_id)
+
+        # Merkle-batched evidence is verified through its batch's on-chain id instead
+        cursor.execute("PRAGMA table_info(mrvdata)")
+        individual = ("COALESCE(m.anchor_mode, 'individual') = 'individual'"
+                      if "anchor_mode" in {col[1] for col in cursor.fetchall()} else "1 = 1")
+        cursor.execute(f"""
+            SELECT m.id, p.blockchain_id, m.evidence_hash FROM mrvdata m JOIN projects p ON p.id = m.project_id
+            WHERE m.chain_evidence_id IS NULL AND {individual}
+        """)
+        filled, unresolved = 0, []
+        for evidence_id, chain_project_id, evidence_hash in cursor.fetchall():
+            candidates = uploaded.get((chain_project_id, (evidence_hash or "").lower()), [])
+            if len(candidates) == 1:
+                cursor.execute("UPDATE mrvdata SET chain_evidence_id = ? WHERE id = ?", (candidates[0], evidence_id))
+                filled += 1
+            else:
+                unresolved.append(evidence_id)
+        conn.commit()
+        conn.close()
+
+        print(f"  SUCCESS: On-chain evidence id set for {filled} evidence records")
+        if unresolved:
+            print(f"\n⚠️  No unique EvidenceUploaded event for evidence {unresolved}; set chain_evidence_id by hand")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = add_chain_evidence_id_column()
+    if success:
+        print("\n🚀 Database is ready!")
+    else:
+        print("\n❌ Migration failed. Please check the errors above.")
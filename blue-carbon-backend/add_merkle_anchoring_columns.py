@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Add Merkle batch anchoring fields to the database.
+"""
+
+import sqlite3
+import os
+
+def add_merkle_anchoring_columns():
+    """Add the evidence anchoring columns to mrvdata."""
+    db_path = "bluecarbon.db"
+    
+    if not os.path.exists(db_path):
+        print(f"❌ Database {db_path} not found!")
+        return False
+    
+    print(f"🗃️  Adding Merkle anchoring columns to {db_path}...")
+    
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        # List of anchoring columns to add
+        columns_to_add = [
+            ("anchor_mode", "TEXT DEFAULT 'individual'"),
+            ("anchor_batch_id", "INTEGER"),
+            ("merkle_proof", "JSON")
+        ]
+        
+        for column_name, column_def in columns_to_add:
+            try:
+                cursor.execute(f"ALTER TABLE mrvdata ADD COLUMN {column_name} {column_def}")
+                print(f"  SUCCESS: Added column: {column_name}")
+            except sqlite3.OperationalError as e:
+                if "duplicate column name" in str(e).lower():
+                    print(f"  INFO: Column already exists: {column_name}")
+                else:
+                    print(f"  ERROR: Error adding {column_name}: {e}")
+        
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_mrvdata_anchor_batch_id ON mrvdata (anchor_batch_id)")
+        conn.commit()
+        
+        # Verify columns were added
+        cursor.execute("PRAGMA table_info(mrvdata)")
+        column_names = {col[1] for col in cursor.fetchall()}
+        conn.close()
+        
+        missing = [name for name, _ in columns_to_add if name not in column_names]
+        if missing:
+            print(f"\n⚠️  Missing anchoring columns: {missing}")
+            return False
+        
+        print(f"\nSUCCESS: Merkle anchoring migration completed successfully!")
+        return True
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = add_merkle_anchoring_columns()
+    if success:
+        print("\n🚀 Database is ready! Run init_db.py to create the evidence_anchor_batches table.")
+    else:
+        print("\n❌ Migration failed. Please check the errors above.")
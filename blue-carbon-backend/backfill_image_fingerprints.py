@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Compute the perceptual hashes of evidence uploaded before near-duplicate
+detection existed, so new uploads are checked against it too.
+Evidence that already has fingerprints is skipped; safe to run again.
+With --refresh every evidence is fingerprinted again (needed once for
+photos hashed before their EXIF orientation was applied).
+"""
+
+import os
+import sys
+
+from database import SessionLocal, engine
+from models.db_model import Base, ImageFingerprint, MRVData
+from services.blob_store import BlobStore
+from services.evidence_media import EvidenceMediaIndex
+from services.perceptual_hash import NearDuplicateIndex, fingerprint_file
+
+def backfill_image_fingerprints(refresh: bool = False):
+    """Fingerprint the images of every evidence that has none (or of all evidence, with refresh)."""
+    evidence_media = EvidenceMediaIndex(SessionLocal, BlobStore(SessionLocal))
+    duplicate_index = NearDuplicateIndex(SessionLocal)
+    Base.metadata.create_all(bind=engine, tables=[ImageFingerprint.__table__])
+    db = SessionLocal()
+    fingerprinted = 0
+
+    try:
+        done = set() if refresh else {evidence_id for (evidence_id,) in db.query(ImageFingerprint.evidence_id).distinct()}
+        evidence_ids = [evidence_id for (evidence_id,) in db.query(MRVData.id).order_by(MRVData.id) if evidence_id not in done]
+        print(f"🔎 Fingerprinting {len(evidence_ids)} evidence records...")
+
+        for evidence_id in evidence_ids:
+            fingerprints = []
+            for f in evidence_media.files(evidence_id):
+                if not os.path.exists(f["path"]):
+                    print(f"  WARNING: Evidence {evidence_id}: file not found: {f['path']}")
+                    continue
+                try:
+                    hashes = fingerprint_file(f["path"])
+                except Exception:
+                    continue  # not an image
+                fingerprints.append(dict(hashes, position=f["position"], name=f["name"], sha256=f["sha256"]))
+            if fingerprints:
+                if refresh:
+                    duplicate_index.forget(db, [evidence_id])
+                duplicate_index.record(db, evidence_id, fingerprints)
+                db.commit()
+                fingerprinted += 1
+
+        print(f"\nSUCCESS: Fingerprinted {fingerprinted} evidence records")
+        return True
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error during backfill: {e}")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    backfill_image_fingerprints(refresh="--refresh" in sys.argv[1:])
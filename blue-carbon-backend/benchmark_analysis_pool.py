@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Load test of the image analysis endpoint (POST /api/ai-verification/analyze-image)
+under concurrent uploads, with analyses run
+
+  inline     - on the event loop, as the evidence endpoints used to
+  threads    - on threads of the API process (ANALYSIS_WORKERS=0)
+  processes  - in the analysis process pool
+
+While the uploads are in flight a cheap request (GET /api/ai-verification/health)
+arrives every 50 ms; its latency, from arrival until the event loop has
+served it, is what every other client of the API sees during the burst.
+Uploads beyond the pool's capacity are answered 503 and counted. Every mode
+gets different images, so none is served from the analysis cache.
+
+The endpoint coroutines are driven in-process on one event loop, the way
+uvicorn runs them, so no server or HTTP client is needed.
+
+Usage: python benchmark_analysis_pool.py [concurrent uploads]
+"""
+
+import sys
+import os
+import io
+import asyncio
+import time
+
+import numpy as np
+from PIL import Image
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import services.ai_endpoints as ai_endpoints
+from services.analysis_pool import ANALYSIS_WORKERS, AnalysisPool, _ready
+
+UPLOADS = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+PROBE_INTERVAL = 0.05
+
+class InlinePool(AnalysisPool):
+    """Runs each analysis directly on the event loop."""
+
+    async def run(self, task, *args, **kwargs):
+        return task(*args, **kwargs)
+
+def make_upload(seed):
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 90, (1200, 1600, 3), dtype=np.uint8)
+    image[:, :800] += np.array([20, 140, 30], dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else float("nan")
+
+async def load_test(images):
+    probe_latencies, upload_latencies = [], []
+    rejected = 0
+    done = asyncio.Event()
+
+    async def probe():
+        arrival = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+            await ai_endpoints.health_check()
+            await asyncio.sleep(0)  # A response is only sent once the loop gets back to it
+            probe_latencies.append(time.perf_counter() - arrival)
+            arrival = max(arrival + PROBE_INTERVAL, time.perf_counter())
+
+    async def upload(data, index):
+        nonlocal rejected
+        file = UploadFile(io.BytesIO(data), filename=f"plot_{index}.jpg",
+                          headers=Headers({"content-type": "image/jpeg"}))
+        start = time.perf_counter()
+        try:
+            await ai_endpoints.analyze_image(file)
+            upload_latencies.append(time.perf_counter() - start)
+        except HTTPException as e:
+            if e.status_code != 503:
+                raise
+            rejected += 1
+
+    probe_task = asyncio.ensure_future(probe())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(upload(data, i) for i, data in enumerate(images)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe_task
+    return elapsed, upload_latencies, probe_latencies, rejected
+
+async def warm_up(pool, workers):
+    await asyncio.gather(*(pool.run(_ready) for _ in range(workers)))
+
+def main():
+    workers = max(1, ANALYSIS_WORKERS)
+    pools = {
+        "inline": InlinePool(workers=0, queue_size=UPLOADS),
+        "threads": AnalysisPool(workers=0),
+        "processes": AnalysisPool(workers=workers)
+    }
+    print(f"{UPLOADS} concurrent uploads of 1600x1200 JPEGs, {workers} worker process(es), {os.cpu_count()} CPU(s)")
+    print(f"{'mode':>9} | {'total s':>7} | {'done':>4} | {'503':>3} | {'upload p50 ms':>13} | {'probe p50 ms':>12} | {'probe p99 ms':>12} | {'probe max ms':>12}")
+    print("-" * 96)
+    for run, (mode, pool) in enumerate(pools.items()):
+        images = [make_upload(run * UPLOADS + i) for i in range(UPLOADS)]
+        pool.start()
+        if mode == "processes":
+            # Wait for the workers to finish warming up, as they would before traffic arrives
+            asyncio.run(warm_up(pool, workers))
+        ai_endpoints.analysis_pool = pool
+        try:
+            elapsed, uploads, probes, rejected = asyncio.run(load_test(images))
+        finally:
+            pool.stop()
+        print(f"{mode:>9} | {elapsed:>7.1f} | {len(uploads):>4} | {rejected:>3} | {percentile(uploads, 50):>13.0f} | "
+              f"{percentile(probes, 50):>12.1f} | {percentile(probes, 99):>12.1f} | {max(probes) * 1000:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Per-request overhead of building analyzers, compared with taking the shared
+instances from the analyzer registry (services/analyzer_registry.py).
+
+  per request  - what the estimate and immediate-analysis paths did: build a
+                 CO2SequestrationCalculator (and the dynamic credit calculator
+                 with its BeforeAfterAnalyzer, NDVIAnalyzer and CO2 calculator)
+                 for every request
+  registry     - analyzers.get() of the instances built once at start-up
+
+The first request of a fresh process also pays for importing the analysis
+stack; that is measured in a child process, with and without warm-up.
+
+Usage: python benchmark_analyzer_registry.py [requests]
+"""
+
+import sys
+import os
+import subprocess
+import time
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.analyzer_registry import AnalyzerRegistry, _default_factories
+from services.co2_sequestration_calculator import CO2SequestrationCalculator
+from services.dynamic_carbon_credit_calculator import DynamicCarbonCreditCalculator
+from services.greenness_analyzer import GreennessAnalyzer
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+FIRST_REQUEST = """
+import sys, time
+sys.path.insert(0, {path!r})
+started = time.perf_counter()
+from services.analyzer_registry import analyzers
+if {warm}:
+    analyzers.warm_up()
+ready = time.perf_counter()
+analyzers.get('dynamic_credits'); analyzers.get('co2'); analyzers.get('greenness')
+print(ready - started, time.perf_counter() - ready)
+"""
+
+def per_request():
+    DynamicCarbonCreditCalculator()
+    CO2SequestrationCalculator()
+    GreennessAnalyzer()
+
+def from_registry(registry):
+    registry.get('dynamic_credits')
+    registry.get('co2')
+    registry.get('greenness')
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        fn(*args)
+    return (time.perf_counter() - started) / REQUESTS * 1e6
+
+def first_request(warm):
+    code = FIRST_REQUEST.format(path=os.path.dirname(os.path.abspath(__file__)), warm=warm)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return [float(value) * 1000 for value in output.split()[-2:]]
+
+def main():
+    registry = AnalyzerRegistry(_default_factories())
+    registry.warm_up()
+    per_request()  # Imports done, so only construction is timed
+
+    construct_us = timed(per_request)
+    shared_us = timed(from_registry, registry)
+    print(f"{REQUESTS} requests, each needing the credit calculator, CO2 calculator and greenness analyzer")
+    print(f"{'':>12} | {'us/request':>10}")
+    print("-" * 27)
+    print(f"{'per request':>12} | {construct_us:>10.1f}")
+    print(f"{'registry':>12} | {shared_us:>10.2f}")
+    print(f"saved {construct_us - shared_us:.1f} us per request ({construct_us / max(shared_us, 1e-9):.0f}x)")
+
+    print()
+    print(f"{'fresh process':>14} | {'start-up ms':>11} | {'first request ms':>16}")
+    print("-" * 48)
+    for warm in (False, True):
+        startup_ms, request_ms = first_request(warm)
+        print(f"{'warm-up' if warm else 'lazy':>14} | {startup_ms:>11.0f} | {request_ms:>16.1f}")
+
+if __name__ == "__main__":
+    main()
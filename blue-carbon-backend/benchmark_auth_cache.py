@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Per-request cost of authenticating a bearer token (get_current_user),
+comparing
+
+  uncached  - AuthService.verify_token + AuthService.get_user_by_id: a JWT
+              decode and a users query in a new session, as before
+  cached    - services/auth_cache.py: decoded token and user snapshot reused
+
+against a users table in a temporary SQLite file.
+
+Usage: python benchmark_auth_cache.py [requests]
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.db_model import User, UserRole
+import services.auth as auth
+from services.auth import AuthService
+from services.auth_cache import AuthCache
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'users.db')}", connect_args={"check_same_thread": False})
+        User.__table__.create(bind=engine)
+        auth.SessionLocal = sessionmaker(bind=engine)
+        db = auth.SessionLocal()
+        db.add_all(User(username=f"user{n}", email=f"user{n}@example.org", password_hash="x", role=UserRole.USER)
+                   for n in range(1000))
+        db.commit()
+        db.close()
+        tokens = [AuthService.create_access_token(n, f"user{n}", "user") for n in range(1, 51)]
+
+        def uncached(token):
+            return AuthService.get_user_by_id(AuthService.verify_token(token)["user_id"])
+
+        cache = AuthCache()
+        def cached(token):
+            return cache.get_user(cache.verify_token(token)["user_id"])
+
+        print(f"{REQUESTS} authenticated requests from {len(tokens)} users")
+        print(f"{'auth':>9} | {'us/request':>10}")
+        print("-" * 23)
+        for name, authenticate in (("uncached", uncached), ("cached", cached)):
+            started = time.perf_counter()
+            for n in range(REQUESTS):
+                assert authenticate(tokens[n % len(tokens)]) is not None
+            print(f"{name:>9} | {(time.perf_counter() - started) / REQUESTS * 1e6:>10.1f}")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Response size and encoding time of the evidence image comparison
+(/evidence/{id}/image-comparison), comparing
+
+  base64 PNG  - the three rendered images PNG-encoded and inlined in the
+                JSON, as EvidenceImageComparator used to return them
+  renditions  - JPEG/WebP renditions stored once (services/renditions.py),
+                the JSON carrying their URLs
+
+For the renditions the bytes a viewer downloads are listed per format: the
+side-by-side comparison at 1024 px and both highlighted images at full size.
+Those are fetched once and then served from the browser cache (immutable
+URLs), while the base64 images come again with every view.
+
+Usage: python benchmark_comparison_renditions.py [pairs]
+"""
+
+import sys
+import os
+import base64
+import json
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.analysis_cache import analysis_cache
+from services.decoded_image import DecodedImage
+from services.evidence_image_comparator import EvidenceImageComparator
+from services.renditions import rendition_store
+
+PAIRS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+def make_photo(green, seed, size=(1600, 1200)):
+    """A smooth, photo-like scene (noise compresses unrealistically badly)."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    image = cv2.resize(rng.integers(0, 120, (height // 40, width // 40, 3), dtype=np.uint8), size,
+                       interpolation=cv2.INTER_CUBIC)
+    image[:, :int(width * green)] = np.clip(image[:, :int(width * green)].astype(int) + (20, 110, 20), 0, 255)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 92])
+    return encoded.tobytes()
+
+def base64_png(image):
+    ok, encoded = cv2.imencode(".png", image)
+    return f"data:image/png;base64,{base64.b64encode(encoded.tobytes()).decode()}"
+
+def main():
+    tmp = tempfile.mkdtemp()
+    rendition_store.root = os.path.join(tmp, "renditions")
+    analysis_cache.enabled = False
+    comparator = EvidenceImageComparator()
+    rows = {"base64 PNG": [], "renditions": []}
+    downloads = {"jpeg": [], "webp": []}
+    try:
+        for pair in range(PAIRS):
+            before = DecodedImage(make_photo(0.2, seed=pair * 2), "before.jpg")
+            after = DecodedImage(make_photo(0.6, seed=pair * 2 + 1), "after.jpg")
+
+            started = time.perf_counter()
+            result = comparator.compare_images(before, after)
+            rendered = time.perf_counter() - started
+            assert result["success"], result.get("error")
+            rows["renditions"].append((rendered, len(json.dumps(result, default=float))))
+
+            # The old response: the same images PNG-encoded and inlined
+            processed = [comparator.preprocess_decoded(image) for image in (before, after)]
+            masks = [comparator.detect_vegetation_areas(image)[0] for image in processed]
+            highlighted_before = comparator.create_highlighted_image(processed[0], masks[0], (0, 255, 255))
+            highlighted_after = comparator.create_highlighted_image(processed[1], masks[1], (0, 255, 0))
+            highlighted_diff = comparator.create_highlighted_image(processed[1], cv2.absdiff(*masks[::-1]), (0, 0, 255))
+            comparison = comparator.create_side_by_side_comparison(highlighted_before, highlighted_after, highlighted_diff)
+            started = time.perf_counter()
+            inline = {key: value for key, value in result.items() if key != "renditions"}
+            inline.update({
+                "comparison_image_b64": base64_png(comparison),
+                "before_highlighted_b64": base64_png(highlighted_before),
+                "after_highlighted_b64": base64_png(highlighted_after)
+            })
+            encoded = time.perf_counter() - started
+            rows["base64 PNG"].append((encoded, len(json.dumps(inline, default=float))))
+
+            renditions = result["renditions"]
+            for fmt in downloads:
+                urls = [renditions["comparison"]["urls"]["1024w"][fmt],
+                        renditions["before_highlighted"]["urls"]["full"][fmt],
+                        renditions["after_highlighted"]["urls"]["full"][fmt]]
+                downloads[fmt].append(sum(os.path.getsize(rendition_store.locate(*url.split("/")[-2:])[0])
+                                          for url in urls))
+    finally:
+        shutil.rmtree(tmp)
+
+    print(f"{PAIRS} comparisons of 1600x1200 photos")
+    print(f"{'response':>11} | {'JSON KB':>8} | {'encode ms':>9} | note")
+    print("-" * 64)
+    for mode, values in rows.items():
+        size_kb = np.mean([size for _, size in values]) / 1024
+        ms = np.mean([seconds for seconds, _ in values]) * 1000
+        note = "every view" if mode == "base64 PNG" else "whole comparison, first view only"
+        print(f"{mode:>11} | {size_kb:>8.1f} | {ms:>9.0f} | {note}")
+    for fmt, sizes in downloads.items():
+        print(f"{'':>11} | {np.mean(sizes) / 1024:>8.1f} | {'':>9} | {fmt} images, fetched once per client")
+
+if __name__ == "__main__":
+    main()
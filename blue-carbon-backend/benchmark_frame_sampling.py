@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Frame sampling from a long drone-style clip (a pan across a textured scene),
+comparing how the video analyzers read their frames
+
+  seek each  - cap.set(CAP_PROP_POS_FRAMES) + read() per sampled frame, as
+               AdvancedVideoAnalyzer.extract_optimal_frames did
+  read all   - read() and convert every frame up to the last sampled one,
+               as VideoAnalyzer.extract_key_frames did
+  sampler    - VideoFrameSampler (services/frame_sampling.py): frames read
+               in order with grab(), gaps seeked over when that decodes less
+  sampler Nw - the same, frames scaled down to N pixels wide when decoded
+
+for three sampling patterns: 10 frames at a fixed interval (VideoAnalyzer),
+15 evenly spaced frames (AdvancedVideoAnalyzer) and one frame per second.
+
+OpenCV's writer produces MPEG-4 Part 2 with a keyframe every 12 frames, so
+seeks are cheaper here than in long-GOP H.264 from a drone; the sampler
+reads the keyframe positions of the file and adapts to either.
+
+Usage: python benchmark_frame_sampling.py [seconds] [width]
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.frame_sampling import VideoFrameSampler, evenly_spaced
+
+SECONDS = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+WIDTH = int(sys.argv[2]) if len(sys.argv) > 2 else 640
+FPS = 30
+
+def write_clip(path, frame_count, width):
+    height = width * 9 // 16
+    rng = np.random.default_rng(0)
+    scene = cv2.resize(rng.integers(0, 255, (height // 4, width // 2, 3), dtype=np.uint8), (width * 2, height),
+                       interpolation=cv2.INTER_CUBIC)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), FPS, (width, height))
+    for index in range(frame_count):
+        offset = index % width
+        writer.write(np.ascontiguousarray(scene[:, offset:offset + width]))
+    writer.release()
+
+def seek_each(path, indices):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    for index in indices:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ret, frame = cap.read()
+        if ret:
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    return len(frames), f"{len(indices)} seeks"
+
+def read_all(path, indices):
+    cap = cv2.VideoCapture(path)
+    wanted, frames, index = set(indices), [], 0
+    while index <= max(indices):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index in wanted:
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        index += 1
+    cap.release()
+    return len(frames), f"{index} reads"
+
+def sampler(max_width=0):
+    def run(path, indices):
+        video = VideoFrameSampler(path, max_width)
+        frames = [frame for _, frame in video.frames(indices)]
+        video.close()
+        return len(frames), f"{video.grabbed} grabs, {video.seeks} seeks"
+    return run
+
+def main():
+    frame_count = SECONDS * FPS
+    path = os.path.join(tempfile.mkdtemp(), "clip.mp4")
+    started = time.perf_counter()
+    write_clip(path, frame_count, WIDTH)
+    print(f"{SECONDS}s clip, {WIDTH}px wide, {FPS} fps, {frame_count} frames (written in {time.perf_counter() - started:.0f}s)")
+
+    interval = frame_count // 10
+    patterns = {
+        "10 at interval": list(range(0, interval * 10, interval)),
+        "15 evenly spaced": evenly_spaced(frame_count, 15),
+        "1 per second": list(range(0, frame_count, FPS))
+    }
+    modes = {
+        "seek each": seek_each,
+        "read all": read_all,
+        "sampler": sampler(),
+        f"sampler {WIDTH // 2}w": sampler(WIDTH // 2)
+    }
+    print(f"{'pattern':>16} | {'mode':>12} | {'frames':>6} | {'seconds':>7} | decoder calls")
+    print("-" * 72)
+    for pattern, indices in patterns.items():
+        for mode, read in modes.items():
+            started = time.perf_counter()
+            frames, calls = read(path, indices)
+            elapsed = time.perf_counter() - started
+            print(f"{pattern:>16} | {mode:>12} | {frames:>6} | {elapsed:>7.2f} | {calls}")
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Time to produce the resized views the analyzers work on (NDVI 1024x768,
+greenness 512x384, comparator 800x600) for one uploaded photo, comparing
+
+  original  - decode the full upload, resample every view from it
+  pyramid   - read the 1024 px level stored at upload, resample from it
+
+and the one-off cost of building the pyramid in the upload's background job.
+
+Usage: python benchmark_image_pyramid.py [width] [height]
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.decoded_image import DecodedImage, LANCZOS, LINEAR
+from services.image_pyramid import pyramid_store
+
+WIDTH = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+HEIGHT = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+RUNS = 5
+
+VIEWS = (((1024, 768), LANCZOS), ((512, 384), LANCZOS), ((800, 600), LINEAR))
+
+def make_photo():
+    rng = np.random.default_rng(0)
+    image = cv2.resize(rng.integers(0, 200, (HEIGHT // 20, WIDTH // 20, 3), dtype=np.uint8), (WIDTH, HEIGHT),
+                       interpolation=cv2.INTER_CUBIC)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 92])
+    return encoded.tobytes()
+
+def analyzer_views(data):
+    started = time.perf_counter()
+    image = DecodedImage(data)
+    for size, method in VIEWS:
+        image.view(size, method)
+    return time.perf_counter() - started
+
+def main():
+    data = make_photo()
+    tmp = tempfile.mkdtemp()
+    pyramid_store.root = tmp
+    try:
+        original = min(analyzer_views(data) for _ in range(RUNS))
+
+        started = time.perf_counter()
+        pyramid_store.build(DecodedImage(data))
+        build = time.perf_counter() - started
+        stored = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(tmp) for name in names)
+
+        pyramid = min(analyzer_views(data) for _ in range(RUNS))
+    finally:
+        shutil.rmtree(tmp)
+
+    print(f"{WIDTH}x{HEIGHT} JPEG ({len(data) / 1024:.0f} KB), views {', '.join(f'{w}x{h}' for (w, h), _ in VIEWS)}")
+    print(f"{'source':>9} | {'ms':>7}")
+    print("-" * 20)
+    print(f"{'original':>9} | {original * 1000:>7.1f}")
+    print(f"{'pyramid':>9} | {pyramid * 1000:>7.1f}")
+    print(f"\nBuilding the pyramid once: {build * 1000:.0f} ms, {stored / 1024:.0f} KB stored")
+
+if __name__ == "__main__":
+    main()
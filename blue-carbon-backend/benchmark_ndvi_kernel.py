@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Peak memory and throughput of the NDVIAnalyzer pixel kernel (NDVI map,
+vegetation / composition masks and health metrics) on 20-megapixel drone
+frames: the previous float64 implementation with full-frame boolean masks
+versus the float32 in-place kernel with a blocked single-pass histogram.
+
+Peak memory is the resident set high-water mark above the frame itself,
+read from /proc (Linux only), so OpenCV allocations are included.
+
+Usage: python benchmark_ndvi_kernel.py
+"""
+
+import sys
+import os
+import time
+
+import cv2
+import numpy as np
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.ai_verification import NDVIAnalyzer
+
+FRAME_SIZE = (5472, 3648)  # 20 MP, a common drone camera resolution
+REPEATS = 3
+
+def make_frame(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(40, 160, (height, width, 3), dtype=np.uint8)
+    frame[:, :width // 2, 1] = rng.integers(120, 230, (height, width // 2), dtype=np.uint8)
+    return frame
+
+def legacy_kernel(analyzer, image):
+    """The float64 NDVI, per-class boolean masks and np.sum scans this benchmark replaces."""
+    image_float = image.astype(np.float64)
+    nir_proxy = image_float[:, :, 1] + (image_float[:, :, 2] * 0.3)
+    red = image_float[:, :, 0]
+    denominator = nir_proxy + red
+    denominator = np.where(denominator == 0, 1, denominator)
+    ndvi = np.clip((nir_proxy - red) / denominator, -1, 1)
+
+    hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
+    lab = cv2.cvtColor(image, cv2.COLOR_RGB2LAB)
+    hue, saturation, value = hsv[:, :, 0], hsv[:, :, 1], hsv[:, :, 2]
+    vegetation = ((35 <= hue) & (hue <= 85) & (saturation > 30) & (value > 20)) | (lab[:, :, 1] < 127)
+    np.sum(vegetation)
+
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    np.std(cv2.Laplacian(gray, cv2.CV_64F, ksize=9))
+    np.mean(np.var(image, axis=(0, 1)))
+    np.sum(((10 <= hue) & (hue <= 30)) & (saturation > 20))
+    np.sum(((100 <= hue) & (hue <= 130)) & (saturation > 30))
+
+    np.mean(ndvi), np.std(ndvi), np.max(ndvi), np.min(ndvi)
+    np.sum(ndvi > analyzer.healthy_vegetation_threshold)
+    np.sum((ndvi > analyzer.min_vegetation_threshold) & (ndvi <= analyzer.healthy_vegetation_threshold))
+    np.sum((ndvi > 0) & (ndvi <= analyzer.min_vegetation_threshold))
+    np.sum(ndvi <= 0)
+    np.sum(ndvi > analyzer.mangrove_specific_threshold)
+
+def current_kernel(analyzer, image):
+    ndvi = analyzer.calculate_ndvi_rgb(image)
+    vegetation = analyzer.enhanced_vegetation_detection(image)
+    analyzer.analyze_image_composition(image)
+    analyzer.calculate_health_metrics(ndvi, vegetation)
+
+def read_status_kb(field):
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+def measure(kernel, analyzer, frame):
+    """(seconds per frame, peak MB above the resident baseline)."""
+    with open("/proc/self/clear_refs", "w") as fh:
+        fh.write("5")  # Reset the resident high-water mark
+    baseline = read_status_kb("VmRSS")
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        kernel(analyzer, frame)
+    seconds = (time.perf_counter() - start) / REPEATS
+    return seconds, (read_status_kb("VmHWM") - baseline) / 1024
+
+def main():
+    analyzer = NDVIAnalyzer()
+    width, height = FRAME_SIZE
+    frame = make_frame(width, height)
+    megapixels = width * height / 1e6
+    current_kernel(analyzer, frame[:256, :256])  # Warm-up
+
+    print(f"Frame: {width}x{height} ({megapixels:.1f} MP, {frame.nbytes / 1e6:.0f} MB uint8)")
+    print(f"{'kernel':>20} | {'s/frame':>8} | {'MP/s':>6} | {'peak MB':>8}")
+    print("-" * 52)
+    for name, kernel in (("float64 + masks", legacy_kernel), ("float32 + histogram", current_kernel)):
+        seconds, peak = measure(kernel, analyzer, frame)
+        print(f"{name:>20} | {seconds:>8.2f} | {megapixels / seconds:>6.1f} | {peak:>8.0f}")
+
+if __name__ == "__main__":
+    main()
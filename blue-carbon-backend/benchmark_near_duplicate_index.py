@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate lookup time over N stored image fingerprints, comparing
+
+  linear scan   - Hamming distance to every stored dHash (numpy, vectorized)
+  multi-index   - MultiIndexHashTable.search (services/perceptual_hash.py)
+  index.find    - NearDuplicateIndex.find: table sync query, multi-index
+                  search and pHash check (SQLite in memory)
+
+Queries are stored hashes with a few bits flipped (resubmitted photos) and
+random hashes (new photos, the common case).
+
+Usage: python benchmark_near_duplicate_index.py [N]
+"""
+
+import sys
+import os
+import random
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.db_model import Base, ImageFingerprint
+from services.perceptual_hash import NEAR_DUPLICATE_DISTANCE, MultiIndexHashTable, NearDuplicateIndex
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+QUERIES = 500
+
+def per_query_us(search, queries):
+    started = time.perf_counter()
+    for query in queries:
+        search(query)
+    return (time.perf_counter() - started) / len(queries) * 1e6
+
+def main():
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(64) for _ in range(N)]
+    near = []
+    for _ in range(QUERIES // 2):
+        query = rng.choice(hashes)
+        for bit in rng.sample(range(64), rng.randint(0, NEAR_DUPLICATE_DISTANCE)):
+            query ^= 1 << bit
+        near.append(query)
+    fresh = [rng.getrandbits(64) for _ in range(QUERIES // 2)]
+
+    stored = np.array(hashes, dtype=np.uint64)
+    def linear(query):
+        xor = stored ^ np.uint64(query)
+        bits = np.unpackbits(xor.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+        return np.nonzero(bits <= NEAR_DUPLICATE_DISTANCE)[0]
+
+    table = MultiIndexHashTable()
+    started = time.perf_counter()
+    for key, value in enumerate(hashes):
+        table.add(key, value)
+    build = time.perf_counter() - started
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[ImageFingerprint.__table__])
+    with engine.begin() as connection:
+        connection.execute(ImageFingerprint.__table__.insert(), [
+            {"evidence_id": key, "position": 0, "name": f"{key}.jpg", "dhash": f"{value:016x}", "phash": f"{value:016x}"}
+            for key, value in enumerate(hashes)
+        ])
+    index = NearDuplicateIndex(sessionmaker(bind=engine), phash_distance=64)
+    started = time.perf_counter()
+    index.find("0" * 16, "0" * 16)
+    load = time.perf_counter() - started
+
+    print(f"{N} stored fingerprints, radius {NEAR_DUPLICATE_DISTANCE} bits, {QUERIES} queries")
+    print(f"{'search':>12} | {'near-dup us':>11} | {'new photo us':>12}")
+    print("-" * 42)
+    for name, search in (("linear scan", linear),
+                         ("multi-index", lambda q: table.search(q, NEAR_DUPLICATE_DISTANCE)),
+                         ("index.find", lambda q: index.find(f"{q:016x}", f"{q:016x}"))):
+        print(f"{name:>12} | {per_query_us(search, near):>11.0f} | {per_query_us(search, fresh):>12.0f}")
+    print(f"\nBuilding the table: {build:.1f} s; first find() loading it from the database: {load:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for project listing: per-project evidence queries (N+1)
+versus the batched loader in services/project_loader.py.
+
+Uses a file-backed SQLite database in a temp directory so the numbers include
+real statement round-trips. With the batched loader the number of queries
+stays flat as projects and evidence grow, so the remaining cost is the
+per-row hydration shown in the "us/row" column.
+
+Usage: python benchmark_project_listing.py
+"""
+
+import sys
+import os
+import time
+import tempfile
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.db_model import Base, MRVData, ProjectData
+from services.project_loader import load_projects_with_evidences
+
+PROJECT_COUNTS = [100, 500, 2000]
+EVIDENCE_PER_PROJECT = [1, 5, 20]
+REPEATS = 3
+
+def build_database(db_path: str, project_count: int, evidence_per_project: int):
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        conn.execute(ProjectData.__table__.insert(), [
+            {"id": i, "blockchain_id": i, "name": f"Project {i}", "username": "bench"}
+            for i in range(1, project_count + 1)
+        ])
+        conn.execute(MRVData.__table__.insert(), [
+            {"project_id": i, "uploader": "0xbench", "gps": "0,0", "co2": "0"}
+            for i in range(1, project_count + 1)
+            for _ in range(evidence_per_project)
+        ])
+
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statements(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    return engine, statements
+
+def list_n_plus_one(db):
+    projects = db.query(ProjectData).all()
+    return [
+        (project, db.query(MRVData).filter(MRVData.project_id == project.id).all())
+        for project in projects
+    ]
+
+def list_batched(db):
+    return load_projects_with_evidences(db, db.query(ProjectData))
+
+def time_listing(session_factory, statements, listing):
+    best = float("inf")
+    queries = 0
+    for _ in range(REPEATS):
+        db = session_factory()
+        statements.clear()
+        start = time.perf_counter()
+        listing(db)
+        best = min(best, time.perf_counter() - start)
+        queries = len(statements)
+        db.close()
+    return best * 1000, queries
+
+def run_benchmark():
+    print(f"{'projects':>8} {'ev/proj':>8} | {'N+1 ms':>9} {'queries':>8} | "
+          f"{'batched ms':>10} {'queries':>8} {'us/row':>7} | {'speedup':>7}")
+    print("-" * 84)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for project_count in PROJECT_COUNTS:
+            for evidence_per_project in EVIDENCE_PER_PROJECT:
+                db_path = os.path.join(tmp, f"bench_{project_count}_{evidence_per_project}.db")
+                engine, statements = build_database(db_path, project_count, evidence_per_project)
+                session_factory = sessionmaker(bind=engine)
+
+                naive_ms, naive_queries = time_listing(session_factory, statements, list_n_plus_one)
+                batched_ms, batched_queries = time_listing(session_factory, statements, list_batched)
+
+                rows = project_count * (evidence_per_project + 1)
+                print(f"{project_count:>8} {evidence_per_project:>8} | {naive_ms:>9.1f} {naive_queries:>8} | "
+                      f"{batched_ms:>10.1f} {batched_queries:>8} {batched_ms * 1000 / rows:>7.1f} | "
+                      f"{naive_ms / batched_ms:>6.1f}x")
+                engine.dispose()
+
+if __name__ == "__main__":
+    run_benchmark()
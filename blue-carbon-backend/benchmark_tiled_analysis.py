@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Peak memory and throughput of tiled orthomosaic analysis at native
+resolution (TiledImageAnalyzer over a memory-mapped uncompressed TIFF)
+versus decoding the whole image and analysing it at once.
+
+Peak memory is the resident set high-water mark of the analysis, read
+from /proc (Linux only). Whole-image analysis is skipped past
+WHOLE_IMAGE_MAX_PIXELS, where it would exhaust memory.
+
+Usage: python benchmark_tiled_analysis.py
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.tiled_analysis import TiledImageAnalyzer, open_raster
+from test_tiled_analysis import write_tiff, whole_image_analysis
+
+IMAGE_SIZES = [(5000, 5000), (10000, 10000), (20000, 20000)]
+WHOLE_IMAGE_MAX_PIXELS = 100_000_000
+
+def scene_pixels(x, y, w, h):
+    rng = np.random.default_rng(y * 100003 + x)
+    chunk = rng.integers(0, 60, (h, w, 3), dtype=np.uint8)
+    columns = np.arange(x, x + w)
+    chunk[:, (columns // 700) % 3 == 0] += np.array([30, 150, 40], dtype=np.uint8)
+    chunk[:, (columns // 700) % 3 == 1] += np.array([150, 110, 60], dtype=np.uint8)
+    return chunk
+
+def read_status_kb(field):
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+def measure(run):
+    """(seconds, peak MB above the resident baseline)."""
+    with open("/proc/self/clear_refs", "w") as fh:
+        fh.write("5")  # Reset the resident high-water mark
+    baseline = read_status_kb("VmRSS")
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start, (read_status_kb("VmHWM") - baseline) / 1024
+
+def whole_image(path):
+    with Image.open(path) as image:
+        whole_image_analysis(np.array(image.convert("RGB")))
+
+def main():
+    analyzer = TiledImageAnalyzer()
+    Image.MAX_IMAGE_PIXELS = None  # The whole-image baseline decodes past Pillow's bomb limit
+    print(f"Tile size: {analyzer.tile_size}px")
+    print(f"{'image':>12} | {'MP':>5} | {'file MB':>7} | {'tiled s':>7} | {'MP/s':>5} | {'tiled peak MB':>13} | {'whole s':>7} | {'whole peak MB':>13}")
+    print("-" * 92)
+    with tempfile.TemporaryDirectory() as tmp:
+        for width, height in IMAGE_SIZES:
+            path = os.path.join(tmp, f"mosaic_{width}x{height}.tif")
+            write_tiff(path, width, height, scene_pixels, rows_per_strip=64)
+            megapixels = width * height / 1e6
+
+            def tiled():
+                with open_raster(path) as reader:
+                    analyzer.analyze_raster(reader, os.path.basename(path))
+
+            tiled_s, tiled_peak = measure(tiled)
+            if width * height <= WHOLE_IMAGE_MAX_PIXELS:
+                whole_s, whole_peak = measure(lambda: whole_image(path))
+                whole = f"{whole_s:>7.1f} | {whole_peak:>13.0f}"
+            else:
+                whole = f"{'n/a':>7} | {'n/a':>13}"
+            print(f"{width:>5}x{height:<6} | {megapixels:>5.0f} | {os.path.getsize(path) / 1e6:>7.0f} | "
+                  f"{tiled_s:>7.1f} | {megapixels / tiled_s:>5.1f} | {tiled_peak:>13.0f} | {whole}")
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
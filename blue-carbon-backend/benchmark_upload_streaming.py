@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Peak memory benchmark for evidence uploads: reading each file into memory,
+writing it and re-reading it for the SHA-256 (the old /upload path) versus
+the single-pass chunked copy in services/upload_storage.py.
+
+Every measurement runs in a fresh child process and reports its peak RSS
+(ru_maxrss), so the numbers are not polluted by earlier runs. The streaming
+path should stay flat as the file grows; the buffered path grows with it.
+
+Usage: python benchmark_upload_streaming.py [size_mb ...]
+"""
+
+import sys
+import os
+import hashlib
+import resource
+import subprocess
+import tempfile
+import time
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+FILE_SIZES_MB = [16, 64, 256]
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def buffered_upload(source_path: str, dest_path: str) -> str:
+    with open(source_path, "rb") as f:
+        content = f.read()
+    with open(dest_path, "wb") as out:
+        out.write(content)
+    m = hashlib.sha256()
+    with open(dest_path, "rb") as fh:
+        m.update(fh.read())
+    return m.hexdigest()
+
+def streaming_upload(source_path: str, dest_path: str) -> str:
+    from services.upload_storage import save_upload_stream
+    m = hashlib.sha256()
+    with open(source_path, "rb") as f:
+        save_upload_stream(f, dest_path, m, max_bytes=None)
+    return m.hexdigest()
+
+def run_child(mode: str, source_path: str):
+    baseline = peak_rss_mb()
+    dest_path = source_path + ".out"
+    start = time.perf_counter()
+    digest = (streaming_upload if mode == "streaming" else buffered_upload)(source_path, dest_path)
+    elapsed = time.perf_counter() - start
+    os.remove(dest_path)
+    print(f"{peak_rss_mb():.1f} {peak_rss_mb() - baseline:.1f} {elapsed:.3f} {digest}")
+
+def make_file(path: str, size_mb: int):
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+def measure(mode: str, source_path: str):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, source_path],
+        check=True, capture_output=True, text=True
+    ).stdout.split()
+    return float(output[0]), float(output[1]), float(output[2]), output[3]
+
+def main(sizes):
+    print(f"{'size':>8} | {'mode':>9} | {'peak RSS':>9} | {'growth':>8} | {'time':>7}")
+    print("-" * 54)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in sizes:
+            source_path = os.path.join(tmp, f"upload-{size_mb}.bin")
+            make_file(source_path, size_mb)
+            digests = set()
+            for mode in ("buffered", "streaming"):
+                peak, growth, elapsed, digest = measure(mode, source_path)
+                digests.add(digest)
+                print(f"{size_mb:>5} MB | {mode:>9} | {peak:>6.1f} MB | {growth:>5.1f} MB | {elapsed:>6.2f}s")
+            assert len(digests) == 1, "streaming and buffered hashes differ"
+            os.remove(source_path)
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        run_child(sys.argv[2], sys.argv[3])
+    else:
+        main([int(arg) for arg in sys.argv[1:]] or FILE_SIZES_MB)
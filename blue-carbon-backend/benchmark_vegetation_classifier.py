@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Patch-count scaling benchmark for VegetationClassifier.classify_vegetation:
+the previous per-patch loop (k-means, Canny and filter2D per patch, one
+predict_proba call per patch) versus the whole-image feature engine with a
+single batched predict_proba.
+
+The per-patch loop takes minutes on large frames, so it is timed on the
+first LEGACY_SAMPLE_PATCHES patches and extrapolated ("est").
+
+Usage: python benchmark_vegetation_classifier.py
+"""
+
+import sys
+import os
+import time
+
+import numpy as np
+from sklearn.cluster import KMeans
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.vegetation_classifier import VegetationClassifier
+
+IMAGE_SIZES = [(256, 256), (512, 384), (1024, 768), (2048, 1536)]
+PATCH_SIZE = 32
+LEGACY_SAMPLE_PATCHES = 100
+
+def make_scene(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    image = rng.integers(60, 140, (height, width, 3), dtype=np.uint8)
+    image[:, :width // 2, 1] = rng.integers(170, 230, (height, width // 2), dtype=np.uint8)
+    mask = np.zeros((height, width))
+    mask[:, :width // 2] = 1
+    return image, mask
+
+def legacy_patch_features(classifier, patch):
+    """Features as the per-patch loop computed them, k-means color diversity included."""
+    color = classifier.extract_color_features(patch)
+    texture = classifier.extract_texture_features(patch)
+    kmeans = KMeans(n_clusters=5, random_state=42, n_init=10).fit(patch.reshape(-1, 3))
+    return np.concatenate([color, texture, [np.var(kmeans.cluster_centers_.flatten())]])
+
+def legacy_seconds_per_patch(classifier, image):
+    step = PATCH_SIZE // 4
+    positions = [
+        (y, x)
+        for y in range(0, image.shape[0] - PATCH_SIZE + 1, step)
+        for x in range(0, image.shape[1] - PATCH_SIZE + 1, step)
+    ][:LEGACY_SAMPLE_PATCHES]
+    start = time.perf_counter()
+    for y, x in positions:
+        features = legacy_patch_features(classifier, image[y:y + PATCH_SIZE, x:x + PATCH_SIZE]).reshape(1, -1)
+        classifier.classifier.predict_proba(classifier.scaler.transform(features))
+    return (time.perf_counter() - start) / len(positions)
+
+def main():
+    classifier = VegetationClassifier()
+    train_image, train_mask = make_scene(512, 384)
+    classifier.train_classifier([train_image], [train_mask])
+    classifier.classify_vegetation(train_image, patch_size=PATCH_SIZE)  # Warm-up
+    legacy_per_patch = None
+
+    print(f"{'image':>11} | {'patches':>8} | {'per-patch loop':>15} | {'vectorized':>10} | {'us/patch':>8} | {'speedup':>8}")
+    print("-" * 76)
+    for width, height in IMAGE_SIZES:
+        image, _ = make_scene(width, height, seed=1)
+        ys, xs = classifier.patch_grid(height, width, PATCH_SIZE, PATCH_SIZE // 4)
+        patches = len(ys) * len(xs)
+
+        start = time.perf_counter()
+        classifier.classify_vegetation(image, patch_size=PATCH_SIZE)
+        vectorized = time.perf_counter() - start
+
+        if legacy_per_patch is None:
+            legacy_per_patch = legacy_seconds_per_patch(classifier, image)
+        legacy = legacy_per_patch * patches
+
+        print(f"{width:>5}x{height:<5} | {patches:>8} | {legacy:>10.1f}s est | {vectorized:>9.3f}s | "
+              f"{vectorized / patches * 1e6:>8.1f} | {legacy / vectorized:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
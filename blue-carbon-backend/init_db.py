@@ -1,6 +1,6 @@
 # init_db.py
 from database import engine
-from models.db_model import Base, MRVData, ProjectData  # Explicitly import all models
+from models.db_model import Base, MRVData, ProjectData, ChainProject, ChainCheckpoint, ChainEvent, EvidenceAnchorBatch, MediaBlob, EvidenceMedia, ImageFingerprint  # Explicitly import all models
 from models.auth_model import User, LoginSession, UserRole  # Import auth models
 from services.auth import AuthService
 
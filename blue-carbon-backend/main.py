@@ -1,6 +1,7 @@
 # main.py
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from typing import List, Any, Optional, Dict
@@ -11,6 +12,8 @@ import os
 import numpy as np
 import hashlib
 import logging
+import asyncio
+import mimetypes
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -38,19 +41,55 @@ def convert_numpy_types(obj):
 
 # ⬇️ DB + MRV integration
 from database import SessionLocal
-from models.db_model import MRVData, ProjectData
+from sqlalchemy import or_
+from sqlalchemy.orm import load_only
+from models.db_model import ChainEvent, MRVData, ProjectData, EvidenceAnchorBatch
 from models.auth_model import User, UserRole
 from services.mrv import upload_field_data
 from services.auth import AuthService
+from services.auth_cache import auth_cache
+from services.project_loader import attach_evidences, load_evidences_by_project, load_latest_evidence_timestamps
+from services.chain_cache import ProjectChainCache
+from services.event_indexer import RegistryEventIndexer
+from services.tx_manager import TransactionManager, TransactionBuildError
+from services.upload_storage import (
+    MAX_UPLOAD_BYTES, MAX_UPLOAD_REQUEST_BYTES, MULTIPART_OVERHEAD_BYTES, UploadTooLargeError,
+    RequestSizeLimitMiddleware, upload_path, read_upload
+)
+from services.analysis_cache import analysis_cache, file_content_hash
+from services.image_pyramid import PREVIEW_CACHE_CONTROL, PYRAMID_LEVELS, PYRAMID_VERSION, pyramid_store
+from services.renditions import RENDITION_CACHE_CONTROL, rendition_store
+from services.analyzer_registry import analyzers
+from services.video_ingest import MAX_VIDEO_BYTES, cleanup_stale_spools
+from services.analysis_pool import (
+    analysis_pool, AnalysisPoolSaturated, ANALYSIS_RETRY_AFTER,
+    dynamic_credits, evidence_image_comparison, green_progress, image_fingerprint, pyramid
+)
+from services.blob_store import BlobStore, build_media_hashes, media_blob_hashes
+from services.evidence_media import EvidenceMediaIndex, media_roles
+from services.perceptual_hash import NearDuplicateIndex, fingerprint_file
+from services.analysis_jobs import AnalysisJobQueue, RetryLater, serialize_job
+from services.evidence_anchoring import EvidenceBatchAnchorer, ANCHOR_MODE_INDIVIDUAL, ANCHOR_MODE_MERKLE, ANCHOR_WINDOW_SECONDS
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, parse_fields, project_fields, keyset_page, page_response
 
 # AI Verification Services (temporarily disabled)
 from services.ai_endpoints import ai_router
-from services.dynamic_carbon_credit_calculator import DynamicCarbonCreditCalculator
 # from services.admin import admin_router
 # from services.blockchain import blockchain_router
 
 app = FastAPI()
 
+# ---------------- Upload Size Limits ----------------
+# Checked before the multipart body is parsed; added first so CORS headers wrap the 413
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    limits={
+        "/upload": MAX_UPLOAD_REQUEST_BYTES,
+        "/api/ai-verification/analyze-video": MAX_VIDEO_BYTES + MULTIPART_OVERHEAD_BYTES,
+        "/api/ai-verification/analyze-orthomosaic": MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    },
+)
+
 # ---------------- CORS Setup ----------------
 app.add_middleware(
     CORSMiddleware,
@@ -80,6 +119,22 @@ with open(TOKEN_ABI_PATH, "r", encoding="utf-8") as f:
 registry = w3.eth.contract(address=Web3.to_checksum_address(REGISTRY_ADDRESS), abi=registry_abi)
 token = w3.eth.contract(address=Web3.to_checksum_address(TOKEN_ADDRESS), abi=token_abi)
 
+# Registry events are mirrored into SQLite by a background indexer; the project
+# cache is refreshed from its poll loop so requests never wait on the node
+EVENT_INDEXER_ENABLED = os.getenv("EVENT_INDEXER_ENABLED", "true").lower() == "true"
+event_indexer = RegistryEventIndexer(w3, registry, SessionLocal)
+project_cache = ProjectChainCache(w3, registry, SessionLocal, sync_on_read=not EVENT_INDEXER_ENABLED)
+event_indexer.add_listener(lambda: project_cache.sync(force=True))
+
+@app.on_event("startup")
+def start_event_indexer():
+    if EVENT_INDEXER_ENABLED:
+        event_indexer.start()
+
+@app.on_event("shutdown")
+def stop_event_indexer():
+    event_indexer.stop()
+
 # ---------------- Owner Setup ----------------
 DEFAULT_HARDHAT_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
 OWNER_KEY = os.getenv("PRIVATE_KEY", DEFAULT_HARDHAT_KEY)
@@ -98,6 +153,112 @@ if not OWNER:
 
 OWNER = Web3.to_checksum_address(OWNER)
 
+# All backend transactions go through one manager so nonces are allocated locally
+tx_manager = TransactionManager(w3, OWNER, OWNER_KEY)
+
+@app.on_event("shutdown")
+def stop_tx_manager():
+    tx_manager.stop()
+
+# Uploaded evidence files, stored once per unique content
+blob_store = BlobStore(SessionLocal)
+
+# Files of each evidence with their before/after roles, looked up by evidence id
+evidence_media = EvidenceMediaIndex(SessionLocal, blob_store)
+
+# Perceptual hashes of every evidence image, searched for near-duplicates of new uploads
+duplicate_index = NearDuplicateIndex(SessionLocal)
+
+async def fingerprint_upload(path: str) -> Optional[Dict]:
+    """Perceptual hashes of an uploaded file, or None if it isn't an image."""
+    try:
+        try:
+            return await analysis_pool.run(image_fingerprint, path)
+        except AnalysisPoolSaturated:
+            # Uploads don't wait for the pool: hashing is a small fraction of an analysis
+            return await asyncio.to_thread(fingerprint_file, path)
+    except Exception as e:
+        logger.info(f"No perceptual hash for {os.path.basename(path)}: {str(e)}")
+        return None
+
+def classify_near_duplicates(project_id: int, matches: List[Dict]) -> List[Dict]:
+    """
+    Tag near-duplicate matches of an upload's images with the matched evidence's project
+    and file role, and whether they make the upload a resubmission: images of another
+    project, or of this project's other evidence in the same role. This project's
+    evidence of the complementary role is expected to look alike (an "after" photo
+    taken from where the "before" was), so those matches are only flagged.
+    """
+    if not matches:
+        return matches
+    db = SessionLocal()
+    try:
+        projects = dict(db.query(MRVData.id, MRVData.project_id).filter(
+            MRVData.id.in_({match["evidence_id"] for match in matches})
+        ).all())
+    finally:
+        db.close()
+    roles = {}
+    for evidence_id in projects:
+        for f in evidence_media.files(evidence_id):
+            roles[(evidence_id, f["position"])] = f["role"]
+    for match in matches:
+        match["project_id"] = projects.get(match["evidence_id"])
+        match["role"] = roles.get((match["evidence_id"], match["position"]), "media")
+        match["resubmission"] = match["project_id"] != project_id or match["role"] == match["file_role"]
+    return matches
+
+def uploaded_evidence_id(receipt) -> Optional[int]:
+    """On-chain evidence id from an uploadEvidence receipt."""
+    events = registry.events.EvidenceUploaded().process_receipt(receipt)
+    return int(events[0]["args"]["evidenceId"]) if events else None
+
+def submit_anchor_root(batch_id: int, blockchain_project_id: int, merkle_root: bytes, evidence_uri: str) -> str:
+    """Anchor one Merkle batch root with a single uploadEvidence transaction."""
+    return tx_manager.submit(
+        registry.functions.uploadEvidence(blockchain_project_id, merkle_root, evidence_uri),
+        "uploadEvidence",
+        on_confirmed=lambda receipt: evidence_anchorer.mark_anchored(batch_id, uploaded_evidence_id(receipt)),
+        on_failed=lambda record: evidence_anchorer.mark_failed(batch_id),
+        context={"anchor_batch_id": batch_id}
+    )["tx_hash"]
+
+# Evidence uploaded with anchor_mode=merkle_batch is anchored in windows of many hashes per transaction
+evidence_anchorer = EvidenceBatchAnchorer(
+    SessionLocal,
+    submit_anchor_root,
+    window_seconds=float(os.getenv("EVIDENCE_ANCHOR_WINDOW_SECONDS", ANCHOR_WINDOW_SECONDS))
+)
+
+@app.on_event("startup")
+def start_evidence_anchorer():
+    evidence_anchorer.start()
+
+@app.on_event("shutdown")
+def stop_evidence_anchorer():
+    evidence_anchorer.stop()
+
+# CPU-bound image analysis runs in worker processes, off the event loop
+@app.on_event("startup")
+def start_analysis_pool():
+    analysis_pool.start()
+
+@app.on_event("shutdown")
+def stop_analysis_pool():
+    analysis_pool.stop()
+
+@app.on_event("startup")
+def remove_stale_video_spools():
+    cleanup_stale_spools()
+
+def analysis_busy(error: Optional[Exception] = None) -> HTTPException:
+    """503 for requests arriving while every analysis worker and queue slot is taken."""
+    return HTTPException(
+        status_code=503,
+        detail=str(error or "Analysis capacity exhausted, please retry shortly"),
+        headers={"Retry-After": str(ANALYSIS_RETRY_AFTER)}
+    )
+
 # ---------------- Models ----------------
 class Project(BaseModel):
     name: str
@@ -121,6 +282,22 @@ class VerifyRequest(BaseModel):
     receipt_token_uri: str = ""
     mint_amount: int = 0
 
+class BatchVerifyRequest(BaseModel):
+    evidence_ids: List[int]
+    mint_receipt: bool = False
+    receipt_token_uri: str = ""
+    mint_amount: int = 0  # Per-evidence fallback when no AI-calculated credits exist
+
+class BatchAnchorVerifyRequest(BaseModel):
+    mint_receipt: bool = False
+    receipt_token_uri: str = ""
+    mint_amount: int = 0  # Per-evidence fallback when no AI-calculated credits exist
+
+class MerkleProofRequest(BaseModel):
+    evidence_hash: str
+    proof: List[Dict[str, str]]
+    merkle_root: str
+
 class MintRequest(BaseModel):
     project_id: int
     amount: int
@@ -151,14 +328,14 @@ class AuthResponse(BaseModel):
 security = HTTPBearer()
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
-    """Get current authenticated user from JWT token"""
+    """Get current authenticated user from JWT token (decoded token and user cached briefly)"""
     token = credentials.credentials
-    payload = AuthService.verify_token(token)
+    payload = auth_cache.verify_token(token)
     
     if payload is None:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     
-    user = AuthService.get_user_by_id(payload["user_id"])
+    user = auth_cache.get_user(payload["user_id"])
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     
@@ -171,12 +348,12 @@ def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials
     
     try:
         token = credentials.credentials
-        payload = AuthService.verify_token(token)
+        payload = auth_cache.verify_token(token)
         
         if payload is None:
             return None
         
-        user = AuthService.get_user_by_id(payload["user_id"])
+        user = auth_cache.get_user(payload["user_id"])
         return user
     except Exception:
         return None
@@ -210,15 +387,66 @@ def clean(o: Any):
     if hasattr(o, "__dict__"): return {k: clean(v) for k, v in vars(o).items()}
     return o
 
-def sign_and_send(tx: dict):
+def submit_transaction(contract_call, kind: str, gas: int = 2_000_000, on_confirmed=None, on_failed=None,
+                       context: dict = None) -> dict:
+    """Send a registry/token call without waiting for it to be mined; returns the pending tx record."""
+    try:
+        return tx_manager.submit(contract_call, kind, gas=gas, on_confirmed=on_confirmed, on_failed=on_failed,
+                                 context=context)
+    except TransactionBuildError as e:
+        raise HTTPException(status_code=400, detail=f"Failed to build {kind} transaction: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Transaction failed: {e}")
+
+def sign_and_send(contract_call, kind: str, gas: int = 2_000_000):
+    """Send a call and block until it is mined, for callers that need the receipt to respond."""
+    tx_hash = submit_transaction(contract_call, kind, gas=gas)["tx_hash"]
     try:
-        signed = w3.eth.account.sign_transaction(tx, private_key=OWNER_KEY)
-        raw = signed.raw_transaction
-        tx_hash = w3.eth.send_raw_transaction(raw)
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return Web3.to_hex(tx_hash), clean(dict(receipt))
+        record = tx_manager.wait(tx_hash)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Transaction failed: {e}")
+    if record["status"] != "confirmed":
+        raise HTTPException(status_code=500, detail=f"Transaction failed: {record['error']}")
+    return tx_hash, clean(dict(record["receipt"]))
+
+# Evidence columns needed by the listing endpoints. Loading only these keeps
+# large JSON columns (ai_analysis_results) out of list responses entirely.
+EVIDENCE_LIST_COLUMNS = (
+    MRVData.id, MRVData.project_id, MRVData.uploader, MRVData.gps, MRVData.co2,
+    MRVData.media_hashes, MRVData.evidence_hash, MRVData.timestamp, MRVData.verified,
+    MRVData.calculated_carbon_credits, MRVData.credit_calculation_method
+)
+
+# Response field -> column backing it, used to project /evidences queries
+EVIDENCE_FIELD_COLUMNS = {
+    "evidenceId": MRVData.id,
+    "projectId": MRVData.project_id,
+    "uploader": MRVData.uploader,
+    "gps": MRVData.gps,
+    "co2": MRVData.co2,
+    "mediaHashes": MRVData.media_hashes,
+    "evidenceHash": MRVData.evidence_hash,
+    "timestamp": MRVData.timestamp,
+    "verified": MRVData.verified,
+    "calculated_carbon_credits": MRVData.calculated_carbon_credits,
+    "credit_calculation_method": MRVData.credit_calculation_method,
+    "evidenceType": MRVData.evidence_type,
+    "confidenceScore": MRVData.confidence_score,
+    "analysisSummary": MRVData.analysis_summary,
+    "aiAnalysisResults": MRVData.ai_analysis_results
+}
+
+def evidence_columns_for(selected: Optional[set]) -> tuple:
+    """Columns to load for the requested evidence fields (defaults to the list view)."""
+    if selected is None:
+        return EVIDENCE_LIST_COLUMNS
+    return (MRVData.id,) + tuple(
+        column for field, column in EVIDENCE_FIELD_COLUMNS.items() if field in selected
+    )
+
+def paginated(limit: Optional[int], after: Optional[int]) -> bool:
+    """Listing endpoints keep returning a bare array unless a page is requested."""
+    return limit is not None or after is not None
 
 # ---------------- Routes ----------------
 @app.get("/status")
@@ -342,14 +570,39 @@ def update_wallet_address(
         if existing_user:
             raise HTTPException(status_code=400, detail="Wallet address already in use")
         
-        # Update wallet address
-        current_user.wallet_address = wallet_address
+        # Update wallet address (current_user isn't attached to this session)
+        user = db.query(User).filter(User.id == current_user.id).first()
+        user.wallet_address = wallet_address
         db.commit()
+        auth_cache.invalidate_user(current_user.id)
         
         return {"message": "Wallet address updated successfully", "wallet_address": wallet_address}
     finally:
         db.close()
 
+class UserActiveRequest(BaseModel):
+    is_active: bool
+
+@app.put("/admin/users/{user_id}/active")
+def set_user_active(user_id: int, request: UserActiveRequest, current_user: User = Depends(require_admin)):
+    """Deactivate (or reactivate) a user account (admin only); takes effect on the user's next request"""
+    if user_id == current_user.id and not request.is_active:
+        raise HTTPException(status_code=400, detail="You cannot deactivate your own account")
+    
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        user.is_active = request.is_active
+        db.commit()
+        auth_cache.invalidate_user(user_id)
+        
+        return {"id": user_id, "username": user.username, "is_active": user.is_active}
+    finally:
+        db.close()
+
 @app.get("/admin/users")
 def get_all_users(current_user: User = Depends(require_admin)):
     """Get all users (admin only)"""
@@ -375,27 +628,42 @@ def get_all_users(current_user: User = Depends(require_admin)):
 # ---------------- Existing Routes ----------------
 
 @app.get("/projects/my")
-def get_my_projects(current_user: Optional[User] = Depends(get_current_user_optional)):
-    """Get projects owned by the current user with full details"""
+def get_my_projects(
+    current_user: Optional[User] = Depends(get_current_user_optional),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, ge=0),
+    fields: Optional[str] = None
+):
+    """
+    Get projects owned by the current user with full details.
+    Pass `limit` (and the previous page's `next_cursor` as `after`) for keyset
+    pagination, and `fields` to return only some keys (omit `evidences` to skip
+    loading evidence at all).
+    """
+    selected = parse_fields(fields)
+    
     # If not authenticated, return empty array
     if current_user is None:
-        return clean([])
+        return clean(page_response([], None, limit or DEFAULT_PAGE_SIZE) if paginated(limit, after) else [])
     
     try:
         db = SessionLocal()
         
         # Query projects by username instead of wallet address
-        user_projects = db.query(ProjectData).filter(
-            ProjectData.username == current_user.username
-        ).all()
+        project_query = db.query(ProjectData).filter(ProjectData.username == current_user.username)
+        if paginated(limit, after):
+            user_projects, next_cursor = keyset_page(project_query, ProjectData.id, limit or DEFAULT_PAGE_SIZE, after)
+        else:
+            user_projects, next_cursor = project_query.order_by(ProjectData.id).all(), None
+        
+        # Evidence for the whole page is loaded in one batched query
+        if selected is None or "evidences" in selected:
+            user_projects = attach_evidences(db, user_projects, evidence_columns=EVIDENCE_LIST_COLUMNS)
+        else:
+            user_projects = [(project, []) for project in user_projects]
         
         projects = []
-        for project in user_projects:
-            # Get evidence for this project
-            evidences_query = db.query(MRVData).filter(
-                MRVData.project_id == project.id
-            ).all()
-            
+        for project, evidence_rows in user_projects:
             evidences = [
                 {
                     "evidenceId": r.id,
@@ -409,10 +677,10 @@ def get_my_projects(current_user: Optional[User] = Depends(get_current_user_opti
                     "verified": r.verified,
                     "calculated_carbon_credits": r.calculated_carbon_credits,
                     "credit_calculation_method": r.credit_calculation_method
-                } for r in evidences_query
+                } for r in evidence_rows
             ]
             
-            projects.append({
+            projects.append(project_fields({
                 "id": project.id,  # Use database ID consistently
                 "name": project.name,
                 "location": project.location,
@@ -425,9 +693,11 @@ def get_my_projects(current_user: Optional[User] = Depends(get_current_user_opti
                 "evidences": evidences,
                 "verified_on_blockchain": project.verified_on_blockchain,
                 "created_at": project.created_at.isoformat() if project.created_at else None
-            })
+            }, selected))
         
         db.close()
+        if paginated(limit, after):
+            return clean(page_response(projects, next_cursor, limit or DEFAULT_PAGE_SIZE))
         return clean(projects)
         
     except Exception as e:
@@ -435,29 +705,51 @@ def get_my_projects(current_user: Optional[User] = Depends(get_current_user_opti
         raise HTTPException(status_code=500, detail=f"Failed to fetch projects: {e}")
 
 @app.get("/projects/all")
-def get_all_projects_limited(current_user: User = Depends(get_current_user)):
-    """Get all projects with limited info for NGO users (only address and latest credit timeframe)"""
+def get_all_projects_limited(
+    current_user: User = Depends(get_current_user),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, ge=0),
+    fields: Optional[str] = None
+):
+    """
+    Get all projects with limited info for NGO users (only address and latest credit timeframe).
+    Supports `limit`/`after` cursor pagination over blockchain project ids and `fields` projection.
+    Project structs come from `project_cache` rather than one RPC call per project.
+    """
+    selected = parse_fields(fields)
     try:
-        total = registry.functions.totalProjects().call()
+        total = project_cache.total_projects()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read totalProjects: {e}")
 
+    # Project ids on chain are sequential, so a page is simply an id range
+    first_id = (after or 0) + 1
+    last_id = min(total, first_id + (limit or DEFAULT_PAGE_SIZE) - 1) if paginated(limit, after) else total
+    next_cursor = last_id if paginated(limit, after) and last_id < total else None
+
+    chain_projects = project_cache.get_projects(first_id, last_id)
+    project_ids = [project_id for project_id, _ in chain_projects]
+
+    # Evidence for the whole page comes from one session and a batched query
+    db = SessionLocal()
+    try:
+        if current_user.role == UserRole.ADMIN:
+            if selected is None or "evidences" in selected:
+                evidences_by_project = load_evidences_by_project(db, project_ids, columns=EVIDENCE_LIST_COLUMNS)
+            else:
+                evidences_by_project = {}
+        else:
+            latest_timestamps = load_latest_evidence_timestamps(db, project_ids)
+    finally:
+        db.close()
+
     projects = []
     # Use the specific wallet address for filtering
     target_wallet = "0xa114791A6a939087048960f48e62fbe817828CD1"
     
-    for i in range(1, total + 1):
-        try:
-            p = registry.functions.projects(i).call()
-        except Exception:
-            continue
-
+    for i, p in chain_projects:
         # For admin users, show full details
         if current_user.role == UserRole.ADMIN:
-            # fetch evidences from DB for this project
-            db = SessionLocal()
-            rows = db.query(MRVData).filter(MRVData.project_id == i).all()
-            db.close()
             evidences = [
                 {
                     "evidenceId": r.id,
@@ -467,11 +759,11 @@ def get_all_projects_limited(current_user: User = Depends(get_current_user)):
                     "co2": r.co2,
                     "mediaHashes": r.media_hashes,
                     "evidenceHash": r.evidence_hash,
-                    "timestamp": r.timestamp.isoformat()
-                } for r in rows
+                    "timestamp": r.timestamp.isoformat() if r.timestamp else None
+                } for r in evidences_by_project.get(i, [])
             ]
 
-            projects.append({
+            projects.append(project_fields({
                 "id": i,
                 "name": p[0],
                 "location": p[1],
@@ -481,41 +773,57 @@ def get_all_projects_limited(current_user: User = Depends(get_current_user)):
                 "exists": p[5],
                 "totalIssuedCredits": p[6],
                 "evidences": evidences
-            })
+            }, selected))
         else:
             # For NGO users, only show limited info for projects they don't own
             if p[3].lower() != target_wallet.lower():
-                # Get latest evidence timestamp for timeframe info
-                db = SessionLocal()
-                latest_evidence = db.query(MRVData).filter(MRVData.project_id == i).order_by(MRVData.timestamp.desc()).first()
-                db.close()
+                # Latest evidence timestamp gives the timeframe info
+                latest_evidence = latest_timestamps.get(i)
+                latest_timeframe = latest_evidence.isoformat() if latest_evidence else None
                 
-                latest_timeframe = latest_evidence.timestamp.isoformat() if latest_evidence else None
-                
-                projects.append({
+                projects.append(project_fields({
                     "id": i,
                     "owner": p[3],  # Only crypto address
                     "totalIssuedCredits": p[6],
                     "latestCreditTimeframe": latest_timeframe,
                     "isLimited": True  # Flag to indicate limited data
-                })
+                }, selected))
 
+    if paginated(limit, after):
+        return clean(page_response(projects, next_cursor, limit or DEFAULT_PAGE_SIZE))
     return clean(projects)
 
 @app.get("/projects")
-def get_projects():
-    """Legacy endpoint - returns all projects with full details (for backwards compatibility)"""
+def get_projects(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, ge=0),
+    fields: Optional[str] = None
+):
+    """
+    Legacy endpoint - returns all projects with full details (for backwards compatibility).
+    Supports the same `limit`/`after`/`fields` parameters as /projects/my.
+    """
+    selected = parse_fields(fields)
     try:
         db = SessionLocal()
-        all_projects = db.query(ProjectData).all()
+        if paginated(limit, after):
+            rows, next_cursor = keyset_page(db.query(ProjectData), ProjectData.id, limit or DEFAULT_PAGE_SIZE, after)
+        else:
+            rows, next_cursor = db.query(ProjectData).order_by(ProjectData.id).all(), None
+
+        # Evidence is keyed by blockchain id here (falling back to the database id)
+        if selected is None or "evidences" in selected:
+            all_projects = attach_evidences(
+                db,
+                rows,
+                evidence_key=lambda project: project.blockchain_id or project.id,
+                evidence_columns=EVIDENCE_LIST_COLUMNS
+            )
+        else:
+            all_projects = [(project, []) for project in rows]
         
         projects = []
-        for project in all_projects:
-            # Get evidence for this project
-            evidences_query = db.query(MRVData).filter(
-                MRVData.project_id == (project.blockchain_id or project.id)
-            ).all()
-            
+        for project, evidence_rows in all_projects:
             evidences = [
                 {
                     "evidenceId": r.id,
@@ -526,10 +834,10 @@ def get_projects():
                     "mediaHashes": r.media_hashes,
                     "evidenceHash": r.evidence_hash,
                     "timestamp": r.timestamp.isoformat() if r.timestamp else None
-                } for r in evidences_query
+                } for r in evidence_rows
             ]
 
-            projects.append({
+            projects.append(project_fields({
                 "id": project.id,  # Use database ID, not blockchain_id
                 "name": project.name,
                 "location": project.location,
@@ -540,15 +848,48 @@ def get_projects():
                 "exists": True,
                 "totalIssuedCredits": project.total_issued_credits,
                 "evidences": evidences
-            })
+            }, selected))
         
         db.close()
+        if paginated(limit, after):
+            return clean(page_response(projects, next_cursor, limit or DEFAULT_PAGE_SIZE))
         return clean(projects)
         
     except Exception as e:
         logger.error(f"Error fetching projects: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch projects: {e}")
 
+def record_project_registration(local_project_id: int, receipt):
+    """Confirmation handler for registerProject: store the on-chain id on the local record."""
+    db = SessionLocal()
+    try:
+        project_record = db.query(ProjectData).filter(ProjectData.id == local_project_id).first()
+        if not project_record:
+            logger.warning(f"Project {local_project_id} was deleted before its registration was mined")
+            return
+        
+        project_record.verified_on_blockchain = True
+        
+        # Try to get blockchain project ID from events
+        try:
+            # Look for ProjectRegistered events in the receipt
+            project_events = registry.events.ProjectRegistered().process_receipt(receipt)
+            if project_events:
+                blockchain_project_id = int(project_events[0]["args"]["projectId"])
+                project_record.blockchain_id = blockchain_project_id
+                logger.info(f"Project registered on blockchain with ID: {blockchain_project_id}")
+            else:
+                # If no events found, fall back to the project count at the receipt's block
+                total_projects = registry.functions.totalProjects().call(block_identifier=receipt["blockNumber"])
+                project_record.blockchain_id = total_projects
+                logger.info(f"Using total projects count as blockchain ID: {total_projects}")
+        except Exception as e:
+            logger.error(f"Failed to get blockchain project ID: {e}")
+        
+        db.commit()
+    finally:
+        db.close()
+
 @app.post("/projects")
 def register_project(project: Project, current_user: User = Depends(get_current_user)):
     owner_checksum = to_checksum(project.owner)
@@ -571,57 +912,32 @@ def register_project(project: Project, current_user: User = Depends(get_current_
         db.refresh(project_record)
         local_project_id = project_record.id
         
-        # Then submit to blockchain
+        # Then submit to blockchain; the record is completed once the tx is mined
         try:
-            tx = registry.functions.registerProject(
-                project.name,
-                project.location,
-                project.hectares,
-                owner_checksum,
-                project.metadata
-            ).build_transaction({
-                "from": OWNER,
-                "nonce": w3.eth.get_transaction_count(OWNER),
-                "gas": 2_000_000,
-                "gasPrice": w3.to_wei("20", "gwei")
-            })
-            tx_hash, receipt = sign_and_send(tx)
+            pending = submit_transaction(
+                registry.functions.registerProject(
+                    project.name,
+                    project.location,
+                    project.hectares,
+                    owner_checksum,
+                    project.metadata
+                ),
+                "registerProject",
+                on_confirmed=lambda receipt: record_project_registration(local_project_id, receipt),
+                context={"project_id": local_project_id}
+            )
+            tx_hash = pending["tx_hash"]
             
-            # Update database record with blockchain info
+            # Store the tx hash right away so uploads can wait for the registration
             project_record.tx_hash = tx_hash
-            project_record.verified_on_blockchain = True
-            
-            # Try to get blockchain project ID from events
-            try:
-                # Look for ProjectRegistered events in the receipt
-                project_events = registry.events.ProjectRegistered().process_receipt(receipt)
-                if project_events:
-                    blockchain_project_id = int(project_events[0]["args"]["projectId"])
-                    project_record.blockchain_id = blockchain_project_id
-                    logger.info(f"Project registered on blockchain with ID: {blockchain_project_id}")
-                else:
-                    # If no events found, try to get the total projects count
-                    total_projects = registry.functions.totalProjects().call()
-                    project_record.blockchain_id = total_projects
-                    logger.info(f"Using total projects count as blockchain ID: {total_projects}")
-            except Exception as e:
-                logger.warning(f"Could not extract project ID from blockchain events: {e}")
-                # Fallback: use total projects count
-                try:
-                    total_projects = registry.functions.totalProjects().call()
-                    project_record.blockchain_id = total_projects
-                    logger.info(f"Fallback: using total projects count as blockchain ID: {total_projects}")
-                except Exception as fallback_error:
-                    logger.error(f"Failed to get blockchain project ID: {fallback_error}")
-            
             db.commit()
             
             return clean({
-                "status": "ok", 
+                "status": "pending", 
                 "tx_hash": tx_hash, 
-                "receipt": receipt,
+                "tx_status": pending["status"],
                 "project_id": local_project_id,
-                "blockchain_id": project_record.blockchain_id
+                "blockchain_id": None
             })
         except Exception as blockchain_error:
             # Blockchain failed, but project is saved locally
@@ -658,9 +974,19 @@ def delete_project(project_id: int, current_user: User = Depends(get_current_use
         db = SessionLocal()
         try:
             # Delete all MRV data associated with this project
+            rows = db.query(MRVData.id, MRVData.media_hashes).filter(MRVData.project_id == project_id).all()
+            evidence_ids = [row.id for row in rows]
+            evidence_media.forget(db, evidence_ids)
+            duplicate_index.forget(db, evidence_ids)
             deleted_evidence = db.query(MRVData).filter(MRVData.project_id == project_id).delete()
             db.commit()
             
+            # Release their files; blobs shared with other evidence are kept
+            try:
+                blob_store.release(sha256 for row in rows for sha256 in media_blob_hashes(row.media_hashes))
+            except Exception as file_error:
+                logger.warning(f"Failed to delete some files: {file_error}")
+            
             # Note: We can't actually delete the project from the blockchain contract
             # as it would break the indexing. Instead, we mark it as deleted by setting exists=false
             # This would require a contract modification to add a deleteProject function
@@ -683,6 +1009,76 @@ def delete_project(project_id: int, current_user: User = Depends(get_current_use
             raise e
         raise HTTPException(status_code=500, detail=f"Failed to delete project: {e}")
 
+def record_uploaded_evidence_id(db_id: int, receipt):
+    """
+    Confirmation handler for uploadEvidence: stores the evidence id the chain assigned.
+    Concurrent uploads can be mined in another order than their rows were inserted,
+    so /verify uses this id rather than the database id.
+    """
+    try:
+        chain_evidence_id = uploaded_evidence_id(receipt)
+    except Exception as e:
+        logger.error(f"Could not read EvidenceUploaded event of evidence {db_id}: {e}")
+        return
+    if chain_evidence_id is None:
+        logger.error(f"No EvidenceUploaded event in the receipt of evidence {db_id}")
+        return
+    db = SessionLocal()
+    try:
+        db.query(MRVData).filter(MRVData.id == db_id).update({"chain_evidence_id": chain_evidence_id})
+        db.commit()
+    finally:
+        db.close()
+
+def recover_uploaded_evidence_ids() -> int:
+    """
+    Event indexer listener: stores the on-chain id of individually anchored evidence whose
+    uploadEvidence receipt was never handled (mined after a restart dropped its tracking),
+    from the indexed EvidenceUploaded events. Matched by on-chain project id and evidence
+    hash; keys with several unclaimed events or evidence records are left alone.
+    """
+    db = SessionLocal()
+    try:
+        missing = db.query(MRVData.id, MRVData.evidence_hash, ProjectData.blockchain_id).join(
+            ProjectData, ProjectData.id == MRVData.project_id
+        ).filter(
+            MRVData.chain_evidence_id.is_(None),
+            ProjectData.blockchain_id.isnot(None),
+            or_(MRVData.anchor_mode.is_(None), MRVData.anchor_mode == ANCHOR_MODE_INDIVIDUAL)
+        ).all()
+        if not missing:
+            return 0
+
+        claimed = db.query(MRVData.chain_evidence_id).filter(MRVData.chain_evidence_id.isnot(None))
+        events = db.query(ChainEvent.evidence_id, ChainEvent.project_id, ChainEvent.args).filter(
+            ChainEvent.event == "EvidenceUploaded",
+            ChainEvent.project_id.in_({row.blockchain_id for row in missing}),
+            ChainEvent.evidence_id.notin_(claimed)
+        ).all()
+
+        uploaded, unresolved = {}, {}
+        for event in events:
+            key = (event.project_id, ((event.args or {}).get("evidenceHash") or "").lower())
+            uploaded.setdefault(key, []).append(event.evidence_id)
+        for row in missing:
+            unresolved.setdefault((row.blockchain_id, (row.evidence_hash or "").lower()), []).append(row.id)
+
+        recovered = 0
+        for key, evidence_ids in unresolved.items():
+            chain_evidence_ids = uploaded.get(key, [])
+            if len(evidence_ids) == 1 and len(chain_evidence_ids) == 1:
+                db.query(MRVData).filter(MRVData.id == evidence_ids[0]).update({"chain_evidence_id": chain_evidence_ids[0]})
+                recovered += 1
+        if recovered:
+            db.commit()
+            logger.info(f"Recovered the on-chain id of {recovered} evidence records from indexed events")
+        return recovered
+    finally:
+        db.close()
+
+# Uploads whose receipt was missed are caught up after every indexer poll
+event_indexer.add_listener(recover_uploaded_evidence_ids)
+
 @app.post("/upload")
 async def upload_evidence(
     project_id: int = Form(...),
@@ -692,54 +1088,28 @@ async def upload_evidence(
     evidence_type: str = Form("general"),  # "before", "after", "general", "before_after_pair"
     project_area_hectares: Optional[float] = Form(None),
     time_period_years: float = Form(1.0),
+    anchor_mode: str = Form(ANCHOR_MODE_INDIVIDUAL),  # "individual" or "merkle_batch"
     files: List[UploadFile] = File(None)
 ):
     """
     Upload evidence files with support for before/after image analysis.
     For AI-based carbon credit calculation, both before and after images are required.
+    With anchor_mode=merkle_batch the evidence hash is queued and anchored on chain
+    together with other uploads as one Merkle root instead of its own transaction.
     """
     # Validate evidence type
     valid_evidence_types = ["before", "after", "general", "before_after_pair"]
     if evidence_type not in valid_evidence_types:
         raise HTTPException(status_code=400, detail=f"Invalid evidence_type. Must be one of: {valid_evidence_types}")
     
+    valid_anchor_modes = [ANCHOR_MODE_INDIVIDUAL, ANCHOR_MODE_MERKLE]
+    if anchor_mode not in valid_anchor_modes:
+        raise HTTPException(status_code=400, detail=f"Invalid anchor_mode. Must be one of: {valid_anchor_modes}")
+    
     # For before/after analysis, project area is required
     if evidence_type in ["before", "after", "before_after_pair"] and project_area_hectares is None:
         raise HTTPException(status_code=400, detail="project_area_hectares is required for before/after evidence")
     
-    # Save files locally
-    os.makedirs("uploads", exist_ok=True)
-    saved_files = []
-    file_data = {}
-    
-    for f in files or []:
-        path = os.path.join("uploads", f.filename)
-        file_content = await f.read()
-        
-        # Save file
-        with open(path, "wb") as buffer:
-            buffer.write(file_content)
-        saved_files.append(path)
-        
-        # Store file data for AI analysis
-        file_data[f.filename] = file_content
-
-    # Compute sha256 hash
-    m = hashlib.sha256()
-    for path in saved_files:
-        with open(path, "rb") as fh: 
-            m.update(fh.read())
-    evidence_hash_bytes = m.digest()
-
-    metadata = json.dumps({
-        "gps": gps, 
-        "co2": co2 if co2 is not None else 0.0,  # Default to 0.0 for legacy compatibility
-        "evidence_type": evidence_type,
-        "project_area_hectares": project_area_hectares,
-        "time_period_years": time_period_years,
-        "files": [os.path.basename(p) for p in saved_files]
-    })
-
     # Get the blockchain project ID for the evidence upload
     db_check = SessionLocal()
     try:
@@ -748,33 +1118,87 @@ async def upload_evidence(
             raise HTTPException(status_code=404, detail="Project not found in database")
         
         blockchain_project_id = project_record.blockchain_id
-        if blockchain_project_id is None:
-            raise HTTPException(status_code=400, detail="Project not registered on blockchain. Please re-register the project.")
+        registration_tx = project_record.tx_hash
         
+    except HTTPException:
+        raise
     except Exception as db_error:
         raise HTTPException(status_code=500, detail=f"Database error: {db_error}")
     finally:
         db_check.close()
 
-    # Blockchain transaction using blockchain project ID
-    tx = registry.functions.uploadEvidence(blockchain_project_id, evidence_hash_bytes, metadata).build_transaction({
-        "from": OWNER,
-        "nonce": w3.eth.get_transaction_count(OWNER),
-        "gas": 2_000_000,
-        "gasPrice": w3.to_wei("20", "gwei")
-    })
-    tx_hash, receipt = sign_and_send(tx)
+    # A project registered moments ago may still be waiting for its block
+    if blockchain_project_id is None and registration_tx and tx_manager.get(registration_tx):
+        try:
+            await asyncio.to_thread(tx_manager.wait, registration_tx)
+        except Exception as e:
+            logger.warning(f"Waiting for registration {registration_tx} failed: {e}")
+        db_check = SessionLocal()
+        try:
+            blockchain_project_id = db_check.query(ProjectData.blockchain_id).filter(ProjectData.id == project_id).scalar()
+        finally:
+            db_check.close()
+    
+    if blockchain_project_id is None:
+        raise HTTPException(status_code=400, detail="Project not registered on blockchain. Please re-register the project.")
 
-    # Get evidence_id
-    evidence_id = None
+    # Stream files into the content-addressed store, hashing them in the same pass;
+    # content that is already stored is deduplicated
+    blobs = []
+    m = hashlib.sha256()
+    
     try:
-        events = registry.events.EvidenceUploaded().process_receipt(receipt)
-        if events: 
-            evidence_id = int(events[0]["args"]["evidenceId"])
-    except Exception:
-        pass
+        for f in files or []:
+            name = os.path.basename(upload_path(f.filename))
+            blob = await asyncio.to_thread(blob_store.ingest, f.file, m, MAX_UPLOAD_BYTES)
+            blobs.append(dict(blob, name=name))
+    except (UploadTooLargeError, ValueError) as e:
+        blob_store.release(blob["sha256"] for blob in blobs)
+        status_code = 413 if isinstance(e, UploadTooLargeError) else 400
+        raise HTTPException(status_code=status_code, detail=str(e))
+    
+    evidence_hash_bytes = m.digest()
+    saved_files = [blob_store.path_for(blob["sha256"]) for blob in blobs]
+    media_hashes = build_media_hashes(blobs)
+
+    # Resubmitted photos (renamed, recompressed, resized) are caught by perceptual hash
+    fingerprints = []
+    near_duplicates = []
+    roles = media_roles(evidence_type, [blob["name"] for blob in blobs])
+    for position, (blob, path) in enumerate(zip(blobs, saved_files)):
+        hashes = await fingerprint_upload(path)
+        if hashes:
+            fingerprints.append(dict(hashes, position=position, name=blob["name"], sha256=blob["sha256"]))
+            # Off the event loop: the first search of a process loads every stored fingerprint
+            matches = await asyncio.to_thread(duplicate_index.find, hashes["dhash"], hashes["phash"])
+            near_duplicates.extend(dict(match, file=blob["name"], file_role=roles[position]) for match in matches)
+    near_duplicates = await asyncio.to_thread(classify_near_duplicates, project_id, near_duplicates)
+
+    metadata = json.dumps({
+        "gps": gps, 
+        "co2": co2 if co2 is not None else 0.0,  # Default to 0.0 for legacy compatibility
+        "evidence_type": evidence_type,
+        "project_area_hectares": project_area_hectares,
+        "time_period_years": time_period_years,
+        "files": media_hashes["files"],
+        "content_hashes": media_blob_hashes(media_hashes)
+    })
 
-    # Store in database with enhanced fields
+    # Before/after evidence is analysed by a background job, so the upload doesn't wait
+    # for it; the client polls /jobs/{id} or follows /jobs/{id}/events
+    analysis_skipped = None
+    job_kind = {"before_after_pair": "immediate_pair", "before": "paired", "after": "paired"}.get(evidence_type)
+    resubmitted = sorted({match["evidence_id"] for match in near_duplicates if match["resubmission"]})
+    if job_kind and resubmitted:
+        # Photos already submitted as other evidence aren't analysed (and credited) again;
+        # the verifier sees them flagged instead
+        logger.warning(f"Evidence upload resubmits images of evidence {resubmitted}; analysis skipped")
+        job_kind = None
+        analysis_skipped = "near_duplicate"
+    if job_kind and len(blobs) < (2 if job_kind == "immediate_pair" else 1):
+        job_kind = None
+
+    # Store in database with enhanced fields (before submitting, so the confirmation handler knows its id)
     db = SessionLocal()
     try:
         # Create MRV record with new fields
@@ -783,13 +1207,14 @@ async def upload_evidence(
             uploader=uploader,
             gps=gps,
             co2=str(co2 if co2 is not None else 0.0),  # Legacy field with default
-            media_hashes={"files": [os.path.basename(p) for p in saved_files]},
+            media_hashes=media_hashes,
             evidence_hash="0x" + evidence_hash_bytes.hex(),
             verified=False,
             
             # New fields
             evidence_type=evidence_type,
             project_area_hectares=project_area_hectares,
+            anchor_mode=anchor_mode,
             
             # Placeholder for AI analysis results (will be updated during verification)
             calculated_co2_sequestration=None,
@@ -804,58 +1229,90 @@ async def upload_evidence(
         )
         
         db.add(record)
+        db.flush()
+        evidence_media.record(db, record.id, evidence_type, media_hashes)
+        duplicate_index.record(db, record.id, fingerprints)
+        
+        # Jobs are committed with the evidence, so an analysis can't be lost between the two.
+        # The pyramid job goes first, so the analysis job usually finds the downscaled levels built
+        jobs = []
+        if blobs:
+            jobs.append(analysis_jobs.add(db, "pyramid", record.id, project_id, {}))
+        if job_kind:
+            jobs.append(analysis_jobs.add(db, job_kind, record.id, project_id, {
+                "evidence_type": evidence_type,
+                "project_area_hectares": project_area_hectares,
+                "time_period_years": time_period_years
+            }))
         db.commit()
         db.refresh(record)
         
         db_id = record.id
+        analysis_job = serialize_job(jobs[-1]) if job_kind else None
         
     except Exception as e:
         db.rollback()
+        blob_store.release(media_blob_hashes(media_hashes))
         logger.error(f"Database error during upload: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
     finally:
         db.close()
 
-    # Check for paired before/after evidence for AI analysis
-    ai_analysis_result = None
-    if evidence_type == "before_after_pair":
-        # Both images uploaded together - immediate AI analysis
-        if len(file_data) >= 2:
-            file_names = list(file_data.keys())
-            ai_analysis_result = await perform_immediate_ai_analysis(
-                project_id, file_data[file_names[0]], file_data[file_names[1]], 
-                project_area_hectares, time_period_years
+    if anchor_mode == ANCHOR_MODE_MERKLE:
+        # Picked up by the batch anchorer with other queued hashes of this project
+        evidence_anchorer.notify()
+        pending = {"tx_hash": None, "status": "queued"}
+    else:
+        # Blockchain transaction using blockchain project ID; submitted without waiting for the block
+        try:
+            pending = await asyncio.to_thread(
+                submit_transaction,
+                registry.functions.uploadEvidence(blockchain_project_id, evidence_hash_bytes, metadata),
+                "uploadEvidence",
+                on_confirmed=lambda receipt: record_uploaded_evidence_id(db_id, receipt),
+                context={"project_id": project_id, "evidence_id": db_id}
             )
-    elif evidence_type in ["before", "after"]:
-        # Traditional paired analysis (look for complementary evidence)
-        ai_analysis_result = await attempt_paired_analysis(
-            project_id, evidence_type, file_data, project_area_hectares, time_period_years
-        )
+        except HTTPException:
+            # Nothing was anchored on chain, so don't keep the evidence record either
+            db = SessionLocal()
+            try:
+                db.query(MRVData).filter(MRVData.id == db_id).delete()
+                evidence_media.forget(db, [db_id])
+                duplicate_index.forget(db, [db_id])
+                analysis_jobs.forget(db, [db_id])
+                db.commit()
+            finally:
+                db.close()
+            blob_store.release(media_blob_hashes(media_hashes))
+            raise
+    tx_hash = pending["tx_hash"]
+    analysis_jobs.notify()
 
     # Prepare response
     response = {
         "status": "ok",
         "tx_hash": tx_hash,
+        "tx_status": pending["status"],
+        "anchor_mode": anchor_mode,
         "evidence_hash": "0x" + evidence_hash_bytes.hex(),
-        "evidence_id": evidence_id or db_id,
+        "evidence_id": db_id,
         "metadata": metadata,
         "files": saved_files,
+        "media": blobs,
         "db_id": db_id,
         "evidence_type": evidence_type,
         "project_area_hectares": project_area_hectares
     }
     
-    # Include AI analysis result if available
-    if ai_analysis_result:
-        response["ai_analysis"] = ai_analysis_result
-        response["dynamic_credits_calculated"] = ai_analysis_result.get('success', False)
-        if ai_analysis_result.get('success'):
-            response["recommended_credits"] = ai_analysis_result.get('recommended_credits', 0)
-            response["provisional_credits"] = ai_analysis_result.get('provisional_credits', 0)
-            response["deferred_credits"] = ai_analysis_result.get('deferred_credits', 0)
-            response["credit_distribution"] = ai_analysis_result.get('credit_distribution', {})
-            response["monitoring_requirements"] = ai_analysis_result.get('monitoring_requirements', [])
-            response["calculation_method"] = ai_analysis_result.get('calculation_method', 'ai_analysis')
+    if near_duplicates:
+        response["near_duplicates"] = near_duplicates
+    if analysis_skipped:
+        response["analysis_skipped"] = analysis_skipped
+    
+    # Credits are calculated once the analysis job has run
+    if analysis_job:
+        response["analysis_job"] = job_links(analysis_job)
+        response["dynamic_credits_calculated"] = False
 
     return clean(response)
 
@@ -898,8 +1355,7 @@ async def estimate_carbon_credits(
         }
         
         # Basic calculation using CO2 sequestration rates
-        from services.co2_sequestration_calculator import CO2SequestrationCalculator
-        co2_calculator = CO2SequestrationCalculator()
+        co2_calculator = analyzers.get('co2')
         
         # Calculate baseline CO2 sequestration
         baseline_co2 = co2_calculator.calculate_basic_co2_sequestration(
@@ -939,12 +1395,8 @@ async def estimate_carbon_credits(
                     raise HTTPException(status_code=400, detail="After image must be an image file")
                 
                 # Perform greenness analysis for multiplier calculation
-                logger.info("Importing and initializing GreennessAnalyzer")
-                from services.greenness_analyzer import GreennessAnalyzer
-                greenness_analyzer = GreennessAnalyzer()
-                logger.info("GreennessAnalyzer initialized successfully")
-                
-                green_analysis = greenness_analyzer.calculate_green_progress_multiplier(
+                green_analysis = await analysis_pool.run(
+                    green_progress,
                     before_image_data=before_image_data,
                     after_image_data=after_image_data
                 )
@@ -982,6 +1434,10 @@ async def estimate_carbon_credits(
                     "co2_after_multiplier": f"{multiplied_co2:.1f} kg CO2 (after multiplier)"
                 })
                 
+            except HTTPException:
+                raise
+            except AnalysisPoolSaturated as e:
+                raise analysis_busy(e)
             except Exception as green_error:
                 # Greenness analysis error, fall back to baseline but notify user
                 import traceback
@@ -1008,18 +1464,17 @@ async def estimate_carbon_credits(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Estimation failed: {str(e)}")
 
-async def perform_immediate_ai_analysis(project_id: int, before_image_data: bytes, 
+async def perform_immediate_ai_analysis(evidence_id: int, project_id: int, before_image_data: bytes,
                                       after_image_data: bytes, project_area_hectares: float,
                                       time_period_years: float) -> Optional[Dict]:
     """
     Perform immediate AI analysis when both before and after images are uploaded together.
+    Errors are raised so the analysis job running this is retried.
     """
     try:
-        from services.dynamic_carbon_credit_calculator import DynamicCarbonCreditCalculator
-        
         # Perform AI analysis
-        calculator = DynamicCarbonCreditCalculator()
-        analysis_result = calculator.calculate_dynamic_credits(
+        analysis_result = await analysis_pool.run(
+            dynamic_credits,
             before_image_data=before_image_data,
             after_image_data=after_image_data,
             project_area_hectares=project_area_hectares,
@@ -1031,10 +1486,7 @@ async def perform_immediate_ai_analysis(project_id: int, before_image_data: byte
             # Update database record with analysis results
             db = SessionLocal()
             try:
-                # Find the most recent record for this project
-                current_evidence = db.query(MRVData).filter(
-                    MRVData.project_id == project_id
-                ).order_by(MRVData.id.desc()).first()
+                current_evidence = db.query(MRVData).filter(MRVData.id == evidence_id).first()
                 
                 if current_evidence:
                     supporting_analysis = analysis_result.get('supporting_analysis', {})
@@ -1042,10 +1494,7 @@ async def perform_immediate_ai_analysis(project_id: int, before_image_data: byte
                     co2_results = supporting_analysis.get('co2_sequestration', {})
                     
                     # Use upload page calculation logic instead of complex AI analysis
-                    from services.co2_sequestration_calculator import CO2SequestrationCalculator
-                    from services.greenness_analyzer import GreennessAnalyzer
-                    
-                    co2_calculator = CO2SequestrationCalculator()
+                    co2_calculator = analyzers.get('co2')
                     
                     # Get ecosystem type (default to mangrove)
                     ecosystem_type = "mangrove"  # Could be made configurable
@@ -1127,13 +1576,15 @@ async def perform_immediate_ai_analysis(project_id: int, before_image_data: byte
             
     except Exception as e:
         logger.error(f"Error in immediate AI analysis: {e}")
-        return {"success": False, "error": str(e)}
+        raise
 
-async def attempt_paired_analysis(project_id: int, current_evidence_type: str, 
-                                current_file_data: Dict, project_area_hectares: float,
+async def attempt_paired_analysis(evidence_id: int, project_id: int, current_evidence_type: str,
+                                current_image_data: bytes, project_area_hectares: float,
                                 time_period_years: float) -> Optional[Dict]:
     """
     Attempt to find paired before/after evidence and perform AI analysis.
+    Returns None while the complementary evidence hasn't been uploaded; errors
+    are raised so the analysis job running this is retried.
     """
     try:
         db = SessionLocal()
@@ -1159,7 +1610,7 @@ async def attempt_paired_analysis(project_id: int, current_evidence_type: str,
             return None
         
         # Load the first image file from complementary evidence
-        complementary_file_path = os.path.join("uploads", complementary_files[0])
+        complementary_file_path = blob_store.resolve_paths(complementary_evidence.media_hashes)[0]
         if not os.path.exists(complementary_file_path):
             logger.warning(f"Complementary file not found: {complementary_file_path}")
             return None
@@ -1167,14 +1618,6 @@ async def attempt_paired_analysis(project_id: int, current_evidence_type: str,
         with open(complementary_file_path, "rb") as f:
             complementary_file_data = f.read()
         
-        # Get current image data (assume first file is the main image)
-        current_file_names = list(current_file_data.keys())
-        if not current_file_names:
-            logger.warning("No current file data available")
-            return None
-        
-        current_image_data = current_file_data[current_file_names[0]]
-        
         # Determine before and after image data
         if current_evidence_type == "before":
             before_image_data = current_image_data
@@ -1184,8 +1627,8 @@ async def attempt_paired_analysis(project_id: int, current_evidence_type: str,
             after_image_data = current_image_data
         
         # Perform AI analysis
-        calculator = DynamicCarbonCreditCalculator()
-        analysis_result = calculator.calculate_dynamic_credits(
+        analysis_result = await analysis_pool.run(
+            dynamic_credits,
             before_image_data=before_image_data,
             after_image_data=after_image_data,
             project_area_hectares=project_area_hectares,
@@ -1200,7 +1643,7 @@ async def attempt_paired_analysis(project_id: int, current_evidence_type: str,
             co2_results = supporting_analysis.get('co2_sequestration', {})
             
             # Update current evidence
-            current_evidence = db.query(MRVData).filter(MRVData.project_id == project_id).order_by(MRVData.id.desc()).first()
+            current_evidence = db.query(MRVData).filter(MRVData.id == evidence_id).first()
             if current_evidence:
                 current_evidence.calculated_co2_sequestration = co2_results.get('co2_sequestration_kg')
                 current_evidence.vegetation_change_percentage = transformation_metrics.get('vegetation_change_percentage')
@@ -1246,28 +1689,155 @@ async def attempt_paired_analysis(project_id: int, current_evidence_type: str,
     except Exception as e:
         db.rollback()
         logger.error(f"Error in paired analysis: {e}")
-        return {"success": False, "error": str(e)}
+        raise
     finally:
         db.close()
 
+def build_evidence_pyramids(evidence_id: int) -> Dict:
+    """Build the image pyramid of every file of an evidence; files that aren't images are skipped."""
+    built, skipped = {}, []
+    for f in evidence_media.files(evidence_id):
+        try:
+            built[f["name"]] = asyncio.run(analysis_pool.run(pyramid, f["path"]))
+        except AnalysisPoolSaturated as e:
+            raise RetryLater(str(e), ANALYSIS_RETRY_AFTER)
+        except Exception as e:
+            logger.warning(f"No image pyramid for {f['name']} of evidence {evidence_id}: {str(e)}")
+            skipped.append(f["name"])
+    return {"levels": built, "skipped": skipped}
+
+def run_analysis_job(job: Dict) -> Dict:
+    """Analysis job handler: analyse one uploaded evidence and store the results on its records."""
+    if job["kind"] == "pyramid":
+        return build_evidence_pyramids(job["evidence_id"])
+
+    params = job["params"]
+    db = SessionLocal()
+    try:
+        evidence = db.query(MRVData).filter(MRVData.id == job["evidence_id"]).first()
+        paths = blob_store.resolve_paths(evidence.media_hashes) if evidence else []
+    finally:
+        db.close()
+
+    # Only the images the analysis uses are loaded; other files (e.g. video) stay on disk
+    needed = 2 if job["kind"] == "immediate_pair" else 1
+    if len(paths) < needed:
+        return {"success": False, "error": f"Evidence {job['evidence_id']} has no images to analyse"}
+    images = [read_upload(path) for path in paths[:needed]]
+
+    try:
+        if job["kind"] == "immediate_pair":
+            result = asyncio.run(perform_immediate_ai_analysis(
+                job["evidence_id"], job["project_id"], images[0], images[1],
+                params["project_area_hectares"], params["time_period_years"]
+            ))
+        else:
+            result = asyncio.run(attempt_paired_analysis(
+                job["evidence_id"], job["project_id"], params["evidence_type"], images[0],
+                params["project_area_hectares"], params["time_period_years"]
+            ))
+    except AnalysisPoolSaturated as e:
+        raise RetryLater(str(e), ANALYSIS_RETRY_AFTER)
+
+    if result is None:
+        return {"paired": False, "message": "No complementary before/after evidence yet; analysed when it is uploaded"}
+    return clean(result)
+
+# Uploads queue their analysis here; jobs survive restarts and are retried on failure
+analysis_jobs = AnalysisJobQueue(SessionLocal, run_analysis_job)
+
+@app.on_event("startup")
+def start_analysis_jobs():
+    analysis_jobs.start()
+
+@app.on_event("shutdown")
+def stop_analysis_jobs():
+    analysis_jobs.stop()
+
+def job_links(job: Dict) -> Dict:
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "status_url": f"/jobs/{job['id']}",
+        "events_url": f"/jobs/{job['id']}/events"
+    }
+
+@app.get("/jobs/{job_id}")
+def get_analysis_job(job_id: int):
+    """Status of an analysis job and, once it has run, the analysis result."""
+    job = analysis_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return clean(job)
+
+@app.get("/jobs/{job_id}/events")
+async def stream_analysis_job_events(job_id: int):
+    """Server-sent events: the job on every status change; the stream ends once the job has finished."""
+    if not await asyncio.to_thread(analysis_jobs.get, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        async for job in analysis_jobs.watch(job_id):
+            yield f"event: {job['status']}\ndata: {json.dumps(clean(job))}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.get("/evidences/{project_id}")
-def get_evidences_for_project(project_id: int):
+def get_evidences_for_project(
+    project_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, ge=0),
+    fields: Optional[str] = None
+):
+    """
+    List a project's evidence ordered by evidence id.
+    `fields` selects which keys to return; only their columns are loaded, so
+    e.g. `fields=evidenceId,aiAnalysisResults` is the only way the heavy AI
+    results column gets read here.
+    """
+    selected = parse_fields(fields)
     db = SessionLocal()
-    rows = db.query(MRVData).filter(MRVData.project_id == project_id).all()
-    db.close()
-    return clean([
-        {
-            "evidenceId": r.id,
-            "projectId": r.project_id,
-            "uploader": r.uploader,
-            "gps": r.gps,
-            "co2": r.co2,
-            "mediaHashes": r.media_hashes,
-            "evidenceHash": r.evidence_hash,
-            "timestamp": r.timestamp.isoformat(),
-            "verified": r.verified or False
-        } for r in rows
-    ])
+    try:
+        query = db.query(MRVData).options(
+            load_only(*evidence_columns_for(selected))
+        ).filter(MRVData.project_id == project_id)
+
+        if paginated(limit, after):
+            rows, next_cursor = keyset_page(query, MRVData.id, limit or DEFAULT_PAGE_SIZE, after)
+        else:
+            rows, next_cursor = query.order_by(MRVData.id).all(), None
+
+        evidences = []
+        for r in rows:
+            item = {
+                "evidenceId": r.id,
+                "projectId": r.project_id,
+                "uploader": r.uploader,
+                "gps": r.gps,
+                "co2": r.co2,
+                "mediaHashes": r.media_hashes,
+                "evidenceHash": r.evidence_hash,
+                "timestamp": r.timestamp.isoformat() if r.timestamp else None,
+                "verified": r.verified or False
+            } if selected is None else {}
+
+            if selected is not None:
+                for field, column in EVIDENCE_FIELD_COLUMNS.items():
+                    if field not in selected:
+                        continue
+                    value = getattr(r, column.key)
+                    if field == "timestamp" and value is not None:
+                        value = value.isoformat()
+                    elif field == "verified":
+                        value = value or False
+                    item[field] = value
+            evidences.append(item)
+    finally:
+        db.close()
+
+    if paginated(limit, after):
+        return clean(page_response(evidences, next_cursor, limit or DEFAULT_PAGE_SIZE))
+    return clean(evidences)
 
 @app.get("/debug/evidence/{evidence_id}")
 def debug_evidence(evidence_id: int):
@@ -1299,6 +1869,52 @@ def debug_evidence(evidence_id: int):
     finally:
         db.close()
 
+# Evidences accepted by /verify/batch; also keeps the candidate query under SQLite's bound-parameter limit
+MAX_BATCH_VERIFY_SIZE = 500
+
+def determine_credits(evidence: MRVData, mint_amount: int = 0):
+    """
+    Credits to issue for one evidence: AI-calculated credits when available,
+    then the manually specified amount, then the legacy fixed amount.
+    Returns (credits, calculation_method, analysis_report).
+    """
+    analysis_report = None
+    
+    # Check if AI-calculated credits are available
+    if (evidence.calculated_carbon_credits is not None and 
+        evidence.credit_calculation_method in ['ai_analysis', 'upload_page_calculation'] and
+        evidence.confidence_score is not None):
+        
+        # Use AI-calculated credits
+        credits_to_mint = int(evidence.calculated_carbon_credits)
+        calculation_method = evidence.credit_calculation_method
+        analysis_report = evidence.analysis_summary
+        
+        logger.info(f"Using AI-calculated credits: {credits_to_mint} for evidence {evidence.id}")
+        
+    elif mint_amount and mint_amount > 0:
+        # Use manually specified amount
+        credits_to_mint = int(mint_amount)
+        calculation_method = "manual_override"
+        
+        logger.info(f"Using manual credit amount: {credits_to_mint} for evidence {evidence.id}")
+        
+    else:
+        # Fall back to legacy fixed amount
+        credits_to_mint = 100
+        calculation_method = "legacy_fixed"
+        
+        logger.info(f"Using legacy fixed credits: {credits_to_mint} for evidence {evidence.id}")
+    
+    # Validation: ensure reasonable credit amounts
+    if credits_to_mint < 0:
+        credits_to_mint = 0
+    elif credits_to_mint > 10000:  # Safety cap
+        logger.warning(f"Credit amount {credits_to_mint} exceeds safety cap, capping at 10000")
+        credits_to_mint = 10000
+    
+    return credits_to_mint, calculation_method, analysis_report
+
 @app.post("/verify")
 def verify_project(req: VerifyRequest):
     """
@@ -1314,68 +1930,40 @@ def verify_project(req: VerifyRequest):
         if not evidence:
             raise HTTPException(status_code=404, detail="Evidence not found")
         
-        # Determine credit amount to mint
-        credits_to_mint = 0
-        calculation_method = "fixed"
-        analysis_report = None
+        if evidence.anchor_mode == ANCHOR_MODE_MERKLE:
+            # The chain only knows the batch root, which can be verified once
+            raise HTTPException(
+                status_code=409,
+                detail=f"Evidence is anchored in Merkle batch {evidence.anchor_batch_id}; "
+                       f"verify it with POST /anchoring/batches/{evidence.anchor_batch_id}/verify"
+            )
         
-        # Check if AI-calculated credits are available
-        if (evidence.calculated_carbon_credits is not None and 
-            evidence.credit_calculation_method in ['ai_analysis', 'upload_page_calculation'] and
-            evidence.confidence_score is not None):
-            
-            # Use AI-calculated credits
-            credits_to_mint = int(evidence.calculated_carbon_credits)
-            calculation_method = evidence.credit_calculation_method
-            analysis_report = evidence.analysis_summary
-            
-            logger.info(f"Using AI-calculated credits: {credits_to_mint} for evidence {evidence_id}")
-            
-        elif req.mint_amount and req.mint_amount > 0:
-            # Use manually specified amount
-            credits_to_mint = int(req.mint_amount)
-            calculation_method = "manual_override"
-            
-            logger.info(f"Using manual credit amount: {credits_to_mint} for evidence {evidence_id}")
-            
-        else:
-            # Fall back to legacy fixed amount
-            credits_to_mint = 100
-            calculation_method = "legacy_fixed"
-            
-            logger.info(f"Using legacy fixed credits: {credits_to_mint} for evidence {evidence_id}")
+        if evidence.chain_evidence_id is None:
+            # Set once the uploadEvidence transaction is mined; database and chain ids can differ
+            raise HTTPException(status_code=409, detail="Evidence is not anchored on chain yet, retry once its upload is mined")
+        chain_evidence_id = evidence.chain_evidence_id
         
-        # Validation: ensure reasonable credit amounts
-        if credits_to_mint < 0:
-            credits_to_mint = 0
-        elif credits_to_mint > 10000:  # Safety cap
-            logger.warning(f"Credit amount {credits_to_mint} exceeds safety cap, capping at 10000")
-            credits_to_mint = 10000
+        credits_to_mint, calculation_method, analysis_report = determine_credits(evidence, req.mint_amount)
         
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
     finally:
         db.close()
     
-    # Build blockchain verification transaction
-    try:
-        tx = registry.functions.verifyEvidenceAndIssue(
-            evidence_id,
+    # Execute blockchain verification transaction; the response needs the updated project totals,
+    # so this waits for the receipt (the nonce is still allocated locally)
+    tx_hash, receipt = sign_and_send(
+        registry.functions.verifyEvidenceAndIssue(
+            chain_evidence_id,
             req.mint_receipt,
             req.receipt_token_uri or "",
             credits_to_mint
-        ).build_transaction({
-            "from": OWNER,
-            "nonce": w3.eth.get_transaction_count(OWNER),
-            "gas": 2_000_000,
-            "gasPrice": w3.to_wei("20", "gwei")
-        })
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to build verify transaction: {e}")
-
-    # Execute transaction
-    tx_hash, receipt = sign_and_send(tx)
+        ),
+        "verifyEvidenceAndIssue"
+    )
 
     # Update evidence verification status in database
     db = SessionLocal()
@@ -1384,12 +1972,15 @@ def verify_project(req: VerifyRequest):
         if evidence:
             evidence.verified = True
             
-            # Get updated project info from blockchain
+            # Get updated project info from the project cache (applies the CreditsMinted log just emitted);
+            # the cache is keyed by on-chain project id
             project_id = evidence.project_id
-            project = registry.functions.projects(project_id).call()
+            local_project = db.query(ProjectData).filter(ProjectData.id == project_id).first()
+            blockchain_project_id = local_project.blockchain_id if local_project else project_id
+            project_cache.sync(force=True)
+            project = project_cache.get_project(blockchain_project_id) or registry.functions.projects(blockchain_project_id).call()
             
             # Update local database project record with blockchain data
-            local_project = db.query(ProjectData).filter(ProjectData.id == project_id).first()
             if local_project:
                 local_project.total_issued_credits = float(project[6])  # Update with blockchain total
             
@@ -1401,6 +1992,7 @@ def verify_project(req: VerifyRequest):
                 "tx_hash": tx_hash,
                 "receipt": receipt,
                 "evidence_id": evidence_id,
+                "chain_evidence_id": chain_evidence_id,
                 "credits_issued": credits_to_mint,
                 "calculation_method": calculation_method,
                 "project": {
@@ -1456,20 +2048,7 @@ def verify_project(req: VerifyRequest):
 
 @app.post("/mint")
 def mint_credits(req: MintRequest):
-    try:
-        tx = token.functions.mint(
-            OWNER,
-            req.amount
-        ).build_transaction({
-            "from": OWNER,
-            "nonce": w3.eth.get_transaction_count(OWNER),
-            "gas": 200000,
-            "gasPrice": w3.to_wei("20", "gwei")
-        })
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to build mint transaction: {e}")
-
-    tx_hash, receipt = sign_and_send(tx)
+    tx_hash, receipt = sign_and_send(token.functions.mint(OWNER, req.amount), "mint", gas=200000)
 
     # ✅ fetch updated balance
     balance = token.functions.balanceOf(OWNER).call()
@@ -1481,6 +2060,227 @@ def mint_credits(req: MintRequest):
         "balance": balance
     })
 
+@app.post("/verify/batch")
+def verify_evidence_batch(req: BatchVerifyRequest):
+    """
+    Verify many evidences and issue their credits in one request.
+    Candidates are validated with a single query, their verifyEvidenceAndIssue
+    transactions are sent back to back with sequential local nonces and mined
+    together, and all database updates are committed in one transaction.
+    Returns a result per evidence id.
+    """
+    evidence_ids = list(dict.fromkeys(req.evidence_ids))
+    if not evidence_ids:
+        raise HTTPException(status_code=400, detail="evidence_ids must not be empty")
+    if len(evidence_ids) > MAX_BATCH_VERIFY_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_VERIFY_SIZE} evidences per batch")
+
+    results = {evidence_id: {"evidence_id": evidence_id} for evidence_id in evidence_ids}
+
+    db = SessionLocal()
+    try:
+        evidences = {
+            evidence.id: evidence
+            for evidence in db.query(MRVData).filter(MRVData.id.in_(evidence_ids)).all()
+        }
+        candidates = []
+        for evidence_id in evidence_ids:
+            evidence = evidences.get(evidence_id)
+            if evidence is None:
+                results[evidence_id].update(status="skipped", error="Evidence not found")
+            elif evidence.verified:
+                results[evidence_id].update(status="skipped", error="Evidence already verified")
+            elif evidence.anchor_mode == ANCHOR_MODE_MERKLE:
+                results[evidence_id].update(
+                    status="skipped",
+                    error=f"Evidence is anchored in Merkle batch {evidence.anchor_batch_id}; verify the batch instead"
+                )
+            elif evidence.chain_evidence_id is None:
+                results[evidence_id].update(status="skipped", error="Evidence is not anchored on chain yet")
+            else:
+                credits, method, _ = determine_credits(evidence, req.mint_amount)
+                results[evidence_id].update(project_id=evidence.project_id, chain_evidence_id=evidence.chain_evidence_id,
+                                            credits_issued=credits, calculation_method=method)
+                candidates.append(evidence_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+    finally:
+        db.close()
+
+    # Send every transaction before waiting for any of them, so they are mined in the same few blocks
+    submitted = []
+    for evidence_id in candidates:
+        try:
+            record = tx_manager.submit(
+                registry.functions.verifyEvidenceAndIssue(
+                    results[evidence_id]["chain_evidence_id"],
+                    req.mint_receipt,
+                    req.receipt_token_uri or "",
+                    results[evidence_id]["credits_issued"]
+                ),
+                "verifyEvidenceAndIssue",
+                context={"evidence_id": evidence_id}
+            )
+            results[evidence_id].update(status="pending", tx_hash=record["tx_hash"])
+            submitted.append(evidence_id)
+        except Exception as e:
+            results[evidence_id].update(status="failed", error=f"Failed to send transaction: {e}")
+
+    verified_ids = []
+    for evidence_id in submitted:
+        try:
+            record = tx_manager.wait(results[evidence_id]["tx_hash"])
+        except Exception as e:
+            results[evidence_id].update(status="failed", error=f"Transaction failed: {e}")
+            continue
+        if record["status"] == "confirmed":
+            results[evidence_id]["status"] = "verified"
+            verified_ids.append(evidence_id)
+        else:
+            results[evidence_id].update(status="failed", error=f"Transaction failed: {record['error']}")
+
+    db_warning = None
+    if verified_ids:
+        db = SessionLocal()
+        try:
+            db.query(MRVData).filter(MRVData.id.in_(verified_ids)).update(
+                {"verified": True}, synchronize_session=False
+            )
+
+            # Refresh project totals once per project from the cache (applies the CreditsMinted logs)
+            project_cache.sync(force=True)
+            project_ids = {results[evidence_id]["project_id"] for evidence_id in verified_ids}
+            for local_project in db.query(ProjectData).filter(ProjectData.id.in_(project_ids)).all():
+                blockchain_project_id = local_project.blockchain_id
+                project = project_cache.get_project(blockchain_project_id) or registry.functions.projects(blockchain_project_id).call()
+                local_project.total_issued_credits = float(project[6])
+
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to record batch verification: {e}")
+            # The transactions succeeded; report it like /verify does
+            db_warning = str(e)
+        finally:
+            db.close()
+
+    items = [results[evidence_id] for evidence_id in evidence_ids]
+    summary = {
+        "requested": len(evidence_ids),
+        "verified": len(verified_ids),
+        "failed": sum(1 for item in items if item["status"] == "failed"),
+        "skipped": sum(1 for item in items if item["status"] == "skipped"),
+        "credits_issued": sum(results[evidence_id]["credits_issued"] for evidence_id in verified_ids)
+    }
+    logger.info(f"Batch verification: {summary['verified']}/{summary['requested']} evidences verified, "
+                f"{summary['credits_issued']} credits issued")
+
+    response = {"status": "verified_with_db_warning" if db_warning else "completed", "summary": summary,
+                "results": items}
+    if db_warning:
+        response["db_warning"] = db_warning
+    return clean(response)
+
+@app.get("/evidence/{evidence_id}/merkle-proof")
+def get_evidence_merkle_proof(evidence_id: int):
+    """Merkle inclusion proof and anchoring status for batch-anchored evidence."""
+    proof = evidence_anchorer.get_proof(evidence_id)
+    if proof is None:
+        raise HTTPException(status_code=404, detail="No batch-anchored evidence with this id")
+    return clean(proof)
+
+@app.post("/anchoring/verify-proof")
+def verify_merkle_proof(req: MerkleProofRequest):
+    """
+    Check that an evidence hash is included under a Merkle root, and whether
+    that root was anchored on chain by this registry.
+    """
+    return clean(evidence_anchorer.verify(req.evidence_hash, req.proof, req.merkle_root))
+
+@app.post("/anchoring/batches/{batch_id}/verify")
+def verify_anchor_batch(batch_id: int, req: BatchAnchorVerifyRequest):
+    """
+    Verify every evidence in an anchored Merkle batch and issue their credits.
+    The chain only knows the batch root, so this is one verifyEvidenceAndIssue
+    call for the summed credits of the batch.
+    """
+    db = SessionLocal()
+    try:
+        batch = db.query(EvidenceAnchorBatch).filter(EvidenceAnchorBatch.id == batch_id).first()
+        if not batch:
+            raise HTTPException(status_code=404, detail="Anchor batch not found")
+        if batch.status != "anchored" or batch.chain_evidence_id is None:
+            raise HTTPException(status_code=409, detail=f"Batch is {batch.status}, not anchored on chain yet")
+        if batch.verified:
+            raise HTTPException(status_code=409, detail="Batch already verified")
+
+        evidences = db.query(MRVData).filter(
+            MRVData.anchor_batch_id == batch_id,
+            MRVData.verified == False
+        ).all()
+        per_evidence = {}
+        for evidence in evidences:
+            credits, method, _ = determine_credits(evidence, req.mint_amount)
+            per_evidence[evidence.id] = {"credits_issued": credits, "calculation_method": method}
+        total_credits = sum(item["credits_issued"] for item in per_evidence.values())
+        chain_evidence_id = batch.chain_evidence_id
+        project_id = batch.project_id
+        blockchain_project_id = batch.blockchain_project_id
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+    finally:
+        db.close()
+
+    tx_hash, receipt = sign_and_send(
+        registry.functions.verifyEvidenceAndIssue(
+            chain_evidence_id,
+            req.mint_receipt,
+            req.receipt_token_uri or "",
+            total_credits
+        ),
+        "verifyEvidenceAndIssue"
+    )
+
+    db = SessionLocal()
+    try:
+        if per_evidence:
+            db.query(MRVData).filter(MRVData.id.in_(list(per_evidence))).update(
+                {"verified": True}, synchronize_session=False
+            )
+        db.query(EvidenceAnchorBatch).filter(EvidenceAnchorBatch.id == batch_id).update({"verified": True})
+
+        project_cache.sync(force=True)
+        project = project_cache.get_project(blockchain_project_id) or registry.functions.projects(blockchain_project_id).call()
+        local_project = db.query(ProjectData).filter(ProjectData.id == project_id).first()
+        if local_project:
+            local_project.total_issued_credits = float(project[6])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to record verification of anchor batch {batch_id}: {e}")
+        return clean({
+            "status": "verified_with_db_warning",
+            "tx_hash": tx_hash,
+            "receipt": receipt,
+            "credits_issued": total_credits,
+            "db_warning": str(e)
+        })
+    finally:
+        db.close()
+
+    logger.info(f"Anchor batch {batch_id} verified: {len(per_evidence)} evidences, {total_credits} credits issued")
+    return clean({
+        "status": "verified",
+        "tx_hash": tx_hash,
+        "receipt": receipt,
+        "batch_id": batch_id,
+        "chain_evidence_id": chain_evidence_id,
+        "credits_issued": total_credits,
+        "evidences": [{"evidence_id": eid, **item} for eid, item in per_evidence.items()]
+    })
+
 @app.post("/reject")
 def reject_evidence(req: RejectRequest):
     """
@@ -1505,22 +2305,28 @@ def reject_evidence(req: RejectRequest):
         uploader = evidence.uploader
         evidence_type = evidence.evidence_type
         
-        # Delete associated files if they exist
+        media_hashes = evidence.media_hashes
+        
+        # Delete evidence from database
+        db.delete(evidence)
+        evidence_media.forget(db, [evidence_id])
+        duplicate_index.forget(db, [evidence_id])
+        db.commit()
+        
+        # Release its files; blobs shared with other evidence are kept
         try:
-            if evidence.media_hashes and isinstance(evidence.media_hashes, dict):
-                files = evidence.media_hashes.get('files', [])
-                for filename in files:
-                    file_path = os.path.join("uploads", filename)
+            content_hashes = media_blob_hashes(media_hashes)
+            if content_hashes:
+                blob_store.release(content_hashes)
+            elif isinstance(media_hashes, dict):
+                # Evidence stored before the blob store keeps its files under uploads/<name>
+                for file_path in blob_store.resolve_paths(media_hashes):
                     if os.path.exists(file_path):
                         os.remove(file_path)
                         logger.info(f"Deleted file: {file_path}")
         except Exception as file_error:
             logger.warning(f"Failed to delete some files: {file_error}")
         
-        # Delete evidence from database
-        db.delete(evidence)
-        db.commit()
-        
         logger.info(f"Evidence {evidence_id} rejected and deleted. Reason: {req.reason}")
         
         return clean({
@@ -1546,31 +2352,24 @@ def reject_evidence(req: RejectRequest):
 @app.get("/projects/{project_id}")
 def get_project(project_id: int):
     try:
-        p = registry.functions.projects(project_id).call()
+        p = project_cache.get_project(project_id)
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Project not found: {e}")
+    if p is None:
+        raise HTTPException(status_code=404, detail="Project not found")
 
-    evidences = []
-    try:
-        ev_event = registry.events.EvidenceUploaded()
-        logs = w3.eth.get_logs({
-            "fromBlock": 0,
-            "toBlock": "latest",
-            "address": REGISTRY_ADDRESS
-        })
-        for log in logs:
-            processed = ev_event.processLog(log)
-            if processed["args"]["projectId"] == project_id:
-                evidences.append({
-                    "evidenceId": int(processed["args"]["evidenceId"]),
-                    "evidenceHash": processed["args"]["evidenceHash"].hex(),
-                    "evidenceURI": processed["args"]["evidenceURI"],
-                    "uploader": processed["args"]["uploader"],
-                    "txHash": processed["transactionHash"].hex(),
-                    "blockNumber": processed["blockNumber"]
-                })
-    except Exception:
-        evidences = []
+    # Uploaded evidence comes from the event index instead of scanning the chain
+    indexed, _ = event_indexer.get_events(event="EvidenceUploaded", project_id=project_id)
+    evidences = [
+        {
+            "evidenceId": e["evidenceId"],
+            "evidenceHash": e["args"]["evidenceHash"],
+            "evidenceURI": e["args"]["evidenceURI"],
+            "uploader": e["args"]["uploader"],
+            "txHash": e["txHash"],
+            "blockNumber": e["blockNumber"]
+        } for e in indexed
+    ]
 
     return {
         "id": project_id,
@@ -1584,6 +2383,52 @@ def get_project(project_id: int):
         "evidences": evidences
     }
 
+@app.get("/transactions")
+def list_transactions(status: Optional[str] = None, limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE)):
+    """Recent backend transactions, newest first (optionally only `pending`, `confirmed`, `failed`, `timeout` or `dropped`)."""
+    return clean(tx_manager.list(status=status, limit=limit))
+
+@app.get("/transactions/{tx_hash}")
+def get_transaction_status(tx_hash: str):
+    """Status of a transaction submitted by the backend (pending until its receipt is seen)."""
+    record = tx_manager.get(tx_hash)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return clean(record)
+
+@app.get("/events")
+def get_events(
+    event: Optional[str] = None,
+    project_id: Optional[int] = None,
+    evidence_id: Optional[int] = None,
+    token_id: Optional[int] = None,
+    account: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, ge=0)
+):
+    """
+    Query registry events mirrored by the background indexer, in chain order.
+    Filter by event name, projectId, evidenceId, tokenId or account address;
+    page with `limit` and the previous page's `next_cursor` as `after`.
+    """
+    items, next_cursor = event_indexer.get_events(
+        event=event, project_id=project_id, evidence_id=evidence_id,
+        token_id=token_id, account=account, limit=limit, after=after
+    )
+    return clean(page_response(items, next_cursor, limit))
+
+@app.get("/events/status")
+def get_event_indexer_status():
+    """Indexer health: last indexed block and whether the poll loop is running."""
+    block_number, block_hash = event_indexer.checkpoint()
+    return {
+        "enabled": EVENT_INDEXER_ENABLED,
+        "running": event_indexer.running,
+        "lastIndexedBlock": block_number,
+        "lastIndexedBlockHash": block_hash,
+        "lastError": event_indexer.last_error
+    }
+
 @app.get("/credits/{address}")
 def get_credits(address: str):
     addr = to_checksum(address)
@@ -1673,9 +2518,11 @@ def get_project_credit_calculation(project_id: int):
                     ai_analyzed_credits += evidence.calculated_carbon_credits
                 total_credits += evidence.calculated_carbon_credits
         
-        # Get project details from blockchain
+        # Get project details from the on-chain project cache
         try:
-            project = registry.functions.projects(project_id).call()
+            project = project_cache.get_project(project_id)
+            if project is None:
+                raise ValueError(f"Project {project_id} not found on chain")
             project_info = {
                 "id": project_id,
                 "name": project[0],
@@ -1743,8 +2590,8 @@ async def trigger_manual_analysis(project_id: int, project_area_hectares: float)
             raise HTTPException(status_code=400, detail="Image files not found for analysis")
         
         # Load image data
-        before_file_path = os.path.join("uploads", before_files[0])
-        after_file_path = os.path.join("uploads", after_files[0])
+        before_file_path = blob_store.resolve_paths(before_evidence.media_hashes)[0]
+        after_file_path = blob_store.resolve_paths(after_evidence.media_hashes)[0]
         
         if not os.path.exists(before_file_path) or not os.path.exists(after_file_path):
             raise HTTPException(status_code=400, detail="Image files not accessible")
@@ -1756,8 +2603,8 @@ async def trigger_manual_analysis(project_id: int, project_area_hectares: float)
             after_image_data = f.read()
         
         # Perform AI analysis
-        calculator = DynamicCarbonCreditCalculator()
-        analysis_result = calculator.calculate_dynamic_credits(
+        analysis_result = await analysis_pool.run(
+            dynamic_credits,
             before_image_data=before_image_data,
             after_image_data=after_image_data,
             project_area_hectares=project_area_hectares,
@@ -1800,12 +2647,29 @@ async def trigger_manual_analysis(project_id: int, project_area_hectares: float)
                 "analysis_result": analysis_result
             })
             
+    except AnalysisPoolSaturated as e:
+        raise analysis_busy(e)
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Analysis failed: {e}")
     finally:
         db.close()
 
+@app.get("/system/analysis-cache")
+def get_analysis_cache_stats():
+    """Hit/miss counters of the image analysis result cache."""
+    return analysis_cache.stats()
+
+@app.get("/system/analysis-pool")
+def get_analysis_pool_stats():
+    """Workers, queue capacity and counters of the analysis process pool."""
+    return analysis_pool.stats()
+
+@app.get("/system/analyzers")
+def get_analyzer_stats():
+    """Analyzers built in the API process and how long each took to build."""
+    return analyzers.stats()
+
 @app.get("/system/ai-verification-stats")
 def get_ai_verification_stats():
     """
@@ -1872,13 +2736,11 @@ def get_ai_verification_stats():
 # Evidence Details and Image Comparison Endpoints
 
 @app.get("/evidence/{evidence_id}/detailed-view")
-def get_evidence_detailed_view(evidence_id: int):
+async def get_evidence_detailed_view(evidence_id: int):
     """
     Get comprehensive evidence details including project info and image comparison analysis.
     This endpoint is used by the View button in the admin verification interface.
     """
-    from services.evidence_image_comparator import EvidenceImageComparator
-    
     db = SessionLocal()
     try:
         # Get evidence details
@@ -1919,11 +2781,9 @@ def get_evidence_detailed_view(evidence_id: int):
             "analysis_summary": evidence.analysis_summary
         }
         
-        # Initialize image comparator
-        comparator = EvidenceImageComparator()
-        
         # Get image comparison analysis
-        image_analysis = comparator.get_evidence_images_analysis(evidence_id)
+        media = evidence_media.comparison_files(evidence_id)
+        image_analysis = await analysis_pool.run(evidence_image_comparison, evidence_id, media)
         
         # Combine all information
         result = {
@@ -1944,23 +2804,41 @@ def get_evidence_detailed_view(evidence_id: int):
         
         return clean(result)
         
+    except AnalysisPoolSaturated as e:
+        raise analysis_busy(e)
     except Exception as e:
         logger.error(f"Error getting detailed view for evidence {evidence_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get evidence details: {str(e)}")
     finally:
         db.close()
 
+@app.get("/evidence/{evidence_id}/near-duplicates")
+def get_evidence_near_duplicates(evidence_id: int):
+    """
+    Images of other evidence that are near-duplicates of this evidence's
+    images (same photo renamed, recompressed or resized), by perceptual hash.
+    """
+    fingerprints = duplicate_index.fingerprints(evidence_id)
+    matches = []
+    for f in fingerprints:
+        matches.extend(dict(match, file=f["name"]) for match in duplicate_index.find(f["dhash"], f["phash"], exclude_evidence_id=evidence_id))
+    return clean({
+        "evidence_id": evidence_id,
+        "fingerprinted_files": [f["name"] for f in fingerprints],
+        "near_duplicates": matches
+    })
+
 @app.get("/evidence/{evidence_id}/image-comparison")
-def get_evidence_image_comparison(evidence_id: int):
+async def get_evidence_image_comparison(evidence_id: int):
     """
     Get just the image comparison analysis for an evidence.
     Returns highlighted before/after images with vegetation change analysis.
     """
-    from services.evidence_image_comparator import EvidenceImageComparator
-    
     try:
-        comparator = EvidenceImageComparator()
-        analysis = comparator.get_evidence_images_analysis(evidence_id)
+        media = evidence_media.comparison_files(evidence_id)
+        if media is None:
+            raise HTTPException(status_code=404, detail="Evidence not found")
+        analysis = await analysis_pool.run(evidence_image_comparison, evidence_id, media)
         
         if not analysis.get('success', False):
             raise HTTPException(status_code=404, detail=analysis.get('error', 'Image comparison failed'))
@@ -1969,10 +2847,70 @@ def get_evidence_image_comparison(evidence_id: int):
         
     except HTTPException:
         raise
+    except AnalysisPoolSaturated as e:
+        raise analysis_busy(e)
     except Exception as e:
         logger.error(f"Error comparing images for evidence {evidence_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Image comparison failed: {str(e)}")
 
+@app.get("/renditions/{rendition_id}/{name}")
+def get_rendition(rendition_id: str, name: str, if_none_match: Optional[str] = Header(None)):
+    """
+    A stored comparison image (JPEG or WebP, at one of its widths), as linked
+    from the image comparison results. Immutable, so clients and proxies may
+    cache it for good; revalidation with If-None-Match gets a 304.
+    """
+    located = rendition_store.locate(rendition_id, name)
+    if located is None:
+        raise HTTPException(status_code=404, detail="Rendition not found")
+    path, media_type, etag = located
+    return file_response(path, media_type, etag, RENDITION_CACHE_CONTROL, if_none_match)
+
+@app.get("/evidence/{evidence_id}/files/{position}/preview")
+async def get_evidence_preview(evidence_id: int, position: int, size: int = Query(512, ge=1, le=PYRAMID_LEVELS[-1]),
+                               if_none_match: Optional[str] = Header(None)):
+    """
+    A downscaled evidence image for galleries: the smallest pyramid level
+    whose long side is at least `size` (PNG). Levels are built by the
+    upload's pyramid job, or in the analysis pool if it hasn't run yet (503
+    while the pool is saturated); images smaller than every level are
+    served as uploaded.
+    """
+    files = evidence_media.files(evidence_id)
+    if position < 0 or position >= len(files) or not os.path.exists(files[position]["path"]):
+        raise HTTPException(status_code=404, detail="Evidence file not found")
+    file = files[position]
+    content_hash = file["sha256"] or file_content_hash(file["path"])
+    
+    levels = pyramid_store.stored_levels(content_hash)
+    if not any(level >= size for level in levels):
+        try:
+            levels = await analysis_pool.run(pyramid, file["path"])
+        except AnalysisPoolSaturated as e:
+            raise analysis_busy(e)
+        except Exception as e:
+            logger.warning(f"No preview for {file['name']} of evidence {evidence_id}: {str(e)}")
+            raise HTTPException(status_code=415, detail="Evidence file is not an image")
+    
+    if not levels:
+        media_type = mimetypes.guess_type(file["name"])[0] or "application/octet-stream"
+        return file_response(file["path"], media_type, f'"{content_hash[:32]}"', PREVIEW_CACHE_CONTROL, if_none_match)
+    level = next((level for level in levels if level >= size), levels[-1])
+    return file_response(pyramid_store.path(content_hash, level), "image/png", f'"{content_hash[:32]}-{level}-v{PYRAMID_VERSION}"',
+                         PREVIEW_CACHE_CONTROL, if_none_match)
+
+def file_response(path: str, media_type: str, etag: str, cache_control: str, if_none_match: Optional[str]) -> Response:
+    """A stored file with its ETag, or 304 if the client's If-None-Match already has it."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    
+    if if_none_match:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        if "*" in tags or etag in tags or f"W/{etag}" in tags:
+            return Response(status_code=304, headers=headers)
+    
+    with open(path, "rb") as fh:
+        return Response(content=fh.read(), media_type=media_type, headers=headers)
+
 # Include AI Verification Router
 app.include_router(ai_router)
 
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Move evidence files stored as uploads/<file name> into the content-addressed
+blob store and point mrvdata.media_hashes at their content hashes.
+Original files are left in place; delete them once the migration is checked.
+"""
+
+import os
+
+from database import SessionLocal
+from models.db_model import MRVData
+from services.blob_store import BlobStore, build_media_hashes
+from services.upload_storage import UPLOAD_DIR
+
+def migrate_uploads_to_blob_store():
+    """Ingest the files of every evidence that has no content hashes yet."""
+    db = SessionLocal()
+    blob_store = BlobStore(SessionLocal)
+    migrated = 0
+    missing = 0
+
+    try:
+        evidences = db.query(MRVData).filter(MRVData.media_hashes.isnot(None)).all()
+        print(f"🗃️  Checking {len(evidences)} evidence records...")
+
+        for evidence in evidences:
+            media_hashes = evidence.media_hashes
+            if not isinstance(media_hashes, dict) or media_hashes.get("blobs") or not media_hashes.get("files"):
+                continue
+
+            blobs = []
+            for name in media_hashes["files"]:
+                path = os.path.join(UPLOAD_DIR, name)
+                if not os.path.exists(path):
+                    print(f"  WARNING: Evidence {evidence.id}: file not found: {path}")
+                    break
+                with open(path, "rb") as source:
+                    blob = blob_store.ingest(source, max_bytes=None)
+                blobs.append(dict(blob, name=name))
+            else:
+                evidence.media_hashes = build_media_hashes(blobs)
+                db.commit()
+                migrated += 1
+                print(f"  SUCCESS: Evidence {evidence.id}: {len(blobs)} files")
+                continue
+
+            # Incomplete evidence keeps its legacy file list
+            blob_store.release(blob["sha256"] for blob in blobs)
+            missing += 1
+
+        print(f"\nSUCCESS: Migrated {migrated} evidence records ({missing} skipped with missing files)")
+        return True
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error during migration: {e}")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrate_uploads_to_blob_store()
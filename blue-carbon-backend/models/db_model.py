@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Float, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Float, Text, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 import datetime
 
@@ -46,6 +46,12 @@ class MRVData(Base):
     ai_analysis_results = Column(JSON)  # Complete AI analysis results
     confidence_score = Column(Float)  # AI analysis confidence score
     analysis_summary = Column(Text)  # Human-readable analysis summary
+    
+    # On-chain anchoring
+    anchor_mode = Column(String, default='individual')  # 'individual' (own tx) or 'merkle_batch'
+    chain_evidence_id = Column(Integer, index=True)  # On-chain evidence id from the EvidenceUploaded receipt (individual)
+    anchor_batch_id = Column(Integer, index=True)  # EvidenceAnchorBatch holding this evidence's hash
+    merkle_proof = Column(JSON)  # Inclusion proof of evidence_hash in the batch's Merkle root
 
 class ProjectData(Base):
     __tablename__ = "projects"
@@ -61,3 +67,106 @@ class ProjectData(Base):
     tx_hash = Column(String)  # Blockchain transaction hash
     verified_on_blockchain = Column(Boolean, default=False)
     total_issued_credits = Column(Float, default=0.0)
+
+class ChainProject(Base):
+    """Local copy of a BlueCarbonRegistry Project struct, kept fresh from registry events."""
+    __tablename__ = "chain_projects"
+    project_id = Column(Integer, primary_key=True)  # On-chain project id
+    name = Column(String)
+    location = Column(String)
+    area = Column(String)  # uint256 stored as text
+    owner = Column(String, index=True)
+    metadata_uri = Column(String)
+    exists = Column(Boolean, default=True)
+    total_issued_credits = Column(String, default="0")  # uint256 stored as text
+    updated_block = Column(Integer)  # Block the row was last brought up to date at
+
+class ChainCheckpoint(Base):
+    """Last block processed by a chain follower (project cache, event indexer...)."""
+    __tablename__ = "chain_checkpoints"
+    name = Column(String, primary_key=True)
+    block_number = Column(Integer)
+    block_hash = Column(String)  # Used to detect a reset local chain (e.g. Hardhat restart)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class ChainEvent(Base):
+    """A BlueCarbonRegistry log mirrored by the event indexer."""
+    __tablename__ = "chain_events"
+    __table_args__ = (UniqueConstraint("tx_hash", "log_index", name="uq_chain_events_log"),)
+    id = Column(Integer, primary_key=True, index=True)
+    event = Column(String, index=True)  # ProjectRegistered, EvidenceUploaded, ...
+    block_number = Column(Integer, index=True)
+    block_hash = Column(String)
+    tx_hash = Column(String, index=True)
+    log_index = Column(Integer)
+    project_id = Column(Integer, index=True)
+    evidence_id = Column(Integer, index=True)
+    token_id = Column(Integer, index=True)
+    account = Column(String, index=True)  # owner / uploader / verifier / recipient, lowercased
+    args = Column(JSON)  # All decoded event arguments
+
+class EvidenceAnchorBatch(Base):
+    """A Merkle root over many evidence hashes, anchored with a single uploadEvidence transaction."""
+    __tablename__ = "evidence_anchor_batches"
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, index=True)  # Database project id
+    blockchain_project_id = Column(Integer)
+    merkle_root = Column(String, index=True)
+    leaf_count = Column(Integer)
+    status = Column(String, default='submitted')  # 'submitted', 'anchored', 'failed'
+    tx_hash = Column(String)
+    chain_evidence_id = Column(Integer)  # Evidence id assigned to the root on chain
+    verified = Column(Boolean, default=False)  # Root verified on chain (credits issued for the batch)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    anchored_at = Column(DateTime)
+
+class MediaBlob(Base):
+    """An uploaded file stored once under its SHA-256, shared by every evidence that references it."""
+    __tablename__ = "media_blobs"
+    sha256 = Column(String, primary_key=True)  # Hex digest, also the blob's file name
+    size = Column(Integer)
+    ref_count = Column(Integer, default=0)  # Evidence references; the blob is deleted at zero
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class EvidenceMedia(Base):
+    """One file of an evidence and its role in the before/after analysis, looked up by evidence id."""
+    __tablename__ = "evidence_media"
+    __table_args__ = (UniqueConstraint("evidence_id", "position", name="uq_evidence_media_position"),)
+    id = Column(Integer, primary_key=True, index=True)
+    evidence_id = Column(Integer, index=True)
+    position = Column(Integer)  # Upload order within the evidence
+    role = Column(String)  # 'before', 'after' or 'media'
+    name = Column(String)  # Original file name, for display
+    sha256 = Column(String)  # Blob holding the file; None for files stored before the blob store
+
+class ImageFingerprint(Base):
+    """Perceptual hashes of an evidence image, searched for near-duplicates of new uploads."""
+    __tablename__ = "image_fingerprints"
+    id = Column(Integer, primary_key=True, index=True)
+    evidence_id = Column(Integer, index=True)
+    position = Column(Integer)  # File position within the evidence (see EvidenceMedia)
+    name = Column(String)
+    sha256 = Column(String)
+    dhash = Column(String)  # 64-bit difference hash, 16 hex digits
+    phash = Column(String)  # 64-bit DCT hash, 16 hex digits
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class AnalysisJob(Base):
+    """A queued AI analysis of uploaded evidence, run by a job worker holding a lease on it."""
+    __tablename__ = "analysis_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String)  # 'immediate_pair' (before/after in one upload), 'paired' or 'pyramid' (image levels)
+    evidence_id = Column(Integer, index=True)
+    project_id = Column(Integer, index=True)
+    params = Column(JSON)  # Arguments of the analysis (area, time period, evidence type)
+    status = Column(String, default='queued', index=True)  # 'queued', 'running', 'succeeded', 'failed'
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    run_after = Column(DateTime, default=datetime.datetime.utcnow)  # Retries are delayed with backoff
+    lease_owner = Column(String)  # Worker holding the job while it runs
+    lease_expires_at = Column(DateTime)  # A running job whose lease expired is claimed again
+    result = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
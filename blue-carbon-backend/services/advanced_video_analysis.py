@@ -2,9 +2,9 @@ import cv2
 import numpy as np
 from typing import List, Dict, Tuple
 import logging
-import tempfile
-import os
 from datetime import datetime
+from .frame_sampling import FRAME_MAX_WIDTH, VideoFrameSampler, evenly_spaced
+from .video_ingest import spool_video_bytes
 
 logger = logging.getLogger(__name__)
 
@@ -18,20 +18,21 @@ class AdvancedVideoAnalyzer:
         self.min_frame_interval = 1.0  # Minimum seconds between analyzed frames
         self.max_frames_per_video = 15  # Maximum frames to analyze per video
         self.motion_threshold = 30  # Motion detection threshold
+        self.max_frame_width = FRAME_MAX_WIDTH  # Frames are scaled down to this width when decoded (0: full size)
         
     def extract_optimal_frames(self, video_path: str) -> List[Dict]:
         """
         Extract optimal frames based on content analysis and temporal distribution.
         """
         try:
-            cap = cv2.VideoCapture(video_path)
+            sampler = VideoFrameSampler(video_path, self.max_frame_width)
             
-            if not cap.isOpened():
+            if not sampler.is_opened():
                 raise Exception("Could not open video file")
             
             # Get video properties
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            fps = sampler.fps
+            frame_count = sampler.frame_count
             duration = frame_count / fps if fps > 0 else 0
             
             logger.info(f"Video properties: {frame_count} frames, {fps:.2f} FPS, {duration:.2f}s duration")
@@ -43,23 +44,14 @@ class AdvancedVideoAnalyzer:
                 target_frames = self.max_frames_per_video
             
             # Calculate frame intervals
-            if target_frames >= frame_count:
-                frame_indices = list(range(frame_count))
-            else:
-                frame_indices = np.linspace(0, frame_count - 1, target_frames, dtype=int)
+            frame_indices = evenly_spaced(frame_count, target_frames)
             
             frames_data = []
             prev_frame = None
             
-            for i, frame_idx in enumerate(frame_indices):
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-                ret, frame = cap.read()
-                
-                if not ret:
-                    continue
-                
-                # Convert BGR to RGB
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            # Frames come in order; gaps are grabbed through or seeked over, whichever decodes less
+            for frame_idx, frame_rgb in sampler.frames(frame_indices):
+                i = frame_indices.index(frame_idx)
                 
                 # Calculate frame quality metrics
                 quality_metrics = self.calculate_frame_quality(frame_rgb)
@@ -84,7 +76,8 @@ class AdvancedVideoAnalyzer:
                 frames_data.append(frame_data)
                 prev_frame = frame_rgb.copy()
             
-            cap.release()
+            sampler.close()
+            logger.info(f"Decoded {sampler.retrieved} frames with {sampler.grabbed} grabs and {sampler.seeks} seeks")
             
             # Filter frames based on quality and diversity
             selected_frames = self.select_best_frames(frames_data)
@@ -411,73 +404,76 @@ class VideoProcessingManager:
         
     def process_video_file(self, video_data: bytes, filename: str) -> Dict:
         """
-        Complete video processing workflow.
+        Complete video processing workflow for a video held in memory.
         """
         try:
-            # Save video to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as temp_file:
-                temp_file.write(video_data)
-                temp_path = temp_file.name
-            
-            try:
-                # Extract optimal frames
-                frames_data = self.video_analyzer.extract_optimal_frames(temp_path)
-                
-                if not frames_data:
-                    return {
-                        'error': 'No suitable frames could be extracted from video',
-                        'success': False
-                    }
-                
-                # Analyze each frame (would integrate with existing NDVI analyzer)
-                frame_analyses = []
-                for frame_data in frames_data:
-                    # Here you would call your existing NDVI analyzer
-                    # For now, we'll create a placeholder analysis
-                    analysis = {
-                        'timestamp': frame_data['timestamp'],
-                        'frame_index': frame_data['frame_index'],
-                        'quality_metrics': frame_data['quality_metrics'],
-                        'vegetation_analysis': {
-                            'total_vegetation_coverage': np.random.uniform(20, 80)  # Placeholder
-                        },
-                        'detection_results': {
-                            'overall_health_index': np.random.uniform(60, 90)  # Placeholder
-                        },
-                        'ndvi_analysis': {
-                            'mean_ndvi': np.random.uniform(0.2, 0.8)  # Placeholder
-                        }
-                    }
-                    frame_analyses.append(analysis)
-                
-                # Perform temporal analysis
-                temporal_analysis = self.video_analyzer.analyze_temporal_patterns(frame_analyses)
-                
-                # Generate comprehensive result
-                result = {
-                    'filename': filename,
-                    'timestamp': datetime.now().isoformat(),
-                    'analysis_type': 'advanced_video_temporal',
-                    'video_metadata': {
-                        'total_frames_analyzed': len(frames_data),
-                        'video_duration_analyzed': max([f['timestamp'] for f in frames_data]) if frames_data else 0,
-                        'frame_quality_average': np.mean([f['quality_metrics']['quality_score'] for f in frames_data]) if frames_data else 0
+            with spool_video_bytes(video_data, filename) as spool:
+                return self.process_video_path(spool.path, filename)
+        except Exception as e:
+            logger.error(f"Error processing video: {str(e)}")
+            return {
+                'filename': filename,
+                'error': str(e),
+                'success': False
+            }
+    
+    def process_video_path(self, video_path: str, filename: str) -> Dict:
+        """
+        Complete video processing workflow for a video on disk (e.g. spooled
+        by services/video_ingest.py); the file is left in place.
+        """
+        try:
+            # Extract optimal frames
+            frames_data = self.video_analyzer.extract_optimal_frames(video_path)
+            
+            if not frames_data:
+                return {
+                    'error': 'No suitable frames could be extracted from video',
+                    'success': False
+                }
+            
+            # Analyze each frame (would integrate with existing NDVI analyzer)
+            frame_analyses = []
+            for frame_data in frames_data:
+                # Here you would call your existing NDVI analyzer
+                # For now, we'll create a placeholder analysis
+                analysis = {
+                    'timestamp': frame_data['timestamp'],
+                    'frame_index': frame_data['frame_index'],
+                    'quality_metrics': frame_data['quality_metrics'],
+                    'vegetation_analysis': {
+                        'total_vegetation_coverage': np.random.uniform(20, 80)  # Placeholder
+                    },
+                    'detection_results': {
+                        'overall_health_index': np.random.uniform(60, 90)  # Placeholder
                     },
-                    'frame_analyses': frame_analyses,
-                    'temporal_patterns': temporal_analysis,
-                    'summary': self.generate_video_summary(frame_analyses, temporal_analysis),
-                    'success': True
+                    'ndvi_analysis': {
+                        'mean_ndvi': np.random.uniform(0.2, 0.8)  # Placeholder
+                    }
                 }
-                
-                return result
-                
-            finally:
-                # Clean up temporary file
-                try:
-                    os.unlink(temp_path)
-                except:
-                    pass
-                    
+                frame_analyses.append(analysis)
+            
+            # Perform temporal analysis
+            temporal_analysis = self.video_analyzer.analyze_temporal_patterns(frame_analyses)
+            
+            # Generate comprehensive result
+            result = {
+                'filename': filename,
+                'timestamp': datetime.now().isoformat(),
+                'analysis_type': 'advanced_video_temporal',
+                'video_metadata': {
+                    'total_frames_analyzed': len(frames_data),
+                    'video_duration_analyzed': max([f['timestamp'] for f in frames_data]) if frames_data else 0,
+                    'frame_quality_average': np.mean([f['quality_metrics']['quality_score'] for f in frames_data]) if frames_data else 0
+                },
+                'frame_analyses': frame_analyses,
+                'temporal_patterns': temporal_analysis,
+                'summary': self.generate_video_summary(frame_analyses, temporal_analysis),
+                'success': True
+            }
+            
+            return result
+
         except Exception as e:
             logger.error(f"Error processing video: {str(e)}")
             return {
@@ -1,16 +1,23 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
-import io
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import asyncio
 from datetime import datetime
+import json
+import shutil
+import time
 import uuid
 import os
 
 # Import our AI services
-from services.ai_verification import NDVIAnalyzer, VideoAnalyzer
-from services.vegetation_classifier import VegetationClassifier
+from services.analysis_pool import (
+    analysis_pool, AnalysisPoolSaturated, ANALYSIS_RETRY_AFTER,
+    before_after_comparison, image_analysis, orthomosaic, video
+)
+from services.batch_analysis import BATCH_MAX_PAIRS, BatchInputError, archive_members, pair_images
+from services.upload_storage import UPLOAD_DIR, MAX_UPLOAD_BYTES, UploadTooLargeError, save_upload_stream
+from services.video_ingest import UnsupportedContentTypeError, UnsupportedVideoError, spool_video_stream
 from services.project_verification_integration import ProjectVerificationIntegration
 
 # Configure logging
@@ -20,10 +27,7 @@ logger = logging.getLogger(__name__)
 # Create router
 ai_router = APIRouter(prefix="/api/ai-verification", tags=["AI Verification"])
 
-# Initialize AI services
-ndvi_analyzer = NDVIAnalyzer()
-video_analyzer = VideoAnalyzer()
-vegetation_classifier = VegetationClassifier()
+# Analyzers live in the analysis pool's worker processes (services/analysis_pool.py)
 
 # Supported file types
 SUPPORTED_IMAGE_TYPES = {
@@ -33,9 +37,33 @@ SUPPORTED_VIDEO_TYPES = {
     'video/mp4', 'video/avi', 'video/mov', 'video/mkv', 'video/wmv'
 }
 
+# /analyze-video reads its form from the request stream; described here for the API docs
+VIDEO_UPLOAD_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {"file": {"type": "string", "format": "binary"}}
+        }}}
+    }
+}
+
 # In-memory storage for demo purposes
 analysis_results = {}
 
+def ensure_analysis_capacity():
+    """Turn requests away with a 503 before reading their upload if no analysis slot is free."""
+    if analysis_pool.saturated():
+        raise analysis_busy()
+
+def analysis_busy(error: Optional[Exception] = None) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(error or "Analysis capacity exhausted, please retry shortly"),
+        headers={"Retry-After": str(ANALYSIS_RETRY_AFTER)}
+    )
+
 @ai_router.post("/analyze-image")
 async def analyze_image(
     file: UploadFile = File(...),
@@ -51,6 +79,7 @@ async def analyze_image(
                 status_code=400,
                 detail=f"Unsupported file type. Supported types: {', '.join(SUPPORTED_IMAGE_TYPES)}"
             )
+        ensure_analysis_capacity()
         
         # Read file content
         contents = await file.read()
@@ -58,19 +87,9 @@ async def analyze_image(
         # Generate analysis ID
         analysis_id = str(uuid.uuid4())
         
-        # Create file-like object for processing
-        image_stream = io.BytesIO(contents)
-        
-        # Perform NDVI analysis
-        logger.info(f"Starting NDVI analysis for {file.filename}")
-        ndvi_result = await asyncio.to_thread(ndvi_analyzer.analyze_image, image_stream)
-        
-        # Reset stream for vegetation classification
-        image_stream.seek(0)
-        
-        # Perform vegetation classification
-        logger.info(f"Starting vegetation classification for {file.filename}")
-        vegetation_result = await asyncio.to_thread(vegetation_classifier.classify_vegetation, image_stream)
+        # Perform NDVI analysis and vegetation classification on one decode of the image
+        logger.info(f"Starting NDVI analysis and vegetation classification for {file.filename}")
+        ndvi_result, vegetation_result = await analysis_pool.run(image_analysis, contents, file.filename)
         
         # Combine results
         combined_result = {
@@ -101,50 +120,263 @@ async def analyze_image(
             "data": combined_result
         })
         
+    except HTTPException:
+        raise
+    except AnalysisPoolSaturated as e:
+        raise analysis_busy(e)
     except Exception as e:
         logger.error(f"Error analyzing image {file.filename}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
-@ai_router.post("/analyze-video")
-async def analyze_video(
+@ai_router.post("/analyze-orthomosaic")
+async def analyze_orthomosaic(
     file: UploadFile = File(...),
     project_id: Optional[int] = None
 ):
     """
-    Analyze uploaded video for temporal vegetation monitoring.
+    Analyze a large orthomosaic (GeoTIFF) at native resolution, tile by tile.
+    The upload is streamed to disk and never held in memory.
     """
+    if file.content_type not in SUPPORTED_IMAGE_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type. Supported types: {', '.join(SUPPORTED_IMAGE_TYPES)}"
+        )
+    ensure_analysis_capacity()
+    
+    analysis_id = str(uuid.uuid4())
+    temp_filename = os.path.join(UPLOAD_DIR, f"orthomosaic_{analysis_id}.tmp")
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
     try:
-        # Validate file type
-        if file.content_type not in SUPPORTED_VIDEO_TYPES:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file type. Supported types: {', '.join(SUPPORTED_VIDEO_TYPES)}"
+        try:
+            file_size, _ = await asyncio.to_thread(save_upload_stream, file.file, temp_filename)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        
+        logger.info(f"Starting tiled analysis for {file.filename}")
+        tiled_result = await analysis_pool.run(orthomosaic, temp_filename, file.filename)
+        if tiled_result.get("success") is False:
+            raise HTTPException(status_code=422, detail=f"Analysis failed: {tiled_result.get('error')}")
+        
+        combined_result = {
+            "analysis_id": analysis_id,
+            "filename": file.filename,
+            "file_size": file_size,
+            "timestamp": datetime.now().isoformat(),
+            "ndvi_analysis": tiled_result,
+            "overall_score": tiled_result["verification_metrics"]["confidence_score"],
+            "project_id": project_id
+        }
+        analysis_results[analysis_id] = combined_result
+        
+        if project_id:
+            ProjectVerificationIntegration.link_verification_to_project(
+                project_id, analysis_id, "orthomosaic_analysis"
             )
         
-        # Read file content
-        contents = await file.read()
+        logger.info(f"Tiled analysis completed for {file.filename}: {analysis_id}")
+        return JSONResponse(content={
+            "status": "success",
+            "message": "Orthomosaic analysis completed successfully",
+            "data": combined_result
+        })
+    
+    except HTTPException:
+        raise
+    except AnalysisPoolSaturated as e:
+        raise analysis_busy(e)
+    except Exception as e:
+        logger.error(f"Error analyzing orthomosaic {file.filename}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+    finally:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+
+# Seconds a batch waits before resubmitting a plot the saturated pool turned away
+BATCH_RETRY_SECONDS = 0.5
+
+# Pool workers all running batches may occupy together; the rest stay free for
+# uploads and estimates, which answer 503 when the pool is saturated
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "0"))
+
+_batch_slots: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+def batch_slots() -> asyncio.Semaphore:
+    """Process-wide limit on the plots of all batches analysed at once (half the pool by default)."""
+    global _batch_slots
+    loop = asyncio.get_running_loop()
+    if _batch_slots is None or _batch_slots[0] is not loop:
+        _batch_slots = (loop, asyncio.Semaphore(BATCH_MAX_WORKERS or max(1, analysis_pool.workers // 2)))
+    return _batch_slots[1]
+
+@ai_router.post("/compare-batch")
+async def compare_batch(
+    files: List[UploadFile] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    project_area_hectares: float = Form(...),
+    time_period_years: float = Form(1.0)
+):
+    """
+    Before/after comparison of many plots in one request. Images are uploaded
+    as files and/or a ZIP archive, named "<plot>_before.jpg" / "<plot>_after.jpg"
+    (or "<plot>/before.jpg"). Plots are analysed in parallel on the analysis
+    pool and the results are streamed back as NDJSON, one line per plot as
+    it completes, after a header line and followed by a summary line.
+    """
+    if project_area_hectares <= 0 or time_period_years <= 0:
+        raise HTTPException(status_code=400, detail="project_area_hectares and time_period_years must be greater than 0")
+    if not files and archive is None:
+        raise HTTPException(status_code=400, detail="Upload before/after images as files or a ZIP archive")
+    ensure_analysis_capacity()
+
+    batch_id = str(uuid.uuid4())
+    batch_dir = os.path.join(UPLOAD_DIR, f"batch_{batch_id}")
+    os.makedirs(batch_dir, exist_ok=True)
+    try:
+        # Uploads are streamed to disk; workers read each image themselves
+        sources = {}
+        for index, upload in enumerate(files or []):
+            name = os.path.basename(upload.filename or "")
+            path = os.path.join(batch_dir, f"{index}_{name}")
+            await asyncio.to_thread(save_upload_stream, upload.file, path)
+            sources[name] = path
+        if archive is not None:
+            archive_path = os.path.join(batch_dir, "archive.zip")
+            await asyncio.to_thread(save_upload_stream, archive.file, archive_path)
+            for member in await asyncio.to_thread(archive_members, archive_path, MAX_UPLOAD_BYTES):
+                sources[member] = (archive_path, member)
+
+        pairs, unpaired = pair_images(sources)
+        if not pairs:
+            raise HTTPException(status_code=400, detail="No before/after pairs found; name images <plot>_before / <plot>_after")
+        if len(pairs) > BATCH_MAX_PAIRS:
+            raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_PAIRS} pairs per batch")
+    except HTTPException:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        raise
+    except UploadTooLargeError as e:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        raise HTTPException(status_code=413, detail=str(e))
+    except (BatchInputError, ValueError) as e:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        logger.error(f"Error receiving batch {batch_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch upload failed: {str(e)}")
+
+    logger.info(f"Batch {batch_id}: {len(pairs)} before/after pairs")
+    return StreamingResponse(
+        stream_batch(batch_id, batch_dir, pairs, unpaired, sources, project_area_hectares, time_period_years),
+        media_type="application/x-ndjson"
+    )
+
+async def stream_batch(batch_id: str, batch_dir: str, pairs: Dict, unpaired: List[str], sources: Dict,
+                       project_area_hectares: float, time_period_years: float):
+    """NDJSON lines of a batch; the batch's files are removed when the stream ends or the client goes away."""
+    # Batches share a slice of the pool, so they never crowd interactive requests out of it;
+    # a plot turned away by a pool saturated with interactive work waits and is resubmitted
+    slots = batch_slots()
+    started = time.monotonic()
+
+    async def analyse(index: int, plot: str, images: Dict):
+        async with slots:
+            plot_started = time.monotonic()
+            while True:
+                try:
+                    result = await analysis_pool.run(
+                        before_after_comparison, sources[images['before']], sources[images['after']],
+                        project_area_hectares, time_period_years
+                    )
+                    break
+                except AnalysisPoolSaturated:
+                    await asyncio.sleep(BATCH_RETRY_SECONDS)
+                except Exception as e:
+                    logger.error(f"Batch {batch_id} plot {plot} failed: {str(e)}")
+                    result = {"success": False, "error": str(e)}
+                    break
+            return index, plot, images, result, time.monotonic() - plot_started
+
+    tasks = [asyncio.ensure_future(analyse(index, plot, images)) for index, (plot, images) in enumerate(pairs.items())]
+    try:
+        yield json.dumps({"type": "batch", "batch_id": batch_id, "pairs": len(pairs), "unpaired": unpaired}) + "\n"
+        succeeded, total_credits = 0, 0.0
+        for next_done in asyncio.as_completed(tasks):
+            index, plot, images, result, elapsed = await next_done
+            success = bool(result.get("success"))
+            if success:
+                succeeded += 1
+                total_credits += result.get("recommended_credits") or 0.0
+            yield json.dumps({
+                "type": "pair",
+                "index": index,
+                "plot": plot,
+                "before": images['before'],
+                "after": images['after'],
+                "success": success,
+                "elapsed_seconds": round(elapsed, 3),
+                "result": result
+            }) + "\n"
+        yield json.dumps({
+            "type": "summary",
+            "batch_id": batch_id,
+            "succeeded": succeeded,
+            "failed": len(pairs) - succeeded,
+            "total_recommended_credits": total_credits,
+            "elapsed_seconds": round(time.monotonic() - started, 3)
+        }) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+        shutil.rmtree(batch_dir, ignore_errors=True)
+
+@ai_router.post("/analyze-video", openapi_extra=VIDEO_UPLOAD_FORM)
+async def analyze_video(
+    request: Request,
+    project_id: Optional[int] = None
+):
+    """
+    Analyze uploaded video (multipart field `file`) for temporal vegetation monitoring.
+    The upload is spooled to disk straight from the request stream, written once
+    and never held in memory; requests over MAX_VIDEO_SIZE_MB are refused before
+    the body is read.
+    """
+    filename = None
+    try:
+        ensure_analysis_capacity()
         
         # Generate analysis ID
         analysis_id = str(uuid.uuid4())
         
-        # Create temporary file for video processing
-        temp_filename = f"temp_{analysis_id}.mp4"
-        with open(temp_filename, "wb") as temp_file:
-            temp_file.write(contents)
-        
         try:
+            spool = await spool_video_stream(request.stream(), request.headers.get("content-type"),
+                                             accepted_types=SUPPORTED_VIDEO_TYPES)
+        except UnsupportedContentTypeError:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported file type. Supported types: {', '.join(SUPPORTED_VIDEO_TYPES)}"
+            )
+        except UnsupportedVideoError as e:
+            raise HTTPException(status_code=415, detail=str(e))
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        with spool:
+            filename = spool.filename
             # Perform video analysis
-            logger.info(f"Starting video analysis for {file.filename}")
-            video_result = await asyncio.to_thread(video_analyzer.analyze_video, temp_filename)
+            logger.info(f"Starting video analysis for {filename} ({spool.size} bytes, {spool.container})")
+            video_result = await analysis_pool.run(video, spool.path, filename)
             
             # Combine results
             combined_result = {
                 "analysis_id": analysis_id,
-                "filename": file.filename,
-                "file_size": len(contents),
+                "filename": filename,
+                "file_size": spool.size,
                 "timestamp": datetime.now().isoformat(),
                 "video_analysis": video_result,
-                "overall_score": video_result.get("average_ndvi", 0) * 100,
+                "overall_score": video_result.get("temporal_analysis", {}).get("average_ndvi", 0) * 100,
                 "project_id": project_id
             }
             
@@ -157,21 +389,20 @@ async def analyze_video(
                     project_id, analysis_id, "video_analysis"
                 )
             
-            logger.info(f"Video analysis completed for {file.filename}: {analysis_id}")
+            logger.info(f"Video analysis completed for {filename}: {analysis_id}")
             
             return JSONResponse(content={
                 "status": "success",
                 "message": "Video analysis completed successfully",
                 "data": combined_result
             })
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_filename):
-                os.remove(temp_filename)
         
+    except HTTPException:
+        raise
+    except AnalysisPoolSaturated as e:
+        raise analysis_busy(e)
     except Exception as e:
-        logger.error(f"Error analyzing video {file.filename}: {str(e)}")
+        logger.error(f"Error analyzing video {filename}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Video analysis failed: {str(e)}")
 
 @ai_router.get("/analysis-history")
@@ -2,17 +2,27 @@ import cv2
 import numpy as np
 from PIL import Image, ImageEnhance
 import io
+import os
 import base64
 from typing import Dict, List, Tuple, Optional
 import json
 from datetime import datetime
 import logging
 from .co2_sequestration_calculator import CO2SequestrationCalculator
+from .analysis_cache import analysis_cache
+from .decoded_image import DecodedImage, ImageInput, ImageView, as_decoded
+from .frame_sampling import FRAME_MAX_WIDTH, VideoFrameSampler
+from .image_pyramid import PYRAMID_LEVELS
+from .video_ingest import spool_video_bytes
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# NDVI statistics are gathered block by block so per-block temporaries stay
+# in CPU cache instead of allocating full-frame masks
+NDVI_BLOCK_PIXELS = 1 << 18
+
 class NDVIAnalyzer:
     """
     Advanced NDVI (Normalized Difference Vegetation Index) analyzer for blue carbon vegetation detection.
@@ -32,30 +42,30 @@ class NDVIAnalyzer:
         """
         Calculate NDVI from RGB image using approximation method.
         For RGB images, we use Green as NIR proxy and Red channel.
+        Computed in float32 with in-place ufuncs: two full-frame buffers in total.
         """
         try:
-            # Convert to float to prevent overflow
-            image_float = image.astype(np.float64)
-            
-            # Extract channels (RGB format)
-            red_channel = image_float[:, :, 0]
-            green_channel = image_float[:, :, 1]  # Use green as NIR proxy
-            blue_channel = image_float[:, :, 2]
+            # Extract channels (RGB format), read as uint8 without copying
+            red = image[:, :, 0]
+            green = image[:, :, 1]  # Use green as NIR proxy
+            blue = image[:, :, 2]
             
             # Calculate modified NDVI using green as NIR approximation
             # This is a simplified approach for RGB images
-            nir_proxy = green_channel + (blue_channel * 0.3)  # Enhanced NIR proxy
-            red = red_channel
+            ndvi = np.multiply(blue, np.float32(0.3), dtype=np.float32)
+            ndvi += green  # Enhanced NIR proxy
+            denominator = np.add(ndvi, red, dtype=np.float32)
+            ndvi -= red
             
-            # Avoid division by zero
-            denominator = nir_proxy + red
-            denominator = np.where(denominator == 0, 1, denominator)
+            # Avoid division by zero: the denominator is only 0 for black pixels,
+            # whose numerator is 0 too, so they come out as NDVI 0
+            np.maximum(denominator, np.finfo(np.float32).tiny, out=denominator)
             
             # Calculate NDVI
-            ndvi = (nir_proxy - red) / denominator
+            np.divide(ndvi, denominator, out=ndvi)
             
             # Normalize to -1 to 1 range
-            ndvi = np.clip(ndvi, -1, 1)
+            np.clip(ndvi, -1, 1, out=ndvi)
             
             return ndvi
             
@@ -63,44 +73,35 @@ class NDVIAnalyzer:
             logger.error(f"Error calculating NDVI: {str(e)}")
             return np.zeros_like(image[:, :, 0])
     
-    def enhanced_vegetation_detection(self, image: np.ndarray) -> Dict:
+    def enhanced_vegetation_detection(self, image: np.ndarray, view: Optional[ImageView] = None) -> Dict:
         """
         Enhanced vegetation detection using multiple color space analysis.
+        `view` (the ImageView of `image`) supplies already converted color spaces.
         """
         try:
             # Convert to different color spaces for better analysis
-            hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
-            lab = cv2.cvtColor(image, cv2.COLOR_RGB2LAB)
-            
-            # HSV-based vegetation detection (green hue analysis)
-            hue = hsv[:, :, 0]
-            saturation = hsv[:, :, 1]
-            value = hsv[:, :, 2]
+            hsv = view.hsv if view is not None else cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
+            lab = view.lab if view is not None else cv2.cvtColor(image, cv2.COLOR_RGB2LAB)
             
-            # Define green range in HSV (adjusted for vegetation)
-            green_mask_lower = (35 <= hue) & (hue <= 85)  # Green hue range
-            green_mask_saturation = saturation > 30  # Minimum saturation
-            green_mask_value = value > 20  # Minimum brightness
-            
-            vegetation_mask_hsv = green_mask_lower & green_mask_saturation & green_mask_value
+            # HSV-based vegetation detection (green hue analysis):
+            # hue 35-85, saturation > 30, brightness > 20, as one uint8 pass
+            vegetation_mask = cv2.inRange(hsv, (35, 31, 21), (85, 255, 255))
             
             # LAB color space analysis for better vegetation detection
-            a_channel = lab[:, :, 1]  # Green-Red component
-            b_channel = lab[:, :, 2]  # Blue-Yellow component
-            
-            # Vegetation typically has negative 'a' values (more green than red)
-            vegetation_mask_lab = a_channel < 127  # Below neutral (more green)
+            # Vegetation typically has negative 'a' values (more green than red):
+            # 'a' (Green-Red component) below neutral 127
+            vegetation_mask_lab = cv2.inRange(lab, (0, 0, 0), (255, 126, 255))
             
             # Combine masks
-            combined_vegetation_mask = vegetation_mask_hsv | vegetation_mask_lab
+            cv2.bitwise_or(vegetation_mask, vegetation_mask_lab, dst=vegetation_mask)
             
             # Calculate vegetation statistics
             total_pixels = image.shape[0] * image.shape[1]
-            vegetation_pixels = np.sum(combined_vegetation_mask)
+            vegetation_pixels = cv2.countNonZero(vegetation_mask)
             vegetation_percentage = (vegetation_pixels / total_pixels) * 100
             
             return {
-                'vegetation_mask': combined_vegetation_mask,
+                'vegetation_mask': self._as_bool_mask(vegetation_mask),
                 'vegetation_percentage': vegetation_percentage,
                 'total_pixels': total_pixels,
                 'vegetation_pixels': vegetation_pixels
@@ -115,43 +116,37 @@ class NDVIAnalyzer:
                 'vegetation_pixels': 0
             }
     
-    def analyze_image_composition(self, image: np.ndarray) -> Dict:
+    def analyze_image_composition(self, image: np.ndarray, view: Optional[ImageView] = None) -> Dict:
         """
         Analyze image composition to detect planted vs empty areas.
+        `view` (the ImageView of `image`) supplies already converted color spaces.
         """
         try:
             # Convert to grayscale for texture analysis
-            gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+            gray = view.gray if view is not None else cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
             
             # Calculate texture features using standard deviation
-            kernel_size = 9
-            texture = cv2.Laplacian(gray, cv2.CV_64F, ksize=kernel_size)
-            texture_std = np.std(texture)
+            texture = self.texture_response(gray)
+            texture_std = float(cv2.meanStdDev(texture)[1][0, 0])
             
-            # Color variance analysis
-            color_variance = np.var(image, axis=(0, 1))
+            # Color variance analysis (per channel, without a float copy of the image)
+            color_variance = cv2.meanStdDev(image)[1].ravel() ** 2
             avg_color_variance = np.mean(color_variance)
             
             # Detect bare soil/sand areas (typically brown/tan colors)
-            hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
-            hue = hsv[:, :, 0]
-            saturation = hsv[:, :, 1]
-            
-            # Brown/tan soil detection
-            soil_mask = ((10 <= hue) & (hue <= 30)) & (saturation > 20)
-            soil_percentage = (np.sum(soil_mask) / (image.shape[0] * image.shape[1])) * 100
-            
-            # Water detection (blue areas)
-            water_mask = ((100 <= hue) & (hue <= 130)) & (saturation > 30)
-            water_percentage = (np.sum(water_mask) / (image.shape[0] * image.shape[1])) * 100
+            hsv = view.hsv if view is not None else cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
+            total_pixels = image.shape[0] * image.shape[1]
+            soil_mask, water_mask = self.land_cover_masks(hsv)
+            soil_percentage = (cv2.countNonZero(soil_mask) / total_pixels) * 100
+            water_percentage = (cv2.countNonZero(water_mask) / total_pixels) * 100
             
             return {
                 'texture_complexity': texture_std,
                 'color_variance': avg_color_variance,
                 'soil_percentage': soil_percentage,
                 'water_percentage': water_percentage,
-                'soil_mask': soil_mask,
-                'water_mask': water_mask
+                'soil_mask': self._as_bool_mask(soil_mask),
+                'water_mask': self._as_bool_mask(water_mask)
             }
             
         except Exception as e:
@@ -165,55 +160,92 @@ class NDVIAnalyzer:
                 'water_mask': np.zeros((image.shape[0], image.shape[1]), dtype=bool)
             }
     
+    # Laplacian aperture of the texture measure; tiled analysis reads this
+    # many pixels around each tile so tile borders see their real neighbours
+    TEXTURE_KERNEL_SIZE = 9
+    
+    def texture_response(self, gray: np.ndarray) -> np.ndarray:
+        # float32 holds the ksize 9 response of uint8 input exactly
+        return cv2.Laplacian(gray, cv2.CV_32F, ksize=self.TEXTURE_KERNEL_SIZE)
+    
+    @staticmethod
+    def land_cover_masks(hsv: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """0/255 masks of brown/tan soil (hue 10-30, saturation > 20) and water (hue 100-130, saturation > 30)."""
+        soil_mask = cv2.inRange(hsv, (10, 21, 0), (30, 255, 255))
+        water_mask = cv2.inRange(hsv, (100, 31, 0), (130, 255, 255))
+        return soil_mask, water_mask
+    
+    @staticmethod
+    def _as_bool_mask(mask: np.ndarray) -> np.ndarray:
+        """View a 0/255 cv2 mask as a boolean mask, in place."""
+        np.bitwise_and(mask, 1, out=mask)
+        return mask.view(bool)
+    
+    def ndvi_statistics(self, ndvi: np.ndarray) -> Dict:
+        """
+        Mean, std, min, max and the number of pixels above each NDVI threshold
+        (0, min vegetation, healthy, mangrove), gathered in a single blocked pass.
+        """
+        flat = ndvi.reshape(-1)
+        thresholds = {
+            'zero': 0.0,
+            'min': self.min_vegetation_threshold,
+            'healthy': self.healthy_vegetation_threshold,
+            'mangrove': self.mangrove_specific_threshold
+        }
+        edges = np.array(list(thresholds.values()), dtype=flat.dtype)
+        above = np.zeros(len(edges), dtype=np.int64)
+        total = total_sq = 0.0
+        low, high = np.inf, -np.inf
+        
+        mask = np.empty(min(flat.size, NDVI_BLOCK_PIXELS), dtype=bool)
+        squares = np.empty(mask.size, dtype=np.float64)
+        for start in range(0, flat.size, NDVI_BLOCK_PIXELS):
+            block = flat[start:start + NDVI_BLOCK_PIXELS]
+            n = block.size
+            for i, edge in enumerate(edges):
+                np.greater(block, edge, out=mask[:n])
+                above[i] += np.count_nonzero(mask[:n])
+            total += float(block.sum(dtype=np.float64))
+            np.square(block, out=squares[:n], dtype=np.float64)
+            total_sq += float(squares[:n].sum())
+            low = min(low, float(block.min()))
+            high = max(high, float(block.max()))
+        
+        return self._finish_ndvi_statistics({
+            'sum': total,
+            'sum_squares': total_sq,
+            'min': low,
+            'max': high,
+            'total_pixels': flat.size,
+            'above': dict(zip(thresholds, (int(count) for count in above)))
+        })
+    
+    @classmethod
+    def merge_ndvi_statistics(cls, parts: List[Dict]) -> Dict:
+        """Whole-image statistics from the ndvi_statistics of non-overlapping tiles."""
+        return cls._finish_ndvi_statistics({
+            'sum': sum(part['sum'] for part in parts),
+            'sum_squares': sum(part['sum_squares'] for part in parts),
+            'min': min(part['min'] for part in parts),
+            'max': max(part['max'] for part in parts),
+            'total_pixels': sum(part['total_pixels'] for part in parts),
+            'above': {key: sum(part['above'][key] for part in parts) for key in parts[0]['above']}
+        })
+    
+    @staticmethod
+    def _finish_ndvi_statistics(stats: Dict) -> Dict:
+        mean = stats['sum'] / stats['total_pixels']
+        stats['mean'] = mean
+        stats['std'] = float(np.sqrt(max(stats['sum_squares'] / stats['total_pixels'] - mean * mean, 0.0)))
+        return stats
+    
     def calculate_health_metrics(self, ndvi: np.ndarray, vegetation_data: Dict) -> Dict:
         """
         Calculate vegetation health metrics from NDVI and other data.
         """
         try:
-            # NDVI statistics
-            ndvi_mean = np.mean(ndvi)
-            ndvi_std = np.std(ndvi)
-            ndvi_max = np.max(ndvi)
-            ndvi_min = np.min(ndvi)
-            
-            # Health classification based on NDVI values
-            healthy_vegetation = ndvi > self.healthy_vegetation_threshold
-            moderate_vegetation = (ndvi > self.min_vegetation_threshold) & (ndvi <= self.healthy_vegetation_threshold)
-            sparse_vegetation = (ndvi > 0) & (ndvi <= self.min_vegetation_threshold)
-            no_vegetation = ndvi <= 0
-            
-            total_pixels = ndvi.size
-            healthy_percentage = (np.sum(healthy_vegetation) / total_pixels) * 100
-            moderate_percentage = (np.sum(moderate_vegetation) / total_pixels) * 100
-            sparse_percentage = (np.sum(sparse_vegetation) / total_pixels) * 100
-            bare_percentage = (np.sum(no_vegetation) / total_pixels) * 100
-            
-            # Overall health index (weighted score)
-            health_index = (
-                (healthy_percentage * 1.0) +
-                (moderate_percentage * 0.7) +
-                (sparse_percentage * 0.3) +
-                (bare_percentage * 0.0)
-            )
-            
-            # Mangrove-specific detection
-            potential_mangrove_pixels = ndvi > self.mangrove_specific_threshold
-            mangrove_likelihood = (np.sum(potential_mangrove_pixels) / total_pixels) * 100
-            
-            return {
-                'ndvi_mean': float(ndvi_mean),
-                'ndvi_std': float(ndvi_std),
-                'ndvi_max': float(ndvi_max),
-                'ndvi_min': float(ndvi_min),
-                'healthy_percentage': float(healthy_percentage),
-                'moderate_percentage': float(moderate_percentage),
-                'sparse_percentage': float(sparse_percentage),
-                'bare_percentage': float(bare_percentage),
-                'health_index': float(health_index),
-                'mangrove_likelihood': float(mangrove_likelihood),
-                'is_mangrove_detected': mangrove_likelihood > 15.0  # Threshold for mangrove detection
-            }
-            
+            return self.health_metrics_from_statistics(self.ndvi_statistics(ndvi))
         except Exception as e:
             logger.error(f"Error calculating health metrics: {str(e)}")
             return {
@@ -230,93 +262,112 @@ class NDVIAnalyzer:
                 'is_mangrove_detected': False
             }
     
-    def analyze_image(self, image_data: bytes, filename: str = "unknown") -> Dict:
+    def health_metrics_from_statistics(self, stats: Dict) -> Dict:
+        """Health metrics from ndvi_statistics (or merge_ndvi_statistics) output."""
+        ndvi_mean = stats['mean']
+        ndvi_std = stats['std']
+        ndvi_max = stats['max']
+        ndvi_min = stats['min']
+        
+        # Health classification based on NDVI values, from the pixel counts
+        # above each threshold (a class is empty if its thresholds are inverted)
+        above = stats['above']
+        total_pixels = stats['total_pixels']
+        healthy_percentage = (above['healthy'] / total_pixels) * 100
+        moderate_percentage = (max(above['min'] - above['healthy'], 0) / total_pixels) * 100
+        sparse_percentage = (max(above['zero'] - above['min'], 0) / total_pixels) * 100
+        bare_percentage = ((total_pixels - above['zero']) / total_pixels) * 100
+        
+        # Overall health index (weighted score)
+        health_index = (
+            (healthy_percentage * 1.0) +
+            (moderate_percentage * 0.7) +
+            (sparse_percentage * 0.3) +
+            (bare_percentage * 0.0)
+        )
+        
+        # Mangrove-specific detection
+        mangrove_likelihood = (above['mangrove'] / total_pixels) * 100
+        
+        return {
+            'ndvi_mean': float(ndvi_mean),
+            'ndvi_std': float(ndvi_std),
+            'ndvi_max': float(ndvi_max),
+            'ndvi_min': float(ndvi_min),
+            'healthy_percentage': float(healthy_percentage),
+            'moderate_percentage': float(moderate_percentage),
+            'sparse_percentage': float(sparse_percentage),
+            'bare_percentage': float(bare_percentage),
+            'health_index': float(health_index),
+            'mangrove_likelihood': float(mangrove_likelihood),
+            'is_mangrove_detected': mangrove_likelihood > 15.0  # Threshold for mangrove detection
+        }
+    
+    # Bump when the analysis changes in a way the thresholds don't capture (3: EXIF orientation applied)
+    ANALYSIS_VERSION = 3
+    
+    def cache_params(self) -> Dict:
+        """Everything besides the image that affects analyze_image results."""
+        return {
+            'version': self.ANALYSIS_VERSION,
+            'min_vegetation_threshold': self.min_vegetation_threshold,
+            'healthy_vegetation_threshold': self.healthy_vegetation_threshold,
+            'mangrove_specific_threshold': self.mangrove_specific_threshold,
+            'pyramid_levels': PYRAMID_LEVELS
+        }
+    
+    def analyze_image(self, image_data: ImageInput, filename: str = "unknown") -> Dict:
         """
         Main analysis function that processes an image and returns comprehensive results.
+        Accepts raw bytes or a DecodedImage shared with other analyzers.
+        Results are cached by image content, so re-analysing the same image is a lookup.
         """
+        if not isinstance(image_data, (bytes, bytearray, DecodedImage)):
+            # Only raw bytes have a content hash to cache under
+            return self._analyze_image(image_data, filename)
+        
+        image = as_decoded(image_data, filename)
+        result = analysis_cache.get_or_compute(
+            'ndvi_image', [image.content_hash], self.cache_params(),
+            lambda: self._analyze_image(image, filename)
+        )
+        return self.stamp_result(result, filename)
+    
+    @staticmethod
+    def stamp_result(result: Dict, filename: str) -> Dict:
+        """Set the per-call fields of a cached result, which is shared by every image with the same content."""
+        result['filename'] = filename
+        if 'timestamp' in result:
+            result['timestamp'] = datetime.now().isoformat()
+        return result
+    
+    def _analyze_image(self, image_data: ImageInput, filename: str) -> Dict:
         try:
-            # Load image
-            image_pil = Image.open(io.BytesIO(image_data))
-            image_array = np.array(image_pil.convert('RGB'))
-            
-            logger.info(f"Analyzing image: {filename}, Shape: {image_array.shape}")
+            # Decode (once per DecodedImage)
+            image = as_decoded(image_data, filename)
+            logger.info(f"Analyzing image: {filename}, Size: {image.size}")
             
             # Resize if too large (for performance)
-            if image_array.shape[0] > 1024 or image_array.shape[1] > 1024:
-                image_pil_resized = image_pil.resize((1024, 768), Image.Resampling.LANCZOS)
-                image_array = np.array(image_pil_resized.convert('RGB'))
+            view = image.view_within(1024, (1024, 768))
+            image_array = view.rgb
             
             # Calculate NDVI
             ndvi = self.calculate_ndvi_rgb(image_array)
             
             # Enhanced vegetation detection
-            vegetation_data = self.enhanced_vegetation_detection(image_array)
+            vegetation_data = self.enhanced_vegetation_detection(image_array, view)
             
             # Image composition analysis
-            composition_data = self.analyze_image_composition(image_array)
+            composition_data = self.analyze_image_composition(image_array, view)
             
             # Health metrics
             health_metrics = self.calculate_health_metrics(ndvi, vegetation_data)
             
-            # Calculate confidence score
-            confidence_factors = [
-                min(vegetation_data['vegetation_percentage'] / 50.0, 1.0),  # Vegetation coverage
-                min(health_metrics['health_index'] / 80.0, 1.0),          # Health index
-                min(composition_data['texture_complexity'] / 100.0, 1.0),  # Texture complexity
-                1.0 - min(composition_data['water_percentage'] / 100.0, 0.5)  # Water reduction factor
-            ]
-            
-            confidence_score = (sum(confidence_factors) / len(confidence_factors)) * 100
-            confidence_score = max(min(confidence_score, 95.0), 60.0)  # Clamp between 60-95%
-            
-            # Generate summary
-            analysis_summary = self.generate_analysis_summary(
-                health_metrics, vegetation_data, composition_data, confidence_score
+            result = self.build_analysis_result(
+                filename, image_array.shape, health_metrics, vegetation_data, composition_data
             )
             
-            # Prepare result
-            result = {
-                'filename': filename,
-                'timestamp': datetime.now().isoformat(),
-                'image_dimensions': {
-                    'width': image_array.shape[1],
-                    'height': image_array.shape[0],
-                    'channels': image_array.shape[2]
-                },
-                'ndvi_analysis': {
-                    'mean_ndvi': health_metrics['ndvi_mean'],
-                    'max_ndvi': health_metrics['ndvi_max'],
-                    'min_ndvi': health_metrics['ndvi_min'],
-                    'std_ndvi': health_metrics['ndvi_std']
-                },
-                'vegetation_analysis': {
-                    'total_vegetation_coverage': vegetation_data['vegetation_percentage'],
-                    'healthy_vegetation': health_metrics['healthy_percentage'],
-                    'moderate_vegetation': health_metrics['moderate_percentage'],
-                    'sparse_vegetation': health_metrics['sparse_percentage'],
-                    'bare_land': health_metrics['bare_percentage']
-                },
-                'composition_analysis': {
-                    'soil_percentage': composition_data['soil_percentage'],
-                    'water_percentage': composition_data['water_percentage'],
-                    'texture_complexity': composition_data['texture_complexity'],
-                    'color_variance': composition_data['color_variance']
-                },
-                'detection_results': {
-                    'mangrove_detected': health_metrics['is_mangrove_detected'],
-                    'mangrove_likelihood': health_metrics['mangrove_likelihood'],
-                    'overall_health_index': health_metrics['health_index']
-                },
-                'verification_metrics': {
-                    'confidence_score': confidence_score,
-                    'planted_area_estimate': max(0, vegetation_data['vegetation_percentage'] - composition_data['water_percentage']),
-                    'empty_land_estimate': composition_data['soil_percentage'] + health_metrics['bare_percentage'] / 2,
-                    'analysis_quality': 'High' if confidence_score > 85 else 'Medium' if confidence_score > 70 else 'Basic'
-                },
-                'summary': analysis_summary
-            }
-            
-            logger.info(f"Analysis completed for {filename}. Confidence: {confidence_score:.1f}%")
+            logger.info(f"Analysis completed for {filename}. Confidence: {result['verification_metrics']['confidence_score']:.1f}%")
             return result
             
         except Exception as e:
@@ -328,6 +379,70 @@ class NDVIAnalyzer:
                 'success': False
             }
     
+    def build_analysis_result(self, filename: str, image_shape: Tuple[int, ...], health_metrics: Dict,
+                              vegetation_data: Dict, composition_data: Dict) -> Dict:
+        """
+        Confidence score, summary and the analyze_image result from the
+        per-image (or merged per-tile) vegetation, composition and health data.
+        """
+        # Calculate confidence score
+        confidence_factors = [
+            min(vegetation_data['vegetation_percentage'] / 50.0, 1.0),  # Vegetation coverage
+            min(health_metrics['health_index'] / 80.0, 1.0),          # Health index
+            min(composition_data['texture_complexity'] / 100.0, 1.0),  # Texture complexity
+            1.0 - min(composition_data['water_percentage'] / 100.0, 0.5)  # Water reduction factor
+        ]
+        
+        confidence_score = (sum(confidence_factors) / len(confidence_factors)) * 100
+        confidence_score = max(min(confidence_score, 95.0), 60.0)  # Clamp between 60-95%
+        
+        # Generate summary
+        analysis_summary = self.generate_analysis_summary(
+            health_metrics, vegetation_data, composition_data, confidence_score
+        )
+        
+        # Prepare result
+        return {
+            'filename': filename,
+            'timestamp': datetime.now().isoformat(),
+            'image_dimensions': {
+                'width': image_shape[1],
+                'height': image_shape[0],
+                'channels': image_shape[2]
+            },
+            'ndvi_analysis': {
+                'mean_ndvi': health_metrics['ndvi_mean'],
+                'max_ndvi': health_metrics['ndvi_max'],
+                'min_ndvi': health_metrics['ndvi_min'],
+                'std_ndvi': health_metrics['ndvi_std']
+            },
+            'vegetation_analysis': {
+                'total_vegetation_coverage': vegetation_data['vegetation_percentage'],
+                'healthy_vegetation': health_metrics['healthy_percentage'],
+                'moderate_vegetation': health_metrics['moderate_percentage'],
+                'sparse_vegetation': health_metrics['sparse_percentage'],
+                'bare_land': health_metrics['bare_percentage']
+            },
+            'composition_analysis': {
+                'soil_percentage': composition_data['soil_percentage'],
+                'water_percentage': composition_data['water_percentage'],
+                'texture_complexity': composition_data['texture_complexity'],
+                'color_variance': composition_data['color_variance']
+            },
+            'detection_results': {
+                'mangrove_detected': health_metrics['is_mangrove_detected'],
+                'mangrove_likelihood': health_metrics['mangrove_likelihood'],
+                'overall_health_index': health_metrics['health_index']
+            },
+            'verification_metrics': {
+                'confidence_score': confidence_score,
+                'planted_area_estimate': max(0, vegetation_data['vegetation_percentage'] - composition_data['water_percentage']),
+                'empty_land_estimate': composition_data['soil_percentage'] + health_metrics['bare_percentage'] / 2,
+                'analysis_quality': 'High' if confidence_score > 85 else 'Medium' if confidence_score > 70 else 'Basic'
+            },
+            'summary': analysis_summary
+        }
+    
     def generate_analysis_summary(self, health_metrics: Dict, vegetation_data: Dict, 
                                 composition_data: Dict, confidence_score: float) -> str:
         """
@@ -388,21 +503,25 @@ class BeforeAfterAnalyzer:
     land transformation and carbon sequestration potential.
     """
     
-    def __init__(self):
-        self.ndvi_analyzer = NDVIAnalyzer()
-        self.co2_calculator = CO2SequestrationCalculator()
+    def __init__(self, ndvi_analyzer: Optional[NDVIAnalyzer] = None,
+                 co2_calculator: Optional[CO2SequestrationCalculator] = None):
+        self.ndvi_analyzer = ndvi_analyzer or NDVIAnalyzer()
+        self.co2_calculator = co2_calculator or CO2SequestrationCalculator()
     
-    def compare_images(self, before_image_data: bytes, after_image_data: bytes, 
+    def compare_images(self, before_image_data: ImageInput, after_image_data: ImageInput, 
                       project_area_hectares: float, time_period_years: float = 1.0) -> Dict:
         """
         Compare before and after images to assess transformation and calculate carbon credits.
+        Images are raw bytes or DecodedImage objects shared with the caller's other analyses.
         """
         try:
             logger.info("Starting before/after image comparison analysis")
+            before_image = as_decoded(before_image_data, "before_image")
+            after_image = as_decoded(after_image_data, "after_image")
             
             # Analyze both images
-            before_analysis = self.ndvi_analyzer.analyze_image(before_image_data, "before_image")
-            after_analysis = self.ndvi_analyzer.analyze_image(after_image_data, "after_image")
+            before_analysis = self.ndvi_analyzer.analyze_image(before_image, "before_image")
+            after_analysis = self.ndvi_analyzer.analyze_image(after_image, "after_image")
             
             if 'error' in before_analysis or 'error' in after_analysis:
                 return {
@@ -951,18 +1070,18 @@ class VideoAnalyzer:
     Video analysis for temporal vegetation monitoring.
     """
     
-    def __init__(self):
-        self.ndvi_analyzer = NDVIAnalyzer()
+    def __init__(self, ndvi_analyzer: Optional[NDVIAnalyzer] = None):
+        self.ndvi_analyzer = ndvi_analyzer or NDVIAnalyzer()
         self.frame_interval = 30  # Analyze every 30th frame
+        self.max_frame_width = FRAME_MAX_WIDTH  # Frames are scaled down to this width when decoded (0: full size)
     
     def extract_key_frames(self, video_path: str, max_frames: int = 10) -> List[np.ndarray]:
         """
         Extract key frames from video for analysis.
         """
         try:
-            cap = cv2.VideoCapture(video_path)
-            frames = []
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            sampler = VideoFrameSampler(video_path, self.max_frame_width)
+            frame_count = sampler.frame_count
             
             # Calculate frame interval
             if frame_count > max_frames:
@@ -970,20 +1089,10 @@ class VideoAnalyzer:
             else:
                 interval = 1
             
-            frame_number = 0
-            while cap.isOpened() and len(frames) < max_frames:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                if frame_number % interval == 0:
-                    # Convert BGR to RGB
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    frames.append(frame_rgb)
-                
-                frame_number += 1
+            # Every interval-th frame, read in order rather than seeking to each one
+            frames = [frame for _, frame in sampler.frames(range(0, interval * max_frames, interval))]
             
-            cap.release()
+            sampler.close()
             logger.info(f"Extracted {len(frames)} frames from video")
             return frames
             
@@ -993,16 +1102,28 @@ class VideoAnalyzer:
     
     def analyze_video(self, video_data: bytes, filename: str = "unknown") -> Dict:
         """
-        Analyze video file for temporal vegetation patterns.
+        Analyze video bytes for temporal vegetation patterns. Uploads should be
+        spooled to disk and passed to analyze_video_file instead.
         """
         try:
-            # Save video temporarily for processing
-            temp_path = f"/tmp/{filename}"
-            with open(temp_path, 'wb') as f:
-                f.write(video_data)
-            
+            with spool_video_bytes(video_data, filename) as spool:
+                return self.analyze_video_file(spool.path, filename)
+        except Exception as e:
+            logger.error(f"Error analyzing video {filename}: {str(e)}")
+            return {
+                'filename': filename,
+                'error': str(e),
+                'success': False
+            }
+    
+    def analyze_video_file(self, video_path: str, filename: Optional[str] = None) -> Dict:
+        """
+        Analyze a video file for temporal vegetation patterns.
+        """
+        filename = filename or os.path.basename(video_path)
+        try:
             # Extract frames
-            frames = self.extract_key_frames(temp_path)
+            frames = self.extract_key_frames(video_path)
             
             if not frames:
                 return {
@@ -0,0 +1,177 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_CACHE_DIR = os.getenv("ANALYSIS_CACHE_DIR", "analysis_cache")
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+
+# Budget for serialized results kept in memory; result sizes vary widely,
+# so the LRU is bounded by size rather than entry count
+MEMORY_CACHE_BYTES = 64 * 1024 * 1024
+
+# Bump to invalidate every cached result after a change to the result format
+CACHE_FORMAT_VERSION = 1
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_content_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+    m = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            m.update(chunk)
+    return m.hexdigest()
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def is_cacheable(result: Any) -> bool:
+    """Failed analyses are not cached, so a transient error is retried on the next call."""
+    if isinstance(result, dict):
+        return result.get("success", True) is not False and "error" not in result
+    return result is not None
+
+
+class AnalysisCache:
+    """
+    Cache for image analysis results keyed by the SHA-256 of the analysed
+    image content(s), the kind of analysis and the analyzer parameters.
+
+    Results are stored as JSON: an in-memory LRU (bounded in bytes) sits in
+    front of one file per result under `cache_dir`, so cached analyses
+    survive restarts. Every hit returns a fresh copy, so callers may modify
+    what they get.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = ANALYSIS_CACHE_DIR, memory_bytes: int = MEMORY_CACHE_BYTES,
+                 enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.enabled = enabled
+
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(kind: str, content_hashes: List[str], params: Dict[str, Any]) -> str:
+        payload = json.dumps({
+            "format": CACHE_FORMAT_VERSION,
+            "kind": kind,
+            "content": list(content_hashes),
+            "params": params
+        }, sort_keys=True, default=_json_default)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_or_compute(self, kind: str, content_hashes: List[str], params: Dict[str, Any],
+                       compute: Callable[[], Any]) -> Any:
+        """Cached result for these inputs, computing and storing it on a miss."""
+        if not self.enabled:
+            return compute()
+
+        key = self.make_key(kind, content_hashes, params)
+        cached = self.get(kind, key)
+        if cached is not None:
+            return cached
+
+        result = compute()
+        if is_cacheable(result):
+            try:
+                self.put(kind, key, result)
+            except Exception as e:
+                logger.warning(f"Could not cache {kind} result: {str(e)}")
+        return result
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        with self._lock:
+            serialized = self._memory.get(key)
+            if serialized is not None:
+                self._memory.move_to_end(key)
+
+        if serialized is None and self.cache_dir:
+            path = self._path(kind, key)
+            try:
+                with open(path, "r", encoding="utf-8") as fh:
+                    serialized = fh.read()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not read cached analysis {path}: {str(e)}")
+            if serialized is not None:
+                self._remember(key, serialized)
+
+        with self._lock:
+            if serialized is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(serialized)
+
+    def put(self, kind: str, key: str, result: Any):
+        serialized = json.dumps(result, default=_json_default)
+        self._remember(key, serialized)
+        if not self.cache_dir:
+            return
+
+        path = self._path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            fh.write(serialized)
+        os.replace(tmp_path, path)
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "cache_dir": self.cache_dir
+            }
+
+    def _remember(self, key: str, serialized: str):
+        size = len(serialized)
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_size -= len(previous)
+            self._memory[key] = serialized
+            self._memory_size += size
+            while self._memory_size > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.cache_dir, kind, key[:2], f"{key}.json")
+
+
+# Shared by every analyzer instance of the process
+analysis_cache = AnalysisCache(enabled=ANALYSIS_CACHE_ENABLED)
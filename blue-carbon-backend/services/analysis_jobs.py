@@ -0,0 +1,321 @@
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+import asyncio
+import datetime
+import logging
+import os
+import socket
+import threading
+
+from sqlalchemy import and_, or_
+
+from models.db_model import AnalysisJob, Base
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_SUCCEEDED, JOB_FAILED)
+
+# Job worker threads per API process; they hand the CPU-bound work to the analysis pool
+ANALYSIS_JOB_WORKERS = int(os.getenv("ANALYSIS_JOB_WORKERS", "1"))
+
+# A running job is claimed again if its worker stops renewing the lease (crash, restart)
+LEASE_SECONDS = 60.0
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 10.0  # Doubled after every failed attempt
+POLL_INTERVAL_SECONDS = 1.0
+
+# handler(job) -> analysis result; raising retries the job
+JobHandler = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class RetryLater(Exception):
+    """Raised by a handler that cannot run the job right now; retried after `delay` without using up an attempt."""
+
+    def __init__(self, message: str, delay: float = RETRY_BACKOFF_SECONDS):
+        super().__init__(message)
+        self.delay = delay
+
+
+class AnalysisJobQueue:
+    """
+    Durable queue of evidence analyses, stored in the analysis_jobs table.
+
+    Uploads enqueue a job and return at once. Worker threads claim jobs with
+    a conditional UPDATE, so any number of API processes can share the
+    queue, and hold them under a lease that a heartbeat keeps renewing. A
+    job whose lease runs out (its process died) is claimed again; failed
+    attempts are retried with exponential backoff up to max_attempts.
+    """
+
+    def __init__(self, session_factory, handler: JobHandler, workers: int = ANALYSIS_JOB_WORKERS,
+                 lease_seconds: float = LEASE_SECONDS, max_attempts: int = MAX_ATTEMPTS,
+                 retry_backoff: float = RETRY_BACKOFF_SECONDS, poll_interval: float = POLL_INTERVAL_SECONDS):
+        self.session_factory = session_factory
+        self.handler = handler
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._held: Dict[int, str] = {}  # Running job id -> lease owner, renewed by the heartbeat
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._tables_ready = False
+
+    # ---------------- Lifecycle ----------------
+
+    def start(self):
+        if self._threads:
+            return
+        self._ensure_tables()
+        self._stop_event.clear()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(f"{prefix}:{index}",),
+                                      name=f"analysis-job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name="analysis-job-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        logger.info(f"Analysis job queue started with {self.workers} workers")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """Called after enqueueing so an idle worker picks the job up without waiting for the next poll."""
+        self._wakeup.set()
+
+    def _run(self, owner: str):
+        while not self._stop_event.is_set():
+            try:
+                ran = self.run_next(owner)
+            except Exception as e:
+                logger.error(f"Analysis job worker {owner} failed: {str(e)}")
+                ran = False
+            if not ran:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _heartbeat(self):
+        while not self._stop_event.wait(self.lease_seconds / 3):
+            with self._lock:
+                held = dict(self._held)
+            if not held:
+                continue
+            db = self.session_factory()
+            try:
+                expires = datetime.datetime.utcnow() + datetime.timedelta(seconds=self.lease_seconds)
+                for job_id, owner in held.items():
+                    db.query(AnalysisJob).filter(
+                        AnalysisJob.id == job_id, AnalysisJob.lease_owner == owner
+                    ).update({"lease_expires_at": expires}, synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Renewing analysis job leases failed: {str(e)}")
+            finally:
+                db.close()
+
+    # ---------------- Queue ----------------
+
+    def add(self, db, kind: str, evidence_id: int, project_id: int, params: Dict[str, Any]) -> AnalysisJob:
+        """Queue a job in the caller's session, committed with its evidence; call notify() after the commit."""
+        self._ensure_tables()
+        job = AnalysisJob(kind=kind, evidence_id=evidence_id, project_id=project_id, params=params,
+                          status=JOB_QUEUED, max_attempts=self.max_attempts,
+                          run_after=datetime.datetime.utcnow())
+        db.add(job)
+        return job
+
+    def forget(self, db, evidence_ids: Iterable[int]):
+        """Drop the jobs of deleted evidence in the caller's session."""
+        self._ensure_tables()
+        evidence_ids = list(evidence_ids)
+        if evidence_ids:
+            db.query(AnalysisJob).filter(AnalysisJob.evidence_id.in_(evidence_ids)).delete(synchronize_session=False)
+
+    def enqueue(self, kind: str, evidence_id: int, project_id: int, params: Dict[str, Any]) -> Dict[str, Any]:
+        db = self.session_factory()
+        try:
+            job = self.add(db, kind, evidence_id, project_id, params)
+            db.commit()
+            db.refresh(job)
+            result = serialize_job(job)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        self.notify()
+        return result
+
+    def claim(self, owner: str) -> Optional[Dict[str, Any]]:
+        """Lease the oldest runnable job to `owner`, or None if there is none."""
+        self._ensure_tables()
+        now = datetime.datetime.utcnow()
+        expired = and_(AnalysisJob.status == JOB_RUNNING, AnalysisJob.lease_expires_at < now)
+        claimable = or_(and_(AnalysisJob.status == JOB_QUEUED, AnalysisJob.run_after <= now), expired)
+
+        db = self.session_factory()
+        try:
+            # Jobs whose worker died on the last attempt are not run again
+            abandoned = db.query(AnalysisJob).filter(expired, AnalysisJob.attempts >= AnalysisJob.max_attempts).update({
+                "status": JOB_FAILED,
+                "error": "Worker lost its lease on the last attempt",
+                "lease_owner": None,
+                "finished_at": now
+            }, synchronize_session=False)
+            if abandoned:
+                db.commit()
+
+            candidates = db.query(AnalysisJob.id).filter(claimable).order_by(AnalysisJob.id).limit(8).all()
+            for (job_id,) in candidates:
+                # Conditional update: if another worker claimed the job first, nothing matches
+                claimed = db.query(AnalysisJob).filter(AnalysisJob.id == job_id, claimable).update({
+                    "status": JOB_RUNNING,
+                    "lease_owner": owner,
+                    "lease_expires_at": now + datetime.timedelta(seconds=self.lease_seconds),
+                    "attempts": AnalysisJob.attempts + 1,
+                    "started_at": now
+                }, synchronize_session=False)
+                db.commit()
+                if claimed:
+                    with self._lock:
+                        self._held[job_id] = owner
+                    return serialize_job(db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first())
+            return None
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def run_next(self, owner: str) -> bool:
+        """Claim and run one job. Returns False if no job was runnable."""
+        job = self.claim(owner)
+        if job is None:
+            return False
+        logger.info(f"Running analysis job {job['id']} ({job['kind']}, attempt {job['attempts']}) on {owner}")
+        try:
+            result = self.handler(job)
+        except RetryLater as e:
+            self._release(job, owner, str(e), e.delay, count_attempt=False)
+        except Exception as e:
+            logger.error(f"Analysis job {job['id']} failed: {str(e)}")
+            if job['attempts'] < job['max_attempts']:
+                self._release(job, owner, str(e), self.retry_backoff * 2 ** (job['attempts'] - 1))
+            else:
+                self._finish(job['id'], owner, JOB_FAILED, error=str(e))
+        else:
+            # An analysis that ran but could not score the images is final, not retried
+            status = JOB_SUCCEEDED if result is None or result.get('success', True) else JOB_FAILED
+            self._finish(job['id'], owner, status, result=result,
+                         error=None if status == JOB_SUCCEEDED else (result or {}).get('error'))
+        return True
+
+    def _release(self, job: Dict[str, Any], owner: str, error: str, delay: float, count_attempt: bool = True):
+        """Put a job back in the queue, to run again after `delay` seconds."""
+        values = {
+            "status": JOB_QUEUED,
+            "error": error,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "run_after": datetime.datetime.utcnow() + datetime.timedelta(seconds=delay)
+        }
+        if not count_attempt:
+            values["attempts"] = AnalysisJob.attempts - 1
+        self._update_held(job['id'], owner, values)
+
+    def _finish(self, job_id: int, owner: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        self._update_held(job_id, owner, {
+            "status": status,
+            "result": result,
+            "error": error,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "finished_at": datetime.datetime.utcnow()
+        })
+
+    def _update_held(self, job_id: int, owner: str, values: Dict[str, Any]):
+        with self._lock:
+            self._held.pop(job_id, None)
+        db = self.session_factory()
+        try:
+            # Only the current lease holder may settle the job
+            updated = db.query(AnalysisJob).filter(
+                AnalysisJob.id == job_id, AnalysisJob.lease_owner == owner, AnalysisJob.status == JOB_RUNNING
+            ).update(values, synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if not updated:
+            logger.warning(f"Analysis job {job_id} lost its lease before {owner} finished it")
+
+    # ---------------- Status ----------------
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        self._ensure_tables()
+        db = self.session_factory()
+        try:
+            job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+            return serialize_job(job) if job else None
+        finally:
+            db.close()
+
+    async def watch(self, job_id: int, poll_interval: float = 0.5) -> AsyncIterator[Dict[str, Any]]:
+        """The job every time its status or attempt count changes, until it has finished."""
+        last = None
+        while True:
+            job = await asyncio.to_thread(self.get, job_id)
+            if job is None:
+                return
+            state = (job['status'], job['attempts'])
+            if state != last:
+                last = state
+                yield job
+            if job['status'] in FINISHED_STATUSES:
+                return
+            await asyncio.sleep(poll_interval)
+
+    def _ensure_tables(self):
+        if self._tables_ready:
+            return
+        db = self.session_factory()
+        try:
+            Base.metadata.create_all(bind=db.get_bind(), tables=[AnalysisJob.__table__])
+            self._tables_ready = True
+        finally:
+            db.close()
+
+
+def serialize_job(job: AnalysisJob) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "evidence_id": job.evidence_id,
+        "project_id": job.project_id,
+        "params": job.params,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
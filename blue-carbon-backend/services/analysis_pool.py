@@ -0,0 +1,249 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+import numpy as np
+
+from .analyzer_registry import analyzers
+from .image_pyramid import pyramid_store
+from .perceptual_hash import fingerprint_file
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for CPU-bound image analysis; 0 runs analyses on threads
+# of the API process instead (tests, single-core hosts)
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+
+# Analyses allowed to wait for a free worker; beyond that requests get a 503
+ANALYSIS_QUEUE_SIZE = int(os.getenv("ANALYSIS_QUEUE_SIZE", "8"))
+
+# Seconds clients are told to wait before retrying a saturated pool
+ANALYSIS_RETRY_AFTER = 5
+
+
+class AnalysisPoolSaturated(Exception):
+    """Every worker is busy and the wait queue is full."""
+
+
+# ---------------- Worker side ----------------
+
+def _init_worker():
+    """Load the analysis stack and build every analyzer before the first request arrives."""
+    analyzers.warm_up()
+    logger.info(f"Analysis worker {os.getpid()} ready")
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+# Tasks run in the workers; they are module-level functions so they pickle by name
+
+def dynamic_credits(before_image_data, after_image_data, project_area_hectares: float,
+                    time_period_years: float = 1.0, project_metadata: Optional[Dict] = None) -> Dict:
+    return analyzers.get('dynamic_credits').calculate_dynamic_credits(
+        before_image_data=before_image_data,
+        after_image_data=after_image_data,
+        project_area_hectares=project_area_hectares,
+        time_period_years=time_period_years,
+        project_metadata=project_metadata
+    )
+
+
+def green_progress(before_image_data, after_image_data) -> Dict:
+    return analyzers.get('greenness').calculate_green_progress_multiplier(
+        before_image_data=before_image_data,
+        after_image_data=after_image_data
+    )
+
+
+def evidence_image_comparison(evidence_id: int, media: Dict) -> Dict:
+    return analyzers.get('comparator').get_evidence_images_analysis(evidence_id, media)
+
+
+def image_analysis(image_data: bytes, filename: str = "unknown") -> Tuple[Dict, Dict]:
+    """NDVI analysis and vegetation classification of one uploaded image, decoded once."""
+    from .decoded_image import DecodedImage
+    image = DecodedImage(image_data, filename)
+    ndvi_result = analyzers.get('ndvi').analyze_image(image, filename)
+    vegetation_result = analyzers.get('vegetation').classify_vegetation(image.full.rgb)
+    # Per-pixel maps are neither returned by the API nor worth shipping back from the worker
+    for key in ('vegetation_mask', 'vegetation_probability'):
+        vegetation_result.pop(key, None)
+    return _plain(ndvi_result), _plain(vegetation_result)
+
+
+def _plain(obj):
+    """numpy scalars and arrays inside a result as Python types, ready for JSON."""
+    if isinstance(obj, dict):
+        return {key: _plain(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_plain(item) for item in obj]
+    if isinstance(obj, (np.generic, np.ndarray)):
+        return obj.tolist()
+    return obj
+
+
+def before_after_comparison(before, after, project_area_hectares: float, time_period_years: float = 1.0) -> Dict:
+    """One plot of a batch; `before`/`after` are ImageSources (services/batch_analysis.py), read here in the worker."""
+    from .batch_analysis import read_image_source
+    result = analyzers.get('before_after').compare_images(
+        read_image_source(before), read_image_source(after), project_area_hectares, time_period_years
+    )
+    return _plain(result)
+
+
+def orthomosaic(path: str, filename: Optional[str] = None) -> Dict:
+    return analyzers.get('tiled').analyze_file(path, filename)
+
+
+def video(path: str, filename: Optional[str] = None) -> Dict:
+    return analyzers.get('video').analyze_video_file(path, filename)
+
+
+def pyramid(path: str) -> List[int]:
+    """Store the downscaled levels of an uploaded image (services/image_pyramid.py)."""
+    return pyramid_store.build_file(path)
+
+
+def image_fingerprint(path: str) -> Dict[str, str]:
+    """Perceptual hashes of an uploaded image (services/perceptual_hash.py)."""
+    return fingerprint_file(path)
+
+
+# ---------------- API side ----------------
+
+class AnalysisPool:
+    """
+    Runs CPU-bound analyses in a pool of worker processes so they neither
+    block the event loop nor contend with request handling for the GIL.
+
+    Workers are started with `spawn` (safe next to the API's background
+    threads) and build their analyzers once, at start-up. At most
+    `workers + queue_size` analyses are admitted at a time; run() raises
+    AnalysisPoolSaturated beyond that so the endpoint can answer 503
+    instead of queueing without bound.
+    """
+
+    def __init__(self, workers: int = ANALYSIS_WORKERS, queue_size: int = ANALYSIS_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.capacity = max(workers, 1) + queue_size
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the worker processes and warm them up in the background."""
+        if self.workers <= 0:
+            # Analyses run in this process: build its analyzers now rather than on the first request
+            threading.Thread(target=analyzers.warm_up, name="analyzer-warm-up", daemon=True).start()
+            return
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = self._new_executor()
+            executor = self._executor
+        for _ in range(self.workers):
+            executor.submit(_ready).add_done_callback(self._log_warm_up)
+        logger.info(f"Analysis pool starting {self.workers} workers (queue {self.queue_size})")
+
+    def stop(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def saturated(self) -> bool:
+        with self._lock:
+            return self._in_flight >= self.capacity
+
+    async def run(self, task: Callable, *args, **kwargs) -> Any:
+        """Result of `task(*args, **kwargs)` computed in a worker."""
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self.rejected += 1
+                raise AnalysisPoolSaturated(
+                    f"Analysis queue is full ({self._in_flight} analyses in progress or waiting)"
+                )
+            self._in_flight += 1
+            executor = self._executor
+
+        started = time.monotonic()
+        succeeded = False
+        try:
+            if executor is None:
+                # Not started, or running without worker processes
+                result = await asyncio.to_thread(task, *args, **kwargs)
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    executor, _call, task, args, kwargs
+                )
+            succeeded = True
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+        logger.debug(f"Analysis {task.__name__} finished in {time.monotonic() - started:.2f}s")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "mode": "processes" if self._executor is not None else "threads",
+                "queue_size": self.queue_size,
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "failed": self.failed
+            }
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        )
+
+    def _replace_broken(self, broken: ProcessPoolExecutor):
+        """A worker died (e.g. out of memory); later analyses get a fresh pool."""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            logger.error("Analysis worker died; restarting the analysis pool")
+            self._executor = self._new_executor()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _log_warm_up(future):
+        try:
+            logger.info(f"Analysis worker {future.result()} warmed up")
+        except Exception as e:
+            logger.error(f"Analysis worker failed to start: {str(e)}")
+
+
+def _call(task: Callable, args, kwargs):
+    return task(*args, **kwargs)
+
+
+# Shared by the API endpoints; started and stopped with the application
+analysis_pool = AnalysisPool()
@@ -0,0 +1,125 @@
+from typing import Any, Callable, Dict, Iterable, Optional
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# factory(registry) -> instance; dependencies come from the registry so they are shared too
+AnalyzerFactory = Callable[["AnalyzerRegistry"], Any]
+
+
+class AnalyzerRegistry:
+    """
+    Analyzers and calculators shared by every request of a process, built
+    once on first use (or by warm_up) instead of per request.
+
+    The instances are shared between threads: analysis methods only read
+    their configuration, and the one mutable configuration,
+    DynamicCarbonCreditCalculator.settings, is swapped as an immutable
+    snapshot by update_settings. Analyzers that several others depend on
+    (NDVIAnalyzer, CO2SequestrationCalculator) exist once per process.
+    """
+
+    def __init__(self, factories: Optional[Dict[str, AnalyzerFactory]] = None):
+        self._factories: Dict[str, AnalyzerFactory] = dict(factories or {})
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()  # Re-entrant: factories get their dependencies while building
+        self.build_seconds: Dict[str, float] = {}
+
+    def register(self, name: str, factory: AnalyzerFactory):
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                if name not in self._factories:
+                    raise KeyError(f"Unknown analyzer: {name}")
+                started = time.perf_counter()
+                instance = self._factories[name](self)
+                self.build_seconds[name] = time.perf_counter() - started
+                self._instances[name] = instance
+            return instance
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Build the named analyzers (all by default) now, before requests need them."""
+        started = time.perf_counter()
+        for name in names if names is not None else list(self._factories):
+            self.get(name)
+        logger.info(f"Analyzers warmed up in {time.perf_counter() - started:.2f}s")
+        return dict(self.build_seconds)
+
+    def clear(self):
+        """Drop the built instances; the next get() builds them again."""
+        with self._lock:
+            self._instances.clear()
+            self.build_seconds.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "registered": sorted(self._factories),
+                "built": sorted(self._instances),
+                "build_seconds": {name: round(seconds, 4) for name, seconds in self.build_seconds.items()}
+            }
+
+
+def _default_factories() -> Dict[str, AnalyzerFactory]:
+    # Imported on first use, so importing the registry doesn't load the analysis stack
+    def ndvi(registry):
+        from .ai_verification import NDVIAnalyzer
+        return NDVIAnalyzer()
+
+    def co2(registry):
+        from .co2_sequestration_calculator import CO2SequestrationCalculator
+        return CO2SequestrationCalculator()
+
+    def before_after(registry):
+        from .ai_verification import BeforeAfterAnalyzer
+        return BeforeAfterAnalyzer(registry.get('ndvi'), registry.get('co2'))
+
+    def dynamic_credits(registry):
+        from .dynamic_carbon_credit_calculator import DynamicCarbonCreditCalculator
+        return DynamicCarbonCreditCalculator(registry.get('before_after'), registry.get('co2'))
+
+    def video(registry):
+        from .ai_verification import VideoAnalyzer
+        return VideoAnalyzer(registry.get('ndvi'))
+
+    def tiled(registry):
+        from .tiled_analysis import TiledImageAnalyzer
+        return TiledImageAnalyzer(registry.get('ndvi'))
+
+    def greenness(registry):
+        from .greenness_analyzer import GreennessAnalyzer
+        return GreennessAnalyzer()
+
+    def comparator(registry):
+        from .evidence_image_comparator import EvidenceImageComparator
+        return EvidenceImageComparator()
+
+    def vegetation(registry):
+        from .vegetation_classifier import VegetationClassifier
+        return VegetationClassifier()
+
+    return {
+        'ndvi': ndvi,
+        'co2': co2,
+        'before_after': before_after,
+        'dynamic_credits': dynamic_credits,
+        'video': video,
+        'tiled': tiled,
+        'greenness': greenness,
+        'comparator': comparator,
+        'vegetation': vegetation
+    }
+
+
+# The process's shared instances; analysis pool workers each have their own
+analyzers = AnalyzerRegistry(_default_factories())
@@ -51,7 +51,7 @@ class AuthService:
             return payload
         except jwt.ExpiredSignatureError:
             return None
-        except jwt.JWTError:
+        except jwt.InvalidTokenError:
             return None
     
     @staticmethod
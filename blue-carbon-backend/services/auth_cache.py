@@ -0,0 +1,130 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+import logging
+import os
+import threading
+import time
+
+from models.auth_model import User
+from services.auth import AuthService
+
+logger = logging.getLogger(__name__)
+
+# How long a decoded token or user snapshot is trusted without going back to the
+# database. Bounds how long a change made by another API process goes unseen;
+# changes made through this process invalidate at once.
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+USER_FIELDS = [column.key for column in User.__table__.columns]
+
+
+class TTLCache:
+    """Thread-safe LRU of at most `max_entries` values, each expiring after its own TTL."""
+
+    def __init__(self, max_entries: int, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any, ttl: float):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class AuthCache:
+    """
+    Decoded access tokens and active users, kept for a short TTL so an
+    authenticated request doesn't decode its JWT and query `users` again.
+
+    Tokens are cached until their own expiry at the latest; invalid tokens
+    are never cached. Users are kept as column snapshots and every lookup
+    gets a fresh, session-less User built from one, so a request modifying
+    its user can't affect others. Call invalidate_user after changing a user
+    (wallet, deactivation).
+    """
+
+    def __init__(self, ttl: float = AUTH_CACHE_TTL_SECONDS, max_entries: int = AUTH_CACHE_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.tokens = TTLCache(max_entries, clock)
+        self.users = TTLCache(max_entries, clock)
+        self.hits = 0
+        self.misses = 0
+
+    def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """AuthService.verify_token, cached."""
+        payload = self.tokens.get(token)
+        if payload is not None:
+            self.hits += 1
+            return payload
+        self.misses += 1
+        payload = AuthService.verify_token(token)
+        if payload is not None:
+            remaining = payload.get("exp", time.time() + self.ttl) - time.time()
+            self.tokens.put(token, payload, min(self.ttl, remaining))
+        return payload
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        """AuthService.get_user_by_id (active users only), cached."""
+        snapshot = self.users.get(user_id)
+        if snapshot is not None:
+            self.hits += 1
+            return User(**snapshot)
+        self.misses += 1
+        user = AuthService.get_user_by_id(user_id)
+        if user is None:
+            return None
+        snapshot = {field: getattr(user, field) for field in USER_FIELDS}
+        self.users.put(user_id, snapshot, self.ttl)
+        return User(**snapshot)
+
+    def invalidate_user(self, user_id: int):
+        """Forget a changed user; tokens stay valid, the user is read again on the next request."""
+        self.users.pop(user_id)
+
+    def clear(self):
+        self.tokens.clear()
+        self.users.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ttl_seconds": self.ttl,
+            "tokens": len(self.tokens),
+            "users": len(self.users),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# Used by the authentication dependencies in main.py
+auth_cache = AuthCache()
@@ -0,0 +1,85 @@
+from typing import Dict, Iterable, List, Tuple, Union
+import logging
+import os
+import posixpath
+import re
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+# Plot pairs accepted in one batch request
+BATCH_MAX_PAIRS = int(os.getenv("BATCH_MAX_PAIRS", "200"))
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.webp'}
+
+# "<plot>_before.jpg", "<plot>-after.png", "<plot> before.tif" or "<plot>/before.jpg"
+PAIR_NAME_PATTERN = re.compile(r"^(?:(?P<plot>.+?)[ _\-.])?(?P<role>before|after)$", re.IGNORECASE)
+
+# An image of a batch: a file path, or (archive path, member name) read straight from the ZIP
+ImageSource = Union[str, Tuple[str, str]]
+
+
+class BatchInputError(ValueError):
+    """The uploaded files or archive can't be turned into before/after pairs."""
+
+
+def pair_role(name: str) -> Tuple[str, str]:
+    """(plot, 'before' | 'after') for an image name, or ('', '') if it names neither."""
+    directory, filename = posixpath.split(name.replace("\\", "/"))
+    stem, extension = posixpath.splitext(filename)
+    if extension.lower() not in IMAGE_EXTENSIONS:
+        return "", ""
+    match = PAIR_NAME_PATTERN.match(stem)
+    if not match:
+        return "", ""
+    plot = posixpath.join(directory, match.group("plot") or "").strip("/")
+    return plot or "plot", match.group("role").lower()
+
+
+def pair_images(names: Iterable[str]) -> Tuple[Dict[str, Dict[str, str]], List[str]]:
+    """
+    Group image names into before/after pairs by plot. Returns the complete
+    pairs ({plot: {'before': name, 'after': name}}, in first-seen order) and
+    the names that are not part of one.
+    """
+    plots: Dict[str, Dict[str, str]] = {}
+    unpaired = []
+    for name in names:
+        plot, role = pair_role(name)
+        if not role or role in plots.get(plot, {}):
+            unpaired.append(name)
+            continue
+        plots.setdefault(plot, {})[role] = name
+
+    pairs = {}
+    for plot, images in plots.items():
+        if len(images) == 2:
+            pairs[plot] = images
+        else:
+            unpaired.extend(images.values())
+    return pairs, unpaired
+
+
+def archive_members(archive_path: str, max_member_bytes: int) -> List[str]:
+    """Image members of a ZIP archive; raises BatchInputError for unreadable or oversized archives."""
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            members = []
+            for info in archive.infolist():
+                if info.is_dir() or posixpath.basename(info.filename).startswith("."):
+                    continue
+                if info.file_size > max_member_bytes:
+                    raise BatchInputError(f"{info.filename} exceeds the maximum upload size")
+                members.append(info.filename)
+            return members
+    except zipfile.BadZipFile as e:
+        raise BatchInputError(f"Invalid ZIP archive: {str(e)}")
+
+
+def read_image_source(source: ImageSource) -> bytes:
+    if isinstance(source, str):
+        with open(source, "rb") as fh:
+            return fh.read()
+    archive_path, member = source
+    with zipfile.ZipFile(archive_path) as archive:
+        return archive.read(member)
@@ -0,0 +1,162 @@
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional
+import logging
+import os
+import threading
+import uuid
+
+from models.db_model import Base, MediaBlob
+from services.upload_storage import UPLOAD_DIR, MAX_UPLOAD_BYTES, save_upload_stream
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+
+
+def build_media_hashes(blobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    MRVData.media_hashes for stored blobs. "files" keeps the original file
+    names for display; "blobs" holds the content hashes the files live under.
+    """
+    return {
+        "files": [blob["name"] for blob in blobs],
+        "blobs": [{"sha256": blob["sha256"], "name": blob["name"], "size": blob["size"]} for blob in blobs]
+    }
+
+
+def media_blob_hashes(media_hashes: Optional[Dict[str, Any]]) -> List[str]:
+    """Content hashes referenced by an evidence (empty for evidence stored before the blob store)."""
+    if not isinstance(media_hashes, dict):
+        return []
+    return [blob["sha256"] for blob in media_hashes.get("blobs", [])]
+
+
+class BlobStore:
+    """
+    Content-addressed storage for uploaded evidence files.
+
+    Each file is stored once under its SHA-256 in a sharded layout
+    (blobs/ab/cd/abcd...), so identical uploads share one copy and files with
+    the same client name never overwrite each other. media_blobs counts the
+    evidence references to every blob; the file is deleted when the last one
+    is released.
+    """
+
+    def __init__(self, session_factory, root: str = BLOB_DIR):
+        self.session_factory = session_factory
+        self.root = root
+        self._lock = threading.Lock()
+        self._tables_ready = False
+
+    def path_for(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def ingest(self, source: BinaryIO, evidence_hasher=None, max_bytes: Optional[int] = MAX_UPLOAD_BYTES) -> Dict[str, Any]:
+        """
+        Stream `source` into the store and take one reference on the blob.
+        Returns {"sha256", "size", "deduplicated"}; deduplicated is True when
+        the content was already stored and the new copy was discarded.
+        """
+        self._ensure_tables()
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+        size, sha256 = save_upload_stream(source, tmp_path, evidence_hasher, max_bytes)
+
+        path = self.path_for(sha256)
+        with self._lock:
+            deduplicated = os.path.exists(path)
+            if deduplicated:
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            try:
+                self._add_reference(sha256, size)
+            except Exception:
+                if not deduplicated:
+                    os.remove(path)
+                raise
+
+        if deduplicated:
+            logger.info(f"Upload deduplicated against stored blob {sha256}")
+        return {"sha256": sha256, "size": size, "deduplicated": deduplicated}
+
+    def add_reference(self, sha256: str):
+        """Take another reference on a stored blob."""
+        self._ensure_tables()
+        with self._lock:
+            if not os.path.exists(self.path_for(sha256)):
+                raise FileNotFoundError(f"Blob {sha256} is not stored")
+            self._add_reference(sha256, os.path.getsize(self.path_for(sha256)))
+
+    def _add_reference(self, sha256: str, size: int):
+        db = self.session_factory()
+        try:
+            blob = db.query(MediaBlob).filter(MediaBlob.sha256 == sha256).first()
+            if blob:
+                blob.ref_count += 1
+            else:
+                db.add(MediaBlob(sha256=sha256, size=size, ref_count=1))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def release(self, sha256s: Iterable[str]):
+        """Drop one reference per hash; blobs nobody references any more are deleted."""
+        self._ensure_tables()
+        with self._lock:
+            db = self.session_factory()
+            try:
+                deleted = []
+                for sha256 in sha256s:
+                    blob = db.query(MediaBlob).filter(MediaBlob.sha256 == sha256).first()
+                    if not blob:
+                        continue
+                    blob.ref_count -= 1
+                    if blob.ref_count <= 0:
+                        db.delete(blob)
+                        deleted.append(sha256)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+            for sha256 in deleted:
+                path = self.path_for(sha256)
+                if os.path.exists(path):
+                    os.remove(path)
+                    logger.info(f"Deleted unreferenced blob {sha256}")
+
+    def ref_count(self, sha256: str) -> int:
+        self._ensure_tables()
+        db = self.session_factory()
+        try:
+            return db.query(MediaBlob.ref_count).filter(MediaBlob.sha256 == sha256).scalar() or 0
+        finally:
+            db.close()
+
+    def resolve_paths(self, media_hashes: Optional[Dict[str, Any]]) -> List[str]:
+        """
+        File paths of an evidence's media, in upload order. Evidence stored
+        before the blob store falls back to uploads/<file name>.
+        """
+        if not isinstance(media_hashes, dict):
+            return []
+        if media_hashes.get("blobs"):
+            return [self.path_for(blob["sha256"]) for blob in media_hashes["blobs"]]
+        return [os.path.join(UPLOAD_DIR, name) for name in media_hashes.get("files", [])]
+
+    def _ensure_tables(self):
+        if self._tables_ready:
+            return
+        db = self.session_factory()
+        try:
+            Base.metadata.create_all(bind=db.get_bind(), tables=[MediaBlob.__table__])
+            self._tables_ready = True
+        finally:
+            db.close()
@@ -0,0 +1,259 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+import logging
+import threading
+import time
+
+from web3 import Web3
+
+from models.db_model import Base, ChainProject, ChainCheckpoint
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = "project_cache"
+
+# Blocks requested per eth_getLogs call while catching up
+LOG_BLOCK_RANGE = 2000
+
+# Reads within this window are served without asking the node for new blocks
+SYNC_INTERVAL_SECONDS = 2.0
+
+PROJECT_REGISTERED_TOPIC = Web3.to_hex(Web3.keccak(text="ProjectRegistered(uint256,address,string,string)"))
+CREDITS_MINTED_TOPIC = Web3.to_hex(Web3.keccak(text="CreditsMinted(uint256,address,uint256)"))
+
+# Same field order as registry.functions.projects(id).call():
+# (name, location, area, owner, metadataURI, exists, totalIssuedCredits)
+ProjectStruct = Tuple[str, str, int, str, str, bool, int]
+
+
+def checkpoint_on_chain(w3: Web3, latest: int, block_number: int, block_hash: Optional[str]) -> bool:
+    """
+    Check a checkpoint block is still part of the chain the node serves.
+    A local Hardhat node restarts from block 0, which invalidates every checkpoint.
+    """
+    if latest < block_number:
+        return False
+    try:
+        block = w3.eth.get_block(block_number)
+    except Exception:
+        return False
+    return Web3.to_hex(block["hash"]) == block_hash
+
+
+class ProjectChainCache:
+    """
+    Local copy of every BlueCarbonRegistry Project struct.
+
+    The first sync reads each project once; after that the cache only asks the
+    node for ProjectRegistered / CreditsMinted logs since the last processed
+    block, so listing projects no longer costs one JSON-RPC call per project.
+    Rows and the block checkpoint are mirrored to SQLite so a restart resumes
+    from where it stopped instead of re-reading the whole registry.
+
+    With `sync_on_read=False` reads never contact the node once the cache is
+    loaded; something else (the event indexer's poll loop) calls sync().
+
+    updateProjectMetadata emits no event, so metadata URI changes are only
+    picked up when the cache is rebuilt.
+    """
+
+    def __init__(self, w3: Web3, registry, session_factory, sync_interval: float = SYNC_INTERVAL_SECONDS,
+                 sync_on_read: bool = True):
+        self.w3 = w3
+        self.registry = registry
+        self.session_factory = session_factory
+        self.sync_interval = sync_interval
+        self.sync_on_read = sync_on_read
+
+        self._projects: Dict[int, ProjectStruct] = {}
+        self._block_number: Optional[int] = None
+        self._block_hash: Optional[str] = None
+        self._last_sync = 0.0
+        self._restored = False
+        self._lock = threading.RLock()
+
+    # ---------------- Reads ----------------
+
+    def total_projects(self) -> int:
+        """Number of registered projects (ids are sequential from 1)."""
+        self._sync_for_read()
+        with self._lock:
+            return max(self._projects, default=0)
+
+    def get_project(self, project_id: int) -> Optional[ProjectStruct]:
+        self._sync_for_read()
+        with self._lock:
+            return self._projects.get(project_id)
+
+    def get_projects(self, first_id: int = 1, last_id: Optional[int] = None) -> List[Tuple[int, ProjectStruct]]:
+        """Return (project_id, struct) pairs for ids in [first_id, last_id], ordered by id."""
+        self._sync_for_read()
+        with self._lock:
+            return [
+                (project_id, self._projects[project_id])
+                for project_id in sorted(self._projects)
+                if project_id >= first_id and (last_id is None or project_id <= last_id)
+            ]
+
+    # ---------------- Sync ----------------
+
+    def _sync_for_read(self):
+        # Even without sync_on_read, a cache that was never loaded has to load once
+        if self.sync_on_read or self._block_number is None:
+            self.sync()
+
+    def sync(self, force: bool = False):
+        """
+        Bring the cache up to the latest block. Calls within `sync_interval`
+        of the previous sync return immediately unless `force` is set.
+
+        If the node is unreachable, previously cached data keeps being served;
+        the error is only raised when there is nothing cached yet.
+        """
+        with self._lock:
+            if not force and time.monotonic() - self._last_sync < self.sync_interval:
+                return
+
+            if not self._restored:
+                self._restore()
+                self._restored = True
+
+            try:
+                latest = self.w3.eth.block_number
+
+                if self._block_number is not None and not checkpoint_on_chain(self.w3, latest, self._block_number, self._block_hash):
+                    logger.info("Chain was reset since the last sync, rebuilding project cache")
+                    self._projects = {}
+                    self._block_number = None
+                    self._clear_persisted()
+
+                if self._block_number is None:
+                    changed = self._full_load(latest)
+                elif latest > self._block_number:
+                    changed = self._apply_logs(self._block_number + 1, latest)
+                else:
+                    changed = set()
+
+                self._block_number = latest
+                self._block_hash = Web3.to_hex(self.w3.eth.get_block(latest)["hash"])
+                self._last_sync = time.monotonic()
+            except Exception as e:
+                logger.error(f"Project cache sync failed: {str(e)}")
+                if self._block_number is None:
+                    raise
+                return
+
+            self._persist(changed)
+
+    def _fetch_project(self, project_id: int, block_number: int) -> ProjectStruct:
+        return tuple(self.registry.functions.projects(project_id).call(block_identifier=block_number))
+
+    def _full_load(self, block_number: int) -> Set[int]:
+        total = self.registry.functions.totalProjects().call(block_identifier=block_number)
+        self._projects = {
+            project_id: self._fetch_project(project_id, block_number)
+            for project_id in range(1, total + 1)
+        }
+        logger.info(f"Project cache loaded {total} projects at block {block_number}")
+        return set(self._projects)
+
+    def _apply_logs(self, from_block: int, to_block: int) -> Set[int]:
+        registered: Set[int] = set()
+        minted: Dict[int, int] = defaultdict(int)
+        credits_minted = self.registry.events.CreditsMinted()
+
+        for start in range(from_block, to_block + 1, LOG_BLOCK_RANGE):
+            logs = self.w3.eth.get_logs({
+                "fromBlock": start,
+                "toBlock": min(to_block, start + LOG_BLOCK_RANGE - 1),
+                "address": self.registry.address,
+                "topics": [[PROJECT_REGISTERED_TOPIC, CREDITS_MINTED_TOPIC]]
+            })
+            for log in logs:
+                # projectId is the first indexed argument of both events
+                project_id = int(Web3.to_hex(log["topics"][1]), 16)
+                if Web3.to_hex(log["topics"][0]) == PROJECT_REGISTERED_TOPIC:
+                    registered.add(project_id)
+                else:
+                    minted[project_id] += credits_minted.process_log(log)["args"]["amount"]
+
+        # New projects are read at to_block, which already includes any credits minted to them
+        refetch = registered | {project_id for project_id in minted if project_id not in self._projects}
+        for project_id in refetch:
+            self._projects[project_id] = self._fetch_project(project_id, to_block)
+
+        for project_id, amount in minted.items():
+            if project_id in refetch:
+                continue
+            project = self._projects[project_id]
+            self._projects[project_id] = project[:6] + (project[6] + amount,)
+
+        if refetch or minted:
+            logger.debug(f"Project cache applied blocks {from_block}-{to_block}: "
+                         f"{len(registered)} registered, {len(minted)} with new credits")
+        return refetch | set(minted)
+
+    # ---------------- Persistence ----------------
+
+    def _restore(self):
+        """Load cached rows and the checkpoint saved by a previous process."""
+        db = self.session_factory()
+        try:
+            Base.metadata.create_all(bind=db.get_bind(), tables=[ChainProject.__table__, ChainCheckpoint.__table__])
+            checkpoint = db.query(ChainCheckpoint).filter(ChainCheckpoint.name == CHECKPOINT_NAME).first()
+            if checkpoint is None:
+                return
+            self._projects = {
+                row.project_id: (row.name, row.location, int(row.area or 0), row.owner,
+                                 row.metadata_uri, bool(row.exists), int(row.total_issued_credits or 0))
+                for row in db.query(ChainProject).all()
+            }
+            self._block_number = checkpoint.block_number
+            self._block_hash = checkpoint.block_hash
+            logger.info(f"Project cache restored {len(self._projects)} projects at block {self._block_number}")
+        except Exception as e:
+            logger.error(f"Could not restore project cache: {str(e)}")
+            self._projects = {}
+            self._block_number = None
+        finally:
+            db.close()
+
+    def _persist(self, changed: Set[int]):
+        db = self.session_factory()
+        try:
+            for project_id in changed:
+                name, location, area, owner, metadata_uri, exists, credits = self._projects[project_id]
+                db.merge(ChainProject(
+                    project_id=project_id,
+                    name=name,
+                    location=location,
+                    area=str(area),
+                    owner=owner,
+                    metadata_uri=metadata_uri,
+                    exists=exists,
+                    total_issued_credits=str(credits),
+                    updated_block=self._block_number
+                ))
+            db.merge(ChainCheckpoint(
+                name=CHECKPOINT_NAME,
+                block_number=self._block_number,
+                block_hash=self._block_hash
+            ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Could not persist project cache: {str(e)}")
+        finally:
+            db.close()
+
+    def _clear_persisted(self):
+        db = self.session_factory()
+        try:
+            db.query(ChainProject).delete()
+            db.query(ChainCheckpoint).filter(ChainCheckpoint.name == CHECKPOINT_NAME).delete()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Could not clear persisted project cache: {str(e)}")
+        finally:
+            db.close()
@@ -0,0 +1,192 @@
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+import hashlib
+import io
+import os
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+from .image_pyramid import level_size, levels_for, pyramid_store
+
+# Resize methods: PIL Lanczos (NDVI / greenness analyzers) and OpenCV bilinear
+# (evidence comparator), each reproducing what the analyzer did on its own
+LANCZOS = "lanczos"
+LINEAR = "linear"
+
+EXIF_ORIENTATION = 0x0112
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)  # Orientations that swap width and height
+
+
+def exif_orientation(image: Image.Image) -> int:
+    """EXIF orientation tag of an opened image (1, upright, when absent)."""
+    try:
+        return int(image.getexif().get(EXIF_ORIENTATION, 1))
+    except Exception:
+        return 1
+
+
+class ImageView:
+    """
+    One resolution of a decoded image. Color spaces and other derived arrays
+    are computed on first use and then shared by every analyzer.
+    Arrays are shared, so callers must not modify them in place.
+    """
+
+    def __init__(self, rgb: np.ndarray):
+        self.rgb = rgb
+        self._derived: Dict[str, Any] = {}
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.rgb.shape
+
+    def derived(self, key: str, compute: Callable[[np.ndarray], Any]) -> Any:
+        """Cached `compute(rgb)` under `key`."""
+        if key not in self._derived:
+            self._derived[key] = compute(self.rgb)
+        return self._derived[key]
+
+    @property
+    def hsv(self) -> np.ndarray:
+        return self.derived("hsv", lambda rgb: cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV))
+
+    @property
+    def lab(self) -> np.ndarray:
+        return self.derived("lab", lambda rgb: cv2.cvtColor(rgb, cv2.COLOR_RGB2LAB))
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self.derived("gray", lambda rgb: cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY))
+
+    @property
+    def bgr(self) -> np.ndarray:
+        return self.derived("bgr", lambda rgb: cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+
+    @property
+    def channels_f32(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Contiguous float32 (red, green, blue) planes."""
+        return self.derived("channels_f32", lambda rgb: tuple(
+            np.ascontiguousarray(rgb[:, :, c], dtype=np.float32) for c in range(3)
+        ))
+
+
+class DecodedImage:
+    """
+    An uploaded image decoded at most once per request.
+
+    Built from the raw bytes; the content hash, the full-resolution RGB array
+    and every resized level (with its derived color spaces, see ImageView)
+    are computed lazily and kept, so analyzers that receive the same object
+    never decode, resize or convert the same image twice. Nothing is decoded
+    if every analysis is served from the analysis cache.
+
+    Downscaled views are resampled from the smallest pyramid level that is
+    at least as large (see services/image_pyramid.py). Levels built at
+    upload are read from the store, so the original is only decoded when
+    the full resolution is asked for.
+    """
+
+    def __init__(self, data: bytes, name: str = "image"):
+        self.data = data
+        self.name = name
+        self._content_hash: Optional[str] = None
+        self._pil_rgb: Optional[Image.Image] = None
+        self._size: Optional[Tuple[int, int]] = None
+        self._views: Dict[Tuple, ImageView] = {}
+
+    @classmethod
+    def from_path(cls, path: str) -> "DecodedImage":
+        with open(path, "rb") as fh:
+            return cls(fh.read(), os.path.basename(path))
+
+    @property
+    def content_hash(self) -> str:
+        if self._content_hash is None:
+            self._content_hash = hashlib.sha256(self.data).hexdigest()
+        return self._content_hash
+
+    @property
+    def pil_rgb(self) -> Image.Image:
+        """The image upright: phone photos are rotated by their EXIF orientation, as cv2.imread does."""
+        if self._pil_rgb is None:
+            image = Image.open(io.BytesIO(self.data))
+            if exif_orientation(image) != 1:
+                image = ImageOps.exif_transpose(image)
+            self._pil_rgb = image.convert('RGB')
+        return self._pil_rgb
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Upright (width, height), read from the header without decoding."""
+        if self._size is None:
+            if self._pil_rgb is not None:
+                self._size = self._pil_rgb.size
+            else:
+                with Image.open(io.BytesIO(self.data)) as header:
+                    width, height = header.size
+                    if exif_orientation(header) in TRANSPOSED_ORIENTATIONS:
+                        width, height = height, width
+                    self._size = (width, height)
+        return self._size
+
+    @property
+    def full(self) -> ImageView:
+        return self.view()
+
+    def level(self, level: int) -> ImageView:
+        """
+        The pyramid level with long side `level`: read from the pyramid store,
+        or resampled from the original if it wasn't built (same pixels).
+        """
+        key = ("level", level)
+        if key not in self._views:
+            rgb = pyramid_store.load(self.content_hash, level)
+            if rgb is None:
+                rgb = np.array(self.pil_rgb.resize(level_size(*self.size, level), Image.Resampling.LANCZOS))
+            self._views[key] = ImageView(rgb)
+        return self._views[key]
+
+    def view(self, size: Optional[Tuple[int, int]] = None, method: str = LANCZOS) -> ImageView:
+        """The image at (width, height), or at full resolution when size is None."""
+        key = (size, method if size else None)
+        if key not in self._views:
+            source = self._source_level(size) if size else None
+            if size is None:
+                self._views[key] = ImageView(np.array(self.pil_rgb))
+            elif method == LANCZOS:
+                pil = Image.fromarray(source.rgb) if source else self.pil_rgb
+                self._views[key] = ImageView(np.array(pil.resize(size, Image.Resampling.LANCZOS)))
+            elif method == LINEAR:
+                self._views[key] = ImageView(cv2.resize((source or self.full).rgb, size))
+            else:
+                raise ValueError(f"Unknown resize method: {method}")
+        return self._views[key]
+
+    def _source_level(self, size: Tuple[int, int]) -> Optional[ImageView]:
+        """Smallest pyramid level covering `size` in both dimensions, or None for the original."""
+        width, height = self.size
+        for level in levels_for(width, height):
+            level_width, level_height = level_size(width, height, level)
+            if level_width >= size[0] and level_height >= size[1]:
+                return self.level(level)
+        return None
+
+    def view_within(self, max_side: int, size: Tuple[int, int], method: str = LANCZOS) -> ImageView:
+        """Full resolution, or `size` if either side exceeds `max_side`."""
+        width, height = self.size
+        if height > max_side or width > max_side:
+            return self.view(size, method)
+        return self.full
+
+
+ImageInput = Union[bytes, bytearray, DecodedImage]
+
+
+def as_decoded(image: ImageInput, name: str = "image") -> DecodedImage:
+    """Wrap raw bytes in a DecodedImage; DecodedImage objects are passed through."""
+    if isinstance(image, DecodedImage):
+        return image
+    if isinstance(image, (bytes, bytearray)):
+        return DecodedImage(bytes(image), name)
+    raise TypeError(f"Expected image bytes or DecodedImage, got {type(image).__name__}")
@@ -1,8 +1,12 @@
+from types import MappingProxyType
 from typing import Dict, Optional, Tuple, List
+import copy
 import logging
+import threading
 from datetime import datetime
 from .ai_verification import BeforeAfterAnalyzer
 from .co2_sequestration_calculator import CO2SequestrationCalculator
+from .decoded_image import ImageInput, as_decoded
 
 logger = logging.getLogger(__name__)
 
@@ -13,40 +17,58 @@ class DynamicCarbonCreditCalculator:
     and CO2 sequestration potential.
     """
     
-    def __init__(self):
-        self.before_after_analyzer = BeforeAfterAnalyzer()
-        self.co2_calculator = CO2SequestrationCalculator()
+    # Updated credit calculation settings with provisional credit system
+    DEFAULT_SETTINGS = MappingProxyType({
+        'min_credits_per_project': 0.5,     # Reduced minimum credits
+        'max_credits_per_hectare': 35.0,    # Reduced maximum (was 50.0)
+        'baseline_credit_rate': 0.1,        # Base conversion rate (1 credit per 10kg CO2)
+        'quality_bonus_multiplier': 1.2,    # Reduced bonus (was 1.5)
+        'verification_confidence_threshold': 70.0,  # Increased threshold (was 60.0)
+        'enable_bonus_credits': True,       
+        'enable_fractional_credits': True,
         
-        # Updated credit calculation settings with provisional credit system
-        self.settings = {
-            'min_credits_per_project': 0.5,     # Reduced minimum credits
-            'max_credits_per_hectare': 35.0,    # Reduced maximum (was 50.0)
-            'baseline_credit_rate': 0.1,        # Base conversion rate (1 credit per 10kg CO2)
-            'quality_bonus_multiplier': 1.2,    # Reduced bonus (was 1.5)
-            'verification_confidence_threshold': 70.0,  # Increased threshold (was 60.0)
-            'enable_bonus_credits': True,       
-            'enable_fractional_credits': True,
-            
-            # Provisional credit system settings
-            'enable_provisional_credits': True,
-            'provisional_credit_percentage': 0.5,  # Issue 50% immediately
-            'provisional_verification_period_years': 3,  # Verify remainder after 3 years
-            'strict_confidence_threshold': 85.0,  # High confidence required for full credits
-            'minimum_monitoring_period_months': 12  # Minimum monitoring period
-        }
+        # Provisional credit system settings
+        'enable_provisional_credits': True,
+        'provisional_credit_percentage': 0.5,  # Issue 50% immediately
+        'provisional_verification_period_years': 3,  # Verify remainder after 3 years
+        'strict_confidence_threshold': 85.0,  # High confidence required for full credits
+        'minimum_monitoring_period_months': 12  # Minimum monitoring period
+    })
     
-    def calculate_dynamic_credits(self, before_image_data: bytes, after_image_data: bytes,
+    def __init__(self, before_after_analyzer: Optional[BeforeAfterAnalyzer] = None,
+                 co2_calculator: Optional[CO2SequestrationCalculator] = None):
+        self.before_after_analyzer = before_after_analyzer or BeforeAfterAnalyzer()
+        self.co2_calculator = co2_calculator or CO2SequestrationCalculator()
+        
+        # Read-only snapshot; update_settings replaces it as a whole, so a
+        # calculation in progress never sees a half-applied update
+        self._settings_lock = threading.Lock()
+        self.settings = MappingProxyType(dict(self.DEFAULT_SETTINGS))
+    
+    def calculate_dynamic_credits(self, before_image_data: ImageInput, after_image_data: ImageInput,
                                 project_area_hectares: float, time_period_years: float = 1.0,
                                 project_metadata: Optional[Dict] = None) -> Dict:
         """
         Calculate dynamic carbon credits based on before/after image analysis.
+        Pass DecodedImage objects to share decoded images with the caller's other analyses.
         """
+        # The helpers read self.settings; a shallow copy pins the current snapshot
+        # for this whole calculation while other threads share the calculator
+        return copy.copy(self)._calculate_dynamic_credits(
+            before_image_data, after_image_data, project_area_hectares, time_period_years, project_metadata
+        )
+    
+    def _calculate_dynamic_credits(self, before_image_data: ImageInput, after_image_data: ImageInput,
+                                   project_area_hectares: float, time_period_years: float,
+                                   project_metadata: Optional[Dict]) -> Dict:
         try:
             logger.info(f"Calculating dynamic credits for {project_area_hectares} hectare project")
+            before_image = as_decoded(before_image_data, "before_image")
+            after_image = as_decoded(after_image_data, "after_image")
             
             # Perform comprehensive before/after analysis
             analysis_result = self.before_after_analyzer.compare_images(
-                before_image_data, after_image_data, project_area_hectares, time_period_years
+                before_image, after_image, project_area_hectares, time_period_years
             )
             
             if not analysis_result.get('success', False):
@@ -516,23 +538,28 @@ class DynamicCarbonCreditCalculator:
     
     def update_settings(self, new_settings: Dict) -> Dict:
         """
-        Update calculator settings.
+        Update calculator settings by swapping in a new snapshot; calculations
+        already running finish with the settings they started with.
         """
         try:
-            original_settings = self.settings.copy()
-            
-            # Update settings with validation
-            for key, value in new_settings.items():
-                if key in self.settings:
-                    self.settings[key] = value
-                else:
-                    logger.warning(f"Unknown setting: {key}")
+            with self._settings_lock:
+                original_settings = self.settings
+                updated_settings = dict(original_settings)
+                
+                # Update settings with validation
+                for key, value in new_settings.items():
+                    if key in updated_settings:
+                        updated_settings[key] = value
+                    else:
+                        logger.warning(f"Unknown setting: {key}")
+                
+                self.settings = MappingProxyType(updated_settings)
             
             return {
                 'success': True,
                 'message': 'Settings updated successfully',
-                'original_settings': original_settings,
-                'updated_settings': self.settings
+                'original_settings': dict(original_settings),
+                'updated_settings': dict(updated_settings)
             }
             
         except Exception as e:
@@ -0,0 +1,263 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import threading
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+from models.db_model import Base, ChainCheckpoint, ChainEvent
+from services.chain_cache import checkpoint_on_chain
+from services.pagination import keyset_page
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = "event_indexer"
+
+# Blocks requested per eth_getLogs call; also the unit of one committed batch
+LOG_BLOCK_RANGE = 2000
+
+POLL_INTERVAL_SECONDS = 2.0
+
+# Registry events mirrored into chain_events, with the argument stored in the
+# `account` column for each of them
+INDEXED_EVENTS = {
+    "ProjectRegistered": "owner",
+    "EvidenceUploaded": "uploader",
+    "EvidenceVerified": "verifier",
+    "CreditsMinted": "to",
+    "ReceiptMinted": "to",
+    "ReceiptRetired": "owner",
+}
+
+
+def _event_topic(event_abi: Dict[str, Any]) -> str:
+    signature = f"{event_abi['name']}({','.join(arg['type'] for arg in event_abi['inputs'])})"
+    return Web3.to_hex(Web3.keccak(text=signature))
+
+
+def _json_value(value):
+    """Decoded event arguments as JSON-safe values (bytes become 0x hex)."""
+    if isinstance(value, (bytes, bytearray)):
+        return Web3.to_hex(HexBytes(value))
+    return value
+
+
+def serialize_event(row: ChainEvent) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "event": row.event,
+        "blockNumber": row.block_number,
+        "txHash": row.tx_hash,
+        "logIndex": row.log_index,
+        "projectId": row.project_id,
+        "evidenceId": row.evidence_id,
+        "tokenId": row.token_id,
+        "account": row.account,
+        "args": row.args
+    }
+
+
+class RegistryEventIndexer:
+    """
+    Mirrors BlueCarbonRegistry events into the chain_events table.
+
+    A background thread polls the node, fetches logs for the six registry
+    events with eth_getLogs in LOG_BLOCK_RANGE batches and commits each batch
+    together with the checkpoint, so a crash never stores a log twice or skips
+    one. Request handlers query SQLite through get_events() instead of
+    scanning the chain.
+    """
+
+    def __init__(self, w3: Web3, registry, session_factory, poll_interval: float = POLL_INTERVAL_SECONDS,
+                 block_range: int = LOG_BLOCK_RANGE):
+        self.w3 = w3
+        self.registry = registry
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.block_range = block_range
+
+        self._topics = {
+            _event_topic(entry): entry["name"]
+            for entry in registry.abi
+            if entry.get("type") == "event" and entry["name"] in INDEXED_EVENTS
+        }
+        self._listeners: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._tables_ready = False
+        self.last_error: Optional[str] = None
+
+    # ---------------- Lifecycle ----------------
+
+    def add_listener(self, callback: Callable[[], None]):
+        """Register a callback run after every successful poll (e.g. a cache refresh)."""
+        self._listeners.append(callback)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="registry-event-indexer", daemon=True)
+        self._thread.start()
+        logger.info("Registry event indexer started")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.index_once()
+                for callback in self._listeners:
+                    try:
+                        callback()
+                    except Exception as e:
+                        logger.error(f"Event indexer listener failed: {str(e)}")
+            except Exception as e:
+                # Node down or restarting: keep serving what is indexed and retry
+                self.last_error = str(e)
+                logger.error(f"Event indexing failed: {str(e)}")
+            self._stop_event.wait(self.poll_interval)
+
+    # ---------------- Indexing ----------------
+
+    def index_once(self) -> int:
+        """Index every block up to the node's latest one. Returns the number of new events."""
+        with self._lock:
+            self._ensure_tables()
+            latest = self.w3.eth.block_number
+            block_number, block_hash = self.checkpoint()
+
+            if block_number is not None and not checkpoint_on_chain(self.w3, latest, block_number, block_hash):
+                logger.info("Chain was reset since the last indexed block, re-indexing from genesis")
+                self._clear()
+                block_number = None
+
+            stored = 0
+            start = 0 if block_number is None else block_number + 1
+            while start <= latest:
+                end = min(latest, start + self.block_range - 1)
+                stored += self._index_range(start, end)
+                start = end + 1
+
+            self.last_error = None
+            return stored
+
+    def _index_range(self, from_block: int, to_block: int) -> int:
+        logs = self.w3.eth.get_logs({
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "address": self.registry.address,
+            "topics": [list(self._topics)]
+        })
+
+        rows = [self._to_row(log) for log in logs]
+        end_hash = Web3.to_hex(self.w3.eth.get_block(to_block)["hash"])
+
+        db = self.session_factory()
+        try:
+            db.add_all(rows)
+            db.merge(ChainCheckpoint(name=CHECKPOINT_NAME, block_number=to_block, block_hash=end_hash))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        if rows:
+            logger.debug(f"Indexed {len(rows)} registry events in blocks {from_block}-{to_block}")
+        return len(rows)
+
+    def _to_row(self, log) -> ChainEvent:
+        name = self._topics[Web3.to_hex(log["topics"][0])]
+        decoded = getattr(self.registry.events, name)().process_log(log)
+        args = {key: _json_value(value) for key, value in dict(decoded["args"]).items()}
+        account = args.get(INDEXED_EVENTS[name])
+
+        return ChainEvent(
+            event=name,
+            block_number=decoded["blockNumber"],
+            block_hash=Web3.to_hex(HexBytes(decoded["blockHash"])),
+            tx_hash=Web3.to_hex(HexBytes(decoded["transactionHash"])),
+            log_index=decoded["logIndex"],
+            project_id=args.get("projectId"),
+            evidence_id=args.get("evidenceId"),
+            token_id=args.get("tokenId", args.get("receiptTokenId")),
+            account=account.lower() if account else None,
+            args=args
+        )
+
+    def _ensure_tables(self):
+        if self._tables_ready:
+            return
+        db = self.session_factory()
+        try:
+            Base.metadata.create_all(bind=db.get_bind(), tables=[ChainEvent.__table__, ChainCheckpoint.__table__])
+            self._tables_ready = True
+        finally:
+            db.close()
+
+    def _clear(self):
+        db = self.session_factory()
+        try:
+            db.query(ChainEvent).delete()
+            db.query(ChainCheckpoint).filter(ChainCheckpoint.name == CHECKPOINT_NAME).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    # ---------------- Queries ----------------
+
+    def checkpoint(self) -> Tuple[Optional[int], Optional[str]]:
+        """(last indexed block, its hash), or (None, None) before the first batch."""
+        self._ensure_tables()
+        db = self.session_factory()
+        try:
+            row = db.query(ChainCheckpoint).filter(ChainCheckpoint.name == CHECKPOINT_NAME).first()
+            return (row.block_number, row.block_hash) if row else (None, None)
+        finally:
+            db.close()
+
+    def get_events(self, event: Optional[str] = None, project_id: Optional[int] = None,
+                   evidence_id: Optional[int] = None, token_id: Optional[int] = None,
+                   account: Optional[str] = None, limit: Optional[int] = None,
+                   after: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Indexed events matching the filters, in chain order.
+        With `limit` the result is one keyset page and the next cursor is returned.
+        """
+        self._ensure_tables()
+        db = self.session_factory()
+        try:
+            query = db.query(ChainEvent)
+            if event:
+                query = query.filter(ChainEvent.event == event)
+            if project_id is not None:
+                query = query.filter(ChainEvent.project_id == project_id)
+            if evidence_id is not None:
+                query = query.filter(ChainEvent.evidence_id == evidence_id)
+            if token_id is not None:
+                query = query.filter(ChainEvent.token_id == token_id)
+            if account:
+                query = query.filter(ChainEvent.account == account.lower())
+
+            # Rows are inserted in block / log order, so the id is the chain order
+            if limit is not None:
+                rows, next_cursor = keyset_page(query, ChainEvent.id, limit, after)
+            else:
+                if after is not None:
+                    query = query.filter(ChainEvent.id > after)
+                rows, next_cursor = query.order_by(ChainEvent.id).all(), None
+
+            return [serialize_event(row) for row in rows], next_cursor
+        finally:
+            db.close()
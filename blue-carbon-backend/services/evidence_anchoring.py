@@ -0,0 +1,264 @@
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+import datetime
+import json
+import logging
+import threading
+
+from models.db_model import Base, EvidenceAnchorBatch, MRVData, ProjectData
+from services.merkle import build_levels, proofs_from_levels, verify_proof
+
+logger = logging.getLogger(__name__)
+
+ANCHOR_MODE_INDIVIDUAL = "individual"
+ANCHOR_MODE_MERKLE = "merkle_batch"
+
+# A project's queued evidence is anchored once the oldest entry has waited
+# this long, or as soon as MAX_BATCH_SIZE hashes are queued
+ANCHOR_WINDOW_SECONDS = 60.0
+MAX_BATCH_SIZE = 256
+POLL_INTERVAL_SECONDS = 1.0
+
+# submit_root(batch_id, blockchain_project_id, merkle_root, evidence_uri) -> tx hash
+SubmitRoot = Callable[[int, int, bytes, str], str]
+
+
+class EvidenceBatchAnchorer:
+    """
+    Anchors evidence hashes in Merkle batches instead of one uploadEvidence
+    transaction per upload.
+
+    Evidence uploaded with anchor_mode 'merkle_batch' is queued in mrvdata
+    (anchor_batch_id NULL). A background thread groups queued evidence by
+    project and, per window, builds one Merkle tree, stores each evidence's
+    inclusion proof in mrvdata.merkle_proof and hands the root to `submit_root`,
+    which sends it with a single uploadEvidence call. The contract scopes
+    evidence to a project, so batches never mix projects.
+    """
+
+    def __init__(self, session_factory, submit_root: SubmitRoot, window_seconds: float = ANCHOR_WINDOW_SECONDS,
+                 max_batch_size: int = MAX_BATCH_SIZE, poll_interval: float = POLL_INTERVAL_SECONDS):
+        self.session_factory = session_factory
+        self.submit_root = submit_root
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._tables_ready = False
+
+    # ---------------- Lifecycle ----------------
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="evidence-batch-anchorer", daemon=True)
+        self._thread.start()
+        logger.info("Evidence batch anchorer started")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notify(self):
+        """Called after queueing evidence so full batches go out without waiting for the next poll."""
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Evidence batch anchoring failed: {str(e)}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    # ---------------- Batching ----------------
+
+    def flush(self, force: bool = False) -> List[int]:
+        """
+        Anchor every project queue that is full or older than the window
+        (every non-empty queue when `force` is set). Returns the new batch ids.
+        """
+        with self._lock:
+            self._ensure_tables()
+            db = self.session_factory()
+            try:
+                queued = db.query(MRVData.id, MRVData.project_id, MRVData.evidence_hash, MRVData.timestamp).filter(
+                    MRVData.anchor_mode == ANCHOR_MODE_MERKLE,
+                    MRVData.anchor_batch_id.is_(None)
+                ).order_by(MRVData.id).all()
+
+                by_project = defaultdict(list)
+                for row in queued:
+                    by_project[row.project_id].append(row)
+
+                cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=self.window_seconds)
+                ready = []
+                for project_id, rows in by_project.items():
+                    oldest = rows[0].timestamp
+                    if force or len(rows) >= self.max_batch_size or (oldest is not None and oldest <= cutoff):
+                        for start in range(0, len(rows), self.max_batch_size):
+                            batch = self._create_batch(db, project_id, rows[start:start + self.max_batch_size])
+                            if batch:
+                                ready.append(batch)
+            finally:
+                db.close()
+
+            for batch_id, blockchain_project_id, root in ready:
+                self._submit(batch_id, blockchain_project_id, root)
+            return [batch_id for batch_id, _, _ in ready]
+
+    def _create_batch(self, db, project_id: int, rows) -> Optional[tuple]:
+        blockchain_project_id = db.query(ProjectData.blockchain_id).filter(ProjectData.id == project_id).scalar()
+        if blockchain_project_id is None:
+            logger.info(f"Project {project_id} has no blockchain id yet; keeping {len(rows)} evidence hashes queued")
+            return None
+
+        levels = build_levels([row.evidence_hash for row in rows])
+        proofs = proofs_from_levels(levels)
+        root = levels[-1][0]
+
+        try:
+            batch = EvidenceAnchorBatch(
+                project_id=project_id,
+                blockchain_project_id=blockchain_project_id,
+                merkle_root="0x" + root.hex(),
+                leaf_count=len(rows),
+                status="submitted"
+            )
+            db.add(batch)
+            db.flush()
+            db.bulk_update_mappings(MRVData, [
+                {"id": row.id, "anchor_batch_id": batch.id, "merkle_proof": proof}
+                for row, proof in zip(rows, proofs)
+            ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        logger.info(f"Created anchor batch {batch.id} for project {project_id} with {len(rows)} evidence hashes")
+        return batch.id, blockchain_project_id, root
+
+    def _submit(self, batch_id: int, blockchain_project_id: int, root: bytes):
+        evidence_uri = json.dumps({"type": "merkle_batch", "batch_id": batch_id, "hash_algorithm": "sha256"})
+        try:
+            tx_hash = self.submit_root(batch_id, blockchain_project_id, root, evidence_uri)
+        except Exception as e:
+            logger.error(f"Submitting anchor batch {batch_id} failed: {str(e)}")
+            self.mark_failed(batch_id)
+            return
+
+        db = self.session_factory()
+        try:
+            db.query(EvidenceAnchorBatch).filter(EvidenceAnchorBatch.id == batch_id).update({"tx_hash": tx_hash})
+            db.commit()
+        finally:
+            db.close()
+
+    def mark_anchored(self, batch_id: int, chain_evidence_id: Optional[int]):
+        """Confirmation handler: the root is on chain under `chain_evidence_id`."""
+        db = self.session_factory()
+        try:
+            db.query(EvidenceAnchorBatch).filter(EvidenceAnchorBatch.id == batch_id).update({
+                "status": "anchored",
+                "chain_evidence_id": chain_evidence_id,
+                "anchored_at": datetime.datetime.utcnow()
+            })
+            db.commit()
+        finally:
+            db.close()
+
+    def mark_failed(self, batch_id: int):
+        """
+        The root never made it on chain (reverted, or dropped for another
+        transaction at its nonce): re-queue its evidence for the next batch.
+        Not called on a receipt timeout, since the root may still be mined.
+        """
+        db = self.session_factory()
+        try:
+            db.query(EvidenceAnchorBatch).filter(EvidenceAnchorBatch.id == batch_id).update({"status": "failed"})
+            db.query(MRVData).filter(MRVData.anchor_batch_id == batch_id).update(
+                {"anchor_batch_id": None, "merkle_proof": None}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+        self.notify()
+
+    def _ensure_tables(self):
+        if self._tables_ready:
+            return
+        db = self.session_factory()
+        try:
+            Base.metadata.create_all(bind=db.get_bind(), tables=[EvidenceAnchorBatch.__table__])
+            self._tables_ready = True
+        finally:
+            db.close()
+
+    # ---------------- Proofs ----------------
+
+    def get_proof(self, evidence_id: int) -> Optional[Dict[str, Any]]:
+        """Inclusion proof and anchoring status for one evidence, or None if it isn't batch-anchored."""
+        self._ensure_tables()
+        db = self.session_factory()
+        try:
+            evidence = db.query(MRVData).filter(MRVData.id == evidence_id).first()
+            if not evidence or evidence.anchor_mode != ANCHOR_MODE_MERKLE:
+                return None
+
+            result = {
+                "evidence_id": evidence.id,
+                "evidence_hash": evidence.evidence_hash,
+                "status": "queued",
+                "batch_id": evidence.anchor_batch_id,
+                "proof": evidence.merkle_proof
+            }
+            if evidence.anchor_batch_id is not None:
+                batch = db.query(EvidenceAnchorBatch).filter(EvidenceAnchorBatch.id == evidence.anchor_batch_id).first()
+                result.update(serialize_batch(batch))
+                result["batch_id"] = batch.id
+            return result
+        finally:
+            db.close()
+
+    def verify(self, evidence_hash: str, proof: List[Dict[str, str]], merkle_root: str) -> Dict[str, Any]:
+        """Check a proof against a root and report whether that root was anchored by this backend."""
+        self._ensure_tables()
+        valid = verify_proof(evidence_hash, proof, merkle_root)
+        result = {"valid": valid, "anchored": False}
+        if not valid:
+            return result
+
+        db = self.session_factory()
+        try:
+            batch = db.query(EvidenceAnchorBatch).filter(
+                EvidenceAnchorBatch.merkle_root == merkle_root.lower()
+            ).order_by(EvidenceAnchorBatch.id.desc()).first()
+            if batch:
+                result.update(serialize_batch(batch))
+                result["batch_id"] = batch.id
+                result["anchored"] = batch.status == "anchored"
+            return result
+        finally:
+            db.close()
+
+
+def serialize_batch(batch: EvidenceAnchorBatch) -> Dict[str, Any]:
+    return {
+        "merkle_root": batch.merkle_root,
+        "leaf_count": batch.leaf_count,
+        "status": batch.status,
+        "tx_hash": batch.tx_hash,
+        "chain_evidence_id": batch.chain_evidence_id,
+        "blockchain_project_id": batch.blockchain_project_id,
+        "anchored_at": batch.anchored_at.isoformat() if batch.anchored_at else None
+    }
@@ -1,11 +1,12 @@
 import cv2
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
 import logging
-import base64
-from io import BytesIO
-from PIL import Image
 import os
+from .analysis_cache import analysis_cache, file_content_hash
+from .decoded_image import DecodedImage, LINEAR
+from .image_pyramid import PYRAMID_LEVELS
+from .renditions import RENDITION_FORMATS, RENDITION_WIDTHS, rendition_store
 
 logger = logging.getLogger(__name__)
 
@@ -55,6 +56,11 @@ class EvidenceImageComparator:
             logger.error(f"Error preprocessing image: {str(e)}")
             return image
     
+    def preprocess_decoded(self, image: DecodedImage, target_size: Tuple[int, int] = (800, 600)) -> np.ndarray:
+        """preprocess_image for a DecodedImage, sharing its resized level with other analyzers."""
+        view = image.view(target_size, LINEAR)
+        return view.derived('comparator_blurred_bgr', lambda rgb: cv2.GaussianBlur(view.bgr, (5, 5), 0))
+    
     def detect_vegetation_areas(self, image: np.ndarray) -> Tuple[np.ndarray, float]:
         """Detect vegetation areas in the image using color segmentation."""
         try:
@@ -117,26 +123,72 @@ class EvidenceImageComparator:
             logger.error(f"Error calculating NDVI: {str(e)}")
             return np.zeros((image.shape[0], image.shape[1]), dtype=np.float32), 0.0
     
-    def compare_images(self, before_image_path: str, after_image_path: str) -> Dict:
+    # Bump when the comparison or its highlighted renderings change (4: EXIF orientation applied)
+    ANALYSIS_VERSION = 4
+    
+    def cache_params(self) -> Dict:
+        """Everything besides the two images that affects compare_images results."""
+        return {
+            'version': self.ANALYSIS_VERSION,
+            'min_contour_area': self.min_contour_area,
+            'vegetation_color_ranges': self.vegetation_color_ranges,
+            'pyramid_levels': PYRAMID_LEVELS,
+            'renditions': {'widths': RENDITION_WIDTHS, 'formats': RENDITION_FORMATS}
+        }
+    
+    def compare_images(self, before_image: Union[str, DecodedImage], after_image: Union[str, DecodedImage]) -> Dict:
         """
         Compare before and after images to detect vegetation changes.
+        Images are file paths or DecodedImage objects already shared with other analyzers.
         Returns detailed analysis with highlighted differences.
+        Results are cached by the content of both images.
         """
         try:
-            # Load images
-            before_img = self.load_image_from_path(before_image_path)
-            after_img = self.load_image_from_path(after_image_path)
-            
-            if before_img is None or after_img is None:
+            content_hashes = [self._content_hash(before_image), self._content_hash(after_image)]
+        except OSError as e:
+            logger.error(f"Image file not readable: {str(e)}")
+            return {
+                'success': False,
+                'error': 'Failed to load one or both images'
+            }
+        
+        # The renditions of a comparison are stored under its cache key
+        params = self.cache_params()
+        rid = analysis_cache.make_key('image_comparison', content_hashes, params)
+        result = analysis_cache.get_or_compute(
+            'image_comparison', content_hashes, params,
+            lambda: self._compare_images(before_image, after_image, rid)
+        )
+        if result.get('success') and not rendition_store.has(result['renditions']):
+            # Cached result whose renditions were removed: render them again
+            result = self._compare_images(before_image, after_image, rid)
+        return result
+    
+    @staticmethod
+    def _content_hash(image: Union[str, DecodedImage]) -> str:
+        if isinstance(image, DecodedImage):
+            return image.content_hash
+        return file_content_hash(image)
+    
+    def _compare_images(self, before_image: Union[str, DecodedImage], after_image: Union[str, DecodedImage],
+                        rid: str) -> Dict:
+        try:
+            # Load images (decoded once; paths are read here on a cache miss only)
+            if not isinstance(before_image, DecodedImage):
+                before_image = DecodedImage.from_path(before_image)
+            if not isinstance(after_image, DecodedImage):
+                after_image = DecodedImage.from_path(after_image)
+            
+            try:
+                before_processed = self.preprocess_decoded(before_image)
+                after_processed = self.preprocess_decoded(after_image)
+            except Exception as e:
+                logger.error(f"Failed to decode images: {str(e)}")
                 return {
                     'success': False,
                     'error': 'Failed to load one or both images'
                 }
             
-            # Preprocess images
-            before_processed = self.preprocess_image(before_img)
-            after_processed = self.preprocess_image(after_img)
-            
             # Detect vegetation in both images
             before_veg_mask, before_veg_percent = self.detect_vegetation_areas(before_processed)
             after_veg_mask, after_veg_percent = self.detect_vegetation_areas(after_processed)
@@ -171,10 +223,12 @@ class EvidenceImageComparator:
             else:
                 multiplier = 1.0
             
-            # Convert images to base64 for frontend display
-            comparison_b64 = self.image_to_base64(comparison_image)
-            before_highlighted_b64 = self.image_to_base64(highlighted_before)
-            after_highlighted_b64 = self.image_to_base64(highlighted_after)
+            # Stored as JPEG/WebP files for the frontend; the result only carries their URLs
+            renditions = rendition_store.save(rid, {
+                'comparison': comparison_image,
+                'before_highlighted': highlighted_before,
+                'after_highlighted': highlighted_after
+            })
             
             return {
                 'success': True,
@@ -185,9 +239,10 @@ class EvidenceImageComparator:
                 'after_ndvi': round(after_ndvi_avg, 4),
                 'ndvi_improvement': round(after_ndvi_avg - before_ndvi_avg, 4),
                 'green_multiplier': round(multiplier, 3),
-                'comparison_image_b64': comparison_b64,
-                'before_highlighted_b64': before_highlighted_b64,
-                'after_highlighted_b64': after_highlighted_b64,
+                'comparison_image_url': renditions['comparison']['urls']['full']['jpeg'],
+                'before_highlighted_url': renditions['before_highlighted']['urls']['full']['jpeg'],
+                'after_highlighted_url': renditions['after_highlighted']['urls']['full']['jpeg'],
+                'renditions': renditions,
                 'analysis_summary': {
                     'vegetation_change': 'Improved' if vegetation_improvement > 0 else 'Declined' if vegetation_improvement < 0 else 'No Change',
                     'change_magnitude': 'Significant' if abs(vegetation_improvement) > 10 else 'Moderate' if abs(vegetation_improvement) > 5 else 'Minor',
@@ -274,28 +329,6 @@ class EvidenceImageComparator:
             logger.error(f"Error adding label: {str(e)}")
             return image
     
-    def image_to_base64(self, image: np.ndarray) -> str:
-        """Convert OpenCV image to base64 string."""
-        try:
-            # Convert BGR to RGB
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            # Convert to PIL Image
-            pil_image = Image.fromarray(image_rgb)
-            
-            # Save to buffer
-            buffer = BytesIO()
-            pil_image.save(buffer, format='PNG')
-            
-            # Encode to base64
-            img_str = base64.b64encode(buffer.getvalue()).decode()
-            
-            return f"data:image/png;base64,{img_str}"
-            
-        except Exception as e:
-            logger.error(f"Error converting image to base64: {str(e)}")
-            return ""
-    
     def generate_recommendation(self, improvement: float, multiplier: float) -> str:
         """Generate recommendation based on analysis results."""
         if improvement > 20:
@@ -309,70 +342,23 @@ class EvidenceImageComparator:
         else:
             return "Vegetation decline detected. Investigation recommended to identify causes."
     
-    def get_evidence_images_analysis(self, evidence_id: int) -> Dict:
+    def get_evidence_images_analysis(self, evidence_id: int, media: Dict) -> Dict:
         """
         Get detailed analysis for evidence images including highlighted comparisons.
-        This is the main method to be called from the API.
+        This is the main method to be called from the API; `media` holds the
+        before and after files picked by EvidenceMediaIndex.comparison_files.
         """
         try:
-            # This would typically fetch from database to get actual file paths
-            # For now, using file path pattern and scanning uploads directory
-            uploads_dir = "uploads"
-            
-            # Look for before and after images for this evidence
-            before_path = None
-            after_path = None
-            evidence_files = []
-            
-            # Scan uploads directory for evidence files
-            if os.path.exists(uploads_dir):
-                for filename in os.listdir(uploads_dir):
-                    # Look for files that might belong to this evidence
-                    if (str(evidence_id) in filename or 
-                        filename.startswith(f"evidence_{evidence_id}") or
-                        filename.endswith(f"_{evidence_id}.jpg") or
-                        filename.endswith(f"_{evidence_id}.jpeg") or
-                        filename.endswith(f"_{evidence_id}.png")):
-                        
-                        full_path = os.path.join(uploads_dir, filename)
-                        evidence_files.append((filename, full_path))
-                        
-                        # Try to determine before/after based on filename
-                        filename_lower = filename.lower()
-                        if "before" in filename_lower:
-                            before_path = full_path
-                        elif "after" in filename_lower:
-                            after_path = full_path
-                        elif before_path is None:
-                            before_path = full_path
-                        elif after_path is None:
-                            after_path = full_path
-            
-            # If we didn't find files by evidence ID pattern, look for recent files
-            if not evidence_files and os.path.exists(uploads_dir):
-                all_files = []
-                for filename in os.listdir(uploads_dir):
-                    if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
-                        full_path = os.path.join(uploads_dir, filename)
-                        stat = os.stat(full_path)
-                        all_files.append((filename, full_path, stat.st_mtime))
-                
-                # Sort by modification time and take the 2 most recent
-                all_files.sort(key=lambda x: x[2], reverse=True)
-                
-                if len(all_files) >= 2:
-                    before_path = all_files[1][1]  # Second most recent
-                    after_path = all_files[0][1]   # Most recent
-                    evidence_files = [(all_files[1][0], before_path), (all_files[0][0], after_path)]
-            
-            if not before_path or not after_path:
+            before, after = media.get('before'), media.get('after')
+            if not before or not after:
                 return {
                     'success': False,
-                    'error': f'Could not find both before and after images for evidence {evidence_id}. Found files: {[f[0] for f in evidence_files]}',
-                    'available_files': [f[0] for f in evidence_files]
+                    'error': f"Could not find both before and after images for evidence {evidence_id}. Found files: {media.get('files', [])}",
+                    'available_files': media.get('files', [])
                 }
             
-            logger.info(f"Using images for evidence {evidence_id}: before={os.path.basename(before_path)}, after={os.path.basename(after_path)}")
+            before_path, after_path = before['path'], after['path']
+            logger.info(f"Using images for evidence {evidence_id}: before={before['name']}, after={after['name']}")
             
             # Perform comparison
             result = self.compare_images(before_path, after_path)
@@ -380,8 +366,10 @@ class EvidenceImageComparator:
             # Add file information to result
             if result.get('success'):
                 result['files_used'] = {
-                    'before_image': os.path.basename(before_path),
-                    'after_image': os.path.basename(after_path),
+                    'before_image': before['name'],
+                    'after_image': after['name'],
+                    'before_evidence_id': before['evidence_id'],
+                    'after_evidence_id': after['evidence_id'],
                     'evidence_id': evidence_id
                 }
             
@@ -0,0 +1,177 @@
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+import os
+
+from sqlalchemy.exc import IntegrityError
+
+from models.db_model import Base, EvidenceMedia, MRVData
+from services.upload_storage import UPLOAD_DIR
+
+logger = logging.getLogger(__name__)
+
+# The evidence each single-role evidence is compared with
+COMPLEMENTARY_ROLE = {"before": "after", "after": "before"}
+
+
+def media_roles(evidence_type: Optional[str], names: List[str]) -> List[str]:
+    """
+    Role of each file of an evidence, in upload order. A before/after pair
+    uploads the before image first, as the immediate pair analysis reads it;
+    general evidence is tagged from file names that say which one they are.
+    """
+    if evidence_type == "before_after_pair":
+        return ["before", "after"][:len(names)] + ["media"] * (len(names) - 2)
+    if evidence_type in COMPLEMENTARY_ROLE:
+        return [evidence_type] * len(names)
+    roles = []
+    for name in names:
+        lowered = (name or "").lower()
+        roles.append("before" if "before" in lowered else "after" if "after" in lowered else "media")
+    return roles
+
+
+class EvidenceMediaIndex:
+    """
+    Files of every evidence with their before/after roles (evidence_media),
+    so the images of an evidence are found by its id instead of by scanning
+    uploads/ for file names that mention it.
+
+    Rows are written in the upload's transaction. Evidence uploaded before
+    the index existed is indexed from MRVData.media_hashes the first time it
+    is looked up.
+    """
+
+    def __init__(self, session_factory, blob_store):
+        self.session_factory = session_factory
+        self.blob_store = blob_store
+        self._tables_ready = False
+
+    def record(self, db, evidence_id: int, evidence_type: Optional[str], media_hashes: Optional[Dict[str, Any]]):
+        """Index the files of a new evidence in the caller's session (committed with it)."""
+        self._ensure_tables()
+        for row in self._rows(evidence_id, evidence_type, media_hashes):
+            db.add(row)
+
+    def forget(self, db, evidence_ids: Iterable[int]):
+        """Drop the rows of deleted evidence in the caller's session."""
+        self._ensure_tables()
+        evidence_ids = list(evidence_ids)
+        if evidence_ids:
+            db.query(EvidenceMedia).filter(EvidenceMedia.evidence_id.in_(evidence_ids)).delete(synchronize_session=False)
+
+    def files(self, evidence_id: int) -> List[Dict[str, Any]]:
+        """Files of an evidence in upload order: [{'position', 'role', 'name', 'sha256', 'path'}]."""
+        self._ensure_tables()
+        db = self.session_factory()
+        try:
+            rows = self._query(db, evidence_id)
+            if not rows:
+                rows = self._backfill(db, evidence_id)
+            return [self._file(row) for row in rows]
+        finally:
+            db.close()
+
+    def comparison_files(self, evidence_id: int) -> Optional[Dict[str, Any]]:
+        """
+        The before and after image to compare for an evidence, or None if
+        the evidence doesn't exist: {'before', 'after', 'files'}, where
+        before/after are file dicts (with the 'evidence_id' they belong to)
+        or None, and 'files' names the evidence's own files.
+
+        A before/after pair is compared with itself; single-role evidence
+        with the latest evidence of the other role in its project.
+        """
+        self._ensure_tables()
+        db = self.session_factory()
+        try:
+            evidence = db.query(MRVData.id, MRVData.project_id, MRVData.evidence_type).filter(
+                MRVData.id == evidence_id
+            ).first()
+        finally:
+            db.close()
+        if evidence is None:
+            return None
+
+        files = self.files(evidence_id)
+        chosen = {role: self._first(files, role, evidence_id) for role in ("before", "after")}
+        if not chosen["before"] and not chosen["after"]:
+            # Untagged general evidence: upload order, as it was compared before
+            media = [dict(f, evidence_id=evidence_id) for f in files if f["role"] == "media"]
+            if len(media) >= 2:
+                chosen = {"before": media[0], "after": media[1]}
+
+        missing = [role for role, f in chosen.items() if f is None]
+        if len(missing) == 1 and evidence.evidence_type in COMPLEMENTARY_ROLE:
+            role = missing[0]
+            complement = self._latest_of_type(evidence.project_id, role)
+            if complement is not None:
+                chosen[role] = self._first(self.files(complement), role, complement)
+
+        return dict(chosen, files=[f["name"] for f in files])
+
+    def _latest_of_type(self, project_id: int, evidence_type: str) -> Optional[int]:
+        db = self.session_factory()
+        try:
+            return db.query(MRVData.id).filter(
+                MRVData.project_id == project_id,
+                MRVData.evidence_type == evidence_type
+            ).order_by(MRVData.timestamp.desc()).limit(1).scalar()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _first(files: List[Dict[str, Any]], role: str, evidence_id: int) -> Optional[Dict[str, Any]]:
+        for f in files:
+            if f["role"] == role:
+                return dict(f, evidence_id=evidence_id)
+        return None
+
+    def _query(self, db, evidence_id: int) -> List[EvidenceMedia]:
+        return db.query(EvidenceMedia).filter(EvidenceMedia.evidence_id == evidence_id).order_by(EvidenceMedia.position).all()
+
+    def _backfill(self, db, evidence_id: int) -> List[EvidenceMedia]:
+        evidence = db.query(MRVData.evidence_type, MRVData.media_hashes).filter(MRVData.id == evidence_id).first()
+        if evidence is None:
+            return []
+        rows = self._rows(evidence_id, evidence.evidence_type, evidence.media_hashes)
+        if not rows:
+            return []
+        try:
+            db.add_all(rows)
+            db.commit()
+        except IntegrityError:
+            # Indexed by a concurrent lookup
+            db.rollback()
+            return self._query(db, evidence_id)
+        logger.info(f"Indexed {len(rows)} files of evidence {evidence_id}")
+        return self._query(db, evidence_id)
+
+    @staticmethod
+    def _rows(evidence_id: int, evidence_type: Optional[str], media_hashes: Optional[Dict[str, Any]]) -> List[EvidenceMedia]:
+        if not isinstance(media_hashes, dict):
+            return []
+        blobs = media_hashes.get("blobs")
+        if blobs:
+            entries = [(blob["name"], blob["sha256"]) for blob in blobs]
+        else:
+            entries = [(name, None) for name in media_hashes.get("files", [])]
+        roles = media_roles(evidence_type, [name for name, _ in entries])
+        return [
+            EvidenceMedia(evidence_id=evidence_id, position=position, role=role, name=name, sha256=sha256)
+            for position, ((name, sha256), role) in enumerate(zip(entries, roles))
+        ]
+
+    def _file(self, row: EvidenceMedia) -> Dict[str, Any]:
+        # Files stored before the blob store live under uploads/<name>
+        path = self.blob_store.path_for(row.sha256) if row.sha256 else os.path.join(UPLOAD_DIR, row.name)
+        return {"position": row.position, "role": row.role, "name": row.name, "sha256": row.sha256, "path": path}
+
+    def _ensure_tables(self):
+        if self._tables_ready:
+            return
+        db = self.session_factory()
+        try:
+            Base.metadata.create_all(bind=db.get_bind(), tables=[EvidenceMedia.__table__])
+            self._tables_ready = True
+        finally:
+            db.close()
@@ -0,0 +1,128 @@
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Optional, Tuple
+import logging
+import os
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# OpenCV's FFmpeg backend seeks to the keyframe at or before (target - 16)
+# and decodes forward from there, so a seek costs that many frame decodes
+SEEK_BACKOFF_FRAMES = 16
+
+# Without keyframe positions, gaps longer than this are crossed with a seek
+# (x264's default maximum GOP of 250 frames plus the backoff, rounded up)
+SEEK_GAP_FRAMES = int(os.getenv("VIDEO_SEEK_GAP_FRAMES", "300"))
+
+# Sampled frames wider than this are scaled down right after decoding; 0 keeps full resolution
+FRAME_MAX_WIDTH = int(os.getenv("VIDEO_FRAME_MAX_WIDTH", "0"))
+
+
+def evenly_spaced(frame_count: int, count: int) -> List[int]:
+    """`count` frame indices spread over the video, first and last included."""
+    if count >= frame_count:
+        return list(range(frame_count))
+    return [int(index) for index in np.linspace(0, frame_count - 1, count, dtype=int)]
+
+
+class VideoFrameSampler:
+    """
+    Decodes selected frames of a video without seeking for every one.
+
+    Seeking in long-GOP video re-decodes from the previous keyframe, so
+    frames are read in order: the ones in between are skipped with grab(),
+    which decodes but leaves out the color conversion and copy of
+    retrieve(). Only when a gap between wanted frames costs more to decode
+    than a seek to its keyframe (the keyframe positions are read from the
+    container packets, without decoding) is the gap crossed with a seek.
+    """
+
+    def __init__(self, video_path: str, max_width: int = FRAME_MAX_WIDTH):
+        self.video_path = video_path
+        self.max_width = max_width
+        self.capture = cv2.VideoCapture(video_path)
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT)) if self.capture.isOpened() else 0
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) if self.capture.isOpened() else 0.0
+        self._keyframes: Optional[List[int]] = None
+
+        # Decoder work, for logs and benchmarks
+        self.grabbed = 0
+        self.retrieved = 0
+        self.seeks = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.capture.release()
+
+    def is_opened(self) -> bool:
+        return self.capture.isOpened()
+
+    def keyframes(self) -> List[int]:
+        """Indices of the keyframes, or [] if the backend can't report them."""
+        if self._keyframes is None:
+            self._keyframes = []
+            # Raw mode only demuxes packets; nothing is decoded
+            raw = cv2.VideoCapture(self.video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+            try:
+                index = 0
+                while raw.isOpened() and raw.grab():
+                    if raw.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME) > 0:
+                        self._keyframes.append(index)
+                    index += 1
+            except cv2.error as e:
+                logger.warning(f"Could not read keyframes of {self.video_path}: {str(e)}")
+                self._keyframes = []
+            finally:
+                raw.release()
+        return self._keyframes
+
+    def _should_seek(self, position: int, index: int) -> bool:
+        """Whether seeking to `index` decodes fewer frames than grabbing forward from `position`."""
+        gap = index - position
+        if gap <= SEEK_BACKOFF_FRAMES + 1:
+            return False
+        keyframes = self.keyframes()
+        if not keyframes:
+            return gap > SEEK_GAP_FRAMES
+        start = keyframes[max(bisect_right(keyframes, max(index - SEEK_BACKOFF_FRAMES, 0)) - 1, 0)]
+        return start > position and index - start < gap
+
+    def frames(self, frame_indices: Iterable[int]) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (index, RGB frame) for the wanted frames, in index order."""
+        wanted = sorted({int(index) for index in frame_indices if index >= 0})
+        position = 0  # Index of the frame the next grab() decodes
+        for index in wanted:
+            if self._should_seek(position, index):
+                self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+                self.seeks += 1
+                position = index
+            while position < index:
+                if not self.capture.grab():
+                    return
+                self.grabbed += 1
+                position += 1
+            if not self.capture.grab():
+                return
+            self.grabbed += 1
+            position += 1
+
+            ret, frame = self.capture.retrieve()
+            if not ret:
+                continue
+            self.retrieved += 1
+            yield index, self._to_rgb(frame)
+
+    def _to_rgb(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        if self.max_width and width > self.max_width:
+            # Scaled before the color conversion, which then runs on fewer pixels
+            size = (self.max_width, max(1, round(height * self.max_width / width)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -1,8 +1,9 @@
 import cv2
 import numpy as np
-from PIL import Image
-import io
 import logging
+from .analysis_cache import analysis_cache
+from .decoded_image import ImageInput, as_decoded
+from .image_pyramid import PYRAMID_LEVELS
 
 logger = logging.getLogger(__name__)
 
@@ -17,64 +18,75 @@ class GreennessAnalyzer:
         self.max_multiplier = 1.5
         self.neutral_multiplier = 1.0
     
-    def calculate_greenness_percentage(self, image_data: bytes) -> float:
+    # Bump when the green pixel detection changes (2: EXIF orientation applied)
+    ANALYSIS_VERSION = 2
+    
+    def calculate_greenness_percentage(self, image_data: ImageInput) -> float:
         """
         Calculate the percentage of green pixels in an image.
+        Results are cached by image content.
         
         Args:
-            image_data: Image bytes
+            image_data: Image bytes or a DecodedImage shared with other analyzers
             
         Returns:
             Percentage of green pixels (0-100)
         """
         try:
-            # Load image
-            image_pil = Image.open(io.BytesIO(image_data))
-            image_array = np.array(image_pil.convert('RGB'))
-            
-            # Resize if too large for performance
-            if image_array.shape[0] > 512 or image_array.shape[1] > 512:
-                image_pil_resized = image_pil.resize((512, 384), Image.Resampling.LANCZOS)
-                image_array = np.array(image_pil_resized.convert('RGB'))
-            
-            # Convert RGB to HSV for better green detection
-            hsv_image = cv2.cvtColor(image_array, cv2.COLOR_RGB2HSV)
-            
-            # Define green color range in HSV
-            # Green hue range: 35-85 (broader range to catch various green shades)
-            lower_green1 = np.array([35, 40, 40])   # Lower bound for green
-            upper_green1 = np.array([85, 255, 255]) # Upper bound for green
-            
-            # Also catch darker greens
-            lower_green2 = np.array([35, 25, 25])   # Darker green lower bound
-            upper_green2 = np.array([85, 255, 200]) # Darker green upper bound
-            
-            # Create masks for green detection
-            mask1 = cv2.inRange(hsv_image, lower_green1, upper_green1)
-            mask2 = cv2.inRange(hsv_image, lower_green2, upper_green2)
-            
-            # Combine masks
-            green_mask = cv2.bitwise_or(mask1, mask2)
-            
-            # Calculate percentage of green pixels
-            total_pixels = image_array.shape[0] * image_array.shape[1]
-            green_pixels = np.sum(green_mask > 0)
-            green_percentage = (green_pixels / total_pixels) * 100
-            
-            logger.info(f"Image greenness analysis: {green_percentage:.1f}% green pixels")
-            return green_percentage
-            
+            image = as_decoded(image_data)
+            return analysis_cache.get_or_compute(
+                'greenness', [image.content_hash], {'version': self.ANALYSIS_VERSION, 'pyramid_levels': PYRAMID_LEVELS},
+                lambda: self._calculate_greenness_percentage(image)
+            )
         except Exception as e:
+            # Not cached: an unreadable upload is retried on the next call
             logger.error(f"Error calculating greenness: {str(e)}")
             return 0.0
     
-    def calculate_green_progress_multiplier(self, before_image_data: bytes, after_image_data: bytes) -> dict:
+    def _calculate_greenness_percentage(self, image) -> float:
+        # Resize if too large for performance
+        view = image.view_within(512, (512, 384))
+        image_array = view.rgb
+        
+        # Convert RGB to HSV for better green detection
+        hsv_image = view.hsv
+        
+        green_mask = self.green_mask(hsv_image)
+        
+        # Calculate percentage of green pixels
+        total_pixels = image_array.shape[0] * image_array.shape[1]
+        green_pixels = cv2.countNonZero(green_mask)
+        green_percentage = (green_pixels / total_pixels) * 100
+        
+        logger.info(f"Image greenness analysis: {green_percentage:.1f}% green pixels")
+        return float(green_percentage)
+    
+    @staticmethod
+    def green_mask(hsv_image: np.ndarray) -> np.ndarray:
+        """0/255 mask of the green pixels of an HSV image."""
+        # Define green color range in HSV
+        # Green hue range: 35-85 (broader range to catch various green shades)
+        lower_green1 = np.array([35, 40, 40])   # Lower bound for green
+        upper_green1 = np.array([85, 255, 255]) # Upper bound for green
+        
+        # Also catch darker greens
+        lower_green2 = np.array([35, 25, 25])   # Darker green lower bound
+        upper_green2 = np.array([85, 255, 200]) # Darker green upper bound
+        
+        # Create masks for green detection
+        mask1 = cv2.inRange(hsv_image, lower_green1, upper_green1)
+        mask2 = cv2.inRange(hsv_image, lower_green2, upper_green2)
+        
+        # Combine masks
+        return cv2.bitwise_or(mask1, mask2)
+    
+    def calculate_green_progress_multiplier(self, before_image_data: ImageInput, after_image_data: ImageInput) -> dict:
         """
         Calculate the Green Progress multiplier by comparing before and after images.
         
         Args:
-            before_image_data: Before image bytes
-            after_image_data: After image bytes
+            before_image_data: Before image bytes or DecodedImage
+            after_image_data: After image bytes or DecodedImage
             
         Returns:
             Dictionary with multiplier and analysis details
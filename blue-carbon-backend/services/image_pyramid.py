@@ -0,0 +1,96 @@
+from typing import List, Optional, Tuple
+import logging
+import os
+import uuid
+
+import cv2
+import numpy as np
+
+from .analysis_cache import ANALYSIS_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Downscaled copies of uploaded images are derived data, like the analysis results
+PYRAMID_DIR = os.getenv("PYRAMID_DIR", os.path.join(ANALYSIS_CACHE_DIR, "pyramids"))
+
+# Long side of every level, smallest first; only levels smaller than the image are stored
+PYRAMID_LEVELS = (256, 512, 1024)
+
+# Bump when the pixels of a level change (2: levels are upright, by EXIF orientation)
+PYRAMID_VERSION = 2
+
+# Previews are addressed by evidence file, not by content, so they are revalidated daily
+PREVIEW_CACHE_CONTROL = "public, max-age=86400"
+
+
+def level_size(width: int, height: int, level: int) -> Tuple[int, int]:
+    """(width, height) of an image scaled so its long side is `level`, keeping the aspect ratio."""
+    scale = level / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def levels_for(width: int, height: int) -> List[int]:
+    """Pyramid levels of an image of this size."""
+    return [level for level in PYRAMID_LEVELS if level < max(width, height)]
+
+
+class ImagePyramidStore:
+    """
+    Multi-resolution copies of uploaded images, built once per upload in the
+    background so analyzers and previews start from the nearest level
+    instead of decoding and resampling the full original every time.
+
+    Levels are stored under the content hash of the original (the blob
+    store's file name), as lossless PNG: a stored level holds exactly the
+    pixels DecodedImage.level computes, so analysis results don't depend on
+    whether the pyramid was built yet.
+    """
+
+    def __init__(self, root: str = PYRAMID_DIR):
+        self.root = root
+
+    def path(self, content_hash: str, level: int) -> str:
+        return os.path.join(self.root, f"v{PYRAMID_VERSION}", content_hash[:2], content_hash, f"{level}.png")
+
+    def stored_levels(self, content_hash: str) -> List[int]:
+        return [level for level in PYRAMID_LEVELS if os.path.exists(self.path(content_hash, level))]
+
+    def load(self, content_hash: str, level: int) -> Optional[np.ndarray]:
+        """RGB array of a stored level, or None."""
+        path = self.path(content_hash, level)
+        if not os.path.exists(path):
+            return None
+        bgr = cv2.imread(path, cv2.IMREAD_COLOR)
+        if bgr is None:
+            logger.warning(f"Unreadable pyramid level {path}")
+            return None
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+
+    def save(self, content_hash: str, level: int, rgb: np.ndarray):
+        path = self.path(content_hash, level)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        ok, encoded = cv2.imencode(".png", cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+        if not ok:
+            raise ValueError(f"Could not encode pyramid level {level} of {content_hash}")
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(encoded.tobytes())
+        os.replace(tmp_path, path)
+
+    def build(self, image) -> List[int]:
+        """Store the missing levels of a DecodedImage; returns all its levels."""
+        width, height = image.size
+        levels = levels_for(width, height)
+        for level in levels:
+            if not os.path.exists(self.path(image.content_hash, level)):
+                self.save(image.content_hash, level, image.level(level).rgb)
+        return levels
+
+    def build_file(self, path: str) -> List[int]:
+        """Build the pyramid of an image file (see build)."""
+        from .decoded_image import DecodedImage
+        return self.build(DecodedImage.from_path(path))
+
+
+# Read by every DecodedImage, written by the upload's pyramid job
+pyramid_store = ImagePyramidStore()
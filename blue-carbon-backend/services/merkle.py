@@ -0,0 +1,81 @@
+from typing import Dict, List, Union
+import hashlib
+
+# Leaves and internal nodes are hashed with different prefixes so an internal
+# node can never be passed off as a leaf (second-preimage protection)
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+HashLike = Union[bytes, str]
+
+
+def _to_bytes(value: HashLike) -> bytes:
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    return value
+
+
+def hash_leaf(evidence_hash: HashLike) -> bytes:
+    return hashlib.sha256(LEAF_PREFIX + _to_bytes(evidence_hash)).digest()
+
+
+def hash_node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_levels(evidence_hashes: List[HashLike]) -> List[List[bytes]]:
+    """
+    All tree levels, leaves first. An odd node at the end of a level is
+    paired with itself.
+    """
+    if not evidence_hashes:
+        raise ValueError("Cannot build a Merkle tree without leaves")
+
+    levels = [[hash_leaf(h) for h in evidence_hashes]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        levels.append([
+            hash_node(level[i], level[i + 1] if i + 1 < len(level) else level[i])
+            for i in range(0, len(level), 2)
+        ])
+    return levels
+
+
+def merkle_root(evidence_hashes: List[HashLike]) -> bytes:
+    return build_levels(evidence_hashes)[-1][0]
+
+
+def proofs_from_levels(levels: List[List[bytes]]) -> List[List[Dict[str, str]]]:
+    """Inclusion proof for every leaf: the sibling hash and its side at each level."""
+    proofs = []
+    for index in range(len(levels[0])):
+        proof = []
+        position = index
+        for level in levels[:-1]:
+            sibling = position ^ 1
+            if sibling >= len(level):
+                sibling = position
+            proof.append({
+                "position": "right" if sibling >= position else "left",
+                "hash": "0x" + level[sibling].hex()
+            })
+            position //= 2
+        proofs.append(proof)
+    return proofs
+
+
+def verify_proof(evidence_hash: HashLike, proof: List[Dict[str, str]], root: HashLike) -> bool:
+    """Recompute the root from a leaf and its proof and compare it with `root`."""
+    try:
+        node = hash_leaf(evidence_hash)
+        for step in proof:
+            sibling = _to_bytes(step["hash"])
+            if step["position"] == "left":
+                node = hash_node(sibling, node)
+            elif step["position"] == "right":
+                node = hash_node(node, sibling)
+            else:
+                return False
+        return node == _to_bytes(root)
+    except (KeyError, TypeError, ValueError):
+        return False
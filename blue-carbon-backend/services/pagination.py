@@ -0,0 +1,63 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+from sqlalchemy.orm import Query
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on `limit` for every paginated listing endpoint
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    """
+    Parse a comma-separated `fields` query parameter.
+    Returns None when no projection was requested (all fields are returned).
+    """
+    if fields is None:
+        return None
+    selected = {name.strip() for name in fields.split(",") if name.strip()}
+    return selected or None
+
+
+def project_fields(item: Dict[str, Any], selected: Optional[Set[str]]) -> Dict[str, Any]:
+    """Keep only the selected top-level keys of a response item."""
+    if selected is None:
+        return item
+    return {key: value for key, value in item.items() if key in selected}
+
+
+def keyset_page(query: Query, key_column, limit: int, after: Optional[int] = None) -> Tuple[List[Any], Optional[int]]:
+    """
+    Fetch one page of `query` ordered by `key_column`, starting after the
+    `after` cursor. Uses `WHERE key > after ORDER BY key LIMIT n` so every page
+    costs the same regardless of how deep into the listing the client is.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if after is not None:
+        query = query.filter(key_column > after)
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.order_by(key_column).limit(limit + 1).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = getattr(rows[-1], key_column.key)
+    else:
+        next_cursor = None
+
+    return rows, next_cursor
+
+
+def page_response(items: Iterable[Dict[str, Any]], next_cursor: Optional[int], limit: int) -> Dict[str, Any]:
+    """Standard envelope returned by paginated listing endpoints."""
+    items = list(items)
+    return {
+        "items": items,
+        "count": len(items),
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
+    }
@@ -0,0 +1,233 @@
+from functools import lru_cache
+from itertools import combinations
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import logging
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from models.db_model import Base, ImageFingerprint
+from services.decoded_image import DecodedImage
+
+logger = logging.getLogger(__name__)
+
+# Uploads whose dHash is within this many bits of a stored image (of 64) are near-duplicates...
+NEAR_DUPLICATE_DISTANCE = int(os.getenv("NEAR_DUPLICATE_DISTANCE", "6"))
+# ...if their pHash agrees too, which rules out different scenes with similar gradients
+PHASH_CONFIRM_DISTANCE = int(os.getenv("PHASH_CONFIRM_DISTANCE", "10"))
+
+HASH_BITS = 64
+CHUNK_BITS = 16
+CHUNKS = HASH_BITS // CHUNK_BITS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+def _bits(mask: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(mask.flatten()).tobytes(), "big")
+
+
+def dhash(image: DecodedImage) -> int:
+    """Difference hash: whether each pixel of a 9x8 grayscale thumbnail is brighter than its left neighbour."""
+    gray = image.view((9, 8)).gray.astype(np.int16)
+    return _bits(gray[:, 1:] > gray[:, :-1])
+
+
+def phash(image: DecodedImage) -> int:
+    """DCT hash: the lowest 8x8 frequencies of a 32x32 grayscale thumbnail against their median."""
+    gray = image.view((32, 32)).gray.astype(np.float32)
+    low = cv2.dct(gray)[:8, :8]
+    return _bits(low > np.median(low.flatten()[1:]))
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def fingerprint(image: DecodedImage) -> Dict[str, str]:
+    """Both hashes of an image as 16-digit hex strings."""
+    return {"dhash": f"{dhash(image):016x}", "phash": f"{phash(image):016x}"}
+
+
+def fingerprint_file(path: str) -> Dict[str, str]:
+    return fingerprint(DecodedImage.from_path(path))
+
+
+def _chunks(value: int) -> List[int]:
+    return [(value >> (CHUNK_BITS * i)) & CHUNK_MASK for i in range(CHUNKS)]
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(radius: int) -> Tuple[int, ...]:
+    """Every CHUNK_BITS-bit mask with at most `radius` bits set."""
+    return tuple(
+        sum(1 << bit for bit in bits)
+        for count in range(radius + 1)
+        for bits in combinations(range(CHUNK_BITS), count)
+    )
+
+
+class MultiIndexHashTable:
+    """
+    Hamming-distance search over 64-bit hashes by multi-index hashing.
+
+    Every hash is split into four 16-bit chunks, each with its own table of
+    exact chunk values. Two hashes within distance r differ by at most
+    r // 4 bits in one of their chunks (pigeonhole), so a search only probes
+    the chunk values that close to the query's and checks the handful of
+    hashes found there, instead of comparing against every stored hash.
+    """
+
+    def __init__(self):
+        self._tables: List[Dict[int, Set[int]]] = [{} for _ in range(CHUNKS)]
+        self._hashes: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, key: int, value: int):
+        self.remove(key)
+        self._hashes[key] = value
+        for table, chunk in zip(self._tables, _chunks(value)):
+            table.setdefault(chunk, set()).add(key)
+
+    def remove(self, key: int):
+        value = self._hashes.pop(key, None)
+        if value is None:
+            return
+        for table, chunk in zip(self._tables, _chunks(value)):
+            bucket = table[chunk]
+            bucket.discard(key)
+            if not bucket:
+                del table[chunk]
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, int]]:
+        """(key, distance) of every stored hash within `radius` bits of `value`, closest first."""
+        masks = _flip_masks(radius // CHUNKS)
+        seen: Set[int] = set()
+        found = []
+        for table, chunk in zip(self._tables, _chunks(value)):
+            for mask in masks:
+                for key in table.get(chunk ^ mask, ()):
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    distance = hamming(value, self._hashes[key])
+                    if distance <= radius:
+                        found.append((key, distance))
+        return sorted(found, key=lambda item: (item[1], item[0]))
+
+
+class NearDuplicateIndex:
+    """
+    Perceptual hashes of every evidence image (image_fingerprints), searched
+    in memory so an upload is checked against all stored evidence before it
+    is analysed.
+
+    The table is the source of truth: rows are written in the upload's
+    transaction, and each process loads rows it hasn't seen (by id) before
+    searching. Matches are checked against the table, so evidence deleted by
+    another process is dropped from memory when it turns up.
+    """
+
+    def __init__(self, session_factory, max_distance: int = NEAR_DUPLICATE_DISTANCE,
+                 phash_distance: int = PHASH_CONFIRM_DISTANCE):
+        self.session_factory = session_factory
+        self.max_distance = max_distance
+        self.phash_distance = phash_distance
+        self._table = MultiIndexHashTable()
+        self._entries: Dict[int, Tuple[int, int, str, int]] = {}  # row id -> (evidence id, position, name, pHash)
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()  # One loader at a time, so concurrent searches don't each read the table
+        self._tables_ready = False
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def record(self, db, evidence_id: int, fingerprints: Iterable[Dict[str, Any]]):
+        """Store the fingerprints of a new evidence's images in the caller's session (committed with it)."""
+        self._ensure_tables()
+        for f in fingerprints:
+            db.add(ImageFingerprint(evidence_id=evidence_id, position=f["position"], name=f["name"],
+                                    sha256=f.get("sha256"), dhash=f["dhash"], phash=f["phash"]))
+
+    def forget(self, db, evidence_ids: Iterable[int]):
+        """Drop the fingerprints of deleted evidence in the caller's session."""
+        self._ensure_tables()
+        evidence_ids = list(evidence_ids)
+        if evidence_ids:
+            db.query(ImageFingerprint).filter(ImageFingerprint.evidence_id.in_(evidence_ids)).delete(synchronize_session=False)
+
+    def fingerprints(self, evidence_id: int) -> List[Dict[str, Any]]:
+        """Stored fingerprints of an evidence's images, in file order."""
+        self._ensure_tables()
+        db = self.session_factory()
+        try:
+            rows = db.query(ImageFingerprint).filter(ImageFingerprint.evidence_id == evidence_id).order_by(ImageFingerprint.position).all()
+            return [{"position": row.position, "name": row.name, "sha256": row.sha256, "dhash": row.dhash, "phash": row.phash}
+                    for row in rows]
+        finally:
+            db.close()
+
+    def find(self, dhash_hex: str, phash_hex: str, exclude_evidence_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Stored images that are near-duplicates of the one with these hashes, closest first."""
+        self._sync()
+        query_phash = int(phash_hex, 16)
+        with self._lock:
+            candidates = [(key, distance, self._entries[key]) for key, distance in self._table.search(int(dhash_hex, 16), self.max_distance)]
+
+        matches = []
+        for key, distance, (evidence_id, position, name, stored_phash) in candidates:
+            phash_distance = hamming(query_phash, stored_phash)
+            if evidence_id == exclude_evidence_id or phash_distance > self.phash_distance:
+                continue
+            matches.append({"row_id": key, "evidence_id": evidence_id, "position": position, "name": name,
+                            "distance": distance, "phash_distance": phash_distance})
+        if not matches:
+            return []
+
+        # Rows deleted by another process since they were loaded
+        db = self.session_factory()
+        try:
+            ids = [match["row_id"] for match in matches]
+            live = {row_id for (row_id,) in db.query(ImageFingerprint.id).filter(ImageFingerprint.id.in_(ids))}
+        finally:
+            db.close()
+        with self._lock:
+            for row_id in set(ids) - live:
+                self._table.remove(row_id)
+                self._entries.pop(row_id, None)
+        return [{key: value for key, value in match.items() if key != "row_id"} for match in matches if match["row_id"] in live]
+
+    def _sync(self):
+        self._ensure_tables()
+        with self._sync_lock:
+            db = self.session_factory()
+            try:
+                rows = db.query(ImageFingerprint.id, ImageFingerprint.evidence_id, ImageFingerprint.position,
+                                ImageFingerprint.name, ImageFingerprint.dhash, ImageFingerprint.phash).filter(
+                    ImageFingerprint.id > self._last_id
+                ).order_by(ImageFingerprint.id).all()
+            finally:
+                db.close()
+            if not rows:
+                return
+            with self._lock:
+                for row in rows:
+                    self._table.add(row.id, int(row.dhash, 16))
+                    self._entries[row.id] = (row.evidence_id, row.position, row.name, int(row.phash, 16))
+                    self._last_id = row.id
+        if len(rows) > 1000:
+            logger.info(f"Loaded {len(rows)} image fingerprints ({len(self._table)} indexed)")
+
+    def _ensure_tables(self):
+        if self._tables_ready:
+            return
+        db = self.session_factory()
+        try:
+            Base.metadata.create_all(bind=db.get_bind(), tables=[ImageFingerprint.__table__])
+            self._tables_ready = True
+        finally:
+            db.close()
@@ -0,0 +1,96 @@
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import datetime
+import logging
+
+from sqlalchemy import func
+from sqlalchemy.orm import Query, Session, load_only
+
+from models.db_model import MRVData, ProjectData
+
+logger = logging.getLogger(__name__)
+
+# SQLite builds older than 3.32 cap a statement at 999 bound parameters,
+# so very large project lists are split into a handful of IN (...) queries.
+IN_CLAUSE_CHUNK_SIZE = 900
+
+
+def _chunked(values: List[int], size: int) -> Iterable[List[int]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def load_evidences_by_project(db: Session, project_ids: Iterable[int],
+                              columns: Optional[Sequence] = None) -> Dict[int, List[MRVData]]:
+    """
+    Load the evidence rows for many projects with one grouped IN (...) query
+    (per IN_CLAUSE_CHUNK_SIZE ids) instead of one query per project.
+
+    `columns` restricts which MRVData columns are loaded, so listings don't
+    pay for deserializing large JSON columns such as ai_analysis_results.
+
+    Returns a mapping of project_id -> evidence rows ordered by evidence id.
+    """
+    unique_ids = sorted({pid for pid in project_ids if pid is not None})
+    evidences_by_project: Dict[int, List[MRVData]] = defaultdict(list)
+
+    for chunk in _chunked(unique_ids, IN_CLAUSE_CHUNK_SIZE):
+        query = db.query(MRVData)
+        if columns:
+            query = query.options(load_only(*columns))
+        rows = query.filter(
+            MRVData.project_id.in_(chunk)
+        ).order_by(MRVData.project_id, MRVData.id).all()
+
+        for row in rows:
+            evidences_by_project[row.project_id].append(row)
+
+    return evidences_by_project
+
+
+def load_latest_evidence_timestamps(db: Session, project_ids: Iterable[int]) -> Dict[int, datetime.datetime]:
+    """Latest evidence timestamp per project, using one grouped MAX() query per chunk."""
+    unique_ids = sorted({pid for pid in project_ids if pid is not None})
+    latest: Dict[int, datetime.datetime] = {}
+
+    for chunk in _chunked(unique_ids, IN_CLAUSE_CHUNK_SIZE):
+        rows = db.query(MRVData.project_id, func.max(MRVData.timestamp)).filter(
+            MRVData.project_id.in_(chunk)
+        ).group_by(MRVData.project_id).all()
+        latest.update({project_id: timestamp for project_id, timestamp in rows if timestamp is not None})
+
+    return latest
+
+
+def attach_evidences(
+    db: Session,
+    projects: List[ProjectData],
+    evidence_key: Callable[[ProjectData], int] = lambda project: project.id,
+    evidence_columns: Optional[Sequence] = None
+) -> List[Tuple[ProjectData, List[MRVData]]]:
+    """
+    Pair already-loaded projects (e.g. one page of a listing) with their evidence rows.
+
+    `evidence_key` picks the value MRVData.project_id is matched against, since
+    the legacy /projects listing keys evidence by blockchain id while
+    /projects/my keys it by the database id.
+    """
+    evidences_by_project = load_evidences_by_project(
+        db, (evidence_key(project) for project in projects), columns=evidence_columns
+    )
+
+    logger.debug(f"Loaded {len(projects)} projects with evidence for {len(evidences_by_project)} of them")
+    return [
+        (project, evidences_by_project.get(evidence_key(project), []))
+        for project in projects
+    ]
+
+
+def load_projects_with_evidences(
+    db: Session,
+    project_query: Query,
+    evidence_key: Callable[[ProjectData], int] = lambda project: project.id,
+    evidence_columns: Optional[Sequence] = None
+) -> List[Tuple[ProjectData, List[MRVData]]]:
+    """Run a ProjectData query and attach each project's evidence rows."""
+    return attach_evidences(db, project_query.all(), evidence_key, evidence_columns)
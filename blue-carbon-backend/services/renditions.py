@@ -0,0 +1,132 @@
+from typing import Dict, Optional, Tuple
+import hashlib
+import logging
+import os
+import re
+import threading
+import uuid
+
+import cv2
+import numpy as np
+
+from .analysis_cache import ANALYSIS_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Rendered images are derived data, kept next to the analysis results they belong to
+RENDITION_DIR = os.getenv("RENDITION_DIR", os.path.join(ANALYSIS_CACHE_DIR, "renditions"))
+RENDITION_URL_PREFIX = "/renditions"
+
+# Widths rendered besides the full size (only those smaller than the image)
+RENDITION_WIDTHS = (320, 1024)
+
+# (extension, media type, OpenCV encoder parameters)
+RENDITION_FORMATS = {
+    "jpeg": ("jpg", "image/jpeg", [cv2.IMWRITE_JPEG_QUALITY, 85]),
+    "webp": ("webp", "image/webp", [cv2.IMWRITE_WEBP_QUALITY, 80])
+}
+
+# Rendition ids are analysis cache keys, which cover everything the pixels
+# depend on, so the file behind a URL never changes
+RENDITION_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+RENDITION_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+RENDITION_NAME_PATTERN = re.compile(r"^(?P<kind>[a-z_]+)-(?P<size>full|\d+w)\.(?P<ext>jpg|webp)$")
+
+
+class RenditionStore:
+    """
+    Rendered analysis images (highlighted overlays, side-by-side comparisons)
+    stored once as JPEG and WebP at several widths, and served as files
+    instead of being inlined as base64 PNGs in every response.
+
+    The renditions of an analysis live under its id, the analysis cache key
+    of the result that references them. Files are written once (via a
+    temporary file) and never modified, so their URLs can be cached forever
+    and their ETags are the hash of their bytes.
+    """
+
+    def __init__(self, root: str = RENDITION_DIR):
+        self.root = root
+        self._etags: Dict[Tuple[str, int, int], str] = {}
+        self._lock = threading.Lock()
+
+    def _dir(self, rid: str) -> str:
+        return os.path.join(self.root, rid[:2], rid)
+
+    def save(self, rid: str, images: Dict[str, np.ndarray]) -> Dict[str, Dict]:
+        """
+        Encode and store every rendition of the named BGR images. Returns,
+        per image, its size and the URLs of its renditions:
+        {kind: {'width', 'height', 'urls': {size: {format: url}}}}.
+        """
+        directory = self._dir(rid)
+        os.makedirs(directory, exist_ok=True)
+        manifest = {}
+        for kind, image in images.items():
+            height, width = image.shape[:2]
+            urls = {}
+            for size, scaled in self._sizes(image):
+                urls[size] = {}
+                for fmt, (ext, _, params) in RENDITION_FORMATS.items():
+                    name = f"{kind}-{size}.{ext}"
+                    path = os.path.join(directory, name)
+                    if not os.path.exists(path):
+                        ok, encoded = cv2.imencode(f".{ext}", scaled, params)
+                        if not ok:
+                            raise ValueError(f"Could not encode {name}")
+                        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+                        with open(tmp_path, "wb") as fh:
+                            fh.write(encoded.tobytes())
+                        os.replace(tmp_path, path)
+                    urls[size][fmt] = f"{RENDITION_URL_PREFIX}/{rid}/{name}"
+            manifest[kind] = {"width": width, "height": height, "urls": urls}
+        return manifest
+
+    def _sizes(self, image: np.ndarray):
+        height, width = image.shape[:2]
+        for target in RENDITION_WIDTHS:
+            if target < width:
+                yield f"{target}w", cv2.resize(image, (target, max(1, round(height * target / width))),
+                                               interpolation=cv2.INTER_AREA)
+        yield "full", image
+
+    def has(self, manifest: Dict[str, Dict]) -> bool:
+        """Whether every rendition a (possibly cached) manifest points to is still stored."""
+        for entry in manifest.values():
+            for formats in entry["urls"].values():
+                for url in formats.values():
+                    rid, name = url.rsplit("/", 2)[-2:]
+                    if not os.path.exists(os.path.join(self._dir(rid), name)):
+                        return False
+        return True
+
+    def locate(self, rid: str, name: str) -> Optional[Tuple[str, str, str]]:
+        """(path, media type, strong ETag) of a stored rendition, or None."""
+        match = RENDITION_NAME_PATTERN.match(name)
+        if not RENDITION_ID_PATTERN.match(rid) or not match:
+            return None
+        path = os.path.join(self._dir(rid), name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        media_type = next(media for ext, media, _ in RENDITION_FORMATS.values() if ext == match.group("ext"))
+        return path, media_type, self._etag(path, stat)
+
+    def _etag(self, path: str, stat: os.stat_result) -> str:
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            etag = self._etags.get(key)
+        if etag is None:
+            with open(path, "rb") as fh:
+                etag = f'"{hashlib.sha256(fh.read()).hexdigest()[:32]}"'
+            with self._lock:
+                if len(self._etags) > 4096:
+                    self._etags.clear()
+                self._etags[key] = etag
+        return etag
+
+
+# Shared by the comparator (which writes renditions) and the endpoint serving them
+rendition_store = RenditionStore()
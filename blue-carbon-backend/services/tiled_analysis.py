@@ -0,0 +1,312 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+import mmap
+import os
+
+import cv2
+import numpy as np
+from PIL import TiffImagePlugin
+
+from .ai_verification import NDVIAnalyzer
+from .analysis_cache import analysis_cache, file_content_hash
+from .decoded_image import DecodedImage, ImageView
+from .greenness_analyzer import GreennessAnalyzer
+
+try:
+    import rasterio
+    from rasterio.windows import Window
+except ImportError:  # Only needed for compressed GeoTIFFs; uncompressed TIFFs are memory-mapped
+    rasterio = None
+
+logger = logging.getLogger(__name__)
+
+# Side of the square windows analysed at a time; a tile costs roughly
+# 40 bytes per pixel of working memory (≈170 MB at 2048)
+TILE_SIZE = int(os.getenv("TILED_ANALYSIS_TILE_SIZE", "2048"))
+
+
+class UnsupportedRasterError(ValueError):
+    pass
+
+
+class RasterReader:
+    """Reads RGB windows of an image without decoding the whole image."""
+
+    name = "raster"
+    width = 0
+    height = 0
+
+    def read_window(self, x: int, y: int, width: int, height: int) -> np.ndarray:
+        """(height, width, 3) uint8 RGB pixels of the window at (x, y)."""
+        raise NotImplementedError
+
+    def release(self):
+        """Drop file pages kept resident by earlier reads."""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MemmapTiffReader(RasterReader):
+    """
+    Uncompressed, chunky (RGB interleaved) TIFF / BigTIFF files, strip or tile
+    organised. Pillow only parses the header; pixels are read through a
+    memory map, so a window costs just the pages it touches.
+    """
+
+    name = "memmap_tiff"
+    BANDS = {'RGB': 3, 'RGBA': 4, 'RGBX': 4}
+
+    def __init__(self, path: str):
+        with open(path, "rb") as fh:
+            try:
+                # The constructor, unlike Image.open, has no decompression bomb
+                # check; nothing is decoded here
+                image = TiffImagePlugin.TiffImageFile(fh)
+            except SyntaxError as e:
+                raise UnsupportedRasterError(f"Not a TIFF file: {str(e)}")
+            self.width, self.height = image.size
+            tiles = list(image.tile)
+
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            self._file.close()
+            raise UnsupportedRasterError("Empty TIFF file")
+        self._data = np.frombuffer(self._mmap, dtype=np.uint8)
+
+        self._chunks = []
+        try:
+            for codec, extents, offset, args in tiles:
+                if codec != "raw":
+                    raise UnsupportedRasterError(f"Compressed TIFF ({codec}) cannot be memory-mapped")
+                rawmode, stride, ystep = args[0], args[1], args[2] if len(args) > 2 else 1
+                if rawmode not in self.BANDS or ystep != 1:
+                    raise UnsupportedRasterError(f"Unsupported TIFF layout: {rawmode}, ystep {ystep}")
+                x0, y0, x1, y1 = extents
+                bands = self.BANDS[rawmode]
+                row_bytes = stride or (x1 - x0) * bands
+                if offset + row_bytes * (y1 - y0) > self._data.size:
+                    raise UnsupportedRasterError("Truncated TIFF file")
+                self._chunks.append((x0, y0, x1, y1, offset, row_bytes, bands))
+        except UnsupportedRasterError:
+            self.close()
+            raise
+        self._extents = np.array([chunk[:4] for chunk in self._chunks]).reshape(-1, 4)
+
+    def read_window(self, x: int, y: int, width: int, height: int) -> np.ndarray:
+        window = np.empty((height, width, 3), dtype=np.uint8)
+        x1, y1 = x + width, y + height
+        e = self._extents
+        hits = np.nonzero((e[:, 0] < x1) & (e[:, 2] > x) & (e[:, 1] < y1) & (e[:, 3] > y))[0]
+        for index in hits:
+            cx0, cy0, cx1, cy1, offset, row_bytes, bands = self._chunks[index]
+            rows = self._data[offset:offset + row_bytes * (cy1 - cy0)].reshape(cy1 - cy0, row_bytes)
+            chunk = rows[:, :(cx1 - cx0) * bands].reshape(cy1 - cy0, cx1 - cx0, bands)
+            ix0, iy0, ix1, iy1 = max(x, cx0), max(y, cy0), min(x1, cx1), min(y1, cy1)
+            window[iy0 - y:iy1 - y, ix0 - x:ix1 - x] = chunk[iy0 - cy0:iy1 - cy0, ix0 - cx0:ix1 - cx0, :3]
+        return window
+
+    def release(self):
+        if hasattr(mmap, "MADV_DONTNEED"):
+            self._mmap.madvise(mmap.MADV_DONTNEED)
+
+    def close(self):
+        self._data = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+            self._file.close()
+
+
+class RasterioReader(RasterReader):
+    """Any 8-bit RGB raster GDAL can read (compressed / tiled GeoTIFFs), read window by window."""
+
+    name = "rasterio"
+
+    def __init__(self, path: str):
+        self._dataset = rasterio.open(path)
+        if self._dataset.count < 3 or any(dtype != "uint8" for dtype in self._dataset.dtypes[:3]):
+            self._dataset.close()
+            raise UnsupportedRasterError("Tiled analysis needs an 8-bit RGB raster")
+        self.width, self.height = self._dataset.width, self._dataset.height
+
+    def read_window(self, x: int, y: int, width: int, height: int) -> np.ndarray:
+        bands = self._dataset.read(indexes=[1, 2, 3], window=Window(x, y, width, height))
+        return np.ascontiguousarray(np.moveaxis(bands, 0, -1))
+
+    def close(self):
+        self._dataset.close()
+
+
+class ArrayReader(RasterReader):
+    """Windows of an already decoded image (formats that cannot be read window by window)."""
+
+    name = "decoded"
+
+    def __init__(self, rgb: np.ndarray):
+        self._rgb = rgb
+        self.height, self.width = rgb.shape[:2]
+
+    def read_window(self, x: int, y: int, width: int, height: int) -> np.ndarray:
+        return self._rgb[y:y + height, x:x + width]
+
+
+def open_raster(path: str) -> RasterReader:
+    """
+    The most memory-efficient reader for the file: a memory map for
+    uncompressed TIFFs, rasterio for other GeoTIFFs when it is installed,
+    otherwise a full decode (bounded by Pillow's decompression bomb limit).
+    """
+    try:
+        return MemmapTiffReader(path)
+    except UnsupportedRasterError as e:
+        reason = str(e)
+
+    if rasterio is not None:
+        try:
+            return RasterioReader(path)
+        except (rasterio.errors.RasterioIOError, UnsupportedRasterError) as e:
+            reason = str(e)
+
+    logger.warning(f"Decoding {os.path.basename(path)} whole for tiled analysis ({reason})")
+    return ArrayReader(DecodedImage.from_path(path).full.rgb)
+
+
+class TiledImageAnalyzer:
+    """
+    NDVI, vegetation, composition and greenness analysis of very large images
+    (orthomosaics) at native resolution with bounded memory.
+
+    The image is read one tile at a time and every statistic is kept as
+    counts and moments that merge exactly, so the result equals analysing
+    the whole image at once. Texture uses a halo around each tile so the
+    Laplacian sees the real neighbours across tile borders.
+    """
+
+    # Bump when the tiled analysis changes in a way the analyzer parameters don't capture
+    ANALYSIS_VERSION = 1
+
+    def __init__(self, ndvi_analyzer: Optional[NDVIAnalyzer] = None, tile_size: int = TILE_SIZE):
+        self.ndvi_analyzer = ndvi_analyzer or NDVIAnalyzer()
+        self.tile_size = tile_size
+
+    def cache_params(self) -> Dict:
+        return {
+            'version': self.ANALYSIS_VERSION,
+            'greenness_version': GreennessAnalyzer.ANALYSIS_VERSION,
+            'ndvi': self.ndvi_analyzer.cache_params()
+        }
+
+    def analyze_file(self, path: str, filename: Optional[str] = None) -> Dict:
+        """Tiled analysis of an image file; results are cached by file content."""
+        filename = filename or os.path.basename(path)
+        try:
+            content_hash = file_content_hash(path)
+        except OSError as e:
+            logger.error(f"Image file not readable: {str(e)}")
+            return {'filename': filename, 'error': 'Failed to read image file', 'success': False}
+
+        result = analysis_cache.get_or_compute(
+            'ndvi_tiled', [content_hash], self.cache_params(),
+            lambda: self._analyze_file(path, filename)
+        )
+        return self.ndvi_analyzer.stamp_result(result, filename)
+
+    def _analyze_file(self, path: str, filename: str) -> Dict:
+        try:
+            with open_raster(path) as reader:
+                return self.analyze_raster(reader, filename)
+        except Exception as e:
+            logger.error(f"Error in tiled analysis of {filename}: {str(e)}")
+            return {'filename': filename, 'error': str(e), 'success': False}
+
+    def tile_windows(self, width: int, height: int) -> Iterator[Tuple[int, int, int, int]]:
+        """(x, y, width, height) of the tiles covering the image, row by row."""
+        for y in range(0, height, self.tile_size):
+            for x in range(0, width, self.tile_size):
+                yield x, y, min(self.tile_size, width - x), min(self.tile_size, height - y)
+
+    def analyze_raster(self, reader: RasterReader, filename: str = "orthomosaic") -> Dict:
+        analyzer = self.ndvi_analyzer
+        width, height = reader.width, reader.height
+        halo = analyzer.TEXTURE_KERNEL_SIZE // 2
+        logger.info(f"Tiled analysis of {filename}: {width}x{height}, {self.tile_size}px tiles ({reader.name})")
+
+        ndvi_parts: List[Dict] = []
+        vegetation_pixels = soil_pixels = water_pixels = green_pixels = 0
+        texture = _Moments(1)
+        color = _Moments(3)
+        tiles = 0
+
+        for x, y, w, h in self.tile_windows(width, height):
+            x0, y0 = max(x - halo, 0), max(y - halo, 0)
+            x1, y1 = min(x + w + halo, width), min(y + h + halo, height)
+            padded = reader.read_window(x0, y0, x1 - x0, y1 - y0)
+            tile = np.ascontiguousarray(padded[y - y0:y - y0 + h, x - x0:x - x0 + w])
+            view = ImageView(tile)
+
+            ndvi_parts.append(analyzer.ndvi_statistics(analyzer.calculate_ndvi_rgb(tile)))
+            vegetation_pixels += analyzer.enhanced_vegetation_detection(tile, view)['vegetation_pixels']
+            soil_mask, water_mask = analyzer.land_cover_masks(view.hsv)
+            soil_pixels += cv2.countNonZero(soil_mask)
+            water_pixels += cv2.countNonZero(water_mask)
+            green_pixels += cv2.countNonZero(GreennessAnalyzer.green_mask(view.hsv))
+
+            response = analyzer.texture_response(cv2.cvtColor(padded, cv2.COLOR_RGB2GRAY))
+            texture.add(response[y - y0:y - y0 + h, x - x0:x - x0 + w])
+            color.add(tile)
+
+            reader.release()
+            tiles += 1
+
+        total_pixels = width * height
+        vegetation_data = {
+            'vegetation_percentage': (vegetation_pixels / total_pixels) * 100,
+            'total_pixels': total_pixels,
+            'vegetation_pixels': vegetation_pixels
+        }
+        composition_data = {
+            'texture_complexity': float(np.sqrt(texture.variance()[0])),
+            'color_variance': float(np.mean(color.variance())),
+            'soil_percentage': (soil_pixels / total_pixels) * 100,
+            'water_percentage': (water_pixels / total_pixels) * 100
+        }
+        health_metrics = analyzer.health_metrics_from_statistics(analyzer.merge_ndvi_statistics(ndvi_parts))
+
+        result = analyzer.build_analysis_result(
+            filename, (height, width, 3), health_metrics, vegetation_data, composition_data
+        )
+        result['greenness_percentage'] = (green_pixels / total_pixels) * 100
+        result['analysis_mode'] = 'tiled'
+        result['tiling'] = {'tile_size': self.tile_size, 'tiles': tiles, 'reader': reader.name}
+        logger.info(f"Tiled analysis completed for {filename}: {tiles} tiles")
+        return result
+
+
+class _Moments:
+    """Per-channel count, sum and sum of squares, merged across tiles."""
+
+    def __init__(self, channels: int):
+        self.count = 0
+        self.sum = np.zeros(channels)
+        self.sum_squares = np.zeros(channels)
+
+    def add(self, values: np.ndarray):
+        mean, std = cv2.meanStdDev(values)
+        n = values.shape[0] * values.shape[1]
+        mean, std = mean.ravel(), std.ravel()
+        self.count += n
+        self.sum += mean * n
+        self.sum_squares += (std ** 2 + mean ** 2) * n
+
+    def variance(self) -> np.ndarray:
+        mean = self.sum / self.count
+        return np.maximum(self.sum_squares / self.count - mean ** 2, 0.0)
@@ -0,0 +1,276 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import datetime
+import logging
+import threading
+import time
+
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+CONFIRMED = "confirmed"
+FAILED = "failed"
+# Past the receipt timeout; still tracked, since it may yet be mined
+TIMEOUT = "timeout"
+# Never mined: another transaction was mined with its nonce
+DROPPED = "dropped"
+
+# Statuses the tracker keeps polling receipts for
+TRACKED = (PENDING, TIMEOUT)
+
+# Finished transactions kept in memory for the status endpoint
+HISTORY_SIZE = 1000
+
+
+class TransactionBuildError(Exception):
+    """The transaction could not be built (bad arguments, estimation failure...)."""
+
+
+class TransactionManager:
+    """
+    Submits transactions from a single backend account without waiting for them
+    to be mined.
+
+    Nonces are allocated locally under a lock, so concurrent requests never
+    reuse the same nonce, and the lock is only held while signing and sending,
+    not while the transaction waits for a block. A background thread polls for
+    receipts and runs each transaction's `on_confirmed` callback once it is
+    mined. Callers that need the receipt before responding use wait().
+    """
+
+    def __init__(self, w3: Web3, sender: str, private_key: str, gas_price_gwei: str = "20",
+                 poll_interval: float = 0.5, receipt_timeout: float = 300.0):
+        self.w3 = w3
+        self.sender = sender
+        self.private_key = private_key
+        self.gas_price_gwei = gas_price_gwei
+        self.poll_interval = poll_interval
+        self.receipt_timeout = receipt_timeout
+
+        self._next_nonce: Optional[int] = None
+        self._nonce_lock = threading.Lock()
+
+        self._transactions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._tracker: Optional[threading.Thread] = None
+
+    # ---------------- Submission ----------------
+
+    def submit(self, contract_call, kind: str, gas: int = 2_000_000,
+               on_confirmed: Optional[Callable[[Any], None]] = None,
+               on_failed: Optional[Callable[[Dict[str, Any]], None]] = None,
+               context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Build, sign and send `contract_call` with the next local nonce.
+        Returns the pending transaction record immediately.
+
+        `on_confirmed(receipt)` runs on the tracker thread after the
+        transaction is mined successfully, even if that is after the receipt
+        timeout; `on_failed(record)` runs if it reverts or is dropped. A
+        timeout alone runs neither: the transaction may still be mined.
+        """
+        with self._nonce_lock:
+            nonce = self._allocate_nonce()
+            try:
+                tx = contract_call.build_transaction({
+                    "from": self.sender,
+                    "nonce": nonce,
+                    "gas": gas,
+                    "gasPrice": self.w3.to_wei(self.gas_price_gwei, "gwei")
+                })
+            except Exception as e:
+                raise TransactionBuildError(str(e)) from e
+
+            try:
+                signed = self.w3.eth.account.sign_transaction(tx, private_key=self.private_key)
+                tx_hash = Web3.to_hex(self.w3.eth.send_raw_transaction(signed.raw_transaction))
+            except Exception:
+                # The node may have seen transactions we didn't send; re-read the nonce next time
+                self._next_nonce = None
+                raise
+            self._next_nonce = nonce + 1
+
+        record = {
+            "tx_hash": tx_hash,
+            "kind": kind,
+            "nonce": nonce,
+            "status": PENDING,
+            "submitted_at": datetime.datetime.utcnow().isoformat(),
+            "confirmed_at": None,
+            "block_number": None,
+            "gas_used": None,
+            "error": None,
+            "context": context or {},
+            "receipt": None,
+            "_on_confirmed": on_confirmed,
+            "_on_failed": on_failed,
+            "_done": threading.Event(),
+            "_deadline": time.monotonic() + self.receipt_timeout
+        }
+        with self._lock:
+            self._transactions[tx_hash] = record
+            self._trim_history()
+        self._ensure_tracker()
+        self._wakeup.set()
+
+        logger.info(f"Submitted {kind} transaction {tx_hash} (nonce {nonce})")
+        return self._snapshot(record)
+
+    def _allocate_nonce(self) -> int:
+        if self._next_nonce is None:
+            self._next_nonce = self.w3.eth.get_transaction_count(self.sender, "pending")
+        return self._next_nonce
+
+    # ---------------- Status ----------------
+
+    def get(self, tx_hash: str, include_receipt: bool = False) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._transactions.get(tx_hash.lower())
+            return self._snapshot(record, include_receipt) if record else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent transactions first."""
+        with self._lock:
+            records = [r for r in reversed(self._transactions.values()) if status is None or r["status"] == status]
+            return [self._snapshot(r) for r in records[:limit]]
+
+    def wait(self, tx_hash: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Block until the transaction is mined (or fails) and return its record, receipt included."""
+        with self._lock:
+            record = self._transactions.get(tx_hash.lower())
+        if record is None:
+            raise KeyError(f"Unknown transaction {tx_hash}")
+        if not record["_done"].wait(timeout if timeout is not None else self.receipt_timeout + self.poll_interval):
+            raise TimeoutError(f"Transaction {tx_hash} not mined yet")
+        return self.get(tx_hash, include_receipt=True)
+
+    @staticmethod
+    def _snapshot(record: Dict[str, Any], include_receipt: bool = False) -> Dict[str, Any]:
+        snapshot = {key: value for key, value in record.items() if not key.startswith("_")}
+        if not include_receipt:
+            snapshot.pop("receipt")
+        return snapshot
+
+    def _trim_history(self):
+        while len(self._transactions) > HISTORY_SIZE:
+            oldest_hash = next(iter(self._transactions))
+            if self._transactions[oldest_hash]["status"] in TRACKED:
+                break
+            self._transactions.popitem(last=False)
+
+    # ---------------- Receipt tracking ----------------
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the receipt tracker (shutdown); transactions still pending are no longer followed."""
+        self._stop_event.set()
+        self._wakeup.set()
+        with self._lock:
+            tracker = self._tracker
+        if tracker:
+            tracker.join(timeout)
+
+    def _ensure_tracker(self):
+        with self._lock:
+            if self._stop_event.is_set() or (self._tracker and self._tracker.is_alive()):
+                return
+            self._tracker = threading.Thread(target=self._track_receipts, name="tx-receipt-tracker", daemon=True)
+            self._tracker.start()
+
+    def _track_receipts(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            if self._stop_event.is_set():
+                with self._lock:
+                    self._tracker = None
+                return
+
+            with self._lock:
+                pending = [r for r in self._transactions.values() if r["status"] in TRACKED]
+            if not pending:
+                with self._lock:
+                    # Exit only if nothing was submitted meanwhile; submit() restarts the thread
+                    if not any(r["status"] in TRACKED for r in self._transactions.values()):
+                        self._tracker = None
+                        return
+                continue
+
+            for record in pending:
+                self._check_receipt(record)
+
+    def _check_receipt(self, record: Dict[str, Any]):
+        try:
+            receipt = self.w3.eth.get_transaction_receipt(record["tx_hash"])
+        except TransactionNotFound:
+            receipt = None
+        except Exception as e:
+            logger.error(f"Receipt lookup failed for {record['tx_hash']}: {str(e)}")
+            receipt = None
+
+        if receipt is None:
+            if record["status"] == TIMEOUT:
+                if self._nonce_taken(record):
+                    self._finish(record, DROPPED, error="Transaction was dropped; its nonce was used by another transaction")
+            elif time.monotonic() > record["_deadline"]:
+                self._time_out(record)
+            return
+
+        record["receipt"] = receipt
+        record["block_number"] = receipt.get("blockNumber")
+        record["gas_used"] = receipt.get("gasUsed")
+        if receipt.get("status", 1) != 1:
+            self._finish(record, FAILED, error="Transaction reverted")
+            return
+
+        callback = record["_on_confirmed"]
+        if callback:
+            try:
+                callback(receipt)
+            except Exception as e:
+                logger.error(f"Confirmation handler for {record['kind']} {record['tx_hash']} failed: {str(e)}")
+                record["error"] = f"Confirmation handler failed: {e}"
+        self._finish(record, CONFIRMED, error=record["error"])
+
+    def _nonce_taken(self, record: Dict[str, Any]) -> bool:
+        """Whether another transaction was mined with this (still receipt-less) transaction's nonce."""
+        try:
+            if self.w3.eth.get_transaction_count(self.sender, "latest") <= record["nonce"]:
+                return False
+            # Mined since the receipt lookup; picked up on the next poll
+            self.w3.eth.get_transaction_receipt(record["tx_hash"])
+            return False
+        except TransactionNotFound:
+            return True
+        except Exception as e:
+            logger.error(f"Nonce check failed for {record['tx_hash']}: {str(e)}")
+            return False
+
+    def _time_out(self, record: Dict[str, Any]):
+        """Release waiters; tracking goes on until the transaction is mined or dropped."""
+        with self._lock:
+            record["status"] = TIMEOUT
+            record["error"] = "Transaction was not mined before the receipt timeout"
+        record["_done"].set()
+        # The transaction may have left the node's pool, leaving a nonce gap; re-read the nonce from the node
+        with self._nonce_lock:
+            self._next_nonce = None
+        logger.warning(f"{record['kind']} transaction {record['tx_hash']} not mined after {self.receipt_timeout:.0f}s; still tracking it")
+
+    def _finish(self, record: Dict[str, Any], status: str, error: Optional[str] = None):
+        with self._lock:
+            record["status"] = status
+            record["error"] = error
+            record["confirmed_at"] = datetime.datetime.utcnow().isoformat()
+        record["_done"].set()
+        if status != CONFIRMED:
+            logger.warning(f"{record['kind']} transaction {record['tx_hash']} {status}: {error}")
+            if record["_on_failed"]:
+                try:
+                    record["_on_failed"](self._snapshot(record))
+                except Exception as e:
+                    logger.error(f"Failure handler for {record['kind']} {record['tx_hash']} failed: {str(e)}")
@@ -0,0 +1,132 @@
+from typing import BinaryIO, Dict, Optional, Tuple
+import hashlib
+import logging
+import os
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = "uploads"
+
+# Bytes read and written per step; memory use of an upload is bounded by this
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Per-file limit, overridable with MAX_UPLOAD_SIZE_MB
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_SIZE_MB", "2048")) * 1024 * 1024)
+
+# Form fields and part headers of a multipart request, on top of its files
+MULTIPART_OVERHEAD_BYTES = 1024 * 1024
+
+# Whole-request limit of an evidence upload, overridable with MAX_UPLOAD_REQUEST_SIZE_MB;
+# by default a before/after pair at the per-file limit
+MAX_UPLOAD_REQUEST_BYTES = (int(float(os.getenv("MAX_UPLOAD_REQUEST_SIZE_MB", "0")) * 1024 * 1024)
+                            or 2 * MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES)
+
+
+class UploadTooLargeError(Exception):
+    """An uploaded file exceeded the configured maximum size."""
+
+    def __init__(self, filename: str, max_bytes: int):
+        super().__init__(f"{filename} exceeds the maximum upload size of {max_bytes // (1024 * 1024)} MB")
+        self.filename = filename
+        self.max_bytes = max_bytes
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Rejects request bodies over a per-path limit with 413 before the endpoint
+    runs. Starlette parses the whole multipart body, spooling every file,
+    before the handler is called, so the per-file limit of
+    save_upload_stream only applies once the client has sent everything.
+
+    `limits` maps request paths to the most bytes their body may have. A
+    declared Content-Length over the limit is refused without reading the
+    body; bodies sent without one are counted as they arrive.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request exceeds the maximum size of {limit // (1024 * 1024)} MB"
+        declared = dict(scope["headers"]).get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > limit:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def upload_path(filename: str, upload_dir: str = UPLOAD_DIR) -> str:
+    """Where an uploaded file is stored; only the base name of the client's filename is used."""
+    name = os.path.basename(filename or "")
+    if name in ("", ".", ".."):
+        raise ValueError(f"Invalid upload filename: {filename!r}")
+    return os.path.join(upload_dir, name)
+
+
+def save_upload_stream(source: BinaryIO, dest_path: str, evidence_hasher=None,
+                       max_bytes: Optional[int] = MAX_UPLOAD_BYTES,
+                       chunk_size: int = UPLOAD_CHUNK_SIZE) -> Tuple[int, str]:
+    """
+    Copy `source` to `dest_path` chunk by chunk in a single pass, updating the
+    file's own SHA-256 and `evidence_hasher` (shared across all files of an
+    evidence) as the bytes go by. Returns (size, file sha256 hex).
+
+    The data is written to a temporary file that only replaces `dest_path`
+    once it is complete, so a rejected or interrupted upload leaves nothing
+    behind. Raises UploadTooLargeError past `max_bytes`; for HTTP uploads
+    that is after the request body was received, which
+    RequestSizeLimitMiddleware caps before it is parsed.
+
+    Note that `evidence_hasher` has already consumed the partial data if an
+    error is raised; callers discard it in that case.
+    """
+    file_hasher = hashlib.sha256()
+    partial_path = dest_path + ".part"
+    size = 0
+    try:
+        with open(partial_path, "wb") as out:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLargeError(os.path.basename(dest_path), max_bytes)
+                file_hasher.update(chunk)
+                if evidence_hasher is not None:
+                    evidence_hasher.update(chunk)
+                out.write(chunk)
+        os.replace(partial_path, dest_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    return size, file_hasher.hexdigest()
+
+
+def read_upload(path: str) -> bytes:
+    """Load a stored upload for analyses that need the whole image in memory."""
+    with open(path, "rb") as fh:
+        return fh.read()
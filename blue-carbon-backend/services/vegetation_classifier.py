@@ -1,6 +1,5 @@
 import cv2
 import numpy as np
-from sklearn.cluster import KMeans
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 import joblib
@@ -10,6 +9,11 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever a feature changes meaning; saved models record the version they
+# were trained on. 2: color_diversity is the variance of all pixels, not of
+# k-means cluster centers.
+FEATURE_VERSION = 2
+
 class VegetationClassifier:
     """
     Advanced vegetation classification using machine learning and computer vision.
@@ -91,24 +95,13 @@ class VegetationClassifier:
     
     def extract_diversity_features(self, image_patch: np.ndarray) -> np.ndarray:
         """
-        Extract color diversity features using k-means clustering.
+        Extract color diversity: the variance of all channel values in the patch.
+        Tracks the spread of the dominant colors like k-means cluster centers do,
+        but costs one pass and has a closed form over integral images
+        (see extract_patch_features).
         """
         try:
-            # Reshape image for k-means
-            pixels = image_patch.reshape(-1, 3)
-            
-            # Perform k-means clustering to find dominant colors
-            n_colors = min(5, len(pixels))  # Max 5 color clusters
-            if n_colors > 1:
-                kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
-                kmeans.fit(pixels)
-                
-                # Calculate color diversity (variance in cluster centers)
-                centers = kmeans.cluster_centers_
-                color_diversity = np.var(centers.flatten())
-            else:
-                color_diversity = 0.0
-            
+            color_diversity = np.var(image_patch.astype(np.float64))
             return np.array([color_diversity])
             
         except Exception as e:
@@ -132,39 +125,100 @@ class VegetationClassifier:
             logger.error(f"Error extracting features: {str(e)}")
             return np.zeros(len(self.feature_names))
     
+    @staticmethod
+    def _integral(values: np.ndarray) -> np.ndarray:
+        """Summed-area table with a leading zero row and column."""
+        table = np.zeros((values.shape[0] + 1, values.shape[1] + 1) + values.shape[2:], dtype=np.float64)
+        np.cumsum(values, axis=0, dtype=np.float64, out=table[1:, 1:])
+        np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+        return table
+    
+    @staticmethod
+    def _patch_sums(table: np.ndarray, ys: np.ndarray, xs: np.ndarray, patch_size: int) -> np.ndarray:
+        """Sum over every patch on the (ys, xs) grid from a summed-area table: shape (len(ys), len(xs), ...)."""
+        y0, x0 = ys[:, None], xs[None, :]
+        y1, x1 = y0 + patch_size, x0 + patch_size
+        return table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+    
+    @staticmethod
+    def patch_grid(height: int, width: int, patch_size: int, step: int,
+                   include_last: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-left corners of the sliding-window patches along each axis."""
+        end = 1 if include_last else 0
+        return (np.arange(0, max(height - patch_size + end, 0), step),
+                np.arange(0, max(width - patch_size + end, 0), step))
+    
+    def extract_patch_features(self, image: np.ndarray, patch_size: int = 32, step: Optional[int] = None,
+                               include_last: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Features of every patch on a sliding-window grid, computed for the whole
+        image at once. Returns (features, ys, xs): one row per patch in row-major
+        grid order, with columns as in self.feature_names.
+        
+        Channel means/stds and color diversity come from summed-area tables of
+        the pixels and their squares. Local variance and Canny edges are computed
+        once for the whole image and averaged per patch the same way.
+        """
+        step = step or patch_size // 4
+        height, width = image.shape[:2]
+        ys, xs = self.patch_grid(height, width, patch_size, step, include_last)
+        if len(ys) == 0 or len(xs) == 0:
+            return np.zeros((0, len(self.feature_names))), ys, xs
+        
+        n = float(patch_size * patch_size)
+        pixels = image.astype(np.float64)
+        
+        # Color statistics per channel: (ny, nx, 3)
+        channel_sums = self._patch_sums(self._integral(pixels), ys, xs, patch_size)
+        channel_square_sums = self._patch_sums(self._integral(pixels * pixels), ys, xs, patch_size)
+        means = channel_sums / n
+        stds = np.sqrt(np.maximum(channel_square_sums / n - means ** 2, 0.0))
+        mean_red, mean_green, mean_blue = means[..., 0], means[..., 1], means[..., 2]
+        
+        green_red_ratio = mean_green / (mean_red + 1e-6)
+        green_blue_ratio = mean_green / (mean_blue + 1e-6)
+        vegetation_index = (mean_green - mean_red) / (mean_green + mean_red + 1e-6)
+        
+        # Texture: mean local variance and edge density per patch
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        gray_float = gray.astype(np.float32)
+        kernel = np.ones((5, 5), np.float32) / 25
+        local_mean = cv2.filter2D(gray_float, -1, kernel)
+        local_variance = cv2.filter2D((gray_float - local_mean) ** 2, -1, kernel)
+        texture_contrast = self._patch_sums(self._integral(local_variance), ys, xs, patch_size) / n
+        edges = (cv2.Canny(gray, 50, 150) > 0).astype(np.float64)
+        edge_density = self._patch_sums(self._integral(edges), ys, xs, patch_size) / n
+        
+        # Variance of all channel values in the patch
+        all_mean = channel_sums.sum(axis=-1) / (3 * n)
+        color_diversity = np.maximum(channel_square_sums.sum(axis=-1) / (3 * n) - all_mean ** 2, 0.0)
+        
+        features = np.stack([
+            mean_red, mean_green, mean_blue,
+            stds[..., 0], stds[..., 1], stds[..., 2],
+            green_red_ratio, green_blue_ratio,
+            vegetation_index, texture_contrast,
+            edge_density, color_diversity
+        ], axis=-1)
+        return features.reshape(-1, len(self.feature_names)), ys, xs
+    
     def create_training_data(self, image: np.ndarray, vegetation_mask: np.ndarray, 
                            patch_size: int = 32) -> Tuple[np.ndarray, np.ndarray]:
         """
         Create training data from image and vegetation mask.
         """
         try:
-            features = []
-            labels = []
-            
-            height, width = image.shape[:2]
             step = patch_size // 2  # Overlapping patches
+            features, ys, xs = self.extract_patch_features(image, patch_size, step, include_last=False)
+            if len(features) == 0:
+                return np.array([]), np.array([])
             
-            for y in range(0, height - patch_size, step):
-                for x in range(0, width - patch_size, step):
-                    # Extract patch
-                    patch = image[y:y+patch_size, x:x+patch_size]
-                    mask_patch = vegetation_mask[y:y+patch_size, x:x+patch_size]
-                    
-                    # Skip patches that are too small
-                    if patch.shape[0] < patch_size or patch.shape[1] < patch_size:
-                        continue
-                    
-                    # Extract features
-                    patch_features = self.extract_all_features(patch)
-                    
-                    # Determine label (vegetation if >50% of patch is vegetation)
-                    vegetation_ratio = np.sum(mask_patch) / (patch_size * patch_size)
-                    label = 1 if vegetation_ratio > 0.5 else 0
-                    
-                    features.append(patch_features)
-                    labels.append(label)
-            
-            return np.array(features), np.array(labels)
+            # Label: vegetation if >50% of the patch is vegetation
+            mask_sums = self._patch_sums(self._integral(vegetation_mask.astype(np.float64)), ys, xs, patch_size)
+            vegetation_ratio = mask_sums.reshape(-1) / (patch_size * patch_size)
+            labels = (vegetation_ratio > 0.5).astype(int)
+            
+            return features, labels
             
         except Exception as e:
             logger.error(f"Error creating training data: {str(e)}")
@@ -220,28 +274,25 @@ class VegetationClassifier:
                 return self.rule_based_classification(image)
             
             height, width = image.shape[:2]
-            vegetation_probability = np.zeros((height, width))
-            coverage_map = np.zeros((height, width))
-            
             step = patch_size // 4  # High overlap for smooth results
             
-            for y in range(0, height - patch_size + 1, step):
-                for x in range(0, width - patch_size + 1, step):
-                    # Extract patch
-                    patch = image[y:y+patch_size, x:x+patch_size]
-                    
-                    # Extract features
-                    patch_features = self.extract_all_features(patch).reshape(1, -1)
-                    
-                    # Scale features
-                    patch_features_scaled = self.scaler.transform(patch_features)
-                    
-                    # Predict vegetation probability
-                    prob = self.classifier.predict_proba(patch_features_scaled)[0, 1]
-                    
-                    # Update probability map
-                    vegetation_probability[y:y+patch_size, x:x+patch_size] += prob
-                    coverage_map[y:y+patch_size, x:x+patch_size] += 1
+            # All patches are featurized and scored in one batch
+            features, ys, xs = self.extract_patch_features(image, patch_size, step)
+            if len(features) > 0:
+                probabilities = self.classifier.predict_proba(self.scaler.transform(features))[:, 1]
+            else:
+                probabilities = np.zeros(0)
+            
+            # Spread every patch's probability over its pixels: corner deltas
+            # on a difference grid, then a 2D prefix sum
+            patch_y = np.repeat(ys, len(xs))
+            patch_x = np.tile(xs, len(ys))
+            vegetation_probability = self._accumulate_patches(
+                probabilities, patch_y, patch_x, patch_size, height, width
+            )
+            coverage_map = self._accumulate_patches(
+                np.ones_like(probabilities), patch_y, patch_x, patch_size, height, width
+            )
             
             # Normalize by coverage
             coverage_map = np.maximum(coverage_map, 1)  # Avoid division by zero
@@ -270,6 +321,17 @@ class VegetationClassifier:
             logger.error(f"Error classifying vegetation: {str(e)}")
             return self.rule_based_classification(image)
     
+    @staticmethod
+    def _accumulate_patches(values: np.ndarray, ys: np.ndarray, xs: np.ndarray, patch_size: int,
+                            height: int, width: int) -> np.ndarray:
+        """Per-pixel sum of `values` over the patches covering each pixel."""
+        delta = np.zeros((height + 1, width + 1))
+        np.add.at(delta, (ys, xs), values)
+        np.add.at(delta, (ys, xs + patch_size), -values)
+        np.add.at(delta, (ys + patch_size, xs), -values)
+        np.add.at(delta, (ys + patch_size, xs + patch_size), values)
+        return np.cumsum(np.cumsum(delta, axis=0), axis=1)[:height, :width]
+    
     def rule_based_classification(self, image: np.ndarray) -> Dict:
         """
         Fallback rule-based vegetation classification.
@@ -465,6 +527,7 @@ class VegetationClassifier:
                     'classifier': self.classifier,
                     'scaler': self.scaler,
                     'feature_names': self.feature_names,
+                    'feature_version': FEATURE_VERSION,
                     'is_trained': self.is_trained
                 }
                 joblib.dump(model_data, filepath)
@@ -480,11 +543,17 @@ class VegetationClassifier:
     
     def load_model(self, filepath: str):
         """
-        Load a trained model from file.
+        Load a trained model from file. Models trained on another feature
+        version are rejected; retrain them with train_classifier.
         """
         try:
             if os.path.exists(filepath):
                 model_data = joblib.load(filepath)
+                version = model_data.get('feature_version', 1)
+                if version != FEATURE_VERSION:
+                    logger.warning(f"Model {filepath} uses feature version {version}, "
+                                   f"expected {FEATURE_VERSION}; retrain it")
+                    return False
                 self.classifier = model_data['classifier']
                 self.scaler = model_data['scaler']
                 self.feature_names = model_data['feature_names']
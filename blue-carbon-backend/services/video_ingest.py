@@ -0,0 +1,278 @@
+from typing import AsyncIterable, BinaryIO, Collection, Optional
+import asyncio
+import io
+import logging
+import os
+import tempfile
+import time
+import uuid
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart before 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from .upload_storage import UPLOAD_CHUNK_SIZE, UploadTooLargeError, save_upload_stream
+
+logger = logging.getLogger(__name__)
+
+# Videos are spooled here while they are analyzed, then deleted
+VIDEO_TEMP_DIR = os.getenv("VIDEO_TEMP_DIR") or os.path.join(tempfile.gettempdir(), "blue-carbon-video")
+
+# Per-video limit, overridable with MAX_VIDEO_SIZE_MB
+MAX_VIDEO_BYTES = int(float(os.getenv("MAX_VIDEO_SIZE_MB", "4096")) * 1024 * 1024)
+
+# Spools older than this were left behind by a crashed process
+STALE_SPOOL_SECONDS = 6 * 3600
+
+# Container signatures checked on the first bytes, before the rest is copied;
+# the longest (ASF) takes 16 bytes
+SNIFF_BYTES = 16
+ASF_GUID = bytes.fromhex("3026b2758e66cf11a6d900aa0062ce6c")
+MP4_BOXES = {b"ftyp", b"moov", b"mdat", b"wide", b"free", b"skip", b"pnot"}
+CONTAINER_SUFFIXES = {"mp4": ".mp4", "avi": ".avi", "matroska": ".mkv", "asf": ".wmv"}
+
+
+class UnsupportedVideoError(ValueError):
+    """The upload is not in a video container the analyzers can open."""
+
+
+class UnsupportedContentTypeError(UnsupportedVideoError):
+    """The upload's declared content type is not an accepted video type."""
+
+
+def sniff_container(head: bytes) -> Optional[str]:
+    """Container of a video from its first bytes: 'mp4' (incl. QuickTime), 'avi', 'matroska', 'asf' or None."""
+    if len(head) >= 8 and head[4:8] in MP4_BOXES:
+        return "mp4"
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return "avi"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "matroska"
+    if head[:16] == ASF_GUID:
+        return "asf"
+    return None
+
+
+class VideoSpool:
+    """A video spooled to VIDEO_TEMP_DIR; removed on close or when the `with` block ends."""
+
+    def __init__(self, path: str, size: int, container: str, filename: Optional[str] = None,
+                 content_type: Optional[str] = None):
+        self.path = path
+        self.size = size
+        self.container = container
+        self.filename = filename
+        self.content_type = content_type
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def spool_video(source: BinaryIO, filename: str = "video", max_bytes: Optional[int] = MAX_VIDEO_BYTES,
+                temp_dir: Optional[str] = None) -> VideoSpool:
+    """
+    Copy a video upload to the spool directory chunk by chunk, so only one
+    chunk is in memory at a time. The container is checked on the first
+    chunk, so anything but a video is rejected (UnsupportedVideoError)
+    before it is copied. Raises UploadTooLargeError past `max_bytes`.
+
+    For an HTTP upload Starlette has already received the body into a
+    temporary file of its own by the time this runs; spool_video_stream()
+    reads the request instead and writes the video once.
+    """
+    head = source.read(UPLOAD_CHUNK_SIZE)
+    container = sniff_container(head)
+    if container is None:
+        raise UnsupportedVideoError(f"{os.path.basename(filename or '')} is not an MP4, MOV, AVI, MKV or WMV video")
+
+    temp_dir = temp_dir or VIDEO_TEMP_DIR
+    os.makedirs(temp_dir, exist_ok=True)
+    path = os.path.join(temp_dir, f"{uuid.uuid4().hex}{CONTAINER_SUFFIXES[container]}")
+    size, _ = save_upload_stream(_Chained(head, source), path, max_bytes=max_bytes)
+    return VideoSpool(path, size, container)
+
+
+async def spool_video_stream(chunks: AsyncIterable[bytes], content_type: str, field: str = "file",
+                             accepted_types: Optional[Collection[str]] = None,
+                             max_bytes: Optional[int] = MAX_VIDEO_BYTES, temp_dir: Optional[str] = None) -> VideoSpool:
+    """
+    Spool the `field` file of a multipart/form-data request body as it
+    arrives (e.g. `request.stream()`), so the video is written to disk once
+    instead of first to Starlette's form-parsing temp file. Writes happen off
+    the event loop, UPLOAD_CHUNK_SIZE at a time.
+
+    The part's declared type is checked against `accepted_types`
+    (UnsupportedContentTypeError) and its container on the first bytes
+    (UnsupportedVideoError) before the rest of the body is read. Raises
+    UploadTooLargeError past `max_bytes` and ValueError for a malformed body
+    or one without the file. The spool carries the client's filename and
+    content type.
+    """
+    _, params = parse_options_header(content_type or "")
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise ValueError("Expected a multipart/form-data body")
+
+    part = _VideoPart(field)
+    parser = MultipartParser(boundary, part.callbacks())
+    temp_dir = temp_dir or VIDEO_TEMP_DIR
+    path, out = None, None
+    head, buffer = b"", bytearray()
+    size, container, checked = 0, None, False
+    try:
+        async for chunk in chunks:
+            parser.write(chunk)
+            if part.found and not checked:
+                if accepted_types is not None and part.content_type not in accepted_types:
+                    raise UnsupportedContentTypeError(f"{part.filename} has unsupported type {part.content_type}")
+                checked = True
+
+            data = part.take()
+            if out is None:
+                head += data
+                if len(head) < SNIFF_BYTES and not part.ended:
+                    continue
+                container = sniff_container(head)
+                if container is None:
+                    raise UnsupportedVideoError(f"{os.path.basename(part.filename)} is not an MP4, MOV, AVI, MKV or WMV video")
+                os.makedirs(temp_dir, exist_ok=True)
+                path = os.path.join(temp_dir, f"{uuid.uuid4().hex}{CONTAINER_SUFFIXES[container]}")
+                out = open(path, "wb")
+                data = head
+
+            size += len(data)
+            if max_bytes is not None and size > max_bytes:
+                raise UploadTooLargeError(os.path.basename(part.filename), max_bytes)
+            buffer += data
+            if len(buffer) >= UPLOAD_CHUNK_SIZE or part.ended:
+                pending, buffer = bytes(buffer), bytearray()
+                await asyncio.to_thread(out.write, pending)
+            if part.ended:
+                # Later form fields aren't needed
+                break
+
+        if not part.found:
+            raise ValueError(f"No {field!r} file in the upload")
+        if not part.ended:
+            raise ValueError(f"{os.path.basename(part.filename)} ended before the upload was complete")
+        out.close()
+    except BaseException:
+        if out is not None:
+            out.close()
+            os.remove(path)
+        raise
+    return VideoSpool(path, size, container, filename=part.filename, content_type=part.content_type)
+
+
+def spool_video_bytes(video_data: bytes, filename: str = "video", temp_dir: Optional[str] = None) -> VideoSpool:
+    """Spool a video that is already in memory (no size limit: the caller holds it anyway)."""
+    return spool_video(io.BytesIO(video_data), filename, max_bytes=None, temp_dir=temp_dir)
+
+
+def cleanup_stale_spools(max_age: float = STALE_SPOOL_SECONDS, temp_dir: Optional[str] = None) -> int:
+    """Delete spools (and partial spools) left behind by processes that died mid-analysis."""
+    temp_dir = temp_dir or VIDEO_TEMP_DIR
+    if not os.path.isdir(temp_dir):
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(temp_dir):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError as e:
+            logger.warning(f"Could not remove stale video spool {entry.path}: {str(e)}")
+    if removed:
+        logger.info(f"Removed {removed} stale video spools from {temp_dir}")
+    return removed
+
+
+class _VideoPart:
+    """
+    Callbacks for python-multipart's streaming parser: the headers of each
+    part, and the data of the first file part named `field`, collected until
+    take() is called.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.found = False
+        self.ended = False
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self._in_file = False
+        self._headers = {}
+        self._header_name = b""
+        self._header_value = b""
+        self._data = []
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        }
+
+    def take(self) -> bytes:
+        data, self._data = b"".join(self._data), []
+        return data
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name, self._header_value = b"", b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._in_file = (not self.found and b"filename" in options
+                         and options.get(b"name", b"").decode("latin-1") == self.field)
+        if self._in_file:
+            self.found = True
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            self.content_type = self._headers.get(b"content-type", b"").decode("latin-1").strip() or None
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self._data.append(data[start:end])
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._in_file = False
+            self.ended = True
+
+
+class _Chained:
+    """The already-read first chunk followed by the rest of the source."""
+
+    def __init__(self, head: bytes, source: BinaryIO):
+        self._head = head
+        self._source = source
+
+    def read(self, size: int = -1) -> bytes:
+        if self._head:
+            chunk, self._head = self._head, b""
+            return chunk
+        return self._source.read(size)
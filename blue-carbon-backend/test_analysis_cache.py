@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test the image analysis result cache (services/analysis_cache.py) and its use
+by NDVIAnalyzer, GreennessAnalyzer and EvidenceImageComparator.
+"""
+
+import sys
+import os
+import io
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.analysis_cache import AnalysisCache, analysis_cache
+from services.ai_verification import NDVIAnalyzer
+from services.greenness_analyzer import GreennessAnalyzer
+from services.evidence_image_comparator import EvidenceImageComparator
+from services.renditions import rendition_store
+
+def with_cache_dir(test):
+    """
+    Run `test` with the shared analysis cache and the rendition store in a
+    temporary directory and restore them afterwards. ANALYSIS_CACHE_DIR is
+    set too, for analysis pool workers started during the test.
+    """
+    def run():
+        tmp = tempfile.mkdtemp()
+        original_dir, original_enabled = analysis_cache.cache_dir, analysis_cache.enabled
+        original_root = rendition_store.root
+        original_env = os.environ.get("ANALYSIS_CACHE_DIR")
+        analysis_cache.cache_dir = os.environ["ANALYSIS_CACHE_DIR"] = tmp
+        rendition_store.root = os.path.join(tmp, "renditions")
+        analysis_cache.clear_memory()
+        try:
+            return test()
+        finally:
+            analysis_cache.cache_dir, analysis_cache.enabled = original_dir, original_enabled
+            rendition_store.root = original_root
+            if original_env is None:
+                os.environ.pop("ANALYSIS_CACHE_DIR", None)
+            else:
+                os.environ["ANALYSIS_CACHE_DIR"] = original_env
+            analysis_cache.clear_memory()
+            shutil.rmtree(tmp)
+    run.__name__ = test.__name__
+    return run
+
+def make_image(green: int) -> bytes:
+    array = np.zeros((64, 64, 3), dtype=np.uint8)
+    array[:, :green] = (30, 160, 40)
+    array[:, green:] = (150, 120, 90)
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def test_memory_and_disk_layers():
+    """Results survive a new cache instance, and the in-memory LRU stays within its byte budget."""
+    print("Testing cache layers...")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = AnalysisCache(cache_dir=tmp, memory_bytes=100)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"value": np.float64(1.5), "success": True}
+
+        first = cache.get_or_compute("kind", ["aa"], {"threshold": 0.2}, compute)
+        first["value"] = "mutated by caller"
+        assert cache.get_or_compute("kind", ["aa"], {"threshold": 0.2}, compute)["value"] == 1.5
+        assert len(calls) == 1
+
+        # Different parameters are a different entry
+        cache.get_or_compute("kind", ["aa"], {"threshold": 0.3}, compute)
+        assert len(calls) == 2
+
+        restarted = AnalysisCache(cache_dir=tmp)
+        assert restarted.get_or_compute("kind", ["aa"], {"threshold": 0.2}, compute) == {"value": 1.5, "success": True}
+        assert len(calls) == 2
+
+        for i in range(20):
+            cache.put("kind", f"key{i}", {"i": i})
+        assert cache.stats()["memory_bytes"] <= 100
+
+        failures = []
+        for _ in range(2):
+            cache.get_or_compute("kind", ["bb"], {}, lambda: failures.append(1) or {"error": "bad image", "success": False})
+        assert len(failures) == 2
+    print("✓ Disk layer persists, LRU bounded, failures not cached")
+
+@with_cache_dir
+def test_analyzers_use_cache():
+    """Repeated analysis of the same content is served from the cache."""
+    print("Testing analyzer integration...")
+    with tempfile.TemporaryDirectory() as tmp:
+        analysis_cache.enabled = True
+        image = make_image(40)
+
+        analyzer = NDVIAnalyzer()
+        first = analyzer.analyze_image(image, "before.png")
+        hits = analysis_cache.hits
+        time.sleep(0.01)
+        second = NDVIAnalyzer().analyze_image(image, "copy.png")
+        assert analysis_cache.hits == hits + 1
+        assert second["filename"] == "copy.png"
+        assert second["timestamp"] > first["timestamp"]  # stamped per call, not when first computed
+        assert second["vegetation_analysis"] == first["vegetation_analysis"]
+
+        analyzer.min_vegetation_threshold = 0.3
+        analyzer.analyze_image(image, "before.png")
+        assert analysis_cache.hits == hits + 1
+
+        greenness = GreennessAnalyzer()
+        assert greenness.calculate_greenness_percentage(image) == greenness.calculate_greenness_percentage(image)
+        assert greenness.calculate_greenness_percentage(b"not an image") == 0.0
+
+        before_path, after_path = os.path.join(tmp, "before.png"), os.path.join(tmp, "after.png")
+        for path, green in ((before_path, 10), (after_path, 50)):
+            with open(path, "wb") as fh:
+                fh.write(make_image(green))
+        comparator = EvidenceImageComparator()
+        result = comparator.compare_images(before_path, after_path)
+        hits = analysis_cache.hits
+        assert comparator.compare_images(before_path, after_path) == result
+        assert analysis_cache.hits == hits + 1
+    print("✓ NDVI, greenness and comparison results cached by content")
+
+if __name__ == "__main__":
+    test_memory_and_disk_layers()
+    test_analyzers_use_cache()
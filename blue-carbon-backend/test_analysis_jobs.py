@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test the durable analysis job queue (services/analysis_jobs.py): leases,
+retries with backoff, recovery of jobs whose worker died and status events.
+Uses SQLite databases and stub handlers, so no analysis runs.
+"""
+
+import sys
+import os
+import asyncio
+import datetime
+import shutil
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.db_model import AnalysisJob, Base, MRVData
+from services.analysis_jobs import AnalysisJobQueue, RetryLater
+
+def make_queue(handler, db_path=None, **kwargs):
+    if db_path:
+        # Worker threads need connections of their own
+        engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    else:
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    return AnalysisJobQueue(Session, handler, **kwargs), Session
+
+def enqueue(queue, evidence_id=1):
+    return queue.enqueue("paired", evidence_id, 7, {"evidence_type": "before", "project_area_hectares": 2.0})
+
+def make_runnable(Session, job_id, **values):
+    """Move a job's retry delay or lease expiry into the past."""
+    past = datetime.datetime.utcnow() - datetime.timedelta(seconds=1)
+    db = Session()
+    db.query(AnalysisJob).filter(AnalysisJob.id == job_id).update(
+        {key: past for key in values} or {"run_after": past}
+    )
+    db.commit()
+    db.close()
+
+def test_job_runs_and_stores_result():
+    print("Testing job execution...")
+    seen = []
+    queue, _ = make_queue(lambda job: seen.append(job) or {"success": True, "recommended_credits": 4.2})
+    job = enqueue(queue)
+    assert job["status"] == "queued" and job["attempts"] == 0
+    assert queue.run_next("worker-a") is True
+    assert queue.run_next("worker-a") is False
+
+    done = queue.get(job["id"])
+    assert done["status"] == "succeeded" and done["attempts"] == 1
+    assert done["result"]["recommended_credits"] == 4.2 and done["finished_at"]
+    assert seen[0]["params"]["evidence_type"] == "before" and seen[0]["evidence_id"] == 1
+
+    # An analysis that ran but failed is final
+    failing, _ = make_queue(lambda job: {"success": False, "error": "No vegetation detected"})
+    job = enqueue(failing)
+    failing.run_next("worker-a")
+    assert failing.get(job["id"])["status"] == "failed"
+    assert failing.get(job["id"])["error"] == "No vegetation detected"
+    print("✓ Result written back on success")
+
+def test_retries_with_backoff():
+    print("Testing retries...")
+    calls = []
+
+    def flaky(job):
+        calls.append(job["attempts"])
+        raise RuntimeError("worker crashed")
+
+    queue, Session = make_queue(flaky, max_attempts=3, retry_backoff=30)
+    job = enqueue(queue)
+    queue.run_next("worker-a")
+    retry = queue.get(job["id"])
+    assert retry["status"] == "queued" and retry["attempts"] == 1 and retry["error"] == "worker crashed"
+    assert queue.run_next("worker-a") is False  # Still backing off
+
+    for _ in range(2):
+        make_runnable(Session, job["id"])
+        assert queue.run_next("worker-a") is True
+    failed = queue.get(job["id"])
+    assert failed["status"] == "failed" and failed["attempts"] == 3 and calls == [1, 2, 3]
+
+    # RetryLater delays the job without using up an attempt
+    def busy(job):
+        raise RetryLater("pool busy", 5)
+
+    deferred_queue, Session = make_queue(busy)
+    job = enqueue(deferred_queue)
+    for _ in range(5):
+        make_runnable(Session, job["id"])
+        deferred_queue.run_next("worker-a")
+    deferred = deferred_queue.get(job["id"])
+    assert deferred["status"] == "queued" and deferred["attempts"] == 0
+    print("✓ Failed attempts retried with backoff, then given up")
+
+def test_expired_lease_is_reclaimed():
+    """A job whose worker died is run again; the dead worker can no longer settle it."""
+    print("Testing lease expiry...")
+    queue, Session = make_queue(lambda job: {"success": True}, max_attempts=2)
+    job = enqueue(queue)
+    claimed = queue.claim("worker-a")
+    assert claimed["status"] == "running" and queue.claim("worker-b") is None
+
+    make_runnable(Session, job["id"], lease_expires_at=True)
+    reclaimed = queue.claim("worker-b")
+    assert reclaimed["id"] == job["id"] and reclaimed["attempts"] == 2
+
+    queue._finish(job["id"], "worker-a", "succeeded", result={"stale": True})
+    assert queue.get(job["id"])["status"] == "running"
+    queue._finish(job["id"], "worker-b", "succeeded", result={"success": True})
+    assert queue.get(job["id"])["result"] == {"success": True}
+
+    # Losing the lease on the last attempt fails the job
+    job = enqueue(queue, evidence_id=2)
+    for owner in ("worker-a", "worker-b"):
+        make_runnable(Session, job["id"], lease_expires_at=True)
+        queue.claim(owner)
+    make_runnable(Session, job["id"], lease_expires_at=True)
+    assert queue.claim("worker-c") is None
+    assert queue.get(job["id"])["status"] == "failed"
+    print("✓ Expired leases reclaimed, stale workers fenced off")
+
+def test_jobs_commit_with_their_evidence():
+    """Jobs added in the upload's transaction exist exactly when the evidence does."""
+    print("Testing transactional enqueue...")
+    queue, Session = make_queue(lambda job: {"success": True})
+    db = Session()
+    evidence = MRVData(project_id=7, evidence_hash="0x01")
+    db.add(evidence)
+    db.flush()
+    queue.add(db, "paired", evidence.id, 7, {"evidence_type": "before"})
+    db.rollback()
+    db.close()
+    assert queue.claim("worker-a") is None
+
+    db = Session()
+    evidence = MRVData(project_id=7, evidence_hash="0x02")
+    db.add(evidence)
+    db.flush()
+    job = queue.add(db, "paired", evidence.id, 7, {"evidence_type": "before"})
+    db.commit()
+    job_id, evidence_id = job.id, evidence.id
+    assert queue.get(job_id)["evidence_id"] == evidence_id
+    queue.forget(db, [evidence_id])
+    db.commit()
+    db.close()
+    assert queue.get(job_id) is None
+    print("✓ Jobs rolled back and deleted with their evidence")
+
+def test_background_workers_and_events():
+    print("Testing worker threads and status events...")
+    tmp = tempfile.mkdtemp()
+    queue, _ = make_queue(lambda job: {"success": True}, db_path=os.path.join(tmp, "jobs.db"),
+                          workers=2, poll_interval=0.05)
+    queue.start()
+    try:
+        jobs = [enqueue(queue, evidence_id=i) for i in range(4)]
+
+        async def follow(job_id):
+            return [job["status"] async for job in queue.watch(job_id, poll_interval=0.02)]
+
+        statuses = asyncio.run(follow(jobs[-1]["id"]))
+        assert statuses[-1] == "succeeded"
+        assert all(queue.get(job["id"])["status"] == "succeeded" for job in jobs[:-1])
+    finally:
+        queue.stop()
+        shutil.rmtree(tmp)
+    print(f"✓ Events: {' -> '.join(statuses)}")
+
+if __name__ == "__main__":
+    test_job_runs_and_stores_result()
+    test_retries_with_backoff()
+    test_expired_lease_is_reclaimed()
+    test_jobs_commit_with_their_evidence()
+    test_background_workers_and_events()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test the analysis process pool (services/analysis_pool.py): results from
+worker processes, bounded admission and the 503 returned when saturated.
+"""
+
+import sys
+import os
+import io
+import asyncio
+import threading
+
+import numpy as np
+from PIL import Image
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import services.ai_endpoints as ai_endpoints
+from services.analysis_pool import AnalysisPool, AnalysisPoolSaturated, _ready, green_progress, image_analysis
+from test_analysis_cache import with_cache_dir
+
+def make_image_bytes(green, seed=0):
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 80, (240, 320, 3), dtype=np.uint8)
+    image[:, :int(320 * green)] += np.array([20, 140, 30], dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+@with_cache_dir
+def test_thread_mode():
+    print("Testing analysis pool without worker processes...")
+    pool = AnalysisPool(workers=0, queue_size=2)
+    pool.start()
+    result = asyncio.run(pool.run(green_progress, make_image_bytes(0.2), make_image_bytes(0.7, seed=1)))
+    assert result['green_improvement'] > 0
+    stats = pool.stats()
+    assert stats['mode'] == "threads" and stats['completed'] == 1 and stats['in_flight'] == 0
+    print(f"✓ Green improvement {result['green_improvement']:+.1f}% computed on a thread")
+
+def test_saturation_rejects():
+    """Capacity is workers + queue; analyses beyond it are refused, not queued."""
+    print("Testing backpressure...")
+    pool = AnalysisPool(workers=0, queue_size=1)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = [asyncio.ensure_future(pool.run(release.wait, 10)) for _ in range(pool.capacity)]
+        await asyncio.sleep(0.05)
+        assert pool.saturated()
+        try:
+            await pool.run(release.wait, 10)
+            raise AssertionError("saturated pool accepted an analysis")
+        except AnalysisPoolSaturated:
+            pass
+        release.set()
+        await asyncio.gather(*blocked)
+
+    asyncio.run(scenario())
+    stats = pool.stats()
+    assert stats['rejected'] == 1 and stats['completed'] == 2 and not pool.saturated()
+    print(f"✓ {stats['capacity']} analyses admitted, 1 rejected")
+
+def test_endpoint_returns_503():
+    print("Testing 503 from a saturated pool...")
+    saturated = AnalysisPool(workers=0, queue_size=0)
+    saturated._in_flight = saturated.capacity
+    original = ai_endpoints.analysis_pool
+    ai_endpoints.analysis_pool = saturated
+    try:
+        upload = UploadFile(io.BytesIO(make_image_bytes(0.5)), filename="plot.png",
+                            headers=Headers({"content-type": "image/png"}))
+        asyncio.run(ai_endpoints.analyze_image(upload))
+        raise AssertionError("analysis ran on a saturated pool")
+    except HTTPException as e:
+        assert e.status_code == 503 and e.headers["Retry-After"]
+    finally:
+        ai_endpoints.analysis_pool = original
+    print("✓ 503 with Retry-After")
+
+@with_cache_dir
+def test_process_mode():
+    print("Testing analysis in worker processes...")
+    pool = AnalysisPool(workers=1, queue_size=1)
+    pool.start()
+    try:
+        image = make_image_bytes(0.4)
+
+        async def scenario():
+            pid = await pool.run(_ready)
+            result = await pool.run(image_analysis, image, "plot.png")
+            return pid, result
+
+        pid, (ndvi_result, vegetation_result) = asyncio.run(scenario())
+        assert pid != os.getpid()
+        expected_ndvi, expected_vegetation = image_analysis(image, "plot.png")
+        assert ndvi_result['vegetation_analysis'] == expected_ndvi['vegetation_analysis']
+        assert vegetation_result['vegetation_percentage'] == expected_vegetation['vegetation_percentage']
+        assert pool.stats()['mode'] == "processes"
+    finally:
+        pool.stop()
+    print(f"✓ Worker {pid} matches the in-process analysis")
+
+if __name__ == "__main__":
+    test_thread_mode()
+    test_saturation_rejects()
+    test_endpoint_returns_503()
+    test_process_mode()
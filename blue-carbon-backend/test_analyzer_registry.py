@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test the shared analyzer registry (services/analyzer_registry.py) and the
+settings snapshots of DynamicCarbonCreditCalculator.
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.analyzer_registry import AnalyzerRegistry, analyzers
+from services.dynamic_carbon_credit_calculator import DynamicCarbonCreditCalculator
+from test_analysis_pool import make_image_bytes
+from test_analysis_cache import with_cache_dir
+
+def test_single_instance_across_threads():
+    print("Testing concurrent first use...")
+    builds = []
+
+    def slow_factory(registry):
+        builds.append(threading.get_ident())
+        time.sleep(0.05)
+        return object()
+
+    registry = AnalyzerRegistry({"slow": slow_factory})
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(registry.get("slow"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len({id(instance) for instance in seen}) == 1
+    assert registry.stats()["built"] == ["slow"] and registry.build_seconds["slow"] >= 0.05
+    try:
+        registry.get("missing")
+        raise AssertionError("unknown analyzer returned")
+    except KeyError:
+        pass
+    print("✓ One build for 8 concurrent callers")
+
+@with_cache_dir
+def test_default_analyzers_share_dependencies():
+    print("Testing the default analyzers...")
+    analyzers.warm_up()
+    stats = analyzers.stats()
+    assert stats["built"] == stats["registered"]
+
+    ndvi, co2 = analyzers.get("ndvi"), analyzers.get("co2")
+    before_after = analyzers.get("before_after")
+    calculator = analyzers.get("dynamic_credits")
+    assert before_after.ndvi_analyzer is ndvi and before_after.co2_calculator is co2
+    assert calculator.before_after_analyzer is before_after and calculator.co2_calculator is co2
+    assert analyzers.get("video").ndvi_analyzer is ndvi
+    assert analyzers.get("tiled").ndvi_analyzer is ndvi
+    assert analyzers.get("dynamic_credits") is calculator
+    print(f"✓ {len(stats['built'])} analyzers built once, NDVI and CO2 shared")
+
+def test_settings_snapshots():
+    print("Testing settings snapshots...")
+    calculator = DynamicCarbonCreditCalculator()
+    snapshot = calculator.settings
+    try:
+        snapshot["baseline_credit_rate"] = 1.0
+        raise AssertionError("settings snapshot is mutable")
+    except TypeError:
+        pass
+
+    update = calculator.update_settings({"baseline_credit_rate": 0.2})
+    assert update["success"] and update["original_settings"]["baseline_credit_rate"] == 0.1
+    assert calculator.settings["baseline_credit_rate"] == 0.2
+    assert snapshot["baseline_credit_rate"] == 0.1  # Holders of the old snapshot are unaffected
+    update["updated_settings"]["baseline_credit_rate"] = 5.0
+    assert calculator.settings["baseline_credit_rate"] == 0.2
+    assert DynamicCarbonCreditCalculator.DEFAULT_SETTINGS["baseline_credit_rate"] == 0.1
+    print("✓ Updates swap in a new read-only snapshot")
+
+@with_cache_dir
+def test_calculation_pins_settings():
+    """An update that lands while a calculation runs only applies to later calculations."""
+    print("Testing settings during a calculation...")
+    calculator = DynamicCarbonCreditCalculator(before_after_analyzer=analyzers.get("before_after"),
+                                               co2_calculator=analyzers.get("co2"))
+    compare_images = calculator.before_after_analyzer.compare_images
+
+    class UpdatingAnalyzer:
+        def compare_images(self, *args):
+            calculator.update_settings({"baseline_credit_rate": 0.5})
+            return compare_images(*args)
+
+    calculator.before_after_analyzer = UpdatingAnalyzer()
+    before, after = make_image_bytes(0.1, seed=21), make_image_bytes(0.7, seed=22)
+    result = calculator.calculate_dynamic_credits(before, after, 2.0)
+    assert result["success"], result.get("error")
+    assert result["calculation_factors"]["base_credit_rate"] == 0.1
+    assert calculator.settings["baseline_credit_rate"] == 0.5
+    print("✓ Calculation finished with the settings it started with")
+
+if __name__ == "__main__":
+    test_single_instance_across_threads()
+    test_default_analyzers_share_dependencies()
+    test_settings_snapshots()
+    test_calculation_pins_settings()
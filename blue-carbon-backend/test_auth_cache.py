@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Test the authentication cache (services/auth_cache.py) behind
+get_current_user: decoded tokens and users are reused, and wallet updates
+and deactivation take effect on the next request.
+Uses an in-memory SQLite database.
+"""
+
+import sys
+import os
+import time
+
+import jwt
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+import services.auth as auth
+from models.auth_model import User, UserRole
+from services.auth import ALGORITHM, SECRET_KEY, AuthService
+from services.auth_cache import AuthCache, TTLCache, auth_cache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def with_users_db(test):
+    """Run `test` with AuthService and main on an in-memory users table."""
+    def run():
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        User.__table__.create(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        originals = auth.SessionLocal, main.SessionLocal
+        auth.SessionLocal = main.SessionLocal = session_factory
+        auth_cache.clear()
+        try:
+            test(session_factory)
+        finally:
+            auth.SessionLocal, main.SessionLocal = originals
+            auth_cache.clear()
+    run.__name__ = test.__name__
+    return run
+
+def add_user(session_factory, username, role=UserRole.USER):
+    db = session_factory()
+    try:
+        user = User(username=username, email=f"{username}@example.org", password_hash="x", role=role)
+        db.add(user)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+def bearer(user_id, username="user"):
+    token = AuthService.create_access_token(user_id, username, "user")
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+def counting(cache):
+    """Count the database lookups and JWT decodes behind `cache`."""
+    calls = {"verify_token": 0, "get_user_by_id": 0}
+    for name in calls:
+        original = getattr(AuthService, name)
+        def wrapper(*args, _name=name, _original=original):
+            calls[_name] += 1
+            return _original(*args)
+        setattr(cache, f"_original_{name}", original)
+        setattr(AuthService, name, staticmethod(wrapper))
+    return calls
+
+def restore(cache):
+    for name in ("verify_token", "get_user_by_id"):
+        setattr(AuthService, name, staticmethod(getattr(cache, f"_original_{name}")))
+
+def test_ttl_cache():
+    print("Testing the TTL cache...")
+    clock = FakeClock()
+    cache = TTLCache(max_entries=2, clock=clock)
+    cache.put("a", 1, ttl=10)
+    cache.put("b", 2, ttl=5)
+    assert cache.get("a") == 1  # a is now the most recent
+    clock.now = 1
+    cache.put("c", 3, ttl=10)
+    assert cache.get("b") is None and len(cache) == 2
+    clock.now = 10
+    assert cache.get("a") is None and cache.get("c") == 3
+    cache.put("d", 4, ttl=0)
+    assert cache.get("d") is None
+    print("✓ Entries expire after their TTL, least recently used evicted first")
+
+@with_users_db
+def test_tokens_and_users_cached(session_factory):
+    print("Testing cached authentication...")
+    user_id = add_user(session_factory, "alice")
+    credentials = bearer(user_id, "alice")
+    clock = FakeClock()
+    cache = AuthCache(ttl=30, clock=clock)
+    calls = counting(cache)
+    try:
+        first = cache.get_user(cache.verify_token(credentials.credentials)["user_id"])
+        for _ in range(100):
+            user = cache.get_user(cache.verify_token(credentials.credentials)["user_id"])
+        assert calls == {"verify_token": 1, "get_user_by_id": 1}
+        assert user.username == "alice" and user.role == UserRole.USER and user is not first
+
+        # Each request gets its own User; changing one doesn't change the others
+        user.wallet_address = "0xchanged"
+        assert cache.get_user(user_id).wallet_address is None
+
+        # Changes made elsewhere are picked up once the TTL has passed
+        db = session_factory()
+        try:
+            db.query(User).filter(User.id == user_id).update({"organization_name": "Mangrove Trust"})
+            db.commit()
+        finally:
+            db.close()
+        assert cache.get_user(user_id).organization_name is None
+        clock.now = 31
+        assert cache.get_user(user_id).organization_name == "Mangrove Trust"
+        assert calls["get_user_by_id"] == 2
+    finally:
+        restore(cache)
+    print(f"✓ 101 requests, {calls['verify_token']} decode, {calls['get_user_by_id']} lookups until the TTL ran out")
+
+def test_token_expiry_and_invalid_tokens():
+    print("Testing expired and invalid tokens...")
+    cache = AuthCache(ttl=30)
+    short = jwt.encode({"user_id": 1, "exp": int(time.time()) + 1}, SECRET_KEY, algorithm=ALGORITHM)
+    assert cache.verify_token(short)["user_id"] == 1
+    time.sleep(1.2)
+    assert cache.verify_token(short) is None  # not served from the cache past its expiry
+
+    forged = jwt.encode({"user_id": 1, "exp": int(time.time()) + 60}, "another-key", algorithm=ALGORITHM)
+    for token in (forged, "not-a-jwt"):
+        assert cache.verify_token(token) is None
+    assert len(cache.tokens) == 0
+    print("✓ Tokens cached no longer than they are valid, invalid ones rejected")
+
+@with_users_db
+def test_wallet_update_and_deactivation(session_factory):
+    print("Testing invalidation...")
+    user_id = add_user(session_factory, "ngo")
+    admin_id = add_user(session_factory, "root", role=UserRole.ADMIN)
+    credentials = bearer(user_id, "ngo")
+
+    user = main.get_current_user(credentials)
+    wallet = "0x" + "ab" * 20
+    main.update_wallet_address(main.WalletUpdateRequest(wallet_address=wallet), current_user=user)
+    assert main.get_current_user(credentials).wallet_address == wallet
+    assert AuthService.get_user_by_id(user_id).wallet_address == wallet  # stored, not only cached
+
+    admin = main.get_current_user(bearer(admin_id, "root"))
+    main.set_user_active(user_id, main.UserActiveRequest(is_active=False), current_user=admin)
+    try:
+        main.get_current_user(credentials)
+        raise AssertionError("deactivated user authenticated")
+    except HTTPException as e:
+        assert e.status_code == 401
+    assert main.get_current_user_optional(credentials) is None
+
+    main.set_user_active(user_id, main.UserActiveRequest(is_active=True), current_user=admin)
+    assert main.get_current_user(credentials).id == user_id
+    try:
+        main.set_user_active(admin_id, main.UserActiveRequest(is_active=False), current_user=admin)
+        raise AssertionError("admin deactivated themselves")
+    except HTTPException as e:
+        assert e.status_code == 400
+    print("✓ Wallet updates and deactivation apply on the next request")
+
+if __name__ == "__main__":
+    test_ttl_cache()
+    test_tokens_and_users_cached()
+    test_token_expiry_and_invalid_tokens()
+    test_wallet_update_and_deactivation()
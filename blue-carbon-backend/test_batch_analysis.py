@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test the batch before/after comparison endpoint (POST /api/ai-verification/compare-batch):
+pairing of uploaded images by plot name and the streamed NDJSON results.
+"""
+
+import sys
+import os
+import io
+import asyncio
+import json
+import tempfile
+import zipfile
+
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import services.ai_endpoints as ai_endpoints
+from services.batch_analysis import pair_images, pair_role
+from test_analysis_pool import make_image_bytes
+from test_analysis_cache import with_cache_dir
+
+def upload(data, filename, content_type="image/png"):
+    return UploadFile(io.BytesIO(data), filename=filename, headers=Headers({"content-type": content_type}))
+
+def run_batch(files=None, archive=None):
+    kwargs = {"files": files, "archive": archive}  # Called directly, so the File() defaults don't apply
+
+    async def collect():
+        response = await ai_endpoints.compare_batch(project_area_hectares=2.0, time_period_years=1.0, **kwargs)
+        assert response.media_type == "application/x-ndjson"
+        return [json.loads(line) async for line in response.body_iterator]
+    return asyncio.run(collect())
+
+def test_pairing():
+    print("Testing before/after pairing...")
+    assert pair_role("plot7_before.JPG") == ("plot7", "before")
+    assert pair_role("north bay-after.png") == ("north bay", "after")
+    assert pair_role("site/a/before.tif") == ("site/a", "before")
+    assert pair_role("notes_before.txt") == ("", "")
+    assert pair_role("plot7.jpg") == ("", "")
+
+    pairs, unpaired = pair_images([
+        "p1_before.jpg", "p2_after.png", "p1_after.jpg", "p3_before.jpg",
+        "p2_before.png", "readme.md", "p1_before.png"
+    ])
+    assert list(pairs) == ["p1", "p2"]
+    assert pairs["p1"] == {"before": "p1_before.jpg", "after": "p1_after.jpg"}
+    assert sorted(unpaired) == ["p1_before.png", "p3_before.jpg", "readme.md"]
+    print("✓ Plots paired by name; leftovers reported")
+
+@with_cache_dir
+def test_batch_streams_ndjson():
+    print("Testing batch comparison of files and a ZIP archive...")
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("zone/before.png", make_image_bytes(0.1, seed=3))
+        zf.writestr("zone/after.png", make_image_bytes(0.8, seed=4))
+        zf.writestr("zone/orphan_after.png", make_image_bytes(0.5, seed=5))
+    files = [
+        upload(make_image_bytes(0.2, seed=1), "p1_before.png"),
+        upload(make_image_bytes(0.6, seed=2), "p1_after.png")
+    ]
+    lines = run_batch(files=files, archive=upload(archive.getvalue(), "plots.zip", "application/zip"))
+
+    header, pairs, summary = lines[0], lines[1:-1], lines[-1]
+    assert header["type"] == "batch" and header["pairs"] == 2
+    assert header["unpaired"] == ["zone/orphan_after.png"]
+    assert sorted(line["plot"] for line in pairs) == ["p1", "zone"]
+    for line in pairs:
+        assert line["type"] == "pair" and line["success"], line.get("result", {}).get("error")
+        assert line["result"]["analysis_type"] == "before_after_comparison"
+    assert summary["type"] == "summary" and summary["succeeded"] == 2 and summary["failed"] == 0
+    assert not os.path.exists(os.path.join(ai_endpoints.UPLOAD_DIR, f"batch_{header['batch_id']}"))
+    print(f"✓ {len(pairs)} plots streamed, {summary['total_recommended_credits']:.1f} credits in total")
+
+@with_cache_dir
+def test_batch_rejects_bad_input():
+    print("Testing invalid batches...")
+    for kwargs, status in [
+        ({"files": [upload(make_image_bytes(0.3), "p1_before.png")]}, 400),
+        ({"archive": upload(b"not a zip", "plots.zip", "application/zip")}, 400),
+        ({}, 400)
+    ]:
+        try:
+            run_batch(**kwargs)
+            raise AssertionError(f"accepted {kwargs}")
+        except HTTPException as e:
+            assert e.status_code == status, (kwargs, e.detail)
+    leftovers = [name for name in os.listdir(ai_endpoints.UPLOAD_DIR) if name.startswith("batch_")]
+    assert not leftovers, leftovers
+    print("✓ Unpaired uploads and broken archives rejected with 400")
+
+class CountingPool:
+    """Stand-in analysis pool recording how many analyses run at once."""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.running = 0
+        self.peak = 0
+
+    async def run(self, task, *args):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return {"success": True, "recommended_credits": 1.0}
+
+@with_cache_dir
+def test_batches_leave_workers_free():
+    """Concurrent batches together use at most half the pool."""
+    print("Testing batch concurrency...")
+    original = ai_endpoints.analysis_pool
+    ai_endpoints.analysis_pool = pool = CountingPool(workers=4)
+    try:
+        pairs = {f"p{n}": {"before": f"p{n}_before.png", "after": f"p{n}_after.png"} for n in range(12)}
+        sources = {name: name for images in pairs.values() for name in images.values()}
+
+        async def run_batches():
+            async def collect(batch_id):
+                stream = ai_endpoints.stream_batch(batch_id, tempfile.mkdtemp(), pairs, [], sources, 2.0, 1.0)
+                return [json.loads(line) async for line in stream]
+            return await asyncio.gather(collect("a"), collect("b"))
+
+        for lines in asyncio.run(run_batches()):
+            assert lines[-1]["succeeded"] == 12
+        assert pool.peak == 2
+    finally:
+        ai_endpoints.analysis_pool = original
+    print(f"✓ 2 batches of 12 plots, at most {pool.peak} of {pool.workers} workers busy")
+
+if __name__ == "__main__":
+    test_pairing()
+    test_batch_streams_ndjson()
+    test_batch_rejects_bad_input()
+    test_batches_leave_workers_free()
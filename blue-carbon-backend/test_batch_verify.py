@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Test the /verify and /verify/batch endpoints.
+Calls the endpoint function directly with an in-memory SQLite database and
+the in-process node stand-in from test_tx_manager, so no Hardhat node is
+required.
+"""
+
+import sys
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from models.db_model import Base, ChainEvent, MRVData, ProjectData
+from services.tx_manager import TransactionManager
+from test_tx_manager import FakeContractCall, FakeNode, SENDER
+
+class FakeRegistryFunctions:
+    def __init__(self):
+        self.calls = []
+
+    def verifyEvidenceAndIssue(self, evidence_id, mint_receipt, token_uri, amount):
+        self.calls.append((evidence_id, amount))
+        return FakeContractCall(revert=evidence_id == 14)
+
+class FakeRegistry:
+    def __init__(self):
+        self.functions = FakeRegistryFunctions()
+
+class FakeProjectCache:
+    """Keyed by on-chain project id, like ProjectChainCache."""
+
+    def sync(self, force=False):
+        pass
+
+    def get_project(self, blockchain_project_id):
+        return {9: ("Mangrove A", "Coast", 10, SENDER, "", True, 450)}.get(blockchain_project_id)
+
+def setup_database():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    # Database and on-chain project ids differ, as they do once a registration is retried
+    db.add(ProjectData(id=1, name="Mangrove A", location="Coast", hectares=10, owner=SENDER, blockchain_id=9))
+    # On-chain evidence ids differ from the database ids, as they do once uploads interleave
+    db.add_all([
+        MRVData(id=1, project_id=1, evidence_hash="0x01", chain_evidence_id=11, calculated_carbon_credits=150,
+                credit_calculation_method="ai_analysis", confidence_score=0.9),
+        MRVData(id=2, project_id=1, evidence_hash="0x02", chain_evidence_id=12),
+        MRVData(id=3, project_id=1, evidence_hash="0x03", chain_evidence_id=13, verified=True),
+        MRVData(id=4, project_id=1, evidence_hash="0x04", chain_evidence_id=14),
+        MRVData(id=5, project_id=1, evidence_hash="0x05", anchor_mode="merkle_batch", anchor_batch_id=1),
+        MRVData(id=7, project_id=1, evidence_hash="0x07")  # uploadEvidence not mined yet
+    ])
+    db.commit()
+    db.close()
+    return Session
+
+def with_verify_backend(test):
+    """Run `test(Session, registry, node)` with main's database, registry, project cache and tx manager on test doubles."""
+    def run():
+        names = ("SessionLocal", "registry", "project_cache", "tx_manager")
+        originals = {name: getattr(main, name) for name in names}
+        node = FakeNode()
+        registry = FakeRegistry()
+        main.SessionLocal = Session = setup_database()
+        main.registry = registry
+        main.project_cache = FakeProjectCache()
+        main.tx_manager = TransactionManager(node, SENDER, "0x01", poll_interval=0.05)
+        try:
+            test(Session, registry, node)
+        finally:
+            main.tx_manager.stop()
+            node.stop()
+            for name, value in originals.items():
+                setattr(main, name, value)
+    run.__name__ = test.__name__
+    return run
+
+@with_verify_backend
+def test_batch_verification_reports_each_item(Session, registry, node):
+    """Valid evidences are verified in one pass; the rest are reported individually."""
+    print("Testing batch verification...")
+    response = main.verify_evidence_batch(main.BatchVerifyRequest(evidence_ids=[1, 2, 3, 4, 5, 6, 7, 1], mint_amount=200))
+    results = {item["evidence_id"]: item for item in response["results"]}
+
+    assert [item["evidence_id"] for item in response["results"]] == [1, 2, 3, 4, 5, 6, 7]
+    assert results[1]["status"] == "verified" and results[1]["credits_issued"] == 150
+    assert results[2]["status"] == "verified" and results[2]["calculation_method"] == "manual_override"
+    assert results[3]["status"] == "skipped"
+    assert results[4]["status"] == "failed"
+    assert results[5]["status"] == "skipped" and "Merkle batch" in results[5]["error"]
+    assert results[6]["status"] == "skipped"
+    assert results[7]["status"] == "skipped" and "not anchored" in results[7]["error"]
+    assert response["summary"] == {"requested": 7, "verified": 2, "failed": 1, "skipped": 4, "credits_issued": 350}
+
+    # Transactions were sent with consecutive nonces before any was mined
+    assert [tx["nonce"] for tx in node.sent] == [0, 1, 2]
+    assert registry.functions.calls == [(11, 150), (12, 200), (14, 200)]
+
+    db = Session()
+    assert {e.id for e in db.query(MRVData).filter(MRVData.verified == True)} == {1, 2, 3}
+    assert response["status"] == "completed" and db.get(ProjectData, 1).total_issued_credits == 450
+    db.close()
+    print("✓ 2 verified, 1 reverted, 4 skipped with per-item results")
+
+@with_verify_backend
+def test_verify_uses_on_chain_evidence_id(Session, registry, node):
+    """/verify sends the id from the upload receipt and refuses evidence that has none yet."""
+    print("Testing single verification...")
+
+    # The confirmation handler stores the id the chain assigned
+    original = main.uploaded_evidence_id
+    main.uploaded_evidence_id = lambda receipt: receipt["evidenceId"]
+    try:
+        main.record_uploaded_evidence_id(7, {"evidenceId": 6})
+    finally:
+        main.uploaded_evidence_id = original
+    db = Session()
+    assert db.get(MRVData, 7).chain_evidence_id == 6
+    db.query(MRVData).filter(MRVData.id == 7).update({"chain_evidence_id": None})
+    db.commit()
+    db.close()
+
+    # A receipt missed across a restart is recovered from the indexed events once the upload is mined
+    assert main.recover_uploaded_evidence_ids() == 0
+    db = Session()
+    db.add_all([
+        ChainEvent(event="EvidenceUploaded", tx_hash="0xa1", log_index=0, project_id=9, evidence_id=17,
+                   args={"evidenceId": 17, "evidenceHash": "0x07"}),
+        ChainEvent(event="EvidenceUploaded", tx_hash="0xa2", log_index=0, project_id=9, evidence_id=12,
+                   args={"evidenceId": 12, "evidenceHash": "0x02"}),  # Already recorded on evidence 2
+        ChainEvent(event="EvidenceUploaded", tx_hash="0xa3", log_index=0, project_id=9, evidence_id=18,
+                   args={"evidenceId": 18, "evidenceHash": "0x05"})   # Evidence 5 is batch-anchored
+    ])
+    db.commit()
+    db.close()
+    assert main.recover_uploaded_evidence_ids() == 1
+    db = Session()
+    assert db.get(MRVData, 7).chain_evidence_id == 17 and db.get(MRVData, 5).chain_evidence_id is None
+    db.query(MRVData).filter(MRVData.id == 7).update({"chain_evidence_id": None})
+    db.commit()
+    db.close()
+
+    try:
+        main.verify_project(main.VerifyRequest(evidence_id=7))
+        raise AssertionError("evidence without an on-chain id verified")
+    except main.HTTPException as e:
+        assert e.status_code == 409
+    assert registry.functions.calls == []
+
+    # Batch-anchored evidence is pointed at its batch
+    try:
+        main.verify_project(main.VerifyRequest(evidence_id=5))
+        raise AssertionError("batch-anchored evidence verified on its own")
+    except main.HTTPException as e:
+        assert e.status_code == 409 and "POST /anchoring/batches/1/verify" in e.detail
+
+    response = main.verify_project(main.VerifyRequest(evidence_id=2, mint_amount=80))
+    assert response["status"] == "verified" and response["chain_evidence_id"] == 12
+    assert response["project"]["totalIssuedCredits"] == 450
+    assert registry.functions.calls == [(12, 80)]
+    print("✓ Verified under its on-chain id, unanchored evidence refused")
+
+if __name__ == "__main__":
+    test_batch_verification_reports_each_item()
+    test_verify_uses_on_chain_evidence_id()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test the content-addressed evidence store (services/blob_store.py) and
+that deleting a project releases its evidence files.
+Uses an in-memory SQLite database and a temp directory.
+"""
+
+import sys
+import os
+import io
+import hashlib
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.blob_store import BlobStore, build_media_hashes, media_blob_hashes
+
+def make_store(root):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    return BlobStore(sessionmaker(bind=engine), root=root)
+
+class FakeProjectCall:
+    def call(self):
+        return ("Mangrove A", "Coast", 10, "0x" + "11" * 20, "", True, 0)
+
+class FakeRegistry:
+    def __init__(self):
+        self.functions = type("Functions", (), {"projects": staticmethod(lambda project_id: FakeProjectCall())})()
+
+def test_identical_uploads_are_stored_once():
+    """Re-uploaded content is deduplicated and reference counted."""
+    print("Testing deduplication...")
+    content = os.urandom(4096)
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        first = store.ingest(io.BytesIO(content))
+        second = store.ingest(io.BytesIO(content))
+        other = store.ingest(io.BytesIO(b"different image"))
+
+        assert first == {"sha256": sha256, "size": 4096, "deduplicated": False}
+        assert second["deduplicated"] and second["sha256"] == sha256
+        assert store.path_for(sha256) == os.path.join(tmp, sha256[:2], sha256[2:4], sha256)
+        with open(store.path_for(sha256), "rb") as fh:
+            assert fh.read() == content
+        assert store.ref_count(sha256) == 2
+        assert os.listdir(os.path.join(tmp, "tmp")) == []
+
+        store.release([sha256])
+        assert store.ref_count(sha256) == 1 and os.path.exists(store.path_for(sha256))
+        store.release([sha256, other["sha256"]])
+        assert store.ref_count(sha256) == 0
+        assert not os.path.exists(store.path_for(sha256))
+        assert not os.path.exists(store.path_for(other["sha256"]))
+    print("✓ One copy per content, deleted with its last reference")
+
+def test_media_hashes_point_at_content():
+    """media_hashes keeps file names and resolves to blob paths; legacy records resolve to uploads/."""
+    print("Testing media_hashes...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        blobs = [dict(store.ingest(io.BytesIO(data)), name="image.jpg") for data in (b"before", b"after")]
+        media_hashes = build_media_hashes(blobs)
+
+        assert media_hashes["files"] == ["image.jpg", "image.jpg"]
+        assert media_blob_hashes(media_hashes) == [hashlib.sha256(b"before").hexdigest(),
+                                                   hashlib.sha256(b"after").hexdigest()]
+        assert store.resolve_paths(media_hashes) == [store.path_for(blob["sha256"]) for blob in blobs]
+        assert store.resolve_paths({"files": ["old.jpg"]}) == [os.path.join("uploads", "old.jpg")]
+        assert media_blob_hashes({"files": ["old.jpg"]}) == [] and media_blob_hashes(None) == []
+    print("✓ Same-name files kept apart by content hash")
+
+def test_project_deletion_releases_files():
+    """Deleting a project drops one reference per evidence file; files other projects share are kept."""
+    print("Testing project deletion...")
+    import main
+    from models.auth_model import User, UserRole
+    from models.db_model import Base, MRVData
+    from services.evidence_media import EvidenceMediaIndex
+    from services.perceptual_hash import NearDuplicateIndex
+
+    names = ("SessionLocal", "blob_store", "evidence_media", "duplicate_index", "registry")
+    originals = {name: getattr(main, name) for name in names}
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        Session = store.session_factory
+        Base.metadata.create_all(bind=Session().get_bind(), tables=[MRVData.__table__])
+        main.SessionLocal, main.blob_store = Session, store
+        main.evidence_media = EvidenceMediaIndex(Session, store)
+        main.duplicate_index = NearDuplicateIndex(Session)
+        main.registry = FakeRegistry()
+        try:
+            def add_evidence(project_id, *contents):
+                blobs = [dict(store.ingest(io.BytesIO(data)), name="image.jpg") for data in contents]
+                db = Session()
+                db.add(MRVData(project_id=project_id, media_hashes=build_media_hashes(blobs)))
+                db.commit()
+                db.close()
+                return [blob["sha256"] for blob in blobs]
+
+            own, shared = add_evidence(1, b"site before", b"shared")
+            again, = add_evidence(1, b"site before")
+            add_evidence(2, b"shared")
+
+            admin = User(id=1, username="root", role=UserRole.ADMIN)
+            response = main.delete_project(1, current_user=admin)
+            assert response["deleted_evidence_count"] == 2
+            assert own == again and store.ref_count(own) == 0 and not os.path.exists(store.path_for(own))
+            assert store.ref_count(shared) == 1 and os.path.exists(store.path_for(shared))
+        finally:
+            for name, value in originals.items():
+                setattr(main, name, value)
+    print("✓ Files of deleted evidence collected, shared ones kept")
+
+if __name__ == "__main__":
+    test_identical_uploads_are_stored_once()
+    test_media_hashes_point_at_content()
+    test_project_deletion_releases_files()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test the stored comparison renditions (services/renditions.py): the image
+comparison result links JPEG/WebP files instead of inlining base64 PNGs,
+and GET /renditions/{id}/{name} serves them with ETag and Cache-Control.
+"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+import cv2
+import numpy as np
+from fastapi import HTTPException
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from services.analysis_cache import analysis_cache
+from services.decoded_image import DecodedImage
+from services.evidence_image_comparator import EvidenceImageComparator
+from services.renditions import RENDITION_CACHE_CONTROL, rendition_store
+from test_analysis_pool import make_image_bytes
+
+def with_stores(test):
+    """Run `test` with the analysis cache and rendition store in a temporary directory."""
+    def run():
+        tmp = tempfile.mkdtemp()
+        original_root, original_dir = rendition_store.root, analysis_cache.cache_dir
+        rendition_store.root = os.path.join(tmp, "renditions")
+        analysis_cache.cache_dir = os.path.join(tmp, "cache")
+        analysis_cache.clear_memory()
+        try:
+            test()
+        finally:
+            rendition_store.root, analysis_cache.cache_dir = original_root, original_dir
+            analysis_cache.clear_memory()
+            shutil.rmtree(tmp)
+    run.__name__ = test.__name__
+    return run
+
+def compare(seed=0):
+    before = DecodedImage(make_image_bytes(0.2, seed=seed), "before.png")
+    after = DecodedImage(make_image_bytes(0.7, seed=seed + 1), "after.png")
+    result = EvidenceImageComparator().compare_images(before, after)
+    assert result["success"], result.get("error")
+    return result
+
+def fetch(url, if_none_match=None):
+    rendition_id, name = url.split("/")[-2:]
+    return main.get_rendition(rendition_id, name, if_none_match=if_none_match)
+
+@with_stores
+def test_result_links_renditions():
+    print("Testing comparison renditions...")
+    result = compare()
+    assert not any(key.endswith("_b64") for key in result)
+    assert len(json.dumps(result, default=float)) < 8000
+
+    renditions = result["renditions"]
+    assert set(renditions) == {"comparison", "before_highlighted", "after_highlighted"}
+    comparison = renditions["comparison"]
+    assert (comparison["width"], comparison["height"]) == (2400, 600)
+    assert set(comparison["urls"]) == {"320w", "1024w", "full"}
+    assert set(renditions["after_highlighted"]["urls"]) == {"320w", "full"}  # 800 wide: no 1024w
+    assert result["comparison_image_url"] == comparison["urls"]["full"]["jpeg"]
+
+    for size, width in (("320w", 320), ("1024w", 1024), ("full", 2400)):
+        for fmt in ("jpeg", "webp"):
+            response = fetch(comparison["urls"][size][fmt])
+            image = cv2.imdecode(np.frombuffer(response.body, np.uint8), cv2.IMREAD_COLOR)
+            assert image.shape[1] == width and response.media_type == f"image/{fmt}"
+    print(f"✓ {sum(len(entry['urls']) * 2 for entry in renditions.values())} renditions stored and linked")
+
+@with_stores
+def test_rendition_caching_headers():
+    print("Testing rendition HTTP caching...")
+    url = compare()["renditions"]["before_highlighted"]["urls"]["320w"]["webp"]
+    response = fetch(url)
+    etag = response.headers["etag"]
+    assert response.status_code == 200 and response.headers["cache-control"] == RENDITION_CACHE_CONTROL
+    assert etag.startswith('"') and fetch(url).headers["etag"] == etag
+
+    for header in (etag, f'"other", {etag}', f"W/{etag}", "*"):
+        revalidated = fetch(url, if_none_match=header)
+        assert revalidated.status_code == 304 and not revalidated.body
+        assert revalidated.headers["etag"] == etag
+    assert fetch(url, if_none_match='"other"').status_code == 200
+
+    rendition_id = url.split("/")[-2]
+    for rid, name in ((rendition_id, "../../secrets.jpg"), (rendition_id, "comparison-full.png"),
+                      ("not-an-id", "comparison-full.jpg"), ("0" * 64, "comparison-full.jpg")):
+        try:
+            main.get_rendition(rid, name, if_none_match=None)
+            raise AssertionError(f"served {rid}/{name}")
+        except HTTPException as e:
+            assert e.status_code == 404
+    print("✓ Strong ETag, immutable Cache-Control, 304 on revalidation")
+
+@with_stores
+def test_missing_renditions_rendered_again():
+    print("Testing cached results whose renditions are gone...")
+    result = compare(seed=5)
+    hits = analysis_cache.hits
+    assert compare(seed=5) == result and analysis_cache.hits == hits + 1
+
+    shutil.rmtree(rendition_store.root)
+    again = compare(seed=5)
+    assert again["renditions"] == result["renditions"]
+    assert fetch(again["comparison_image_url"]).status_code == 200
+    print("✓ Renditions restored for a cached comparison")
+
+if __name__ == "__main__":
+    test_result_links_renditions()
+    test_rendition_caching_headers()
+    test_missing_renditions_rendered_again()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test the shared decode pipeline (services/decoded_image.py): one DecodedImage
+passed through several analyzers is decoded, resized and converted only once.
+"""
+
+import sys
+import os
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.analysis_cache import analysis_cache
+from services.decoded_image import DecodedImage, LINEAR, as_decoded
+from services.ai_verification import NDVIAnalyzer
+from services.greenness_analyzer import GreennessAnalyzer
+from services.evidence_image_comparator import EvidenceImageComparator
+from services.dynamic_carbon_credit_calculator import DynamicCarbonCreditCalculator
+from test_analysis_cache import with_cache_dir
+
+class CountingImage(DecodedImage):
+    """DecodedImage that counts how often the encoded bytes are decoded."""
+
+    def __init__(self, data, name="image"):
+        super().__init__(data, name)
+        self.decodes = 0
+
+    @property
+    def pil_rgb(self):
+        if self._pil_rgb is None:
+            self.decodes += 1
+        return super().pil_rgb
+
+def make_image(green: int, size=(1280, 960)) -> bytes:
+    width, height = size
+    rng = np.random.default_rng(green)
+    array = rng.integers(0, 40, (height, width, 3), dtype=np.uint8)
+    array[:, :green * width // 100] += np.array([30, 150, 40], dtype=np.uint8)
+    array[:, green * width // 100:] += np.array([150, 110, 80], dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def test_views_are_lazy_and_shared():
+    """Decoding, resizing and color conversion happen on first use, once."""
+    print("Testing lazy views...")
+    image = CountingImage(make_image(40), "plot.png")
+    assert image.decodes == 0
+    assert image.content_hash == as_decoded(image.data).content_hash
+
+    view = image.view_within(1024, (1024, 768))
+    assert view.shape == (768, 1024, 3)
+    assert image.view((1024, 768)) is view
+    assert view.hsv is view.hsv
+    assert image.view((800, 600), LINEAR) is not image.view((800, 600))
+    red, green, blue = view.channels_f32
+    assert green.dtype == np.float32 and green.flags['C_CONTIGUOUS']
+    assert np.array_equal(green, view.rgb[:, :, 1])
+    assert image.decodes == 1
+
+    small = DecodedImage(make_image(40, (320, 240)))
+    assert small.view_within(1024, (1024, 768)) is small.full
+    try:
+        as_decoded("uploads/plot.png")
+        assert False, "paths are not image input"
+    except TypeError:
+        pass
+    print("✓ One decode, views and color spaces cached per image")
+
+@with_cache_dir
+def test_analyzers_share_one_decode():
+    """NDVI, greenness, comparison and dynamic credits on the same pair decode each image once."""
+    print("Testing shared decode across analyzers...")
+    analysis_cache.enabled = False
+    try:
+        before_bytes, after_bytes = make_image(20), make_image(60)
+        before, after = CountingImage(before_bytes, "before.png"), CountingImage(after_bytes, "after.png")
+
+        ndvi = NDVIAnalyzer().analyze_image(before, "before.png")
+        greenness = GreennessAnalyzer().calculate_greenness_percentage(before)
+        comparison = EvidenceImageComparator().compare_images(before, after)
+        credits = DynamicCarbonCreditCalculator().calculate_dynamic_credits(before, after, 2.0)
+        assert comparison['success'] and credits['success']
+        assert before.decodes == 1 and after.decodes == 1
+
+        # Same results as analysing the raw bytes independently
+        assert NDVIAnalyzer().analyze_image(before_bytes, "before.png")['vegetation_analysis'] == ndvi['vegetation_analysis']
+        assert GreennessAnalyzer().calculate_greenness_percentage(before_bytes) == greenness
+        fresh = DynamicCarbonCreditCalculator().calculate_dynamic_credits(before_bytes, after_bytes, 2.0)
+        assert fresh['recommended_credits'] == credits['recommended_credits']
+    finally:
+        analysis_cache.enabled = True
+    print(f"✓ Each image decoded once for four analyses ({credits['recommended_credits']} credits)")
+
+@with_cache_dir
+def test_exif_orientation_applied():
+    """Phone photos tagged with an EXIF rotation are analysed upright, like cv2.imread loads them."""
+    print("Testing EXIF orientation...")
+    array = np.zeros((60, 100, 3), dtype=np.uint8)
+    array[:, :50] = (30, 160, 40)  # green left half, as stored by the camera
+    exif = Image.Exif()
+    exif[0x0112] = 6  # display rotated 90 degrees clockwise
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format="JPEG", quality=95, exif=exif)
+
+    image = DecodedImage(buffer.getvalue(), "phone.jpg")
+    assert image.size == (60, 100)  # from the header, before decoding
+    assert image.full.shape == (100, 60, 3) and image.size == (60, 100)
+    upright = cv2.cvtColor(cv2.imdecode(np.frombuffer(image.data, np.uint8), cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
+    assert np.abs(image.full.rgb.astype(int) - upright.astype(int)).max() <= 8
+    assert image.full.rgb[:50, :, 1].mean() > 120 and image.full.rgb[50:, :, 1].mean() < 40  # green on top
+    print("✓ Rotated as cv2.imread does")
+
+if __name__ == "__main__":
+    test_views_are_lazy_and_shared()
+    test_analyzers_share_one_decode()
+    test_exif_orientation_applied()
@@ -13,6 +13,7 @@ import numpy as np
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from services.dynamic_carbon_credit_calculator import DynamicCarbonCreditCalculator
+from test_analysis_cache import with_cache_dir
 
 def create_simple_image(vegetation_percentage: float) -> bytes:
     """Create a simple test image."""
@@ -45,6 +46,7 @@ def create_simple_image(vegetation_percentage: float) -> bytes:
     img_buffer.seek(0)
     return img_buffer.getvalue()
 
+@with_cache_dir
 def test_dynamic_calculator():
     """Test the DynamicCarbonCreditCalculator exactly like the API does."""
     print("Testing DynamicCarbonCreditCalculator...")
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Test the background registry event indexer (services/event_indexer.py).
+Uses an in-process stand-in for the node and registry contract plus an
+in-memory SQLite database, so no Hardhat node is required.
+"""
+
+import sys
+import os
+import json
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from web3 import Web3
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.db_model import Base
+from services.event_indexer import RegistryEventIndexer
+
+REGISTRY_ABI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "contracts", "BlueCarbonRegistry.json")
+OWNER = "0x" + "AB" * 20
+UPLOADER = "0x" + "CD" * 20
+
+class FakeEvent:
+    def process_log(self, log):
+        return log["decoded"]
+
+class FakeRegistryNode:
+    """Node + registry stand-in that records logs as (block, decoded event)."""
+
+    def __init__(self):
+        with open(REGISTRY_ABI_PATH, "r", encoding="utf-8") as f:
+            self.abi = json.load(f)["abi"]
+        self.address = "0x" + "22" * 20
+        self.block_number = 0
+        self.chain_salt = 0
+        self.logs = []
+        self.get_logs_calls = 0
+
+        self.topics = {
+            entry["name"]: Web3.keccak(text=f"{entry['name']}({','.join(i['type'] for i in entry['inputs'])})")
+            for entry in self.abi if entry["type"] == "event"
+        }
+        self.events = type("Events", (), {name: staticmethod(FakeEvent) for name in self.topics})()
+
+        node = self
+        self.eth = type("Eth", (), {})()
+        type(self.eth).block_number = property(lambda _: node.block_number)
+        self.eth.get_block = self.get_block
+        self.eth.get_logs = self.get_logs
+
+    def block_hash(self, number):
+        return Web3.keccak(text=f"{self.chain_salt}:{number}")
+
+    def get_block(self, number):
+        if number > self.block_number:
+            raise ValueError("block not found")
+        return {"hash": self.block_hash(number)}
+
+    def get_logs(self, params):
+        self.get_logs_calls += 1
+        wanted = {Web3.to_hex(topic) if isinstance(topic, bytes) else topic for topic in params["topics"][0]}
+        return [
+            log for log in self.logs
+            if params["fromBlock"] <= log["decoded"]["blockNumber"] <= params["toBlock"]
+            and Web3.to_hex(log["topics"][0]) in wanted
+        ]
+
+    def emit(self, event_name, **args):
+        self.block_number += 1
+        self.logs.append({
+            "topics": [self.topics[event_name]],
+            "decoded": {
+                "args": args,
+                "blockNumber": self.block_number,
+                "blockHash": self.block_hash(self.block_number),
+                "transactionHash": Web3.keccak(text=f"tx{self.chain_salt}:{self.block_number}"),
+                "logIndex": 0
+            }
+        })
+
+def create_indexer(node, block_range=10):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return RegistryEventIndexer(node, node, sessionmaker(bind=engine), poll_interval=0.01, block_range=block_range)
+
+def emit_project_history(node, project_id):
+    node.emit("ProjectRegistered", projectId=project_id, owner=OWNER, name=f"Project {project_id}", metadataURI="ipfs://m")
+    node.emit("EvidenceUploaded", evidenceId=project_id * 10, projectId=project_id,
+              evidenceHash=b"\x01" * 32, evidenceURI="ipfs://e", uploader=UPLOADER)
+    node.emit("EvidenceVerified", evidenceId=project_id * 10, projectId=project_id, verifier=OWNER, receiptTokenId=0)
+    node.emit("CreditsMinted", projectId=project_id, to=OWNER, amount=5)
+    # Events outside the six indexed ones are not stored
+    node.emit("Transfer", **{"from": OWNER, "to": UPLOADER, "tokenId": 1})
+
+def test_indexes_in_block_ranges():
+    """Logs are fetched in block-range batches and stored once with their args."""
+    print("Testing batched indexing...")
+    node = FakeRegistryNode()
+    for project_id in range(1, 6):
+        emit_project_history(node, project_id)
+    indexer = create_indexer(node, block_range=10)
+
+    stored = indexer.index_once()
+    assert stored == 20, f"expected 20 events, got {stored}"
+    assert node.get_logs_calls == 3  # 25 blocks in ranges of 10
+    assert indexer.checkpoint()[0] == 25
+
+    # A second pass with no new blocks stores nothing
+    assert indexer.index_once() == 0
+
+    uploads, _ = indexer.get_events(event="EvidenceUploaded", project_id=3)
+    assert len(uploads) == 1
+    assert uploads[0]["evidenceId"] == 30
+    assert uploads[0]["args"]["evidenceHash"] == "0x" + "01" * 32
+
+    by_account, _ = indexer.get_events(account=UPLOADER.upper().replace("0X", "0x"))
+    assert len(by_account) == 5
+    print(f"✓ Indexed {stored} events with {node.get_logs_calls} getLogs calls")
+
+def test_pagination_and_resume():
+    """Events page in chain order and indexing resumes after the checkpoint."""
+    print("Testing pagination and resume...")
+    node = FakeRegistryNode()
+    emit_project_history(node, 1)
+    indexer = create_indexer(node)
+    indexer.index_once()
+
+    emit_project_history(node, 2)
+    assert indexer.index_once() == 4
+
+    page, cursor = indexer.get_events(limit=3)
+    rest, last_cursor = indexer.get_events(limit=10, after=cursor)
+    blocks = [e["blockNumber"] for e in page + rest]
+    assert len(blocks) == 8 and blocks == sorted(blocks)
+    assert last_cursor is None
+    print("✓ Paged through 8 events in chain order")
+
+def test_chain_reset_reindexes():
+    """A restarted local chain wipes the index and starts from genesis."""
+    print("Testing chain reset...")
+    node = FakeRegistryNode()
+    emit_project_history(node, 1)
+    emit_project_history(node, 2)
+    indexer = create_indexer(node)
+    indexer.index_once()
+
+    node.logs = []
+    node.block_number = 0
+    node.chain_salt += 1
+    emit_project_history(node, 1)
+
+    indexer.index_once()
+    events, _ = indexer.get_events()
+    assert len(events) == 4
+    print("✓ Index rebuilt after chain reset")
+
+def test_background_thread_notifies_listeners():
+    """The poll loop indexes new blocks and runs listeners after each poll."""
+    print("Testing background poll loop...")
+    node = FakeRegistryNode()
+    indexer = create_indexer(node)
+    polls = []
+    indexer.add_listener(lambda: polls.append(True))
+
+    indexer.start()
+    try:
+        emit_project_history(node, 1)
+        deadline = time.time() + 5
+        while time.time() < deadline and len(indexer.get_events()[0]) < 4:
+            time.sleep(0.02)
+    finally:
+        indexer.stop()
+
+    assert len(indexer.get_events()[0]) == 4
+    assert polls and not indexer.running
+    print("✓ Background indexer picked up new events")
+
+if __name__ == "__main__":
+    test_indexes_in_block_ranges()
+    test_pagination_and_resume()
+    test_chain_reset_reindexes()
+    test_background_thread_notifies_listeners()
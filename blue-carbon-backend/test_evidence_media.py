@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test the evidence file index (services/evidence_media.py) the image
+comparison resolves before/after images through.
+Uses an in-memory SQLite database and a temp directory.
+"""
+
+import sys
+import os
+import io
+import datetime
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.db_model import Base, MRVData
+from services.blob_store import BlobStore, build_media_hashes
+from services.evidence_image_comparator import EvidenceImageComparator
+from services.evidence_media import EvidenceMediaIndex, media_roles
+from test_analysis_cache import with_cache_dir
+from test_analysis_pool import make_image_bytes
+
+def make_index(root):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[MRVData.__table__])
+    session_factory = sessionmaker(bind=engine)
+    return EvidenceMediaIndex(session_factory, BlobStore(session_factory, root=root))
+
+def add_evidence(index, evidence_type, files, project_id=1, minutes=0, indexed=True):
+    """Store `files` ({name: bytes}) as one evidence, indexed like an upload (or as legacy evidence)."""
+    blobs = [dict(index.blob_store.ingest(io.BytesIO(data)), name=name) for name, data in files.items()]
+    media_hashes = build_media_hashes(blobs)
+    db = index.session_factory()
+    try:
+        record = MRVData(project_id=project_id, evidence_type=evidence_type, media_hashes=media_hashes,
+                         timestamp=datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=minutes))
+        db.add(record)
+        db.flush()
+        if indexed:
+            index.record(db, record.id, evidence_type, media_hashes)
+        db.commit()
+        return record.id
+    finally:
+        db.close()
+
+def test_media_roles():
+    print("Testing role assignment...")
+    assert media_roles("before_after_pair", ["a.jpg", "b.jpg", "c.mp4"]) == ["before", "after", "media"]
+    assert media_roles("before_after_pair", ["a.jpg"]) == ["before"]
+    assert media_roles("after", ["a.jpg", "b.jpg"]) == ["after", "after"]
+    assert media_roles("general", ["site_AFTER.png", "Before_1.jpg", "map.tif"]) == ["after", "before", "media"]
+    assert media_roles(None, []) == []
+    print("✓ Pairs by upload order, general evidence by file name")
+
+def test_pair_resolved_by_id():
+    print("Testing before/after pair lookup...")
+    with tempfile.TemporaryDirectory() as tmp:
+        index = make_index(tmp)
+        evidence_id = add_evidence(index, "before_after_pair", {"site.jpg": b"before bytes", "site2.jpg": b"after bytes"})
+        add_evidence(index, "general", {f"noise_{n}.jpg": os.urandom(64) for n in range(20)})
+
+        media = index.comparison_files(evidence_id)
+        assert media["files"] == ["site.jpg", "site2.jpg"]
+        assert (media["before"]["name"], media["after"]["name"]) == ("site.jpg", "site2.jpg")
+        assert media["before"]["evidence_id"] == media["after"]["evidence_id"] == evidence_id
+        with open(media["after"]["path"], "rb") as fh:
+            assert fh.read() == b"after bytes"
+        assert index.comparison_files(9999) is None
+    print("✓ Files found by evidence id, whatever else is stored")
+
+def test_single_role_evidence_paired_in_project():
+    print("Testing single-role evidence pairing...")
+    with tempfile.TemporaryDirectory() as tmp:
+        index = make_index(tmp)
+        before_id = add_evidence(index, "before", {"2023.jpg": b"old"}, minutes=0)
+        add_evidence(index, "after", {"2024-draft.jpg": b"draft"}, minutes=1)
+        after_id = add_evidence(index, "after", {"2024.jpg": b"new"}, minutes=2)
+        add_evidence(index, "after", {"elsewhere.jpg": b"other project"}, project_id=2, minutes=3)
+
+        media = index.comparison_files(before_id)
+        assert (media["before"]["evidence_id"], media["after"]["evidence_id"]) == (before_id, after_id)
+        assert media["after"]["name"] == "2024.jpg" and media["files"] == ["2023.jpg"]
+        assert index.comparison_files(after_id)["before"]["evidence_id"] == before_id
+
+        lonely = add_evidence(index, "before", {"alone.jpg": b"alone"}, project_id=3)
+        assert index.comparison_files(lonely)["after"] is None
+    print("✓ Compared with the latest evidence of the other role")
+
+def test_legacy_evidence_indexed_on_lookup():
+    print("Testing lazy indexing of older evidence...")
+    with tempfile.TemporaryDirectory() as tmp:
+        index = make_index(tmp)
+        evidence_id = add_evidence(index, "general", {"a_before.jpg": b"1", "b_after.jpg": b"2"}, indexed=False)
+        db = index.session_factory()
+        try:
+            legacy = MRVData(project_id=1, evidence_type="general", media_hashes={"files": ["x.jpg", "y.jpg"]})
+            db.add(legacy)
+            db.commit()
+            legacy_id = legacy.id
+        finally:
+            db.close()
+
+        media = index.comparison_files(evidence_id)
+        assert (media["before"]["name"], media["after"]["name"]) == ("a_before.jpg", "b_after.jpg")
+        assert [f["position"] for f in index.files(evidence_id)] == [0, 1]
+
+        files = index.files(legacy_id)
+        assert [f["sha256"] for f in files] == [None, None]
+        assert files[0]["path"].endswith(os.path.join("uploads", "x.jpg"))
+        media = index.comparison_files(legacy_id)
+        assert (media["before"]["name"], media["after"]["name"]) == ("x.jpg", "y.jpg")  # upload order
+
+        db = index.session_factory()
+        try:
+            index.forget(db, [evidence_id])
+            db.commit()
+        finally:
+            db.close()
+        assert len(index.files(evidence_id)) == 2  # indexed again from media_hashes
+    print("✓ Indexed from media_hashes the first time they are looked up")
+
+@with_cache_dir
+def test_comparison_uses_indexed_files():
+    print("Testing the evidence image comparison...")
+    with tempfile.TemporaryDirectory() as tmp:
+        index = make_index(tmp)
+        evidence_id = add_evidence(index, "before_after_pair", {
+            "plot_may.png": make_image_bytes(0.2, seed=1),
+            "plot_sep.png": make_image_bytes(0.7, seed=2)
+        })
+        comparator = EvidenceImageComparator()
+        result = comparator.get_evidence_images_analysis(evidence_id, index.comparison_files(evidence_id))
+        assert result["success"], result.get("error")
+        assert result["files_used"]["before_image"] == "plot_may.png"
+        assert result["files_used"]["after_image"] == "plot_sep.png"
+
+        lonely = add_evidence(index, "before", {"only.png": b"x"}, project_id=5)
+        result = comparator.get_evidence_images_analysis(lonely, index.comparison_files(lonely))
+        assert not result["success"] and result["available_files"] == ["only.png"]
+    print("✓ Comparison runs on the indexed before/after images")
+
+if __name__ == "__main__":
+    test_media_roles()
+    test_pair_resolved_by_id()
+    test_single_role_evidence_paired_in_project()
+    test_legacy_evidence_indexed_on_lookup()
+    test_comparison_uses_indexed_files()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test video frame sampling (services/frame_sampling.py) and the video
+analyzers that use it. Each frame of the test clip carries its index as
+black and white bars, so every returned frame can be checked.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+import cv2
+import numpy as np
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.advanced_video_analysis import AdvancedVideoAnalyzer
+from services.ai_verification import VideoAnalyzer
+from services.frame_sampling import SEEK_GAP_FRAMES, VideoFrameSampler, evenly_spaced
+
+BARS = 10
+BAR_WIDTH = 32
+
+def write_clip(path, frame_count=600):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (BARS * BAR_WIDTH, 240))
+    for index in range(frame_count):
+        frame = np.zeros((240, BARS * BAR_WIDTH, 3), dtype=np.uint8)
+        for bit in range(BARS):
+            if index >> bit & 1:
+                frame[:, bit * BAR_WIDTH:(bit + 1) * BAR_WIDTH] = 255
+        writer.write(frame)
+    writer.release()
+
+def frame_number(frame):
+    bar = frame.shape[1] / BARS
+    return sum(1 << bit for bit in range(BARS)
+               if frame[:, int(bit * bar + bar / 4):int((bit + 1) * bar - bar / 4)].mean() > 128)
+
+def with_clip(test):
+    def run():
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, "clip.mp4")
+            write_clip(path)
+            test(path)
+        finally:
+            shutil.rmtree(tmp)
+    run.__name__ = test.__name__
+    return run
+
+@with_clip
+def test_sampled_frames_are_exact(path):
+    print("Testing sampled frames...")
+    for indices in ([0, 5, 10, 200, 400, 599], [3, 4, 5], [590, 100, 100], [598, 650]):
+        sampler = VideoFrameSampler(path)
+        frames = list(sampler.frames(indices))
+        sampler.close()
+        expected = sorted({index for index in indices if index < 600})
+        assert [index for index, _ in frames] == expected
+        assert all(frame_number(frame) == index for index, frame in frames), indices
+        assert sampler.retrieved == len(expected)
+
+    # Neighbouring frames are grabbed, never seeked to
+    sampler = VideoFrameSampler(path)
+    list(sampler.frames(range(0, 60, 3)))
+    sampler.close()
+    assert sampler.seeks == 0 and sampler.grabbed == 58
+    print("✓ Frames returned in order with the right content")
+
+def test_seek_decisions():
+    print("Testing grab/seek decisions...")
+    sampler = VideoFrameSampler("missing.mp4")
+    assert not sampler.is_opened() and list(sampler.frames([0, 1])) == []
+
+    sampler._keyframes = [0, 250, 500]  # Long GOP
+    assert not sampler._should_seek(0, 10)
+    assert not sampler._should_seek(0, 200)    # Its keyframe is where decoding already is
+    assert sampler._should_seek(0, 300)        # Decodes from 250 instead of 0
+    assert sampler._should_seek(240, 300)      # 50 frames from 250 instead of 60 grabs
+    assert not sampler._should_seek(280, 300)  # The keyframe is behind the current position
+    assert not sampler._should_seek(0, 260)    # Backs off past the keyframe at 250
+
+    sampler._keyframes = []  # Keyframes unknown: seek across long gaps only
+    assert not sampler._should_seek(0, SEEK_GAP_FRAMES)
+    assert sampler._should_seek(0, SEEK_GAP_FRAMES + 1)
+    assert evenly_spaced(5, 10) == [0, 1, 2, 3, 4] and evenly_spaced(100, 3) == [0, 49, 99]
+    print("✓ Gaps seeked over only when that decodes fewer frames")
+
+@with_clip
+def test_downscaled_frames(path):
+    print("Testing downscaled decoding...")
+    sampler = VideoFrameSampler(path, max_width=160)
+    (index, frame), = sampler.frames([37])
+    sampler.close()
+    assert frame.shape == (120, 160, 3) and frame_number(frame) == 37
+    print("✓ Frames scaled to the maximum width, aspect ratio kept")
+
+@with_clip
+def test_video_analyzers(path):
+    print("Testing the video analyzers' frame extraction...")
+    frames = VideoAnalyzer().extract_key_frames(path, max_frames=10)
+    assert [frame_number(frame) for frame in frames] == list(range(0, 600, 60))
+
+    analyzer = AdvancedVideoAnalyzer()
+    selected = analyzer.extract_optimal_frames(path)
+    assert selected and all(frame_number(data['frame']) == data['frame_index'] for data in selected)
+    assert set(data['frame_index'] for data in selected) <= set(evenly_spaced(600, analyzer.max_frames_per_video))
+    assert VideoAnalyzer().extract_key_frames("missing.mp4") == []
+    print(f"✓ {len(frames)} key frames and {len(selected)} optimal frames extracted")
+
+if __name__ == "__main__":
+    test_sampled_frames_are_exact()
+    test_seek_decisions()
+    test_downscaled_frames()
+    test_video_analyzers()
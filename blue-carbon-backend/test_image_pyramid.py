@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test the stored image pyramids (services/image_pyramid.py): analyzers
+resample from the nearest level instead of the original, with the same
+results whether or not the pyramid was built, and the evidence preview
+endpoint serves the levels.
+"""
+
+import sys
+import os
+import asyncio
+import io
+import shutil
+import tempfile
+
+import cv2
+import numpy as np
+from fastapi import HTTPException
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from services.analysis_pool import AnalysisPoolSaturated
+from services.decoded_image import DecodedImage, LANCZOS, LINEAR
+from services.greenness_analyzer import GreennessAnalyzer
+from services.image_pyramid import PYRAMID_LEVELS, PYRAMID_VERSION, level_size, levels_for, pyramid_store
+from test_analysis_cache import with_cache_dir
+from test_evidence_media import add_evidence, make_index
+
+def make_photo(size=(2000, 1500), seed=0):
+    rng = np.random.default_rng(seed)
+    width, height = size
+    image = cv2.resize(rng.integers(0, 200, (height // 20, width // 20, 3), dtype=np.uint8), size,
+                       interpolation=cv2.INTER_CUBIC)
+    ok, encoded = cv2.imencode(".jpg", image)
+    return encoded.tobytes()
+
+def with_pyramid_dir(test):
+    """Run `test` with the pyramid store in a temporary directory."""
+    def run():
+        tmp = tempfile.mkdtemp()
+        original = pyramid_store.root
+        pyramid_store.root = os.path.join(tmp, "pyramids")
+        try:
+            test(tmp)
+        finally:
+            pyramid_store.root = original
+            shutil.rmtree(tmp)
+    run.__name__ = test.__name__
+    return run
+
+def test_level_sizes():
+    print("Testing level sizes...")
+    assert level_size(4000, 3000, 1024) == (1024, 768)
+    assert level_size(1000, 4000, 256) == (64, 256)
+    assert levels_for(4000, 3000) == list(PYRAMID_LEVELS)
+    assert levels_for(600, 400) == [256, 512]
+    assert levels_for(256, 100) == []
+    print("✓ Aspect-preserving levels below the image size")
+
+@with_cache_dir
+@with_pyramid_dir
+def test_views_read_from_stored_levels(tmp):
+    print("Testing analyzer views from the pyramid...")
+    data = make_photo()
+    assert pyramid_store.build(DecodedImage(data)) == [256, 512, 1024]
+    content_hash = DecodedImage(data).content_hash
+    assert pyramid_store.stored_levels(content_hash) == [256, 512, 1024]
+
+    stored = DecodedImage(data)
+    for size, method in (((1024, 768), LANCZOS), ((512, 384), LANCZOS), ((800, 600), LINEAR)):
+        stored.view(size, method)
+    assert stored._pil_rgb is None  # the original was never decoded
+    assert stored.size == (2000, 1500)
+
+    # Same pixels without the stored levels
+    shutil.rmtree(pyramid_store.root)
+    computed = DecodedImage(data)
+    for size, method in (((1024, 768), LANCZOS), ((512, 384), LANCZOS), ((800, 600), LINEAR)):
+        assert np.array_equal(stored.view(size, method).rgb, computed.view(size, method).rgb)
+    print("✓ Levels read instead of decoding the original, identical results")
+
+@with_cache_dir
+@with_pyramid_dir
+def test_levels_used_only_when_large_enough(tmp):
+    print("Testing level choice...")
+    wide = DecodedImage(make_photo((3000, 750)))
+    assert wide._source_level((1024, 768)) is None  # the 1024 level is only 256 high
+    assert wide._source_level((200, 50)).shape[:2] == (64, 256)
+
+    small = DecodedImage(make_photo((400, 300)))
+    assert small.view_within(512, (512, 384)) is small.full
+    assert pyramid_store.build(small) == [256]
+
+    analyzer = GreennessAnalyzer()
+    photo = make_photo(seed=3)
+    before = analyzer._calculate_greenness_percentage(DecodedImage(photo))
+    pyramid_store.build(DecodedImage(photo))
+    assert analyzer._calculate_greenness_percentage(DecodedImage(photo)) == before
+    print("✓ Original used when no level covers the requested size")
+
+class SaturatedPool:
+    async def run(self, task, *args):
+        raise AnalysisPoolSaturated("Analysis queue is full")
+
+def preview(evidence_id, position, size, if_none_match):
+    return asyncio.run(main.get_evidence_preview(evidence_id, position, size=size, if_none_match=if_none_match))
+
+@with_cache_dir
+@with_pyramid_dir
+def test_pyramid_job_and_preview(tmp):
+    print("Testing the pyramid job and the preview endpoint...")
+    index = make_index(os.path.join(tmp, "blobs"))
+    original_index = main.evidence_media
+    main.evidence_media = index
+    try:
+        photo = make_photo((1600, 1200), seed=4)
+        evidence_id = add_evidence(index, "general", {"site.jpg": photo, "clip.mp4": b"\x00\x00\x00\x18ftypmp42"})
+        result = main.run_analysis_job({"kind": "pyramid", "evidence_id": evidence_id, "params": {}})
+        assert result == {"levels": {"site.jpg": [256, 512, 1024]}, "skipped": ["clip.mp4"]}
+
+        response = preview(evidence_id, 0, size=300, if_none_match=None)
+        image = cv2.imdecode(np.frombuffer(response.body, np.uint8), cv2.IMREAD_COLOR)
+        assert response.media_type == "image/png" and image.shape[:2] == (384, 512)
+        etag = response.headers["etag"]
+        assert preview(evidence_id, 0, size=300, if_none_match=etag).status_code == 304
+        assert preview(evidence_id, 0, size=1024, if_none_match=etag).status_code == 200
+
+        # Built on demand in the analysis pool when the job hasn't run, served as uploaded when smaller than every level
+        tiny = make_photo((200, 150), seed=5)
+        other = add_evidence(index, "general", {"big.jpg": make_photo(seed=6), "tiny.jpg": tiny})
+        original_pool = main.analysis_pool
+        main.analysis_pool = SaturatedPool()
+        try:
+            preview(other, 0, size=256, if_none_match=None)
+            raise AssertionError("preview built outside the analysis pool")
+        except HTTPException as e:
+            assert e.status_code == 503 and "Retry-After" in e.headers
+        finally:
+            main.analysis_pool = original_pool
+        assert preview(other, 0, size=256, if_none_match=None).headers["etag"].endswith(f'-256-v{PYRAMID_VERSION}"')
+        response = preview(other, 1, size=256, if_none_match=None)
+        assert response.body == tiny and response.media_type == "image/jpeg"
+
+        for position, status in ((1, 415), (2, 404)):
+            try:
+                preview(evidence_id, position, size=256, if_none_match=None)
+                raise AssertionError(f"served file {position}")
+            except HTTPException as e:
+                assert e.status_code == status
+    finally:
+        main.evidence_media = original_index
+    print("✓ Levels built in the background job and served as previews")
+
+if __name__ == "__main__":
+    test_level_sizes()
+    test_views_read_from_stored_levels()
+    test_levels_used_only_when_large_enough()
+    test_pyramid_job_and_preview()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test the float32 NDVI kernel and blocked NDVI statistics of NDVIAnalyzer
+(services/ai_verification.py) against a float64 reference.
+"""
+
+import sys
+import os
+
+import numpy as np
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import services.ai_verification as ai_verification
+from services.ai_verification import NDVIAnalyzer
+from test_analysis_cache import with_cache_dir
+
+def make_frame(height=300, width=400, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    frame[:, :width // 2, 1] = rng.integers(120, 256, (height, width // 2), dtype=np.uint8)
+    frame[:8, :8] = 0  # Black pixels: zero denominator
+    return frame
+
+def reference_ndvi(image):
+    image = image.astype(np.float64)
+    nir = image[:, :, 1] + image[:, :, 2] * 0.3
+    denominator = nir + image[:, :, 0]
+    denominator[denominator == 0] = 1
+    return np.clip((nir - image[:, :, 0]) / denominator, -1, 1)
+
+@with_cache_dir
+def test_float32_ndvi():
+    print("Testing float32 NDVI...")
+    frame = make_frame()
+    ndvi = NDVIAnalyzer().calculate_ndvi_rgb(frame)
+    assert ndvi.dtype == np.float32
+    assert np.abs(ndvi - reference_ndvi(frame)).max() < 1e-6
+    assert not ndvi[:8, :8].any()
+    print("✓ Matches the float64 formula within 1e-6")
+
+@with_cache_dir
+def test_blocked_statistics_and_classes():
+    """Percentages match per-class masks regardless of block boundaries."""
+    print("Testing blocked NDVI statistics...")
+    analyzer = NDVIAnalyzer()
+    ndvi = np.linspace(-1, 1, 30001, dtype=np.float32).reshape(1, -1)
+    original_block = ai_verification.NDVI_BLOCK_PIXELS
+    ai_verification.NDVI_BLOCK_PIXELS = 4096  # Several blocks and a partial one
+    try:
+        metrics = analyzer.calculate_health_metrics(ndvi, {})
+    finally:
+        ai_verification.NDVI_BLOCK_PIXELS = original_block
+
+    total = ndvi.size
+    expected = {
+        'healthy_percentage': np.sum(ndvi > analyzer.healthy_vegetation_threshold) / total * 100,
+        'moderate_percentage': np.sum((ndvi > analyzer.min_vegetation_threshold) &
+                                      (ndvi <= analyzer.healthy_vegetation_threshold)) / total * 100,
+        'sparse_percentage': np.sum((ndvi > 0) & (ndvi <= analyzer.min_vegetation_threshold)) / total * 100,
+        'bare_percentage': np.sum(ndvi <= 0) / total * 100,
+        'mangrove_likelihood': np.sum(ndvi > analyzer.mangrove_specific_threshold) / total * 100,
+        'ndvi_mean': float(np.mean(ndvi, dtype=np.float64)),
+        'ndvi_std': float(np.std(ndvi, dtype=np.float64)),
+        'ndvi_min': -1.0,
+        'ndvi_max': 1.0
+    }
+    for key, value in expected.items():
+        assert abs(metrics[key] - value) < 1e-9, (key, metrics[key], value)
+
+    # Inverted thresholds leave the class between them empty
+    analyzer.healthy_vegetation_threshold = 0.1
+    assert analyzer.calculate_health_metrics(ndvi, {})['moderate_percentage'] == 0.0
+    print(f"✓ Classes from one pass: {metrics['healthy_percentage']:.2f}% healthy, {metrics['bare_percentage']:.2f}% bare")
+
+@with_cache_dir
+def test_masks_are_boolean():
+    print("Testing vegetation and composition masks...")
+    frame = make_frame()
+    analyzer = NDVIAnalyzer()
+    vegetation = analyzer.enhanced_vegetation_detection(frame)
+    composition = analyzer.analyze_image_composition(frame)
+    for mask in (vegetation['vegetation_mask'], composition['soil_mask'], composition['water_mask']):
+        assert mask.dtype == bool and mask.shape == frame.shape[:2]
+    assert vegetation['vegetation_pixels'] == np.count_nonzero(vegetation['vegetation_mask'])
+    assert abs(composition['soil_percentage'] - composition['soil_mask'].mean() * 100) < 1e-9
+    print(f"✓ {vegetation['vegetation_percentage']:.1f}% vegetation")
+
+if __name__ == "__main__":
+    test_float32_ndvi()
+    test_blocked_statistics_and_classes()
+    test_masks_are_boolean()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test keyset pagination and field projection helpers used by the listing endpoints.
+Runs against an in-memory SQLite database, no server required.
+"""
+
+import sys
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.db_model import Base, MRVData, ProjectData
+from services.pagination import DEFAULT_PAGE_SIZE, keyset_page, page_response, parse_fields, project_fields
+
+def create_test_session():
+    """Create an in-memory database session."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+def test_keyset_walks_every_row_once():
+    """Following next_cursor visits every project exactly once, in id order."""
+    print("Testing keyset pagination...")
+    db = create_test_session()
+    for i in range(1, 24):
+        db.add(ProjectData(id=i, name=f"Project {i}", username="tester"))
+    db.commit()
+
+    seen, after, pages = [], None, 0
+    while True:
+        rows, after = keyset_page(db.query(ProjectData), ProjectData.id, 10, after)
+        seen.extend(row.id for row in rows)
+        pages += 1
+        if after is None:
+            break
+
+    assert seen == list(range(1, 24))
+    assert pages == 3
+    print(f"✓ 23 projects returned in {pages} pages")
+    db.close()
+
+def test_exact_page_has_no_next_cursor():
+    """A page that ends exactly at the last row reports no further pages."""
+    print("Testing last page detection...")
+    db = create_test_session()
+    for i in range(1, 11):
+        db.add(MRVData(id=i, project_id=1, uploader="0xabc", gps="0,0", co2="0"))
+    db.commit()
+
+    rows, next_cursor = keyset_page(db.query(MRVData), MRVData.id, 10)
+    assert len(rows) == 10 and next_cursor is None
+
+    rows, next_cursor = keyset_page(db.query(MRVData), MRVData.id, 5, after=2)
+    assert [r.id for r in rows] == [3, 4, 5, 6, 7] and next_cursor == 7
+
+    envelope = page_response([{"evidenceId": r.id} for r in rows], next_cursor, 5)
+    assert envelope["count"] == 5 and envelope["has_more"] is True
+    print("✓ next_cursor set only when more rows exist")
+    db.close()
+
+def test_field_projection():
+    """`fields` keeps only the requested keys; no `fields` keeps everything."""
+    print("Testing field projection...")
+    assert parse_fields(None) is None
+    assert parse_fields(" , ") is None
+    assert parse_fields("id, name,") == {"id", "name"}
+
+    item = {"id": 1, "name": "Mangroves", "evidences": []}
+    assert project_fields(item, None) == item
+    assert project_fields(item, {"id", "name"}) == {"id": 1, "name": "Mangroves"}
+    print("✓ Fields projected correctly")
+
+def test_anonymous_page_reports_default_limit():
+    """An anonymous /projects/my page requested with only `after` reports the default page size."""
+    print("Testing anonymous project page...")
+    import main
+    response = main.get_my_projects(current_user=None, limit=None, after=5, fields=None)
+    assert response["items"] == [] and response["limit"] == DEFAULT_PAGE_SIZE and not response["has_more"]
+    assert main.get_my_projects(current_user=None, limit=None, after=None, fields=None) == []
+    print("✓ Empty page carries the default limit")
+
+if __name__ == "__main__":
+    test_keyset_walks_every_row_once()
+    test_exact_page_has_no_next_cursor()
+    test_field_projection()
+    test_anonymous_page_reports_default_limit()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test near-duplicate detection (services/perceptual_hash.py): perceptual
+hashes survive recompression and resizing, the multi-index table finds
+exactly what a linear scan finds, and the evidence index flags resubmitted
+photos. Uses an in-memory SQLite database.
+"""
+
+import sys
+import os
+import asyncio
+import random
+
+import cv2
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from services.decoded_image import DecodedImage
+from services.perceptual_hash import (
+    NEAR_DUPLICATE_DISTANCE, PHASH_CONFIRM_DISTANCE, MultiIndexHashTable, NearDuplicateIndex, fingerprint, hamming
+)
+from test_image_pyramid import make_photo
+
+def reencode(data, size=None, quality=50):
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if size:
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return encoded.tobytes()
+
+def distances(a, b):
+    fa, fb = fingerprint(DecodedImage(a)), fingerprint(DecodedImage(b))
+    return hamming(int(fa["dhash"], 16), int(fb["dhash"], 16)), hamming(int(fa["phash"], 16), int(fb["phash"], 16))
+
+def make_index():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    return NearDuplicateIndex(sessionmaker(bind=engine))
+
+def record(index, evidence_id, images):
+    db = index.session_factory()
+    try:
+        index.record(db, evidence_id, [dict(fingerprint(DecodedImage(data)), position=position, name=name)
+                                       for position, (name, data) in enumerate(images.items())])
+        db.commit()
+    finally:
+        db.close()
+
+def test_hashes_survive_reencoding():
+    print("Testing hash robustness...")
+    photo = make_photo((1600, 1200), seed=1)
+    for variant in (reencode(photo, quality=40), reencode(photo, size=(800, 600)), reencode(photo, size=(400, 300), quality=70)):
+        dhash_distance, phash_distance = distances(photo, variant)
+        assert dhash_distance <= NEAR_DUPLICATE_DISTANCE and phash_distance <= PHASH_CONFIRM_DISTANCE
+    for seed in range(2, 8):
+        dhash_distance, phash_distance = distances(photo, make_photo((1600, 1200), seed=seed))
+        assert dhash_distance > NEAR_DUPLICATE_DISTANCE or phash_distance > PHASH_CONFIRM_DISTANCE
+    print("✓ Recompressed and resized copies match, other scenes don't")
+
+def test_multi_index_matches_linear_scan():
+    print("Testing multi-index hashing...")
+    rng = random.Random(7)
+    table = MultiIndexHashTable()
+    hashes = {key: rng.getrandbits(64) for key in range(5000)}
+    for key, value in hashes.items():
+        table.add(key, value)
+    # Near neighbours of stored hashes, at every distance up to 12
+    for key in range(0, 5000, 250):
+        for bits in range(13):
+            query = hashes[key]
+            for bit in rng.sample(range(64), bits):
+                query ^= 1 << bit
+            for radius in (0, 3, 6, 12):
+                expected = sorted((k, hamming(query, v)) for k, v in hashes.items() if hamming(query, v) <= radius)
+                assert sorted(table.search(query, radius)) == expected
+
+    table.remove(0)
+    table.remove(0)
+    assert len(table) == 4999 and all(key != 0 for key, _ in table.search(hashes[0], 12))
+    print("✓ Same neighbours as a linear scan, at any radius")
+
+def test_index_flags_resubmitted_photos():
+    print("Testing the near-duplicate index...")
+    index = make_index()
+    photo = make_photo((1600, 1200), seed=11)
+    record(index, 1, {"site_2023.jpg": photo, "other.jpg": make_photo((1600, 1200), seed=12)})
+
+    resubmitted = fingerprint(DecodedImage(reencode(photo, size=(1200, 900))))
+    matches = index.find(resubmitted["dhash"], resubmitted["phash"])
+    assert [(m["evidence_id"], m["name"], m["position"]) for m in matches] == [(1, "site_2023.jpg", 0)]
+    assert index.find(resubmitted["dhash"], resubmitted["phash"], exclude_evidence_id=1) == []
+    fresh = fingerprint(DecodedImage(make_photo((1600, 1200), seed=13)))
+    assert index.find(fresh["dhash"], fresh["phash"]) == []
+
+    # Evidence deleted through another process's index disappears from this one
+    record(index, 2, {"copy.jpg": reencode(photo)})
+    assert {m["evidence_id"] for m in index.find(resubmitted["dhash"], resubmitted["phash"])} == {1, 2}
+    other_process = NearDuplicateIndex(index.session_factory)
+    db = index.session_factory()
+    try:
+        other_process.forget(db, [1])
+        db.commit()
+    finally:
+        db.close()
+    assert [m["evidence_id"] for m in index.find(resubmitted["dhash"], resubmitted["phash"])] == [2]
+    assert len(index) == 2 and index.fingerprints(2)[0]["name"] == "copy.jpg"
+    print("✓ Resubmitted photo flagged, deleted evidence dropped")
+
+def test_fingerprint_upload_skips_non_images():
+    print("Testing upload fingerprinting...")
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path, video_path = os.path.join(tmp, "image"), os.path.join(tmp, "video")
+        with open(image_path, "wb") as fh:
+            fh.write(make_photo((640, 480), seed=3))
+        with open(video_path, "wb") as fh:
+            fh.write(b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 100)
+        assert set(asyncio.run(main.fingerprint_upload(image_path))) == {"dhash", "phash"}
+        assert asyncio.run(main.fingerprint_upload(video_path)) is None
+    print("✓ Images hashed, other files skipped")
+
+if __name__ == "__main__":
+    test_hashes_survive_reencoding()
+    test_multi_index_matches_linear_scan()
+    test_index_flags_resubmitted_photos()
+    test_fingerprint_upload_skips_non_images()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test the event-driven on-chain project cache used by GET /projects/all.
+Uses a small in-process stand-in for the registry contract and node, so no
+Hardhat node is required.
+"""
+
+import sys
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from web3 import Web3
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.db_model import Base
+from services.chain_cache import ProjectChainCache, PROJECT_REGISTERED_TOPIC, CREDITS_MINTED_TOPIC
+
+OWNER = "0x" + "11" * 20
+
+class FakeCall:
+    def __init__(self, chain, fn):
+        self.chain = chain
+        self.fn = fn
+
+    def call(self, block_identifier="latest"):
+        self.chain.calls += 1
+        return self.fn()
+
+class FakeChain:
+    """Registry + node stand-in: projects, blocks and the logs emitted in them."""
+
+    def __init__(self):
+        self.projects = {}
+        self.logs = []
+        self.block_number = 1
+        self.chain_salt = 0
+        self.calls = 0
+        self.address = "0x" + "22" * 20
+
+        chain = self
+        self.eth = type("Eth", (), {})()
+        type(self.eth).block_number = property(lambda _: chain.block_number)
+        self.eth.get_block = self.get_block
+        self.eth.get_logs = self.get_logs
+
+        self.functions = type("Functions", (), {})()
+        self.functions.totalProjects = lambda: FakeCall(self, lambda: len(self.projects))
+        self.functions.projects = lambda i: FakeCall(self, lambda: list(self.projects[i]))
+
+        minted_event = type("CreditsMinted", (), {})()
+        minted_event.process_log = lambda log: {"args": {"amount": log["amount"]}}
+        self.events = type("Events", (), {})()
+        self.events.CreditsMinted = lambda: minted_event
+
+    def get_block(self, number):
+        if number > self.block_number:
+            raise ValueError("block not found")
+        return {"hash": Web3.keccak(text=f"{self.chain_salt}:{number}")}
+
+    def get_logs(self, params):
+        self.calls += 1
+        return [log for log in self.logs if params["fromBlock"] <= log["blockNumber"] <= params["toBlock"]]
+
+    def register(self, name):
+        self.block_number += 1
+        project_id = len(self.projects) + 1
+        self.projects[project_id] = (name, "Coast", 10, OWNER, "ipfs://meta", True, 0)
+        self.logs.append({"blockNumber": self.block_number,
+                          "topics": [Web3.to_bytes(hexstr=PROJECT_REGISTERED_TOPIC), project_id.to_bytes(32, "big")]})
+        return project_id
+
+    def mint(self, project_id, amount):
+        self.block_number += 1
+        project = self.projects[project_id]
+        self.projects[project_id] = project[:6] + (project[6] + amount,)
+        self.logs.append({"blockNumber": self.block_number, "amount": amount,
+                          "topics": [Web3.to_bytes(hexstr=CREDITS_MINTED_TOPIC), project_id.to_bytes(32, "big")]})
+
+def create_session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+def test_cache_follows_events():
+    """New projects and minted credits show up without re-reading every project."""
+    print("Testing event-driven refresh...")
+    chain = FakeChain()
+    for i in range(50):
+        chain.register(f"Project {i}")
+
+    cache = ProjectChainCache(chain, chain, create_session_factory(), sync_interval=0)
+    assert cache.total_projects() == 50
+
+    chain.calls = 0
+    new_id = chain.register("Late project")
+    chain.mint(3, 25)
+    chain.mint(new_id, 5)
+
+    projects = dict(cache.get_projects())
+    assert len(projects) == 51
+    assert projects[3][6] == 25
+    assert projects[new_id][0] == "Late project" and projects[new_id][6] == 5
+    # One getLogs call plus one read for the newly registered project
+    assert chain.calls == 2, f"expected 2 RPC reads, got {chain.calls}"
+    print(f"✓ Incremental sync used {chain.calls} RPC reads for 51 projects")
+
+def test_cache_restores_from_sqlite():
+    """A new cache instance resumes from the persisted checkpoint."""
+    print("Testing restart from SQLite...")
+    chain = FakeChain()
+    for i in range(20):
+        chain.register(f"Project {i}")
+    session_factory = create_session_factory()
+    ProjectChainCache(chain, chain, session_factory, sync_interval=0).sync()
+
+    chain.mint(7, 100)
+    chain.calls = 0
+    restarted = ProjectChainCache(chain, chain, session_factory, sync_interval=0)
+    assert restarted.get_project(7)[6] == 100
+    assert restarted.total_projects() == 20
+    assert chain.calls == 1, f"expected only a getLogs call, got {chain.calls}"
+    print("✓ Restarted cache caught up from its checkpoint")
+
+def test_chain_reset_rebuilds_cache():
+    """A restarted local chain (checkpoint block hash changed) triggers a rebuild."""
+    print("Testing chain reset detection...")
+    chain = FakeChain()
+    for i in range(5):
+        chain.register(f"Project {i}")
+    cache = ProjectChainCache(chain, chain, create_session_factory(), sync_interval=0)
+    assert cache.total_projects() == 5
+
+    chain.projects = {}
+    chain.logs = []
+    chain.chain_salt += 1
+    chain.block_number = 1
+    chain.register("Fresh deployment")
+
+    assert cache.total_projects() == 1
+    assert cache.get_project(1)[0] == "Fresh deployment"
+    print("✓ Cache rebuilt after chain reset")
+
+if __name__ == "__main__":
+    test_cache_follows_events()
+    test_cache_restores_from_sqlite()
+    test_chain_reset_rebuilds_cache()
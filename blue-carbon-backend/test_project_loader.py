@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test the batched project + evidence loader used by GET /projects and GET /projects/my.
+Runs against an in-memory SQLite database, no server required.
+"""
+
+import sys
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.db_model import Base, MRVData, ProjectData
+from services import project_loader
+from services.project_loader import load_projects_with_evidences
+
+def create_test_session():
+    """Create an in-memory database session and a statement counter."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statements(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    return sessionmaker(bind=engine)(), statements
+
+def seed_projects(db, project_count: int, evidence_per_project: int):
+    """Insert projects whose evidence is keyed by blockchain id."""
+    for i in range(1, project_count + 1):
+        db.add(ProjectData(id=i, blockchain_id=i + 1000, name=f"Project {i}", username="tester"))
+        for j in range(evidence_per_project):
+            db.add(MRVData(project_id=i + 1000, uploader="0xabc", gps="0,0", co2=str(j)))
+    db.commit()
+
+def test_batched_loader_groups_evidence():
+    """Each project gets exactly its own evidence rows."""
+    print("Testing evidence grouping...")
+    db, _ = create_test_session()
+    seed_projects(db, project_count=5, evidence_per_project=3)
+
+    results = load_projects_with_evidences(
+        db, db.query(ProjectData), evidence_key=lambda p: p.blockchain_id or p.id
+    )
+
+    assert len(results) == 5
+    for project, evidences in results:
+        assert len(evidences) == 3
+        assert all(e.project_id == project.blockchain_id for e in evidences)
+        assert [e.id for e in evidences] == sorted(e.id for e in evidences)
+
+    # Projects without evidence get an empty list, not a missing key
+    results = load_projects_with_evidences(db, db.query(ProjectData))
+    assert all(evidences == [] for _, evidences in results)
+    print("✓ Evidence grouped correctly")
+    db.close()
+
+def test_query_count_is_constant():
+    """Listing issues a fixed number of queries regardless of project count."""
+    print("Testing query count...")
+    db, statements = create_test_session()
+    seed_projects(db, project_count=200, evidence_per_project=2)
+
+    statements.clear()
+    load_projects_with_evidences(db, db.query(ProjectData), evidence_key=lambda p: p.blockchain_id)
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+
+    assert len(selects) == 2, f"expected 2 SELECTs, got {len(selects)}"
+    print(f"✓ 200 projects loaded with {len(selects)} queries")
+    db.close()
+
+def test_large_id_lists_are_chunked():
+    """IN (...) lists are split to stay under SQLite's bound parameter limit."""
+    print("Testing IN clause chunking...")
+    db, statements = create_test_session()
+    seed_projects(db, project_count=25, evidence_per_project=1)
+
+    original_chunk_size = project_loader.IN_CLAUSE_CHUNK_SIZE
+    project_loader.IN_CLAUSE_CHUNK_SIZE = 10
+    try:
+        statements.clear()
+        results = load_projects_with_evidences(db, db.query(ProjectData), evidence_key=lambda p: p.blockchain_id)
+    finally:
+        project_loader.IN_CLAUSE_CHUNK_SIZE = original_chunk_size
+
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 1 + 3
+    assert sum(len(evidences) for _, evidences in results) == 25
+    print("✓ 25 projects loaded in 3 evidence chunks")
+    db.close()
+
+if __name__ == "__main__":
+    test_batched_loader_groups_evidence()
+    test_query_count_is_constant()
+    test_large_id_lists_are_chunked()
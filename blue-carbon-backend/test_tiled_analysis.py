@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Test tiled, memory-bounded image analysis (services/tiled_analysis.py):
+windowed TIFF reading and exact merging of per-tile statistics.
+"""
+
+import sys
+import os
+import struct
+import tempfile
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.ai_verification import NDVIAnalyzer
+from services.greenness_analyzer import GreennessAnalyzer
+from services.tiled_analysis import ArrayReader, MemmapTiffReader, TiledImageAnalyzer, open_raster
+
+def write_tiff(path, width, height, pixels, rows_per_strip=None, tile=None):
+    """
+    Uncompressed RGB TIFF written chunk by chunk, so test and benchmark
+    images never have to exist in memory. pixels(x, y, w, h) returns an
+    (h, w, 3) uint8 chunk; strips by default, square tiles with `tile`.
+    """
+    if tile:
+        chunk_w = chunk_h = tile
+        chunks = [(x, y) for y in range(0, height, tile) for x in range(0, width, tile)]
+    else:
+        chunk_w, chunk_h = width, rows_per_strip or height
+        chunks = [(0, y) for y in range(0, height, chunk_h)]
+
+    def chunk_size(y):
+        rows = chunk_h if tile else min(chunk_h, height - y)
+        return chunk_w * rows * 3
+
+    entries = [(256, 4, 1, width), (257, 4, 1, height), (258, 3, 3, None), (259, 3, 1, 1),
+               (262, 3, 1, 2), (277, 3, 1, 3), (284, 3, 1, 1)]
+    if tile:
+        entries += [(322, 4, 1, tile), (323, 4, 1, tile), (324, 4, len(chunks), None), (325, 4, len(chunks), None)]
+    else:
+        entries += [(273, 4, len(chunks), None), (278, 4, 1, chunk_h), (279, 4, len(chunks), None)]
+    entries.sort()
+
+    ifd_offset = 8
+    data_offset = ifd_offset + 2 + 12 * len(entries) + 4
+    arrays, offsets = {}, []
+    position = data_offset + 6 + 8 * len(chunks)  # Bits per sample, then offsets and byte counts
+    for _, y in chunks:
+        offsets.append(position)
+        position += chunk_size(y)
+    arrays[258] = struct.pack("<3H", 8, 8, 8)
+    arrays[273] = arrays[324] = struct.pack(f"<{len(chunks)}I", *offsets)
+    arrays[279] = arrays[325] = struct.pack(f"<{len(chunks)}I", *(chunk_size(y) for _, y in chunks))
+
+    with open(path, "wb") as fh:
+        fh.write(b"II" + struct.pack("<HI", 42, ifd_offset))
+        fh.write(struct.pack("<H", len(entries)))
+        extra = b""
+        for tag, kind, count, value in entries:
+            if value is None and len(arrays[tag]) > 4:
+                value = data_offset + len(extra)
+                extra += arrays[tag]
+            elif value is None:
+                value = struct.unpack("<I", arrays[tag].ljust(4, b"\0"))[0]
+            fh.write(struct.pack("<HHI", tag, kind, count))
+            fh.write(struct.pack("<HH", value, 0) if kind == 3 else struct.pack("<I", value))
+        fh.write(struct.pack("<I", 0))
+        fh.write(extra.ljust(position - data_offset - sum(chunk_size(y) for _, y in chunks), b"\0"))
+        for x, y in chunks:
+            w, h = (chunk_w, chunk_h) if tile else (width, min(chunk_h, height - y))
+            chunk = np.zeros((h, w, 3), dtype=np.uint8)
+            vw, vh = min(w, width - x), min(h, height - y)
+            chunk[:vh, :vw] = pixels(x, y, vw, vh)
+            fh.write(chunk.tobytes())
+
+def make_scene(height=700, width=900, seed=0):
+    """Vegetation, soil and water bands with noise."""
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+    image[:, :width // 3] += np.array([30, 150, 40], dtype=np.uint8)
+    image[:, width // 3:2 * width // 3] += np.array([150, 110, 60], dtype=np.uint8)
+    image[:, 2 * width // 3:] += np.array([20, 60, 160], dtype=np.uint8)
+    return image
+
+def whole_image_analysis(image):
+    """The per-image analysis at native resolution, for reference."""
+    analyzer = NDVIAnalyzer()
+    vegetation = analyzer.enhanced_vegetation_detection(image)
+    composition = analyzer.analyze_image_composition(image)
+    health = analyzer.calculate_health_metrics(analyzer.calculate_ndvi_rgb(image), vegetation)
+    result = analyzer.build_analysis_result("scene", image.shape, health, vegetation, composition)
+    hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
+    result['greenness_percentage'] = cv2.countNonZero(GreennessAnalyzer.green_mask(hsv)) / (image.shape[0] * image.shape[1]) * 100
+    return result
+
+def test_readers_return_exact_windows():
+    print("Testing windowed TIFF readers...")
+    image = make_scene(300, 500)
+    pixels = lambda x, y, w, h: image[y:y + h, x:x + w]
+    with tempfile.TemporaryDirectory() as tmp:
+        layouts = {
+            'pillow.tif': lambda path: Image.fromarray(image).save(path),
+            'strips.tif': lambda path: write_tiff(path, 500, 300, pixels, rows_per_strip=7),
+            'tiles.tif': lambda path: write_tiff(path, 500, 300, pixels, tile=64)
+        }
+        for name, write in layouts.items():
+            path = os.path.join(tmp, name)
+            write(path)
+            with open_raster(path) as reader:
+                assert isinstance(reader, MemmapTiffReader), name
+                assert (reader.width, reader.height) == (500, 300)
+                for x, y, w, h in [(0, 0, 500, 300), (63, 5, 130, 71), (440, 250, 60, 50)]:
+                    assert np.array_equal(reader.read_window(x, y, w, h), image[y:y + h, x:x + w]), (name, x, y)
+                reader.release()
+
+        png_path = os.path.join(tmp, "scene.png")
+        Image.fromarray(image).save(png_path)
+        with open_raster(png_path) as reader:
+            assert isinstance(reader, ArrayReader)
+            assert np.array_equal(reader.read_window(10, 20, 30, 40), image[20:60, 10:40])
+    print("✓ Pillow, striped and tiled TIFFs read window by window")
+
+def test_tiled_matches_whole_image():
+    """Merged tile statistics equal the whole-image analysis, including texture across tile borders."""
+    print("Testing tiled analysis against whole-image analysis...")
+    image = make_scene()
+    expected = whole_image_analysis(image)
+    result = TiledImageAnalyzer(tile_size=128).analyze_raster(ArrayReader(image), "scene")
+    assert result['tiling']['tiles'] == 6 * 8
+    assert result['image_dimensions'] == {'width': 900, 'height': 700, 'channels': 3}
+
+    for section in ('ndvi_analysis', 'vegetation_analysis', 'composition_analysis', 'detection_results', 'verification_metrics'):
+        for key, value in expected[section].items():
+            actual = result[section][key]
+            if isinstance(value, (bool, str)):
+                assert actual == value, (section, key)
+            else:
+                assert abs(actual - value) <= 1e-6 * max(1.0, abs(value)), (section, key, actual, value)
+    assert abs(result['greenness_percentage'] - expected['greenness_percentage']) < 1e-9
+    print(f"✓ 48 tiles reproduce the whole-image result ({result['vegetation_analysis']['total_vegetation_coverage']:.1f}% vegetation)")
+
+def test_analyze_file_is_cached():
+    print("Testing tiled file analysis...")
+    from services.analysis_cache import analysis_cache
+    image = make_scene(256, 256)
+    with tempfile.TemporaryDirectory() as tmp:
+        analysis_cache.cache_dir = tmp
+        analysis_cache.clear_memory()
+        path = os.path.join(tmp, "mosaic.tif")
+        write_tiff(path, 256, 256, lambda x, y, w, h: image[y:y + h, x:x + w], tile=64)
+        analyzer = TiledImageAnalyzer(tile_size=100)
+        first = analyzer.analyze_file(path, "mosaic.tif")
+        hits = analysis_cache.hits
+        assert analyzer.analyze_file(path, "renamed.tif")['filename'] == "renamed.tif"
+        assert analysis_cache.hits == hits + 1
+        assert first['tiling']['reader'] == 'memmap_tiff' and first['analysis_mode'] == 'tiled'
+
+        broken = os.path.join(tmp, "broken.tif")
+        with open(broken, "wb") as fh:
+            fh.write(b"II*\0garbage")
+        assert analyzer.analyze_file(broken)['success'] is False
+    analysis_cache.cache_dir = None
+    analysis_cache.clear_memory()
+    print("✓ Results cached by file content; unreadable files reported")
+
+if __name__ == "__main__":
+    test_readers_return_exact_windows()
+    test_tiled_matches_whole_image()
+    test_analyze_file_is_cached()
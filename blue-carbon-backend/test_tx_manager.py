@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Test the non-blocking transaction manager (services/tx_manager.py).
+Uses an in-process node stand-in that mines pending transactions on a fixed
+block time, so no Hardhat node is required.
+"""
+
+import sys
+import os
+import threading
+import time
+
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.tx_manager import TransactionManager, TransactionBuildError
+
+SENDER = "0x" + "AA" * 20
+BLOCK_TIME = 0.3
+
+class FakeSigned:
+    def __init__(self, tx):
+        self.raw_transaction = tx
+
+class FakeContractCall:
+    def __init__(self, revert=False, fail_build=False):
+        self.revert = revert
+        self.fail_build = fail_build
+
+    def build_transaction(self, params):
+        if self.fail_build:
+            raise ValueError("execution reverted: Project not found")
+        return dict(params, revert=self.revert)
+
+class FakeNode:
+    """
+    Accepts raw transactions immediately and mines them every BLOCK_TIME
+    seconds, unless `hold` is set; drop() empties the pool without mining.
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.receipts = {}
+        self.mempool = []
+        self.block_number = 0
+        self.confirmed_nonce = 0
+        self.lock = threading.Lock()
+        self.reject_next_send = False
+        self.hold = False
+
+        self.eth = self
+        self.account = type("Account", (), {"sign_transaction": staticmethod(lambda tx, private_key: FakeSigned(tx))})()
+        self._stop = threading.Event()
+        threading.Thread(target=self._mine, daemon=True).start()
+
+    def to_wei(self, value, unit):
+        return Web3.to_wei(value, unit)
+
+    def get_transaction_count(self, address, block_identifier="latest"):
+        with self.lock:
+            return self.confirmed_nonce + (len(self.mempool) if block_identifier == "pending" else 0)
+
+    def send_raw_transaction(self, tx):
+        with self.lock:
+            if self.reject_next_send:
+                self.reject_next_send = False
+                raise ValueError("nonce too low")
+            # Distinct per send, so a replacement at the same nonce has its own hash
+            tx_hash = Web3.keccak(text=f"tx-{len(self.sent)}")
+            self.sent.append(tx)
+            self.mempool.append((tx_hash, tx))
+            return tx_hash
+
+    def get_transaction_receipt(self, tx_hash):
+        with self.lock:
+            if tx_hash not in self.receipts:
+                raise TransactionNotFound("not mined")
+            return self.receipts[tx_hash]
+
+    def drop(self):
+        with self.lock:
+            self.mempool = []
+
+    def _mine(self):
+        while not self._stop.wait(BLOCK_TIME):
+            with self.lock:
+                self.block_number += 1
+                if self.hold:
+                    continue
+                for tx_hash, tx in self.mempool:
+                    self.receipts[Web3.to_hex(tx_hash)] = {"blockNumber": self.block_number, "gasUsed": 21000,
+                                                           "status": 0 if tx["revert"] else 1}
+                    self.confirmed_nonce += 1
+                self.mempool = []
+
+    def stop(self):
+        self._stop.set()
+
+def test_concurrent_submissions_get_unique_nonces():
+    """Parallel submits never share a nonce and return before the block is mined."""
+    print("Testing concurrent nonce allocation...")
+    node = FakeNode()
+    manager = TransactionManager(node, SENDER, "0x01", poll_interval=0.05)
+    confirmed = []
+
+    def submit():
+        manager.submit(FakeContractCall(), "uploadEvidence", on_confirmed=lambda receipt: confirmed.append(receipt))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=submit) for _ in range(30)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    submit_seconds = time.perf_counter() - start
+
+    nonces = sorted(tx["nonce"] for tx in node.sent)
+    assert nonces == list(range(30)), nonces
+    assert submit_seconds < BLOCK_TIME, f"submits took {submit_seconds:.2f}s, longer than a block"
+
+    for record in manager.list():
+        assert manager.wait(record["tx_hash"], timeout=5)["status"] == "confirmed"
+    assert len(confirmed) == 30
+    node.stop()
+    print(f"✓ 30 transactions submitted in {submit_seconds * 1000:.0f} ms (block time {BLOCK_TIME * 1000:.0f} ms)")
+
+def test_reverted_and_unbuildable_transactions():
+    """Reverts are reported as failed; build errors don't consume a nonce."""
+    print("Testing failure handling...")
+    node = FakeNode()
+    manager = TransactionManager(node, SENDER, "0x01", poll_interval=0.05)
+
+    try:
+        manager.submit(FakeContractCall(fail_build=True), "verifyEvidenceAndIssue")
+        assert False, "expected TransactionBuildError"
+    except TransactionBuildError:
+        pass
+
+    reverted = manager.submit(FakeContractCall(revert=True), "verifyEvidenceAndIssue")
+    assert reverted["nonce"] == 0
+    result = manager.wait(reverted["tx_hash"], timeout=5)
+    assert result["status"] == "failed" and result["receipt"]["status"] == 0
+
+    pending = manager.get(manager.submit(FakeContractCall(), "mint")["tx_hash"])
+    assert pending["status"] == "pending" and "receipt" not in pending
+    node.stop()
+    print("✓ Reverted tx marked failed, build error reported without using a nonce")
+
+def test_nonce_resyncs_after_rejected_send():
+    """A rejected send re-reads the nonce from the node instead of leaving a gap."""
+    print("Testing nonce resync...")
+    node = FakeNode()
+    manager = TransactionManager(node, SENDER, "0x01", poll_interval=0.05)
+    manager.submit(FakeContractCall(), "mint")
+
+    node.reject_next_send = True
+    try:
+        manager.submit(FakeContractCall(), "mint")
+        assert False, "expected the send to fail"
+    except ValueError:
+        pass
+
+    record = manager.submit(FakeContractCall(), "mint")
+    assert record["nonce"] == 1
+    node.stop()
+    print("✓ Nonce re-read from the node after a rejected send")
+
+def wait_for_status(manager, tx_hash, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while manager.get(tx_hash)["status"] != status:
+        assert time.monotonic() < deadline, f"{tx_hash} still {manager.get(tx_hash)['status']}"
+        time.sleep(0.05)
+
+def test_timed_out_transactions_stay_tracked():
+    """A timeout releases waiters only; a late block confirms it, a reused nonce drops it."""
+    print("Testing receipt timeouts...")
+    node = FakeNode()
+    manager = TransactionManager(node, SENDER, "0x01", poll_interval=0.05, receipt_timeout=0.2)
+    confirmed, failed = [], []
+    callbacks = {"on_confirmed": confirmed.append, "on_failed": failed.append}
+    try:
+        node.hold = True
+        late = manager.submit(FakeContractCall(), "uploadEvidence", **callbacks)
+        assert manager.wait(late["tx_hash"], timeout=5)["status"] == "timeout"
+        node.hold = False
+        wait_for_status(manager, late["tx_hash"], "confirmed")
+        assert len(confirmed) == 1 and failed == []
+
+        node.hold = True
+        dropped = manager.submit(FakeContractCall(), "uploadEvidence", **callbacks)
+        assert manager.wait(dropped["tx_hash"], timeout=5)["status"] == "timeout"
+        node.drop()
+        node.hold = False
+        time.sleep(BLOCK_TIME)
+        assert manager.get(dropped["tx_hash"])["status"] == "timeout"  # Nothing took its nonce yet
+
+        replacement = manager.submit(FakeContractCall(), "mint")
+        assert replacement["nonce"] == dropped["nonce"] == 1
+        wait_for_status(manager, dropped["tx_hash"], "dropped")
+        assert len(confirmed) == 1 and [record["tx_hash"] for record in failed] == [dropped["tx_hash"]]
+    finally:
+        node.stop()
+    print("✓ Late block confirmed, dropped transaction failed once its nonce was reused")
+
+if __name__ == "__main__":
+    test_concurrent_submissions_get_unique_nonces()
+    test_reverted_and_unbuildable_transactions()
+    test_nonce_resyncs_after_rejected_send()
+    test_timed_out_transactions_stay_tracked()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test that /upload queues its analysis jobs in the same transaction as the
+evidence record, and skips the analysis of resubmitted photos only.
+Calls the endpoint function directly with an in-memory SQLite database, a
+temporary blob store and the in-process node stand-in from
+test_tx_manager; no job worker runs.
+"""
+
+import sys
+import os
+import asyncio
+import io
+import tempfile
+
+import cv2
+import numpy as np
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from models.db_model import AnalysisJob, Base, MRVData, ProjectData
+from services.analysis_jobs import AnalysisJobQueue
+from services.blob_store import BlobStore
+from services.evidence_media import EvidenceMediaIndex
+from services.perceptual_hash import NearDuplicateIndex
+from services.tx_manager import TransactionManager
+from test_image_pyramid import make_photo
+from test_tx_manager import FakeContractCall, FakeNode, SENDER
+
+class FakeRegistryFunctions:
+    def __init__(self):
+        self.fail = False
+
+    def uploadEvidence(self, project_id, evidence_hash, metadata):
+        return FakeContractCall(fail_build=self.fail)
+
+class FakeRegistry:
+    def __init__(self):
+        self.functions = FakeRegistryFunctions()
+
+def with_upload_backend(test):
+    """Run `test` with main's stores, job queue and chain on test doubles."""
+    def run():
+        names = ("SessionLocal", "blob_store", "evidence_media", "duplicate_index", "analysis_jobs", "registry", "tx_manager")
+        originals = {name: getattr(main, name) for name in names}
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        db.add(ProjectData(id=1, name="Mangrove A", location="Coast", hectares=10, owner=SENDER, blockchain_id=3))
+        db.commit()
+        db.close()
+        node = FakeNode()
+        with tempfile.TemporaryDirectory() as tmp:
+            main.SessionLocal = Session
+            main.blob_store = BlobStore(Session, root=tmp)
+            main.evidence_media = EvidenceMediaIndex(Session, main.blob_store)
+            main.duplicate_index = NearDuplicateIndex(Session)
+            main.analysis_jobs = AnalysisJobQueue(Session, lambda job: {"success": True})
+            main.registry = FakeRegistry()
+            main.tx_manager = TransactionManager(node, SENDER, "0x01", poll_interval=0.05)
+            try:
+                test(Session)
+            finally:
+                main.tx_manager.stop()
+                node.stop()
+                for name, value in originals.items():
+                    setattr(main, name, value)
+    run.__name__ = test.__name__
+    return run
+
+def reencode(data):
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 60])[1].tobytes()
+
+def upload(evidence_type, photos, project_id=1):
+    files = [UploadFile(io.BytesIO(data), filename=f"site_{n}.jpg") for n, data in enumerate(photos)]
+    return asyncio.run(main.upload_evidence(
+        project_id=project_id, uploader=SENDER, gps="1.0,2.0", co2=None, evidence_type=evidence_type,
+        project_area_hectares=2.0, time_period_years=1.0, anchor_mode="individual", files=files
+    ))
+
+def jobs_of(Session, evidence_id):
+    db = Session()
+    try:
+        return [job.kind for job in db.query(AnalysisJob).filter(AnalysisJob.evidence_id == evidence_id).order_by(AnalysisJob.id)]
+    finally:
+        db.close()
+
+@with_upload_backend
+def test_jobs_stored_with_the_evidence(Session):
+    print("Testing upload job queueing...")
+    response = upload("before_after_pair", [make_photo((640, 480), seed=21), make_photo((640, 480), seed=22)])
+    evidence_id = response["evidence_id"]
+    assert jobs_of(Session, evidence_id) == ["pyramid", "immediate_pair"]
+    assert response["analysis_job"]["status"] == "queued"
+    assert main.analysis_jobs.get(response["analysis_job"]["id"])["evidence_id"] == evidence_id
+
+    # Evidence that never reached the chain is removed together with its jobs
+    main.registry.functions.fail = True
+    try:
+        upload("before", [make_photo((640, 480), seed=23)])
+        raise AssertionError("upload succeeded without a transaction")
+    except HTTPException as e:
+        assert e.status_code == 400
+    db = Session()
+    try:
+        assert db.query(MRVData).count() == 1 and db.query(AnalysisJob).count() == 2
+    finally:
+        db.close()
+    print("✓ Jobs committed with the evidence record, removed with it")
+
+@with_upload_backend
+def test_only_resubmissions_skip_analysis(Session):
+    print("Testing near-duplicate uploads...")
+    db = Session()
+    db.add(ProjectData(id=2, name="Mangrove B", location="Delta", hectares=5, owner=SENDER, blockchain_id=4))
+    db.commit()
+    db.close()
+    site = make_photo((640, 480), seed=31)
+    before = upload("before", [site])
+
+    # An "after" photo taken from where the "before" was is still analysed
+    after = upload("after", [reencode(site)])
+    match, = after["near_duplicates"]
+    assert match["evidence_id"] == before["evidence_id"] and match["role"] == "before" and not match["resubmission"]
+    assert "analysis_skipped" not in after and jobs_of(Session, after["evidence_id"]) == ["pyramid", "paired"]
+
+    # The same photo as another "before" of this project, or as another project's evidence, is not
+    for evidence_type, project_id in (("before", 1), ("after", 2)):
+        resubmitted = upload(evidence_type, [reencode(site)], project_id=project_id)
+        assert resubmitted["analysis_skipped"] == "near_duplicate" and "analysis_job" not in resubmitted
+        assert any(match["resubmission"] for match in resubmitted["near_duplicates"])
+        assert jobs_of(Session, resubmitted["evidence_id"]) == ["pyramid"]
+    print("✓ Complementary photos analysed, resubmissions flagged and skipped")
+
+if __name__ == "__main__":
+    test_jobs_stored_with_the_evidence()
+    test_only_resubmissions_skip_analysis()
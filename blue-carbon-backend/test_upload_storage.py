@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test streaming evidence uploads (services/upload_storage.py).
+"""
+
+import sys
+import os
+import io
+import asyncio
+import json
+import hashlib
+import tempfile
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI, File, UploadFile
+
+from services.upload_storage import RequestSizeLimitMiddleware, UploadTooLargeError, save_upload_stream, upload_path
+
+def test_single_pass_hashes_match_whole_file_hashes():
+    """Chunked hashing gives the same digests as hashing the concatenated files."""
+    print("Testing incremental hashing...")
+    files = [os.urandom(3 * 1024 + 17), os.urandom(10), b""]
+    evidence_hasher = hashlib.sha256()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, content in enumerate(files):
+            path = os.path.join(tmp, f"file{i}.bin")
+            size, file_hash = save_upload_stream(io.BytesIO(content), path, evidence_hasher, chunk_size=1024)
+            assert size == len(content)
+            assert file_hash == hashlib.sha256(content).hexdigest()
+            with open(path, "rb") as fh:
+                assert fh.read() == content
+
+    assert evidence_hasher.digest() == hashlib.sha256(b"".join(files)).digest()
+    print("✓ File and evidence hashes match the non-streaming computation")
+
+def test_oversized_upload_is_rejected_without_leftovers():
+    """Going past max_bytes raises and removes the partial file."""
+    print("Testing size limit...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "drone.mp4")
+        try:
+            save_upload_stream(io.BytesIO(b"x" * 5000), path, max_bytes=4096, chunk_size=1024)
+            assert False, "expected UploadTooLargeError"
+        except UploadTooLargeError as e:
+            assert e.filename == "drone.mp4"
+        assert os.listdir(tmp) == []
+
+        save_upload_stream(io.BytesIO(b"x" * 4096), path, max_bytes=4096, chunk_size=1024)
+        assert os.path.getsize(path) == 4096
+    print("✓ Oversized upload rejected, limit itself accepted")
+
+def test_upload_path_strips_directories():
+    print("Testing upload filenames...")
+    assert upload_path("../../etc/passwd", "uploads") == os.path.join("uploads", "passwd")
+    for bad in ("", "..", "dir/"):
+        try:
+            upload_path(bad, "uploads")
+            assert False, f"expected ValueError for {bad!r}"
+        except ValueError:
+            pass
+    print("✓ Client paths reduced to their base name")
+
+def multipart(filename, content):
+    return (b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"" + filename.encode() +
+            b"\"\r\nContent-Type: application/octet-stream\r\n\r\n" + content + b"\r\n--b--\r\n")
+
+def post(app, body, chunk_size=1024, declare_length=True):
+    """Send `body` to `app` as an ASGI request in chunks; returns (status, JSON response)."""
+    headers = [(b"content-type", b"multipart/form-data; boundary=b")]
+    if declare_length:
+        headers.append((b"content-length", str(len(body)).encode()))
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+             "path": "/upload", "raw_path": b"/upload", "root_path": "", "query_string": b"", "headers": headers,
+             "client": ("127.0.0.1", 1), "server": ("testserver", 80)}
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    sent = []
+
+    async def receive():
+        if chunks:
+            return {"type": "http.request", "body": chunks.pop(0), "more_body": bool(chunks)}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    status = next(m["status"] for m in sent if m["type"] == "http.response.start")
+    return status, json.loads(b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body"))
+
+def test_oversized_request_is_refused_before_parsing():
+    """The request-size middleware answers 413 before the endpoint's files are parsed."""
+    print("Testing request size limit...")
+    app = FastAPI()
+    handled = []
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        handled.append(file.filename)
+        return {"ok": True}
+
+    app.add_middleware(RequestSizeLimitMiddleware, limits={"/upload": 4096})
+    oversized = multipart("drone.mp4", b"x" * 5000)
+
+    status, response = post(app, oversized)
+    assert status == 413 and "maximum size" in response["detail"]
+    # Without a Content-Length the body is counted as it arrives
+    status, response = post(app, oversized, declare_length=False)
+    assert status == 413 and "maximum size" in response["detail"]
+    assert handled == []
+
+    assert post(app, multipart("site.jpg", b"x" * 1000)) == (200, {"ok": True})
+    assert handled == ["site.jpg"]
+    print("✓ Oversized requests refused by declared and by received size")
+
+if __name__ == "__main__":
+    test_single_pass_hashes_match_whole_file_hashes()
+    test_oversized_upload_is_rejected_without_leftovers()
+    test_upload_path_strips_directories()
+    test_oversized_request_is_refused_before_parsing()
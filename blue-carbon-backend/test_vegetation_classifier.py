@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test the whole-image patch feature engine of VegetationClassifier
+(services/vegetation_classifier.py) against the per-patch extractors.
+"""
+
+import sys
+import os
+import tempfile
+
+import joblib
+import numpy as np
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.vegetation_classifier import FEATURE_VERSION, VegetationClassifier
+
+def make_scene(height=160, width=224, seed=0):
+    """Noisy image whose left half is green vegetation, plus its vegetation mask."""
+    rng = np.random.default_rng(seed)
+    image = rng.integers(60, 140, (height, width, 3), dtype=np.uint8)
+    image[:, :width // 2, 1] = rng.integers(170, 230, (height, width // 2), dtype=np.uint8)
+    mask = np.zeros((height, width))
+    mask[:, :width // 2] = 1
+    return image, mask
+
+def test_patch_features_match_per_patch_extraction():
+    """Color, ratio and diversity features are exact; texture differs only at patch borders."""
+    print("Testing vectorized patch features...")
+    image, _ = make_scene()
+    classifier = VegetationClassifier()
+    features, ys, xs = classifier.extract_patch_features(image, patch_size=32, step=8)
+    assert features.shape == (len(ys) * len(xs), len(classifier.feature_names))
+    assert list(ys) == list(range(0, 160 - 32 + 1, 8)) and list(xs) == list(range(0, 224 - 32 + 1, 8))
+
+    expected = np.array([
+        classifier.extract_all_features(image[y:y + 32, x:x + 32]) for y in ys for x in xs
+    ])
+    exact = [0, 1, 2, 3, 4, 5, 6, 7, 8, 11]
+    assert np.allclose(features[:, exact], expected[:, exact], rtol=1e-9, atol=1e-9)
+    # Local variance and edges see across patch borders in the whole-image pass
+    texture_error = np.abs(features[:, 9] - expected[:, 9]) / expected[:, 9]
+    assert np.median(texture_error) < 0.05
+    assert np.abs(features[:, 10] - expected[:, 10]).max() < 0.15
+    print(f"✓ {len(features)} patches match the per-patch extractors")
+
+def test_batched_classification():
+    """One predict_proba call yields the same map as scoring patches one by one."""
+    print("Testing batched classification...")
+    image, mask = make_scene()
+    classifier = VegetationClassifier()
+    assert classifier.train_classifier([image], [mask])
+
+    result = classifier.classify_vegetation(image)
+    assert result['classification_method'] == 'machine_learning'
+    assert 40 < result['vegetation_percentage'] < 60
+
+    features, ys, xs = classifier.extract_patch_features(image, 32, 8)
+    probabilities = classifier.classifier.predict_proba(classifier.scaler.transform(features))[:, 1]
+    expected = np.zeros(image.shape[:2])
+    coverage = np.zeros(image.shape[:2])
+    for prob, (y, x) in zip(probabilities, [(y, x) for y in ys for x in xs]):
+        expected[y:y + 32, x:x + 32] += prob
+        coverage[y:y + 32, x:x + 32] += 1
+    expected /= np.maximum(coverage, 1)
+    assert np.allclose(result['vegetation_probability'], expected)
+
+    tiny = classifier.classify_vegetation(image[:16, :16])
+    assert tiny['vegetation_percentage'] == 0.0
+    print(f"✓ {result['vegetation_percentage']:.1f}% vegetation (left half of the scene)")
+
+def test_saved_models_carry_feature_version():
+    """Models saved before the diversity feature changed meaning are not loaded."""
+    print("Testing model feature versions...")
+    image, mask = make_scene()
+    trained = VegetationClassifier()
+    assert trained.train_classifier([image], [mask])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.joblib")
+        assert trained.save_model(path)
+        assert joblib.load(path)['feature_version'] == FEATURE_VERSION
+        loaded = VegetationClassifier()
+        assert loaded.load_model(path) and loaded.is_trained
+
+        old = joblib.load(path)
+        del old['feature_version']
+        joblib.dump(old, path)
+        stale = VegetationClassifier()
+        assert not stale.load_model(path) and not stale.is_trained
+    print("✓ Current models load, older feature versions are refused")
+
+if __name__ == "__main__":
+    test_patch_features_match_per_patch_extraction()
+    test_batched_classification()
+    test_saved_models_carry_feature_version()
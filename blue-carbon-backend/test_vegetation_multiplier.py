@@ -15,6 +15,7 @@ import numpy as np
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from services.ai_verification import BeforeAfterAnalyzer, NDVIAnalyzer
+from test_analysis_cache import with_cache_dir
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -63,6 +64,7 @@ def create_test_image(vegetation_coverage: float, size: tuple = (400, 300)) -> b
     
     return image_buffer.getvalue()
 
+@with_cache_dir
 def test_vegetation_multiplier():
     """Test the vegetation change multiplier calculation."""
     print("=" * 60)
@@ -139,6 +141,7 @@ def test_vegetation_multiplier():
     print("TESTING COMPLETE")
     print("=" * 60)
 
+@with_cache_dir
 def test_full_analysis():
     """Test the full before/after analysis with multiplier integration."""
     print(f"\n" + "=" * 60)
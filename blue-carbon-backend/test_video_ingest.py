@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Test video upload spooling (services/video_ingest.py) and the video analysis
+endpoint (POST /api/ai-verification/analyze-video) that uses it.
+"""
+
+import sys
+import os
+import io
+import asyncio
+import json
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from fastapi import HTTPException, Request
+
+# Add the current directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import services.ai_endpoints as ai_endpoints
+import services.video_ingest as video_ingest
+from services.upload_storage import UploadTooLargeError
+from services.video_ingest import (
+    UnsupportedContentTypeError, UnsupportedVideoError, cleanup_stale_spools, sniff_container, spool_video,
+    spool_video_stream
+)
+from test_analysis_cache import with_cache_dir
+
+def make_video_bytes(fourcc="mp4v", suffix=".mp4", frames=90):
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, "clip" + suffix)
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), 30, (320, 240))
+        rng = np.random.default_rng(0)
+        for index in range(frames):
+            frame = rng.integers(0, 60, (240, 320, 3), dtype=np.uint8)
+            frame[:, :120 + index] += np.array([20, 150, 30], dtype=np.uint8)  # BGR: vegetation spreading
+            writer.write(frame)
+        writer.release()
+        with open(path, "rb") as fh:
+            return fh.read()
+    finally:
+        shutil.rmtree(tmp)
+
+class CountingReader(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+BOUNDARY = b"video-boundary"
+
+def multipart_body(data, filename="drone.mp4", content_type="video/mp4"):
+    return (b"--" + BOUNDARY + b"\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nsite 4\r\n"
+            b"--" + BOUNDARY + b"\r\nContent-Disposition: form-data; name=\"file\"; filename=\"" + filename.encode() +
+            b"\"\r\nContent-Type: " + content_type.encode() + b"\r\n\r\n" + data + b"\r\n--" + BOUNDARY + b"--\r\n")
+
+class BodyStream:
+    """A request body delivered in chunks, counting how many were read."""
+
+    def __init__(self, body, chunk_size=4096):
+        self.chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+        self.reads = 0
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            self.reads += 1
+            yield chunk
+
+    def request(self):
+        chunks = iter(self.chunks)
+
+        async def receive():
+            self.reads += 1
+            return {"type": "http.request", "body": next(chunks, b""), "more_body": self.reads < len(self.chunks)}
+        headers = [(b"content-type", b"multipart/form-data; boundary=" + BOUNDARY)]
+        return Request({"type": "http", "method": "POST", "path": "/api/ai-verification/analyze-video",
+                        "headers": headers, "query_string": b""}, receive)
+
+CONTENT_TYPE = "multipart/form-data; boundary=" + BOUNDARY.decode()
+
+def spool_stream(stream, **kwargs):
+    return asyncio.run(spool_video_stream(stream, CONTENT_TYPE, **kwargs))
+
+def test_sniff_container():
+    print("Testing container detection...")
+    assert sniff_container(make_video_bytes()) == "mp4"
+    assert sniff_container(make_video_bytes("MJPG", ".avi", frames=3)) == "avi"
+    assert sniff_container(b"\x1a\x45\xdf\xa3\x01\x00\x00\x00") == "matroska"
+    assert sniff_container(video_ingest.ASF_GUID + b"\x00" * 8) == "asf"
+    assert sniff_container(b"\x89PNG\r\n\x1a\n") is None
+    assert sniff_container(b"") is None
+    print("✓ MP4, AVI, MKV and WMV recognized from their first bytes")
+
+def test_spool_video():
+    print("Testing spooling...")
+    tmp = tempfile.mkdtemp()
+    try:
+        data = make_video_bytes()
+        with spool_video(io.BytesIO(data), "clip.mp4", temp_dir=tmp) as spool:
+            assert spool.size == len(data) and spool.container == "mp4"
+            assert os.path.dirname(spool.path) == tmp and spool.path.endswith(".mp4")
+            with open(spool.path, "rb") as fh:
+                assert fh.read() == data
+        assert os.listdir(tmp) == []
+
+        # Not a video: rejected after the first chunk
+        source = CountingReader(b"not a video" * 500000)
+        try:
+            spool_video(source, "notes.mp4", temp_dir=tmp)
+            raise AssertionError("accepted a non-video")
+        except UnsupportedVideoError:
+            pass
+        assert source.reads == 1
+
+        try:
+            spool_video(io.BytesIO(data), "clip.mp4", max_bytes=len(data) - 1, temp_dir=tmp)
+            raise AssertionError("accepted an oversized video")
+        except UploadTooLargeError:
+            pass
+        assert os.listdir(tmp) == []
+    finally:
+        shutil.rmtree(tmp)
+    print("✓ Spooled in chunks, rejected uploads leave nothing behind")
+
+def test_spool_video_stream():
+    """The video part is written from the request stream once; bad uploads are refused early."""
+    print("Testing spooling from the request stream...")
+    tmp = tempfile.mkdtemp()
+    try:
+        data = make_video_bytes()
+        for chunk_size in (7, 4096, 1 << 20):
+            with spool_stream(BodyStream(multipart_body(data), chunk_size), temp_dir=tmp) as spool:
+                assert spool.size == len(data) and spool.container == "mp4"
+                assert spool.filename == "drone.mp4" and spool.content_type == "video/mp4"
+                with open(spool.path, "rb") as fh:
+                    assert fh.read() == data
+        assert os.listdir(tmp) == []
+
+        # Refused on the part headers or the first bytes, without reading the rest of the body
+        for body, error in ((multipart_body(data, content_type="text/plain"), UnsupportedContentTypeError),
+                            (multipart_body(b"not a video" * 50000, "notes.mp4"), UnsupportedVideoError)):
+            stream = BodyStream(body)
+            try:
+                spool_stream(stream, temp_dir=tmp, accepted_types={"video/mp4"})
+                raise AssertionError("accepted an upload that isn't a video")
+            except error:
+                pass
+            assert stream.reads == 1
+
+        for body, kwargs, error in ((multipart_body(data), {"max_bytes": len(data) - 1}, UploadTooLargeError),
+                                    (multipart_body(data)[:len(data) // 2], {}, ValueError),
+                                    (multipart_body(data).replace(b'name="file"', b'name="video"'), {}, ValueError)):
+            try:
+                spool_stream(BodyStream(body), temp_dir=tmp, **kwargs)
+                raise AssertionError("accepted a bad upload")
+            except error:
+                pass
+        assert os.listdir(tmp) == []
+    finally:
+        shutil.rmtree(tmp)
+    print("✓ Written once from the stream, refused uploads leave nothing behind")
+
+def test_cleanup_stale_spools():
+    print("Testing stale spool cleanup...")
+    tmp = tempfile.mkdtemp()
+    try:
+        for name in ("old.mp4", "old.mp4.part", "new.mp4"):
+            open(os.path.join(tmp, name), "wb").close()
+        day_ago = time.time() - 86400
+        for name in ("old.mp4", "old.mp4.part"):
+            os.utime(os.path.join(tmp, name), (day_ago, day_ago))
+        assert cleanup_stale_spools(temp_dir=tmp) == 2
+        assert os.listdir(tmp) == ["new.mp4"]
+        assert cleanup_stale_spools(temp_dir=os.path.join(tmp, "missing")) == 0
+    finally:
+        shutil.rmtree(tmp)
+    print("✓ Spools of crashed processes removed")
+
+@with_cache_dir
+def test_analyze_video_endpoint():
+    print("Testing the video analysis endpoint...")
+    tmp = tempfile.mkdtemp()
+    original = video_ingest.VIDEO_TEMP_DIR
+    video_ingest.VIDEO_TEMP_DIR = tmp
+    try:
+        data = make_video_bytes()
+        response = asyncio.run(ai_endpoints.analyze_video(BodyStream(multipart_body(data)).request(), project_id=None))
+        result = json.loads(response.body)["data"]
+        assert result["file_size"] == len(data) and result["filename"] == "drone.mp4"
+        assert "error" not in result["video_analysis"], result["video_analysis"]["error"]
+        assert result["video_analysis"]["frames_analyzed"] == 10
+        assert result["overall_score"] == result["video_analysis"]["temporal_analysis"]["average_ndvi"] * 100
+        assert os.listdir(tmp) == []
+
+        for body, status in ((multipart_body(b"\x89PNG" + b"\x00" * 100, "fake.mp4"), 415),
+                             (multipart_body(data, content_type="image/png"), 400)):
+            try:
+                asyncio.run(ai_endpoints.analyze_video(BodyStream(body).request(), project_id=None))
+                raise AssertionError("accepted a non-video")
+            except HTTPException as e:
+                assert e.status_code == status
+        assert os.listdir(tmp) == []
+    finally:
+        video_ingest.VIDEO_TEMP_DIR = original
+        shutil.rmtree(tmp)
+    print(f"✓ {result['video_analysis']['frames_analyzed']} frames analyzed, spool removed")
+
+if __name__ == "__main__":
+    test_sniff_container()
+    test_spool_video()
+    test_spool_video_stream()
+    test_cleanup_stale_spools()
+    test_analyze_video_endpoint()